@@ -0,0 +1,51 @@
+"""Serial get_hourly_ohlcv loop vs. get_hourly_ohlcv_many against a local stub server.
+
+    python benchmarks/bench_bulk_fetch.py --tickers 100 --latency 0.05
+
+The stub adds a fixed per-request latency to stand in for the network
+round-trip. Throughput is reported in tickers per second.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from polygon import RESTClient
+
+from external.polygon_trading_data import PolygonTradingDataService
+from tests.polygon_stub import PolygonStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--rps", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    with PolygonStub(latency=args.latency) as stub:
+        service = PolygonTradingDataService(client=RESTClient(api_key="bench", base=stub.base_url))
+
+        start = time.perf_counter()
+        for ticker in tickers:
+            service.get_hourly_ohlcv(ticker, "2024-12-16", "2024-12-20")
+        serial = time.perf_counter() - start
+
+        print(f"{'mode':>12} {'wall (s)':>9} {'tickers/s':>10} {'speedup':>8}")
+        print(f"{'serial':>12} {serial:>9.2f} {len(tickers) / serial:>10.1f} {1.0:>7.1f}x")
+        for workers in args.workers:
+            start = time.perf_counter()
+            service.get_hourly_ohlcv_many(
+                tickers, "2024-12-16", "2024-12-20", max_workers=workers, requests_per_second=args.rps
+            )
+            elapsed = time.perf_counter() - start
+            label = f"{workers} workers"
+            print(f"{label:>12} {elapsed:>9.2f} {len(tickers) / elapsed:>10.1f} {serial / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
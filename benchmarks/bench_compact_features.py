@@ -0,0 +1,62 @@
+"""Default float64 feature matrix vs. the compact float32 layout.
+
+    python benchmarks/bench_compact_features.py --bars 100000 1000000
+
+Reports build time, peak traced memory during the build (indicators
+included), and the size of the result for build_feature_matrix, its
+compact=True mode, and the compact layout written straight to a .npy memmap.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services.feature_engineering import build_compact_feature_matrix, build_feature_matrix
+
+
+def _result_bytes(result) -> int:
+    if hasattr(result, "memory_usage"):
+        return int(result.memory_usage(index=False).sum())
+    return result.nbytes
+
+
+def measure(build):
+    # Timed and traced in separate runs; tracemalloc slows allocation-heavy code.
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size = _result_bytes(result)
+    del result
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, size / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'bars':>10} {'mode':>8} {'time (s)':>9} {'peak MiB':>9} {'result MiB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "features.npy")
+        for n in args.bars:
+            ohlcv = make_panel(1, n).drop(columns="ticker")
+            for name, build in [
+                ("float64", lambda: build_feature_matrix(ohlcv)),
+                ("compact", lambda: build_feature_matrix(ohlcv, compact=True)),
+                ("memmap", lambda: build_compact_feature_matrix(ohlcv, output="memmap", path=path)),
+            ]:
+                elapsed, peak, size = measure(build)
+                print(f"{n:>10} {name:>8} {elapsed:>9.2f} {peak:>9.1f} {size:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
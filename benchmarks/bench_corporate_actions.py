@@ -0,0 +1,95 @@
+"""Read-time split and dividend adjustment of cached bars.
+
+    python benchmarks/bench_corporate_actions.py --bars 100000 1000000 --actions 40
+
+Times CorporateActionsIndex.adjust on raw BAR_DTYPE bars against a pandas
+loop that applies one action at a time to the bars before its ex-date, and
+bars_to_frame alone for scale. Actions are a mix of splits and quarterly
+dividends spread over the bars' range.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_ohlcv
+from external.bars import BAR_DTYPE, bars_to_frame
+from external.corporate_actions import CorporateActionsIndex, action_factors
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def to_bars(ohlcv: pd.DataFrame) -> np.ndarray:
+    bars = np.empty(len(ohlcv), dtype=BAR_DTYPE)
+    bars["timestamp"] = ohlcv["timestamp"].values.astype("datetime64[ms]").astype(np.int64)
+    for column in ["open", "high", "low", "close", "volume"]:
+        bars[column] = ohlcv[column].to_numpy()
+    return bars
+
+
+def make_actions(ohlcv: pd.DataFrame, n: int, rng) -> tuple:
+    days = pd.Series(ohlcv["timestamp"].dt.tz_convert("America/New_York").dt.date.unique())
+    picks = np.sort(rng.choice(np.arange(1, len(days)), size=min(n, len(days) - 1), replace=False))
+    splits, dividends = [], []
+    for i, pick in enumerate(picks):
+        day = days[pick].isoformat()
+        if i % 10 == 0:
+            splits.append(SimpleNamespace(ticker="AAA", execution_date=day, split_from=1, split_to=2))
+        else:
+            dividends.append(SimpleNamespace(ticker="AAA", ex_dividend_date=day, cash_amount=0.25))
+    return splits, dividends
+
+
+def pandas_adjust(frame: pd.DataFrame, actions: np.ndarray) -> pd.DataFrame:
+    # One boolean mask and multiply per action, on a copy.
+    adjusted = frame.copy()
+    ts = adjusted["timestamp"].values.astype("datetime64[ms]").astype(np.int64)
+    price, volume = action_factors(actions)
+    for ex_ms, p, v in zip(actions["ex_ms"], price, volume):
+        before = ts < ex_ms
+        adjusted.loc[before, ["open", "high", "low", "close"]] *= p
+        adjusted.loc[before, "volume"] *= v
+    return adjusted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--actions", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'bars':>10} {'actions':>8} {'adjust':>10} {'pandas loop':>12} {'speedup':>8} {'to frame':>10}")
+    for n in args.bars:
+        ohlcv = make_ohlcv(n, "minute", seed=args.seed)
+        bars = to_bars(ohlcv)
+        with tempfile.TemporaryDirectory() as root:
+            index = CorporateActionsIndex(root)
+            splits, dividends = make_actions(ohlcv, args.actions, np.random.default_rng(args.seed))
+            index.update(splits, dividends, lambda ticker, ex_ms: np.full(len(ex_ms), 100.0))
+            actions = index.actions("AAA")
+            ours = best_of(lambda: index.adjust("AAA", bars), args.repeat)
+            frame = bars_to_frame(bars)
+            theirs = best_of(lambda: pandas_adjust(frame, actions), args.repeat)
+            to_frame = best_of(lambda: bars_to_frame(bars), args.repeat)
+        print(f"{n:>10,} {len(actions):>8} {ours * 1e3:>8.1f}ms {theirs * 1e3:>10.1f}ms "
+              f"{theirs / ours:>7.1f}x {to_frame * 1e3:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Rebuilding feature matrices vs. FeatureCache hits and incremental extensions.
+
+    python benchmarks/bench_feature_cache.py --bars 5000
+
+Times a cold build, a repeat request (memory hit), a repeat from a fresh
+cache backed by the disk tier, and a series of small appends (one new bar,
+then a day of new bars) against rebuilding from scratch each time.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services.feature_cache import FeatureCache
+from services.feature_engineering import build_feature_matrix
+
+
+def _time(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=5_000)
+    args = parser.parse_args()
+
+    ohlcv = make_panel(1, args.bars).drop(columns="ticker")
+    rebuild = _time(lambda: build_feature_matrix(ohlcv))
+
+    with tempfile.TemporaryDirectory() as disk_dir:
+        cache = FeatureCache(disk_dir=disk_dir)
+        cache.get(ohlcv, "T")
+        memory_hit = _time(lambda: cache.get(ohlcv, "T"))
+        disk_hit = _time(lambda: FeatureCache(disk_dir=disk_dir).get(ohlcv, "T"))
+
+    def append(step):
+        def run():
+            cache = FeatureCache()
+            cache.get(ohlcv.iloc[:args.bars - 10 * step], "T")
+            start = time.perf_counter()
+            for end in range(args.bars - 9 * step, args.bars + 1, step):
+                cache.get(ohlcv.iloc[:end], "T")
+            return (time.perf_counter() - start) / 10
+        return min(run() for _ in range(3))
+
+    print(f"{'case':<24} {'seconds':>9} {'vs rebuild':>11}")
+    for name, seconds in [
+        ("rebuild", rebuild),
+        ("memory hit", memory_hit),
+        ("disk hit", disk_hit),
+        ("append 1 bar", append(1)),
+        ("append 24 bars", append(24)),
+    ]:
+        print(f"{name:<24} {seconds:>9.4f} {rebuild / seconds:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
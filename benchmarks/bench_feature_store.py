@@ -0,0 +1,103 @@
+"""Reading stored feature rows against recomputing them from bars.
+
+    python benchmarks/bench_feature_store.py --tickers 200 --bars 5000 --partition month
+
+Builds compact feature matrices for synthetic hourly bars, appends them to a
+FeatureStore, then times: appending whole matrices and single live rows;
+reading one ticker's history, one week of it, two projected columns and a
+filtered read, against build_feature_matrix(compact=True) on the bars; and
+loading the whole universe as NumPy arrays for training.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_ohlcv
+from services.feature_engineering import build_feature_matrix
+from services.feature_store import FeatureStore
+
+
+def best_of(fn, repeat: int) -> tuple:
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def row_count(result) -> int:
+    return len(result["timestamp"]) if isinstance(result, dict) else len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=5_000, help="hourly bars per ticker")
+    parser.add_argument("--partition", default="month", choices=["day", "month", "year"])
+    parser.add_argument("--live-rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    bars = {t: make_ohlcv(args.bars, seed=i) for i, t in enumerate(tickers)}
+    start = time.perf_counter()
+    matrices = {t: build_feature_matrix(bars[t], compact=True) for t in tickers}
+    build_all = time.perf_counter() - start
+    n_rows = sum(len(m) for m in matrices.values())
+    first = tickers[0]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(os.path.join(root, "store"), partition=args.partition)
+        start = time.perf_counter()
+        for t in tickers:
+            store.append(t, matrices[t])
+        append_all = time.perf_counter() - start
+
+        live = FeatureStore(os.path.join(root, "live"), partition=args.partition)
+        rows = matrices[first].drop(columns=["timestamp", "direction"]).to_dict("records")[:args.live_rows]
+        stamps = matrices[first]["timestamp"].to_numpy()[:args.live_rows]
+        start = time.perf_counter()
+        for ts, row in zip(stamps, rows):
+            live.append_row(first, pd.Timestamp(int(ts), unit="ms", tz="UTC"), row)
+        append_row = (time.perf_counter() - start) / max(len(rows), 1)
+
+        week_start = pd.Timestamp(matrices[first]["timestamp"].iloc[len(matrices[first]) // 2], unit="ms", tz="UTC")
+        week = dict(start=week_start, end=week_start + pd.Timedelta(days=7))
+        threshold = float(np.quantile(matrices[first]["close"], 0.95))
+        cases = [
+            ("recompute 1 ticker", lambda: build_feature_matrix(bars[first], compact=True)),
+            ("read 1 ticker", lambda: store.read(first)),
+            ("read 1 ticker, 1 week", lambda: store.read(first, **week)),
+            ("read 2 columns", lambda: store.read(first, columns=["rsi", "close"])),
+            ("read close >= p95", lambda: store.read(first, filters=[("close", ">=", threshold)])),
+            ("read universe, arrays", lambda: store.read(output="arrays")),
+            ("read universe, frame", lambda: store.read()),
+        ]
+
+        print(f"{args.tickers} tickers x {args.bars:,} bars, {n_rows:,} feature rows, partition={args.partition}")
+        print(f"build every matrix:   {build_all:8.2f}s")
+        print(f"append every matrix:  {append_all:8.2f}s  ({n_rows / append_all:,.0f} rows/s)")
+        print(f"append_row (live):    {append_row * 1e6:8.0f}us per row")
+        print()
+        print(f"{'case':<24} {'time':>10} {'rows':>10} {'rows/s':>12} {'partitions':>14}")
+        for label, fn in cases:
+            before = store.stats()
+            elapsed, result = best_of(fn, args.repeat)
+            after = store.stats()
+            read = (after["partitions_read"] - before["partitions_read"]) // args.repeat
+            skipped = (after["partitions_skipped"] - before["partitions_skipped"]) // args.repeat
+            n = row_count(result)
+            parts = f"{read} / -{skipped}" if label.startswith("read") else "-"
+            print(f"{label:<24} {elapsed * 1e3:>8.1f}ms {n:>10,} {n / elapsed:>12,.0f} {parts:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Looping build_feature_matrix over a config grid vs. one build_feature_sweep call.
+
+    python benchmarks/bench_feature_sweep.py --bars 5000
+
+Grids grow along rsi_period, macd_fast and bb_period, the way a tuning run
+would, so the number of configs grows much faster than the number of
+distinct indicators.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services.feature_engineering import build_feature_matrix
+from services.feature_sweep import build_feature_sweep, parameter_grid
+
+_GRIDS = {
+    1: dict(rsi_period=[14], macd_fast=[12], bb_period=[20]),
+    8: dict(rsi_period=[7, 14], macd_fast=[8, 12], bb_period=[10, 20]),
+    27: dict(rsi_period=[7, 14, 21], macd_fast=[8, 12, 16], bb_period=[10, 20, 30]),
+    64: dict(rsi_period=[7, 10, 14, 21], macd_fast=[6, 8, 12, 16], bb_period=[10, 15, 20, 30]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=5_000)
+    parser.add_argument("--engine", default="pandas")
+    args = parser.parse_args()
+
+    ohlcv = make_panel(1, args.bars).drop(columns="ticker")
+    print(f"{'configs':>8} {'loop (s)':>9} {'sweep (s)':>10} {'wide (s)':>9} {'speedup':>8}")
+    for n_configs, grid in _GRIDS.items():
+        configs = parameter_grid(**grid)
+
+        start = time.perf_counter()
+        for config in configs:
+            build_feature_matrix(ohlcv, engine=args.engine, **config)
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_feature_sweep(ohlcv, configs, engine=args.engine)
+        sweep = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_feature_sweep(ohlcv, configs, wide=True, engine=args.engine)
+        wide = time.perf_counter() - start
+
+        print(f"{n_configs:>8} {loop:>9.3f} {sweep:>10.3f} {wide:>9.3f} {loop / sweep:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
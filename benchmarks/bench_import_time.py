@@ -0,0 +1,97 @@
+"""Cold-start import time of each entry point, with a budget for API workers.
+
+    python benchmarks/bench_import_time.py --repeat 5 --budget-ms 500
+
+Runs `python -X importtime -c "import ..."` in a fresh interpreter per
+entry point and run, and reports the best and median import time (the
+interpreter's own startup excluded), the slowest modules, and which heavy
+optional modules got loaded (pandas' own optional imports, such as
+pyarrow in pandas 2, are not counted against an entry point). Exits 1 if the API worker entry point
+(routes.predictions, what each uvicorn worker imports before serving) is
+over --budget-ms, or if an entry point loads a module it should not.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (label, modules imported, heavy modules that must stay unloaded)
+ENTRY_POINTS = [
+    ("api worker", ["routes.predictions"], ["polygon", "numba", "urllib3", "websockets", "dotenv", "pyarrow"]),
+    ("features", ["services.feature_engineering"], ["polygon", "numba", "urllib3", "websockets", "dotenv", "pyarrow"]),
+    ("rest service", ["external.polygon_trading_data"], ["polygon", "numba", "urllib3", "websockets", "dotenv", "pyarrow"]),
+    ("packages", ["services", "external"], ["pandas", "numpy", "polygon", "pyarrow"]),
+    ("live stream", ["external.streaming", "services.live_pipeline"], ["polygon", "numba", "pyarrow"]),
+]
+WORKER = "api worker"
+
+
+def parse_importtime(stderr: str) -> list:
+    # (self_us, cumulative_us, depth, name) per line of -X importtime output.
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def run(modules: list, forbidden: list) -> tuple:
+    statements = [f"import {m}" for m in modules] + [
+        f"import sys; print(','.join(m for m in {forbidden!r} if m in sys.modules))"
+    ]
+    code = "; ".join(statements)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr), [m for m in result.stdout.strip().split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=500.0, help=f"limit for the {WORKER!r} entry point")
+    parser.add_argument("--top", type=int, default=5, help="slowest modules shown per entry point")
+    args = parser.parse_args()
+
+    # Modules the bare interpreter imports at startup (site, encodings, ...).
+    baseline = {row[3] for row in run([], [])[0]}
+    heavy = sorted({m for entry in ENTRY_POINTS for m in entry[2]})
+    from_pandas = set(run(["pandas"], heavy)[1])
+
+    failed = False
+    print(f"{'entry point':<14} {'best':>9} {'median':>9}  loaded")
+    details = []
+    for label, modules, forbidden in ENTRY_POINTS:
+        times, best_rows, loaded = [], None, []
+        for _ in range(args.repeat):
+            rows, loaded = run(modules, forbidden)
+            loaded = [m for m in loaded if m not in from_pandas]
+            total = sum(row[1] for row in rows if row[2] == 0 and row[3] not in baseline)
+            if not times or total < min(times):
+                best_rows = rows
+            times.append(total)
+        best, median = min(times) / 1e3, statistics.median(times) / 1e3
+        over = label == WORKER and best > args.budget_ms
+        failed |= over or bool(loaded)
+        flag = f"  OVER BUDGET ({args.budget_ms:.0f} ms)" if over else ""
+        print(f"{label:<14} {best:>7.1f}ms {median:>7.1f}ms  {', '.join(loaded) or '-'}{flag}")
+        slowest = sorted((row for row in best_rows if row[3] not in baseline), reverse=True)[:args.top]
+        details.append((label, slowest))
+
+    for label, slowest in details:
+        print(f"\n{label}: slowest modules (self time)")
+        for self_us, cumulative_us, _, name in slowest:
+            print(f"  {self_us / 1e3:>7.1f}ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
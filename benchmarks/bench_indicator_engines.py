@@ -0,0 +1,64 @@
+"""Per-indicator timing of engine="pandas" vs. engine="numba".
+
+    python benchmarks/bench_indicator_engines.py --bars 1000 10000 100000
+
+Each kernel is called once before timing so JIT compilation is excluded.
+Reported times are the best of --repeat runs.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services import indicator_kernels
+from services.feature_engineering import (
+    build_feature_matrix,
+    compute_atr,
+    compute_bollinger_bands,
+    compute_macd,
+    compute_rsi,
+    compute_vwap,
+)
+
+
+def indicator_calls(df):
+    close, high, low, volume, ts = df["close"], df["high"], df["low"], df["volume"], df["timestamp"]
+    return {
+        "rsi": lambda engine: compute_rsi(close, engine=engine),
+        "macd": lambda engine: compute_macd(close, engine=engine),
+        "vwap": lambda engine: compute_vwap(close, high, low, volume, ts, engine=engine),
+        "atr": lambda engine: compute_atr(high, low, close, engine=engine),
+        "bollinger": lambda engine: compute_bollinger_bands(close, engine=engine),
+        "feature_matrix": lambda engine: build_feature_matrix(df, engine=engine),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not indicator_kernels.NUMBA_AVAILABLE:
+        print("numba is not installed; engine='numba' falls back to pandas.")
+
+    print(f"{'bars':>8} {'indicator':>15} {'pandas (ms)':>12} {'numba (ms)':>11} {'speedup':>8}")
+    for n_bars in args.bars:
+        df = make_panel(1, n_bars).drop(columns="ticker")
+        for name, call in indicator_calls(df).items():
+            call("numba")
+            times = {
+                engine: min(timeit.repeat(lambda: call(engine), number=1, repeat=args.repeat)) * 1e3
+                for engine in ("pandas", "numba")
+            }
+            print(
+                f"{n_bars:>8} {name:>15} {times['pandas']:>12.3f} {times['numba']:>11.3f} "
+                f"{times['pandas'] / times['numba']:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cost of the instrumentation hooks in build_feature_matrix, disabled and enabled.
+
+    python benchmarks/bench_instrumentation.py --bars 1000 100000
+
+Times build_feature_matrix with instrumentation off (the default) and on,
+then the per-call cost of span() and count() in both states. With
+--profile cprofile|sampling it also prints a profile of one enabled build.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services import instrumentation
+from services.feature_engineering import build_feature_matrix
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def hook_costs(n: int) -> tuple:
+    def one_span():
+        with instrumentation.span("bench", stage="x"):
+            pass
+
+    def one_count():
+        instrumentation.count("bench_rows", 1, stage="x")
+
+    return per_call(one_span, n), per_call(one_count, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'bars':>8} {'disabled':>10} {'enabled':>10} {'overhead':>9}")
+    for n in args.bars:
+        ohlcv = make_panel(1, n, args.seed).drop(columns="ticker")
+        instrumentation.disable()
+        off = best_of(lambda: build_feature_matrix(ohlcv), args.repeat)
+        instrumentation.enable()
+        on = best_of(lambda: build_feature_matrix(ohlcv), args.repeat)
+        instrumentation.disable()
+        print(f"{n:>8,} {off * 1e3:>8.2f}ms {on * 1e3:>8.2f}ms {100 * (on / off - 1):>8.1f}%")
+
+    off_span, off_count = hook_costs(args.calls)
+    instrumentation.enable()
+    on_span, on_count = hook_costs(args.calls)
+    instrumentation.disable()
+    instrumentation.reset()
+    print()
+    print(f"{'hook':>8} {'disabled':>10} {'enabled':>10}")
+    print(f"{'span':>8} {off_span * 1e9:>8.0f}ns {on_span * 1e9:>8.0f}ns")
+    print(f"{'count':>8} {off_count * 1e9:>8.0f}ns {on_count * 1e9:>8.0f}ns")
+
+    if args.profile:
+        ohlcv = make_panel(1, args.bars[-1], args.seed).drop(columns="ticker")
+        instrumentation.enable()
+        _, profile = instrumentation.profile_call(build_feature_matrix, ohlcv, profiler=args.profile)
+        instrumentation.disable()
+        print()
+        print(profile.report(limit=15))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-row dict conversion vs. columnar conversion of Polygon aggregates.
+
+    python benchmarks/bench_ohlcv_conversion.py --bars 100000 1000000
+
+Aggregates are produced lazily, the way RESTClient.list_aggs pages them in,
+so peak memory shows what each conversion holds on to rather than the cost
+of the input itself. Times include building the Agg objects, which both
+paths pay.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from polygon.rest.models import Agg
+
+from external.bars import aggs_to_bars, bars_to_frame, sort_bars
+
+
+def generate_aggs(n: int):
+    start = 1_700_000_000_000
+    for i in range(n):
+        price = 100.0 + (i % 500) * 0.01
+        yield Agg(
+            open=price, high=price + 0.05, low=price - 0.05, close=price + 0.01,
+            volume=1_000.0, vwap=price, timestamp=start + i * 60_000, transactions=10, otc=None,
+        )
+
+
+def rows_path(aggs) -> pd.DataFrame:
+    rows = []
+    for agg in aggs:
+        rows.append({
+            "timestamp": pd.Timestamp(agg.timestamp, unit="ms", tz="UTC"),
+            "open": agg.open,
+            "high": agg.high,
+            "low": agg.low,
+            "close": agg.close,
+            "volume": agg.volume,
+        })
+    df = pd.DataFrame(rows)
+    return df.sort_values("timestamp").reset_index(drop=True)
+
+
+def columnar_path(aggs) -> pd.DataFrame:
+    return bars_to_frame(sort_bars(aggs_to_bars(aggs)))
+
+
+def measure(convert, n: int):
+    # Timed and traced in separate runs; tracemalloc slows allocation-heavy code.
+    start = time.perf_counter()
+    convert(generate_aggs(n))
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    convert(generate_aggs(n))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'bars':>10} {'path':>9} {'time (s)':>9} {'peak MiB':>9}")
+    for n in args.bars:
+        for name, convert in [("rows", rows_path), ("columnar", columnar_path)]:
+            elapsed, peak = measure(convert, n)
+            print(f"{n:>10} {name:>9} {elapsed:>9.2f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
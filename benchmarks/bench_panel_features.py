@@ -0,0 +1,51 @@
+"""Per-ticker build_feature_matrix loop vs. the panel path.
+
+    python benchmarks/bench_panel_features.py --tickers 500 3000 10000
+
+The per-ticker loop is timed on a sample of tickers and scaled linearly,
+since its cost is a fixed pipeline per ticker.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services.feature_engineering import build_feature_matrix, build_panel_feature_matrix
+
+
+def time_loop(panel, sample: int) -> float:
+    groups = [g.drop(columns="ticker") for _, g in panel.groupby("ticker", sort=False)]
+    sampled = groups[:sample]
+    start = time.perf_counter()
+    for group in sampled:
+        build_feature_matrix(group.reset_index(drop=True))
+    elapsed = time.perf_counter() - start
+    return elapsed * len(groups) / len(sampled)
+
+
+def time_panel(panel) -> float:
+    start = time.perf_counter()
+    build_panel_feature_matrix(panel)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[500, 3000, 10000])
+    parser.add_argument("--bars", type=int, default=200)
+    parser.add_argument("--loop-sample", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'loop (s)':>10} {'panel (s)':>10} {'speedup':>8}")
+    for n_tickers in args.tickers:
+        panel = make_panel(n_tickers, args.bars)
+        loop = time_loop(panel, args.loop_sample)
+        vectorized = time_panel(panel)
+        print(f"{n_tickers:>8} {loop:>10.2f} {vectorized:>10.2f} {loop / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
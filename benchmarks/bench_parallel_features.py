@@ -0,0 +1,56 @@
+"""Scaling of build_feature_matrices_parallel from 1 to N worker processes.
+
+    python benchmarks/bench_parallel_features.py --tickers 1000 --bars 2000 --workers 1 2 4 8
+
+The baseline is a plain loop of build_feature_matrix(compact=True) over the
+tickers. Each parallel run reports its speedup over that loop and its
+efficiency (speedup per worker). Worker counts above the machine's CPU
+count are skipped unless --oversubscribe is given.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_panel
+from services.feature_engineering import build_feature_matrix
+from services.parallel_features import build_feature_matrices_parallel
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=1_000)
+    parser.add_argument("--bars", type=int, default=2_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1))))
+    parser.add_argument("--max-rows", type=int, default=5_000_000)
+    parser.add_argument("--oversubscribe", action="store_true")
+    args = parser.parse_args()
+
+    panel = make_panel(args.tickers, args.bars)
+    frames = {t: g.drop(columns="ticker").reset_index(drop=True) for t, g in panel.groupby("ticker", sort=False)}
+    rows = args.tickers * args.bars
+    print(f"{args.tickers:,} tickers x {args.bars:,} bars = {rows:,} rows on {cpus} CPU(s)\n")
+
+    start = time.perf_counter()
+    for ohlcv in frames.values():
+        build_feature_matrix(ohlcv, compact=True)
+    loop = time.perf_counter() - start
+
+    print(f"{'workers':>8} {'time (s)':>10} {'rows/s':>12} {'speedup':>8} {'efficiency':>11}")
+    print(f"{'loop':>8} {loop:>10.2f} {rows / loop:>12,.0f} {1.0:>7.1f}x {'':>11}")
+    for workers in args.workers:
+        if workers > cpus and not args.oversubscribe:
+            continue
+        start = time.perf_counter()
+        build_feature_matrices_parallel(frames, max_workers=workers, max_rows=args.max_rows)
+        elapsed = time.perf_counter() - start
+        speedup = loop / elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {rows / elapsed:>12,.0f} {speedup:>7.1f}x {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
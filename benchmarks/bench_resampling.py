@@ -0,0 +1,83 @@
+"""Multi-timeframe resampling from minute bars, batch and incremental.
+
+    python benchmarks/bench_resampling.py --bars 100000 1000000
+
+Times resample_many over 5min/15min/1h/1d against one pandas resample per
+timeframe in exchange time, then Resampler.update per streamed chunk and
+per single minute bar, and build_feature_matrix with timeframes.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_ohlcv
+from services.feature_engineering import build_feature_matrix
+from services.resampling import Resampler, resample_many
+
+TIMEFRAMES = ["5min", "15min", "1h", "1d"]
+_RULES = {"5min": "5min", "15min": "15min", "1h": "1h", "1d": "1D"}
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def pandas_resample(minute_ohlcv):
+    local = minute_ohlcv.set_index(minute_ohlcv["timestamp"].dt.tz_convert("America/New_York"))
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    return {timeframe: local.resample(_RULES[timeframe]).agg(agg).dropna() for timeframe in TIMEFRAMES}
+
+
+def stream(minute_ohlcv, chunk: int) -> float:
+    # Seconds per Resampler.update of chunk minute bars.
+    resampler = Resampler(TIMEFRAMES)
+    start = time.perf_counter()
+    updates = 0
+    for i in range(0, len(minute_ohlcv), chunk):
+        resampler.update(minute_ohlcv.iloc[i:i + chunk])
+        updates += 1
+    return (time.perf_counter() - start) / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunk", type=int, default=390, help="minute bars per streamed update")
+    parser.add_argument("--stream-bars", type=int, default=20_000, help="minute bars replayed one at a time")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'minute bars':>12} {'resample_many':>14} {'pandas':>10} {'speedup':>8} {'features':>10}")
+    for n in args.bars:
+        minutes = make_ohlcv(n, "minute", seed=args.seed)
+        ours = best_of(lambda: resample_many(minutes, TIMEFRAMES), args.repeat)
+        theirs = best_of(lambda: pandas_resample(minutes), args.repeat)
+        features = best_of(
+            lambda: build_feature_matrix(minutes, timeframes={"15min": None, "1h": ["rsi"], "1d": ["atr"]}),
+            args.repeat,
+        )
+        print(f"{n:>12,} {ours * 1e3:>12.1f}ms {theirs * 1e3:>8.1f}ms {theirs / ours:>7.1f}x "
+              f"{features * 1e3:>8.1f}ms")
+
+    minutes = make_ohlcv(args.stream_bars, "minute", seed=args.seed)
+    print()
+    print(f"Resampler.update, {args.chunk} bars: {stream(minutes, args.chunk) * 1e3:.2f}ms")
+    resampler = Resampler(TIMEFRAMES)
+    rows = list(minutes.itertuples(index=False))
+    start = time.perf_counter()
+    for row in rows:
+        resampler.update_bar(row.timestamp, row.open, row.high, row.low, row.close, row.volume)
+    print(f"Resampler.update_bar, 1 bar: {(time.perf_counter() - start) / len(rows) * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Re-ranking a whole universe after each bar: Screener vs. sorting per-ticker dicts.
+
+    python benchmarks/bench_screener.py --tickers 1000 10000 50000
+
+Each "bar" overwrites every ticker's latest row, then ranks by
+histogram / atr among tickers with RSI below 70 and volume above 10,000.
+The baseline builds one dict per ticker and sorts them, which is how
+get_ohlc_momentum results are ranked by hand today.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from services.screener import BASE_COLUMNS, Screener
+
+
+def make_latest(n_tickers: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = rng.uniform(20.0, 500.0, n_tickers)
+    atr = close * rng.uniform(0.002, 0.02, n_tickers)
+    columns = {name: close * (1 + rng.standard_normal(n_tickers) * 0.01) for name in BASE_COLUMNS}
+    columns.update(
+        close=close,
+        atr=atr,
+        rsi=rng.uniform(10, 90, n_tickers),
+        histogram=rng.standard_normal(n_tickers) * atr * 0.1,
+        volume=rng.integers(1_000, 1_000_000, n_tickers).astype(float),
+        return_lag_1=rng.standard_normal(n_tickers) * 0.005,
+    )
+    return pd.DataFrame(columns, index=[f"T{i:05d}" for i in range(n_tickers)])
+
+
+def rank_dicts(latest: pd.DataFrame, k: int) -> list:
+    rows = [dict(ticker=t, **row) for t, row in zip(latest.index, latest.to_dict("records"))]
+    passed = [r for r in rows if r["rsi"] < 70 and r["volume"] > 10_000 and r["atr"] > 0]
+    return sorted(passed, key=lambda r: r["histogram"] / r["atr"], reverse=True)[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--bars", type=int, default=20)
+    parser.add_argument("--k", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'dict sort (ms)':>15} {'update (ms)':>12} {'rank (ms)':>10} {'speedup':>8}")
+    for n in args.tickers:
+        bars = [make_latest(n, seed) for seed in range(args.bars)]
+        screener = Screener(score="histogram / atr", filters=["rsi < 70", "volume > 10_000"], k=args.k)
+        screener.load(bars[0])
+
+        start = time.perf_counter()
+        for latest in bars[:5]:
+            rank_dicts(latest, args.k)
+        baseline = (time.perf_counter() - start) / 5 * 1e3
+
+        update = rank = 0.0
+        for latest in bars:
+            start = time.perf_counter()
+            screener.update_many(latest)
+            update += time.perf_counter() - start
+            start = time.perf_counter()
+            screener.rank()
+            rank += time.perf_counter() - start
+        update, rank = update / len(bars) * 1e3, rank / len(bars) * 1e3
+        print(f"{n:>8} {baseline:>15.2f} {update:>12.2f} {rank:>10.2f} {baseline / (update + rank):>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Whole-market snapshot: per-ticker objects and dicts vs. one columnar conversion.
+
+    python benchmarks/bench_snapshot.py --tickers 1000 11000
+
+The payload is a synthetic /v2/snapshot/.../tickers response body. The
+baseline decodes it the way the client library does (one TickerSnapshot per
+ticker), then builds the get_snapshot_mover_data / get_bid_ask_spread /
+get_order_imbalance dicts and a DataFrame from them. Request counts assume
+one request per ticker per method today against one full-market request.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from polygon.rest.models import TickerSnapshot
+
+from external.snapshots import snapshot_to_frame
+
+
+def make_payload(n_tickers: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    now = 1_735_318_800_000_000_000
+    rows = []
+    for i in range(n_tickers):
+        price = float(rng.uniform(1, 500))
+        bar = lambda: {"o": price, "h": price * 1.01, "l": price * 0.99, "c": price, "v": 1e6, "vw": price}
+        rows.append({
+            "ticker": f"T{i:05d}",
+            "todaysChange": float(rng.normal()),
+            "todaysChangePerc": float(rng.normal()),
+            "updated": now + i,
+            "day": bar(),
+            "prevDay": bar(),
+            "min": {**bar(), "av": 1e6, "n": 10, "t": now // 1_000_000},
+            "lastQuote": {"p": price - 0.01, "P": price + 0.01, "s": int(rng.integers(1, 50)),
+                          "S": int(rng.integers(0, 50)), "t": now - i},
+            "lastTrade": {"p": price, "s": 100, "t": now - 2 * i, "x": 4, "i": str(i), "c": [14]},
+        })
+    return json.dumps({"status": "OK", "count": n_tickers, "tickers": rows}).encode()
+
+
+def per_ticker(data: bytes) -> pd.DataFrame:
+    records = []
+    for raw in json.loads(data)["tickers"]:
+        snap = TickerSnapshot.from_dict(raw)
+        quote = snap.last_quote
+        spread = quote.ask_price - quote.bid_price
+        imbalance = quote.bid_size - quote.ask_size
+        records.append({
+            "ticker": snap.ticker,
+            "last_trade": snap.last_trade.price,
+            "min_av": snap.min.accumulated_volume,
+            "prev_day_volume": snap.prev_day.volume,
+            "bid_price": quote.bid_price,
+            "ask_price": quote.ask_price,
+            "spread": spread,
+            "spread_percentage": spread / quote.bid_price * 100,
+            "imbalance": imbalance,
+            "imbalance_ratio": quote.bid_size / quote.ask_size if quote.ask_size > 0 else float("inf"),
+            "excess_demand": imbalance > 0,
+        })
+    return pd.DataFrame(records)
+
+
+def columnar(data: bytes) -> pd.DataFrame:
+    return snapshot_to_frame(json.loads(data)["tickers"])
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1_000, 11_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'requests (old/new)':>20} {'per-ticker':>12} {'columnar':>10} {'speedup':>8}")
+    for n in args.tickers:
+        data = make_payload(n, args.seed)
+        old = best_of(per_ticker, data, args.repeat)
+        new = best_of(columnar, data, args.repeat)
+        requests = f"{3 * n:,} / 1"
+        print(f"{n:>8,} {requests:>20} {old * 1e3:>10.1f}ms {new * 1e3:>8.1f}ms {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
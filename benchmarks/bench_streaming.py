@@ -0,0 +1,94 @@
+"""WebSocket consumer throughput: decoding, the live pipeline, and end to end.
+
+    python benchmarks/bench_streaming.py --tickers 500 --minutes 5 --rate 100000
+
+Times decode_frames and LivePipeline.process on a synthetic feed of minute
+bars, trades and quotes, at several batch sizes, with the stdlib json module
+and orjson (when installed). Then replays the feed through the local stub
+server in tests/websocket_stub.py into a PolygonStream, unpaced and at
+--rate events per second, and reports the throughput, batch sizes, drops
+and how long the consumer took to catch up after the last frame.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_stream_frames
+from external import stream_messages
+from external.stream_messages import decode_frames
+from external.streaming import PolygonStream
+from services.live_pipeline import LivePipeline
+from tests.websocket_stub import PolygonStreamStub
+
+
+def per_event(fn, batches, events: int) -> float:
+    # Microseconds per event for fn over every batch.
+    start = time.perf_counter()
+    for batch in batches:
+        fn(batch)
+    return (time.perf_counter() - start) / events * 1e6
+
+
+def offline(frames, events: int, batch_frames: int):
+    batches = [frames[i:i + batch_frames] for i in range(0, len(frames), batch_frames)]
+    parsers = [("json", None)] + ([("orjson", stream_messages.orjson)] if stream_messages.orjson else [])
+    for name, module in parsers:
+        saved, stream_messages.orjson = stream_messages.orjson, module
+        try:
+            decode = per_event(decode_frames, batches, events)
+        finally:
+            stream_messages.orjson = saved
+        print(f"{batch_frames:>13,} {name:>7} {decode:>11.2f}us {1e6 / decode:>12,.0f}/s")
+    decoded = [decode_frames(batch) for batch in batches]
+    pipeline = LivePipeline()
+    process = per_event(pipeline.process, decoded, events)
+    print(f"{batch_frames:>13,} {'process':>7} {process:>11.2f}us {1e6 / process:>12,.0f}/s")
+
+
+def end_to_end(frames, events: int, rate: float, tickers: list):
+    with PolygonStreamStub(frames, rate=rate) as stub:
+        pipeline = LivePipeline()
+        stream = PolygonStream(tickers, pipeline, api_key=stub.api_key, url=stub.url)
+        start = time.perf_counter()
+        with stream:
+            stub.replayed.wait(600)
+            replayed = time.perf_counter()
+            stream.flush(600)
+            done = time.perf_counter()
+    stats = stream.stats()
+    label = "unpaced" if not rate else f"{rate:,.0f}/s"
+    print(f"{label:>10} {events / (done - start):>12,.0f}/s {(done - replayed) * 1e3:>9.0f}ms "
+          f"{stats['batches']:>8,} {stats['largest_batch']:>8,} {stats['dropped_frames']:>8,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--minutes", type=int, default=5)
+    parser.add_argument("--events-per-frame", type=int, default=100)
+    parser.add_argument("--batch-frames", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--rate", type=float, default=100_000, help="paced replay, events per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = make_stream_frames(n_tickers=args.tickers, n_minutes=args.minutes,
+                                events_per_frame=args.events_per_frame, seed=args.seed)
+    events = sum(frame.count('"ev"') for frame in frames)
+    tickers = [f"T{i:05d}" for i in range(args.tickers)]
+    print(f"{events:,} events in {len(frames):,} frames\n")
+
+    print(f"{'frames/batch':>13} {'stage':>7} {'per event':>13} {'throughput':>14}")
+    for batch_frames in args.batch_frames:
+        offline(frames, events, batch_frames)
+
+    print()
+    print(f"{'replay':>10} {'throughput':>14} {'catch-up':>11} {'batches':>8} {'largest':>8} {'dropped':>8}")
+    end_to_end(frames, events, None, tickers)
+    end_to_end(frames, events, args.rate, tickers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Benchmark suite for feature engineering and ingestion, with a regression gate.
+
+    python benchmarks/bench_suite.py --sizes 10000 100000 --baseline benchmarks/baseline.json
+
+Times build_feature_matrix, each compute_* indicator and get_hourly_ohlcv
+(against FakeRESTClient, so no network or API key) on make_ohlcv bars of
+each size. Every case records its best time, throughput in rows per second
+and peak traced memory. Results are compared with a JSON baseline, and the
+script exits with status 1 if a case got slower or bigger than the
+thresholds allow. --update-baseline writes the results as the new baseline
+instead.
+
+Times are normalized by a fixed NumPy/pandas calibration workload timed on
+the same machine, so a baseline recorded on one machine is usable on
+another of similar shape. Use --no-normalize to compare raw times.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import FakeRESTClient, make_ohlcv
+from external.polygon_trading_data import PolygonTradingDataService
+from services.feature_engineering import (
+    build_feature_matrix,
+    compute_atr,
+    compute_bollinger_bands,
+    compute_direction_label,
+    compute_lagged_returns,
+    compute_macd,
+    compute_rsi,
+    compute_vwap,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CASES = [
+    "build_feature_matrix",
+    "compute_rsi",
+    "compute_macd",
+    "compute_vwap",
+    "compute_atr",
+    "compute_bollinger_bands",
+    "compute_lagged_returns",
+    "compute_direction_label",
+    "get_hourly_ohlcv",
+]
+
+
+def case_functions(ohlcv: pd.DataFrame, latency: float = 0.0) -> dict:
+    """{case name: zero-argument callable} over one OHLCV frame."""
+    close, high, low = ohlcv["close"], ohlcv["high"], ohlcv["low"]
+    volume, timestamp = ohlcv["volume"], ohlcv["timestamp"]
+    service = PolygonTradingDataService(client=FakeRESTClient({"SYN": ohlcv}, latency=latency))
+    local = timestamp.dt.tz_convert("America/New_York")
+    from_date, to_date = str(local.iloc[0].date()), str(local.iloc[-1].date())
+    return {
+        "build_feature_matrix": lambda: build_feature_matrix(ohlcv),
+        "compute_rsi": lambda: compute_rsi(close),
+        "compute_macd": lambda: compute_macd(close),
+        "compute_vwap": lambda: compute_vwap(close, high, low, volume, timestamp),
+        "compute_atr": lambda: compute_atr(high, low, close),
+        "compute_bollinger_bands": lambda: compute_bollinger_bands(close),
+        "compute_lagged_returns": lambda: compute_lagged_returns(close),
+        "compute_direction_label": lambda: compute_direction_label(close),
+        "get_hourly_ohlcv": lambda: service.get_hourly_ohlcv("SYN", from_date, to_date),
+    }
+
+
+def measure(fn, repeat: int = 5, min_time: float = 0.2) -> tuple:
+    """(best seconds, peak MiB) for fn().
+
+    fn runs once to warm up, then at least repeat times and until min_time
+    seconds have passed, with the garbage collector off as in timeit. The
+    fastest run counts. Peak memory comes from one more run under
+    tracemalloc, kept apart because it slows allocation-heavy code.
+    """
+    fn()
+    best = float("inf")
+    runs, start = 0, time.perf_counter()
+    gc.disable()
+    try:
+        while runs < repeat or time.perf_counter() - start < min_time:
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+            runs += 1
+    finally:
+        gc.enable()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1024 ** 2
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Best time of a fixed NumPy/pandas workload, the unit times are normalized by."""
+    values = pd.Series(np.random.default_rng(0).standard_normal(500_000))
+
+    def workload():
+        values.ewm(span=20, adjust=False).mean()
+        values.rolling(20).std()
+        np.sort(values.to_numpy())
+
+    best, _ = measure(workload, repeat=repeat)
+    return best
+
+
+def run_suite(
+    sizes: list,
+    timespan: str = "hour",
+    cases: list = None,
+    repeat: int = 5,
+    min_time: float = 0.2,
+    latency: float = 0.0,
+    seed: int = 0,
+) -> dict:
+    """Run every case at every size.
+
+    Returns:
+        {"meta": {...}, "results": {"<case>[<timespan>:<size>]": {"case",
+        "timespan", "rows", "seconds", "rows_per_s", "peak_mb"}}}. meta holds
+        the calibration time (the better of one run before and one after the
+        cases) and library versions.
+    """
+    cases = CASES if cases is None else cases
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        raise ValueError(f"Unknown cases {unknown}; expected some of {CASES}.")
+
+    calibration = calibrate()
+    results = {}
+    for n in sizes:
+        functions = case_functions(make_ohlcv(n, timespan, seed=seed), latency)
+        for case in cases:
+            seconds, peak_mb = measure(functions[case], repeat, min_time)
+            results[f"{case}[{timespan}:{n}]"] = {
+                "case": case,
+                "timespan": timespan,
+                "rows": n,
+                "seconds": seconds,
+                "rows_per_s": n / seconds,
+                "peak_mb": peak_mb,
+            }
+    return {
+        "meta": {
+            "calibration_s": min(calibration, calibrate()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def merge_runs(runs: list) -> dict:
+    """Combine several run_suite results into one, e.g. to record a baseline.
+
+    Each case keeps its median time and largest peak memory, and the meta
+    keeps the median calibration time, so one lucky or unlucky run does not
+    set the bar.
+    """
+    merged = {"meta": dict(runs[0]["meta"]), "results": {}}
+    merged["meta"]["calibration_s"] = float(np.median([run["meta"]["calibration_s"] for run in runs]))
+    merged["meta"]["runs"] = len(runs)
+    for key, result in runs[0]["results"].items():
+        seconds = float(np.median([run["results"][key]["seconds"] for run in runs]))
+        merged["results"][key] = {
+            **result,
+            "seconds": seconds,
+            "rows_per_s": result["rows"] / seconds,
+            "peak_mb": max(run["results"][key]["peak_mb"] for run in runs),
+        }
+    return merged
+
+
+def fold_retry(current: dict, rerun: dict, attempts: dict, normalize: bool = True) -> None:
+    """Fold a rerun of some cases into current, in place.
+
+    Each rerun time is first rescaled from the rerun's own calibration to
+    current's, so a rerun on a quieter or busier moment is compared like for
+    like. A case then keeps the median of all its attempts, so one lucky run
+    cannot hide a real regression.
+
+    Args:
+        current: run_suite result being gated.
+        rerun: run_suite result for the retried cases.
+        attempts: {case: [seconds, ...]} of earlier attempts, updated here.
+        normalize: Rescale by calibration (off for --no-normalize).
+    """
+    scale = current["meta"]["calibration_s"] / rerun["meta"]["calibration_s"] if normalize else 1.0
+    for key, retried in rerun["results"].items():
+        result = current["results"][key]
+        times = attempts.setdefault(key, [result["seconds"]])
+        times.append(retried["seconds"] * scale)
+        seconds = float(np.median(times))
+        result.update(seconds=seconds, rows_per_s=result["rows"] / seconds)
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    time_threshold: float = 0.25,
+    memory_threshold: float = 0.10,
+    min_seconds: float = 0.001,
+    min_memory_mb: float = 0.5,
+    normalize: bool = True,
+) -> list:
+    """Compare two run_suite results case by case.
+
+    A case regresses when its time grows by more than time_threshold (0.25
+    = 25% slower) and by more than min_seconds, or its peak memory grows by
+    more than memory_threshold and by more than min_memory_mb. The absolute
+    floors keep timer and allocator noise on tiny cases from failing the
+    gate. Cases missing from either side are skipped.
+
+    Returns:
+        One {"case", "metric", "baseline", "current", "change", "regressed"}
+        dict per case and metric, where change is current / baseline - 1.
+    """
+    scale = 1.0
+    if normalize:
+        scale = baseline["meta"]["calibration_s"] / current["meta"]["calibration_s"]
+    rows = []
+    for case, result in current["results"].items():
+        base = baseline["results"].get(case)
+        if base is None:
+            continue
+        seconds = result["seconds"] * scale
+        change = seconds / base["seconds"] - 1
+        rows.append({
+            "case": case, "metric": "seconds", "baseline": base["seconds"], "current": seconds,
+            "change": change, "regressed": change > time_threshold and seconds - base["seconds"] > min_seconds,
+        })
+        change = result["peak_mb"] / base["peak_mb"] - 1 if base["peak_mb"] else 0.0
+        rows.append({
+            "case": case, "metric": "peak_mb", "baseline": base["peak_mb"], "current": result["peak_mb"],
+            "change": change,
+            "regressed": change > memory_threshold and result["peak_mb"] - base["peak_mb"] > min_memory_mb,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--timespan", choices=["hour", "minute"], default="hour")
+    parser.add_argument("--cases", nargs="+", choices=CASES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake REST latency per page, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--baseline-runs", type=int, default=3, help="suite runs merged into a new baseline")
+    parser.add_argument("--output", help="also write this run's results here")
+    parser.add_argument("--time-threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.10)
+    parser.add_argument("--no-normalize", action="store_true")
+    parser.add_argument("--retries", type=int, default=2, help="re-measure slow cases before failing")
+    args = parser.parse_args()
+
+    run = lambda: run_suite(args.sizes, args.timespan, args.cases, args.repeat, args.min_time, args.latency, args.seed)
+    current = merge_runs([run() for _ in range(args.baseline_runs)]) if args.update_baseline else run()
+    print(f"{'case':<45} {'time':>10} {'rows/s':>12} {'peak MiB':>9}")
+    for case, result in current["results"].items():
+        print(f"{case:<45} {result['seconds'] * 1e3:>8.2f}ms {result['rows_per_s']:>12,.0f} {result['peak_mb']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    gate = lambda: compare(current, baseline, args.time_threshold, args.memory_threshold,
+                           normalize=not args.no_normalize)
+    rows = gate()
+    attempts = {}
+    for _ in range(args.retries):
+        slow = [row["case"] for row in rows if row["regressed"] and row["metric"] == "seconds"]
+        if not slow:
+            break
+        # A busy machine makes single runs slow; time those cases again.
+        for key in slow:
+            result = current["results"][key]
+            rerun = run_suite([result["rows"]], result["timespan"], [result["case"]],
+                              args.repeat, args.min_time, args.latency, args.seed)
+            fold_retry(current, rerun, attempts, normalize=not args.no_normalize)
+        rows = gate()
+    regressions = [row for row in rows if row["regressed"]]
+    print(f"\n{len(rows) // 2} cases compared with {args.baseline}")
+    for row in regressions:
+        print(f"REGRESSION {row['case']} {row['metric']}: "
+              f"{row['baseline']:.4g} -> {row['current']:.4g} ({row['change']:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
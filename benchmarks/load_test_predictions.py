@@ -0,0 +1,157 @@
+"""Load test for the prediction service: thousands of concurrent single-ticker requests.
+
+    python benchmarks/load_test_predictions.py --tickers 5000 --requests 20000 --concurrency 2000
+    python benchmarks/load_test_predictions.py --url http://127.0.0.1:8000 --concurrency 200
+
+In-process (the default), a PredictionService is filled with random latest
+rows and a linear model. The same requests are answered two ways:
+unbatched, each request making its own predict call from a pool of client
+threads, and through a MicroBatcher, with every request an asyncio task.
+
+With --url, the requests go to a running server instead
+(routes/predictions.create_app under uvicorn) as GET /predict/{ticker},
+from --concurrency client threads. The server's /metrics are printed at
+the end.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import requests
+
+from services.prediction import FEATURE_COLUMNS, LatencyHistogram, MicroBatcher, PredictionService
+
+
+class LinearModel:
+    """Logistic score over standardised features, roughly the cost of a fitted linear classifier."""
+
+    def __init__(self, n_features: int, seed: int):
+        rng = np.random.default_rng(seed)
+        self.coef = rng.standard_normal(n_features) * 0.1
+
+    def predict_proba(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        z = (x - x.mean(axis=1, keepdims=True)) / (x.std(axis=1, keepdims=True) + 1e-12) @ self.coef
+        up = 1 / (1 + np.exp(-z))
+        return np.column_stack([1 - up, up])
+
+    def predict(self, x):
+        return (self.predict_proba(x)[:, 1] > 0.5).astype(float)
+
+
+def make_service(n_tickers: int, seed: int) -> PredictionService:
+    rng = np.random.default_rng(seed)
+    rows = pd.DataFrame(
+        rng.standard_normal((n_tickers, len(FEATURE_COLUMNS))),
+        columns=FEATURE_COLUMNS,
+        index=[f"T{i:05d}" for i in range(n_tickers)],
+    )
+    rows.index.name = "ticker"
+    service = PredictionService({"linear": LinearModel(len(FEATURE_COLUMNS), seed)})
+    service.load_features(rows.reset_index())
+    return service
+
+
+def run_unbatched(service, tickers, concurrency: int) -> tuple:
+    latency = LatencyHistogram()
+
+    def one(ticker):
+        start = time.perf_counter()
+        service.predict_arrays([ticker])
+        latency.record(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, tickers, chunksize=64))
+    return time.perf_counter() - start, latency.summary(), None
+
+
+def run_batched(service, tickers, concurrency: int, max_batch_size: int, max_wait_ms: float) -> tuple:
+    batcher = MicroBatcher(service, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    async def clients():
+        # concurrency clients, each sending its next request as soon as the last is answered.
+        pending = iter(tickers)
+
+        async def client():
+            for ticker in pending:
+                await batcher.predict(ticker)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    asyncio.run(clients())
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    stats = batcher.stats()
+    return elapsed, stats["latency"], stats["batch_size"]
+
+
+def run_http(url: str, tickers, concurrency: int) -> tuple:
+    latency = LatencyHistogram()
+    local = threading.local()
+    errors = []
+
+    def one(ticker):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        resp = local.session.get(f"{url}/predict/{ticker}")
+        latency.record(time.perf_counter() - start)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, tickers))
+    elapsed = time.perf_counter() - start
+    if errors:
+        print(f"{len(errors)} requests failed, e.g. HTTP {errors[0]}")
+    return elapsed, latency.summary(), requests.get(f"{url}/metrics").json()
+
+
+def report(label: str, n_requests: int, elapsed: float, latency: dict, batches: dict):
+    batch = f"{batches['mean']:>7.1f} {batches['max']:>6}" if batches else f"{'-':>7} {'-':>6}"
+    print(f"{label:<12} {n_requests / elapsed:>10,.0f} {latency['p50_ms']:>9.2f} "
+          f"{latency['p99_ms']:>9.2f} {latency['max_ms']:>9.2f} {batch}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=2_000)
+    parser.add_argument("--threads", type=int, default=32, help="client threads for the unbatched run")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--url", help="hit a running server instead of an in-process service")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    tickers = [f"T{i:05d}" for i in rng.integers(0, args.tickers, args.requests)]
+
+    print(f"{'':<12} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'batch':>7} {'max':>6}")
+    if args.url:
+        elapsed, latency, metrics = run_http(args.url.rstrip("/"), tickers, args.concurrency)
+        report("http", len(tickers), elapsed, latency, metrics["batch_size"])
+        print(f"server-side latency: {metrics['latency']}")
+        return
+
+    service = make_service(args.tickers, args.seed)
+    report("unbatched", len(tickers), *run_unbatched(service, tickers, args.threads))
+    report("batched", len(tickers), *run_batched(
+        service, tickers, args.concurrency, args.max_batch_size, args.max_wait_ms
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from polygon.rest.models import Agg
+
+from services.market_calendar import EARLY_CLOSE, MARKET_TZ, SESSIONS, trading_days
+
+
+def make_panel(n_tickers: int, n_bars: int, seed: int = 0) -> pd.DataFrame:
+    """Long-format hourly OHLCV for n_tickers tickers, n_bars bars each.
+
+    Bars follow a seeded random walk on a shared hourly clock, so the same
+    arguments always produce the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-01-02 09:00", periods=n_bars, freq="h", tz="UTC")
+    start = rng.uniform(20.0, 500.0, size=n_tickers)
+    steps = rng.standard_normal((n_bars, n_tickers)) * start * 0.004
+    close = start + np.cumsum(steps, axis=0)
+    spread = np.abs(rng.standard_normal((n_bars, n_tickers))) * start * 0.002
+    return pd.DataFrame({
+        "ticker": np.tile([f"T{i:05d}" for i in range(n_tickers)], n_bars),
+        "timestamp": np.repeat(timestamps, n_tickers),
+        "open": (close + rng.standard_normal((n_bars, n_tickers)) * spread).ravel(),
+        "high": (close + spread).ravel(),
+        "low": (close - spread).ravel(),
+        "close": close.ravel(),
+        "volume": rng.integers(1_000, 100_000, size=(n_bars, n_tickers)).astype(float).ravel(),
+    })
+
+
+# ── Exchange sessions ─────────────────────────────────────────────────────────
+
+_MINUTE_NS = 60 * 1_000_000_000
+
+# (first bar, end) of each session in minutes after midnight New York time.
+# Polygon stamps bars with their start, so regular-session hourly bars start
+# at 09:00 and the first one only covers 09:30-10:00.
+_SESSIONS = {
+    ("hour", True): (4 * 60, 20 * 60),
+    ("hour", False): (9 * 60, 16 * 60),
+    ("minute", True): (4 * 60, 20 * 60),
+    ("minute", False): (9 * 60 + 30, 16 * 60),
+}
+_REGULAR = SESSIONS["regular"]
+
+
+def make_ohlcv(
+    n_bars: int,
+    timespan: str = "hour",
+    seed: int = 0,
+    start: str = "2020-01-02",
+    extended_hours: bool = True,
+    start_price: float = 100.0,
+    missing_fraction: float = 0.02,
+    zero_volume_fraction: float = 0.01,
+    halts_per_year: float = 4.0,
+) -> pd.DataFrame:
+    """Seeded OHLCV bars that look like one Polygon ticker's hourly or minute aggregates.
+
+    Bars follow the exchange calendar: weekdays only, no bars on market
+    holidays, shortened early-close days, and New York session hours in UTC
+    (so the UTC open shifts by an hour across DST changes). Prices are a
+    random walk with an overnight gap at each day's first bar, and volume
+    has the usual U shape over the regular session with thin pre- and
+    post-market trading.
+
+    Three kinds of irregularity are mixed in:
+        missing bars: dropped at random, mostly outside regular hours,
+                      as Polygon omits bars with no trades;
+        halts: runs of consecutive missing bars in the regular session;
+        zero-volume bars: flat bars (every price equal to the previous
+                          close) with volume 0.
+
+    Args:
+        n_bars: Bars to return.
+        timespan: "hour" or "minute".
+        seed: Random seed; the same arguments always give the same frame.
+        start: First calendar date.
+        extended_hours: Include pre-market (from 04:00) and post-market
+                        (until 20:00) bars, as Polygon does.
+        missing_fraction: Share of bars dropped at random.
+        zero_volume_fraction: Share of bars turned into zero-volume bars.
+        halts_per_year: Average number of trading halts per 252 days.
+
+    Returns:
+        DataFrame with columns [timestamp (UTC), open, high, low, close,
+        volume], in timestamp order, as from get_hourly_ohlcv.
+    """
+    if (timespan, extended_hours) not in _SESSIONS:
+        raise ValueError(f"Unknown timespan {timespan!r}; expected 'hour' or 'minute'.")
+    rng = np.random.default_rng(seed)
+    step = 60 if timespan == "hour" else 1
+    first, end = _SESSIONS[timespan, extended_hours]
+    minutes = np.arange(first, end, step)
+    regular = (minutes + step > _REGULAR[0]) & (minutes < _REGULAR[1])
+
+    # Enough trading days for n_bars after drops, halts and early closes:
+    # about 1.5 calendar days per trading day, with a margin.
+    needed = n_bars / (len(minutes) * (1 - missing_fraction) * 0.8) + 10
+    span_days = int(needed * 1.5) + 10
+    if span_days > (pd.Timestamp("2261-12-31") - pd.Timestamp(start)).days:
+        raise ValueError(f"{n_bars} {timespan} bars from {start} run past the last representable date.")
+    days, early = trading_days(start, pd.Timestamp(start) + pd.Timedelta(days=span_days))
+
+    midnight = days.tz_localize(MARKET_TZ).tz_convert(None).values.astype("datetime64[ns]").astype(np.int64)
+    grid = midnight[:, None] + minutes[None, :] * _MINUTE_NS
+    keep = np.ones(grid.shape, dtype=bool)
+    keep[early] = minutes[None, :] < EARLY_CLOSE["extended" if extended_hours else "regular"]
+
+    # Random drops, four times likelier outside the regular session.
+    drop_rate = np.where(regular, 1.0, 4.0)
+    drop_rate = missing_fraction * drop_rate / drop_rate.mean()
+    keep &= rng.random(grid.shape) >= drop_rate[None, :]
+
+    # Halts: a run of regular-session bars (about 5% of the session) on random days.
+    n_halts = rng.poisson(halts_per_year * len(days) / 252)
+    regular_idx = np.flatnonzero(regular)
+    length = max(1, len(regular_idx) // 20)
+    for day, offset in zip(rng.integers(0, len(days), n_halts),
+                           rng.integers(0, max(1, len(regular_idx) - length), n_halts)):
+        keep[day, regular_idx[offset:offset + length]] = False
+
+    timestamps = grid[keep][:n_bars]
+    bar_regular = np.broadcast_to(regular, grid.shape)[keep][:n_bars]
+    day_index = np.broadcast_to(np.arange(len(days))[:, None], grid.shape)[keep][:n_bars]
+    n = len(timestamps)
+    if n < n_bars:
+        raise ValueError(f"Could not generate {n_bars} bars from {start}.")
+
+    # Price path: per-bar volatility is lower outside regular hours, and the
+    # first bar of each day carries the overnight gap.
+    bar_vol = 0.01 / np.sqrt(len(minutes)) * np.where(bar_regular, 1.0, 0.5)
+    new_day = np.concatenate([[False], day_index[1:] != day_index[:-1]])
+    log_returns = rng.standard_normal(n) * bar_vol + new_day * rng.standard_normal(n) * 0.01
+    # Zero-volume bars do not move the price.
+    zero = rng.random(n) < zero_volume_fraction
+    zero[0] = False
+    log_returns[zero] = 0.0
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate([[start_price], close[:-1]]) * np.exp(rng.standard_normal(n) * bar_vol * 0.2)
+    wick = np.abs(rng.standard_normal((2, n))) * bar_vol * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+
+    # Volume: U-shaped over the regular session, thin outside it.
+    position = (minutes - _REGULAR[0]) / (_REGULAR[1] - _REGULAR[0])
+    profile = np.where(regular, 1.0 + 3.0 * (2 * position - 1) ** 2, 0.15)
+    bar_profile = np.broadcast_to(profile, grid.shape)[keep][:n_bars]
+    volume = np.round(bar_profile * rng.lognormal(np.log(50_000 * step / 60), 0.5, n))
+    open_[zero] = high[zero] = low[zero] = close[zero]
+    volume[zero] = 0.0
+
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(timestamps, unit="ns", utc=True),
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    })
+
+
+# ── Fake Polygon client ───────────────────────────────────────────────────────
+
+def ohlcv_to_results(ohlcv: pd.DataFrame) -> list:
+    """Raw aggregates 'results' rows (t, o, h, l, c, v, vw, n) for an OHLCV frame."""
+    timestamps = pd.DatetimeIndex(ohlcv["timestamp"]).tz_convert(None).values.astype("datetime64[ms]").astype(np.int64)
+    typical = (ohlcv["high"] + ohlcv["low"] + ohlcv["close"]).to_numpy() / 3
+    columns = zip(
+        timestamps.tolist(), ohlcv["open"].tolist(), ohlcv["high"].tolist(), ohlcv["low"].tolist(),
+        ohlcv["close"].tolist(), ohlcv["volume"].tolist(), typical.tolist(),
+    )
+    return [
+        {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v, "vw": vw, "n": int(v // 100)}
+        for t, o, h, l, c, v, vw in columns
+    ]
+
+
+class FakeRESTClient:
+    """Replays aggregates pages the way polygon.RESTClient.list_aggs does, with no network.
+
+    list_aggs returns a lazy iterator of Agg objects. Each page is decoded
+    from JSON bytes and its Aggs built with Agg.from_dict, as the real
+    client does, after sleeping latency seconds for the request. Only the
+    ticker and date range of a call are honoured.
+
+    Args:
+        ohlcv_by_ticker: {ticker: OHLCV DataFrame}, e.g. from make_ohlcv.
+        latency: Seconds to sleep per page.
+        page_size: Results per page (Polygon's limit is 50,000).
+    """
+
+    def __init__(self, ohlcv_by_ticker: dict, latency: float = 0.0, page_size: int = 50_000):
+        self.latency = latency
+        self.page_size = page_size
+        self.pages = {}
+        self.requests = 0
+        for ticker, ohlcv in ohlcv_by_ticker.items():
+            results = ohlcv_to_results(ohlcv)
+            timestamps = np.array([r["t"] for r in results], dtype=np.int64)
+            self.pages[ticker] = (timestamps, results)
+
+    def list_aggs(self, ticker, multiplier, timespan, from_, to, **kwargs):
+        timestamps, results = self.pages.get(ticker, (np.empty(0, dtype=np.int64), []))
+        start = pd.Timestamp(from_, tz=MARKET_TZ).value // 1_000_000
+        stop = (pd.Timestamp(to, tz=MARKET_TZ) + pd.Timedelta(days=1)).value // 1_000_000
+        lo, hi = np.searchsorted(timestamps, [start, stop])
+        return self._pages(results, int(lo), int(hi))
+
+    def _pages(self, results: list, lo: int, hi: int):
+        offset = lo
+        while True:
+            self.requests += 1
+            if self.latency:
+                time.sleep(self.latency)
+            body = json.dumps({"status": "OK", "results": results[offset:min(offset + self.page_size, hi)]})
+            for row in json.loads(body)["results"]:
+                yield Agg.from_dict(row)
+            offset += self.page_size
+            if offset >= hi:
+                return
+
+
+# ── Fake WebSocket feed ───────────────────────────────────────────────────────
+
+def _session_minutes(start: str, n_minutes: int, extended_hours: bool) -> pd.DatetimeIndex:
+    # The first n_minutes session minutes from start, as UTC minute starts.
+    session = "extended" if extended_hours else "regular"
+    open_, close = SESSIONS[session]
+    minutes, days_ahead = [], n_minutes // (close - open_) * 7 // 5 + 10
+    days, early = trading_days(start, pd.Timestamp(start) + pd.Timedelta(days=days_ahead))
+    for day, is_early in zip(days, early):
+        end = EARLY_CLOSE[session] if is_early else close
+        minutes.append(day + pd.to_timedelta(np.arange(open_, end), unit="min"))
+        if sum(map(len, minutes)) >= n_minutes:
+            break
+    local = pd.DatetimeIndex(np.concatenate(minutes)[:n_minutes])
+    return local.tz_localize(MARKET_TZ).tz_convert("UTC")
+
+
+def make_stream_frames(
+    n_tickers: int = 100,
+    n_minutes: int = 30,
+    trades_per_bar: int = 20,
+    quotes_per_bar: int = 20,
+    events_per_frame: int = 100,
+    seed: int = 0,
+    start: str = "2024-07-01",
+    extended_hours: bool = False,
+) -> list:
+    """Frames of Polygon's stocks WebSocket feed (AM, T and Q events), as recorded off the wire.
+
+    Every session minute, each ticker gets trades_per_bar trades and
+    quotes_per_bar quotes at random times within the minute, interleaved
+    across tickers in time order. Its AM bar, built from those trades, comes
+    at the start of the next minute, as Polygon sends it. Events are packed
+    events_per_frame to a frame, a compact JSON array.
+
+    Returns:
+        List of frame strings, oldest first. Tickers are "T00000", ...
+    """
+    rng = np.random.default_rng(seed)
+    minutes = _session_minutes(start, n_minutes, extended_hours).values.astype("datetime64[ms]").astype(np.int64)
+    tickers = np.array([f"T{i:05d}" for i in range(n_tickers)])
+    base = rng.uniform(20.0, 500.0, size=n_tickers)
+    shape = (len(minutes), n_tickers, trades_per_bar)
+    steps = rng.standard_normal(shape) * 0.0005
+    # One random walk per ticker, continuing from minute to minute.
+    walk = np.cumsum(steps.transpose(1, 0, 2).reshape(n_tickers, -1), axis=1)
+    walk = walk.reshape(n_tickers, len(minutes), trades_per_bar).transpose(1, 0, 2)
+    price = np.round(base[None, :, None] * np.exp(walk), 2)
+    size = rng.integers(1, 5, size=shape) * 100.0
+    trade_ms = np.sort(rng.integers(0, 60_000, size=shape), axis=2) + minutes[:, None, None]
+    quote_ms = np.sort(rng.integers(0, 60_000, size=(len(minutes), n_tickers, quotes_per_bar)), axis=2)
+    quote_ms = quote_ms + minutes[:, None, None]
+    quote_mid = price[:, :, np.minimum(np.arange(quotes_per_bar) * trades_per_bar // max(quotes_per_bar, 1),
+                                       trades_per_bar - 1)]
+    half = np.round(np.maximum(0.01, quote_mid * 0.0002), 2)
+    bid_size = rng.integers(1, 20, size=quote_ms.shape) * 100.0
+    ask_size = rng.integers(1, 20, size=quote_ms.shape) * 100.0
+
+    volume = size.sum(axis=2)
+    vwap = (price * size).sum(axis=2) / volume
+    accumulated = np.cumsum(volume, axis=0)
+
+    events = []
+    for m in range(len(minutes)):
+        if m:
+            events.extend(_bar_events(tickers, minutes[m - 1], price[m - 1], volume[m - 1], vwap[m - 1],
+                                      accumulated[m - 1], price[0, :, 0]))
+        trades = [
+            {"ev": "T", "sym": sym, "x": 4, "i": str(i), "z": 3, "p": p, "s": s, "c": [12], "t": t, "q": i}
+            for i, (sym, p, s, t) in enumerate(zip(
+                np.repeat(tickers, trades_per_bar).tolist(), price[m].ravel().tolist(),
+                size[m].ravel().tolist(), trade_ms[m].ravel().tolist()))
+        ]
+        quotes = [
+            {"ev": "Q", "sym": sym, "bx": 11, "bp": round(mid - h, 2), "bs": bs, "ax": 12,
+             "ap": round(mid + h, 2), "as": asz, "c": 1, "t": t, "q": i, "z": 3}
+            for i, (sym, mid, h, bs, asz, t) in enumerate(zip(
+                np.repeat(tickers, quotes_per_bar).tolist(), quote_mid[m].ravel().tolist(),
+                half[m].ravel().tolist(), bid_size[m].ravel().tolist(), ask_size[m].ravel().tolist(),
+                quote_ms[m].ravel().tolist()))
+        ]
+        minute_events = trades + quotes
+        order = np.argsort([e["t"] for e in minute_events], kind="stable")
+        events.extend(minute_events[i] for i in order)
+    if len(minutes):
+        events.extend(_bar_events(tickers, minutes[-1], price[-1], volume[-1], vwap[-1], accumulated[-1],
+                                  price[0, :, 0]))
+
+    return [
+        json.dumps(events[i:i + events_per_frame], separators=(",", ":"))
+        for i in range(0, len(events), events_per_frame)
+    ]
+
+
+def _bar_events(tickers, minute_ms: int, price, volume, vwap, accumulated, opening) -> list:
+    # One AM event per ticker for the minute starting at minute_ms.
+    minute_ms = int(minute_ms)
+    return [
+        {"ev": "AM", "sym": sym, "v": v, "av": av, "op": op, "vw": round(vw, 4), "o": float(p[0]),
+         "c": float(p[-1]), "h": float(p.max()), "l": float(p.min()), "a": round(vw, 4), "z": 100,
+         "s": minute_ms, "e": minute_ms + 60_000}
+        for sym, p, v, vw, av, op in zip(tickers.tolist(), price, volume.tolist(), vwap.tolist(),
+                                         accumulated.tolist(), opening.tolist())
+    ]
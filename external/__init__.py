@@ -0,0 +1,39 @@
+"""Market data from Polygon.io: REST service, bar cache, corporate actions and the live feed.
+
+The main entry points can be imported from the package itself, e.g.
+`from external import PolygonTradingDataService, BarCache`. Modules are
+imported on first use, and the Polygon SDK only when a request needs a
+client (see external.clients).
+"""
+import importlib
+
+# Public name -> module that defines it.
+_EXPORTS = {
+    "PolygonTradingDataService": "external.polygon_trading_data",
+    "polygon_client": "external.clients",
+    "offline_client": "external.clients",
+    "OfflineError": "external.clients",
+    "BarCache": "external.bar_cache",
+    "BAR_DTYPE": "external.bars",
+    "bars_to_frame": "external.bars",
+    "AggsFetcher": "external.bulk_fetch",
+    "CorporateActionsIndex": "external.corporate_actions",
+    "snapshot_to_frame": "external.snapshots",
+    "decode_frames": "external.stream_messages",
+    "PolygonStream": "external.streaming",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from external.bars import BAR_DTYPE
+
+
+class BarCache:
+    """Persistent on-disk cache of OHLCV bars, one file per (ticker, timespan).
+
+    Bars live in memory-mapped .npy files of BAR_DTYPE records sorted by
+    timestamp. Alongside each file, a small JSON sidecar records which calendar
+    days have already been fetched. A day with no bars (a weekend or holiday)
+    therefore still counts as covered and is not requested again. Only
+    completed days are recorded; today and later are always refetched so the
+    cache never freezes a partial session.
+
+    Args:
+        root: Directory to keep the cache in. Created if missing.
+        max_bytes: Total size budget for bar files. When a write pushes the
+                   cache over budget, the least recently used series are
+                   deleted until it fits.
+        session_tz: Timezone whose calendar days bound a "YYYY-MM-DD" range.
+                    Polygon interprets aggregate date ranges in exchange time.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3, session_tz: str = "America/New_York"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.session_tz = session_tz
+        self._lock = threading.Lock()
+        self._series_locks = {}
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        self._index = self._read_json(self._index_path, {})
+
+    def get_bars(self, ticker: str, timespan: str, from_date: str, to_date: str, fetch) -> np.ndarray:
+        """Return cached bars for [from_date, to_date], fetching only what is missing.
+
+        Args:
+            ticker: Stock ticker symbol.
+            timespan: Bar size key, e.g. "1hour". Each timespan is cached separately.
+            from_date: Start date string "YYYY-MM-DD" (inclusive).
+            to_date: End date string "YYYY-MM-DD" (inclusive).
+            fetch: Callable (from_date, to_date) -> BAR_DTYPE array. Called once
+                   per missing date range.
+
+        Returns:
+            Read-only BAR_DTYPE array sorted by timestamp. It is a slice of the
+            memory-mapped file, so no bars are copied.
+        """
+        key = f"{ticker}/{timespan}"
+        start, end = date.fromisoformat(from_date), date.fromisoformat(to_date)
+
+        with self._series_lock(key):
+            covered = self._read_json(self._meta_path(key), {"covered": []})["covered"]
+            gaps = _missing_ranges(covered, start, end)
+            if gaps:
+                bars = self._load(key)
+                fetched = [
+                    np.asarray(fetch(g_start.isoformat(), g_end.isoformat()), dtype=BAR_DTYPE)
+                    for g_start, g_end in gaps
+                ]
+                bars = _merge_bars([np.asarray(bars)] + fetched)
+                last_complete = self._today() - timedelta(days=1)
+                for g_start, g_end in gaps:
+                    if g_start <= last_complete:
+                        covered = _add_range(covered, g_start, min(g_end, last_complete))
+                self._store(key, bars, covered)
+            bars = self._load(key)
+
+            # Still under the series lock, so the index never lists a series
+            # another thread has just evicted. Locks are always taken series
+            # first, then the cache-wide one.
+            with self._lock:
+                self._touch(key)
+                self._evict(keep=key)
+
+        lo = self._day_start_ms(start)
+        hi = self._day_start_ms(end + timedelta(days=1))
+        ts = bars["timestamp"]
+        return bars[np.searchsorted(ts, lo, side="left"):np.searchsorted(ts, hi, side="left")]
+
+    def clear(self, ticker: str = None):
+        """Delete every cached series, or only those of one ticker.
+
+        A series being fetched is deleted once that fetch has finished.
+        """
+        with self._lock:
+            keys = [key for key in self._index if ticker is None or key.split("/")[0] == ticker]
+        for key in keys:
+            with self._series_lock(key), self._lock:
+                self._remove(key)
+                self._write_json(self._index_path, self._index)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._file_size(key) for key in self._index)
+
+    # ── storage ───────────────────────────────────────────────────────────────
+
+    def _series_lock(self, key: str) -> threading.Lock:
+        # Fetches for different series run concurrently; the same series never does.
+        with self._lock:
+            return self._series_locks.setdefault(key, threading.Lock())
+
+    def _bars_path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".npy")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".json")
+
+    def _load(self, key: str) -> np.ndarray:
+        path = self._bars_path(key)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.load(path, mmap_mode="r")
+
+    def _store(self, key: str, bars: np.ndarray, covered: list):
+        path = self._bars_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, bars)
+        os.replace(tmp, path)
+        self._write_json(self._meta_path(key), {"covered": covered})
+
+    def _touch(self, key: str):
+        self._index[key] = time.time()
+        self._write_json(self._index_path, self._index)
+
+    def _evict(self, keep: str):
+        # Called with self._lock held. A series another thread is reading or
+        # writing is skipped rather than waited for; a later eviction gets it.
+        total = self.size_bytes
+        for key in sorted(self._index, key=self._index.get):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            lock = self._series_locks.get(key)
+            if lock is not None and not lock.acquire(blocking=False):
+                continue
+            try:
+                total -= self._file_size(key)
+                self._remove(key)
+            finally:
+                if lock is not None:
+                    lock.release()
+        self._write_json(self._index_path, self._index)
+
+    def _remove(self, key: str):
+        for path in (self._bars_path(key), self._meta_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._index.pop(key, None)
+
+    def _file_size(self, key: str) -> int:
+        path = self._bars_path(key)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _day_start_ms(self, day: date) -> int:
+        return pd.Timestamp(day.isoformat(), tz=self.session_tz).value // 1_000_000
+
+    def _today(self) -> date:
+        return pd.Timestamp.now(tz=self.session_tz).date()
+
+    @staticmethod
+    def _read_json(path: str, default):
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: str, obj):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+
+
+def _missing_ranges(covered: list, start: date, end: date) -> list:
+    # Covered ranges are sorted, non-overlapping [start, end] ISO date pairs.
+    gaps = []
+    cursor = start
+    for c_start, c_end in covered:
+        c_start, c_end = date.fromisoformat(c_start), date.fromisoformat(c_end)
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start - timedelta(days=1)))
+        cursor = c_end + timedelta(days=1)
+        if cursor > end:
+            return gaps
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _add_range(covered: list, start: date, end: date) -> list:
+    ranges = [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in covered]
+    ranges.append((start, end))
+    ranges.sort()
+    merged = [list(ranges[0])]
+    for r_start, r_end in ranges[1:]:
+        if r_start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], r_end)
+        else:
+            merged.append([r_start, r_end])
+    return [[s.isoformat(), e.isoformat()] for s, e in merged]
+
+
+def _merge_bars(chunks: list) -> np.ndarray:
+    # Later chunks win on duplicate timestamps, so a refetch replaces stale bars.
+    bars = np.concatenate(chunks) if chunks else np.empty(0, dtype=BAR_DTYPE)
+    if len(bars) == 0:
+        return bars
+    order = np.argsort(bars["timestamp"], kind="stable")
+    bars = bars[order]
+    keep = np.ones(len(bars), dtype=bool)
+    keep[:-1] = bars["timestamp"][1:] != bars["timestamp"][:-1]
+    return bars[keep]
+
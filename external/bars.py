@@ -0,0 +1,55 @@
+from operator import attrgetter, itemgetter
+
+import numpy as np
+import pandas as pd
+
+# One OHLCV bar. Timestamps are epoch milliseconds (UTC), as Polygon sends them.
+BAR_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+_AGG_FIELDS = attrgetter("timestamp", "open", "high", "low", "close", "volume")
+_RESULT_FIELDS = itemgetter("t", "o", "h", "l", "c", "v")
+
+
+def aggs_to_bars(aggs) -> np.ndarray:
+    """Pack an iterable of polygon Agg objects into a BAR_DTYPE array.
+
+    Values are written straight into the array's buffer as the iterator is
+    consumed. No per-bar dict or Timestamp is created, and the Agg objects
+    can be garbage-collected one page at a time.
+    """
+    return np.fromiter(map(_AGG_FIELDS, aggs), dtype=BAR_DTYPE)
+
+
+def results_to_bars(results: list) -> np.ndarray:
+    """Pack the 'results' list of a raw aggregates JSON page into a BAR_DTYPE array."""
+    return np.fromiter(map(_RESULT_FIELDS, results), dtype=BAR_DTYPE, count=len(results))
+
+
+def sort_bars(bars: np.ndarray) -> np.ndarray:
+    """Return bars in timestamp order, skipping the sort if they already are."""
+    ts = bars["timestamp"]
+    if len(ts) < 2 or (ts[1:] >= ts[:-1]).all():
+        return bars
+    return bars[np.argsort(ts, kind="stable")]
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """Convert BAR_DTYPE records to the DataFrame layout of get_hourly_ohlcv.
+
+    Timestamps are converted to UTC datetimes in one vectorized step.
+    """
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(bars["timestamp"], unit="ms", utc=True),
+        "open": bars["open"],
+        "high": bars["high"],
+        "low": bars["low"],
+        "close": bars["close"],
+        "volume": bars["volume"],
+    })
@@ -0,0 +1,178 @@
+import json
+import math
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import numpy as np
+import urllib3
+
+from external.bars import results_to_bars, sort_bars
+from external.http_metrics import InstrumentedPool
+from services import instrumentation
+
+# Statuses worth retrying: rate limiting and transient server-side failures.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value, now: float = None):
+    """Seconds to wait for a Retry-After header value, or None if it is missing or malformed.
+
+    The header is either a number of seconds or an HTTP date such as
+    "Wed, 21 Oct 2015 07:28:00 GMT"; a date in the past means no wait.
+    """
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+        return seconds if math.isfinite(seconds) else None
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(when.timestamp() - (time.time() if now is None else now), 0.0)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that caps the request rate across workers.
+
+    Args:
+        rate: Tokens added per second (the sustained requests-per-second limit).
+        capacity: Largest burst allowed. Defaults to one second's worth of tokens.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until one token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AggsFetchError(Exception):
+    """Raised when an aggregates request fails for good (non-retryable or out of retries)."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+class AggsFetcher:
+    """Fetches aggregate bars over one shared, thread-safe connection pool.
+
+    Talks to the Polygon aggregates endpoint directly so that it can see HTTP
+    status codes, retry 429/5xx responses with exponential backoff (honouring
+    Retry-After), and draw every page request, including retries, from one
+    token bucket.
+
+    Args:
+        base_url: API root, e.g. "https://api.polygon.io" (RESTClient.BASE).
+        headers: Default request headers, including Authorization (RESTClient.headers).
+        max_connections: Connections kept open per host; match the worker count.
+        requests_per_second: Token-bucket rate shared by all workers.
+        max_retries: Retries per request on retryable failures.
+        backoff: Base delay in seconds; attempt n waits backoff * 2**n.
+        max_backoff: Longest wait in seconds before a retry, including one
+                     asked for by Retry-After.
+        timeout: Per-request timeout in seconds.
+        label: Method label for requests, retries and bytes recorded by
+               services.instrumentation.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        max_connections: int = 8,
+        requests_per_second: float = 5.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 10.0,
+        label: str = "aggs",
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.label = label
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool = InstrumentedPool(urllib3.PoolManager(
+            num_pools=4,
+            maxsize=max_connections,
+            block=True,
+            headers=headers,
+            retries=False,
+            timeout=urllib3.Timeout(total=timeout),
+        ), method=label)
+
+    def fetch_bars(
+        self, ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str, adjusted: bool = True
+    ) -> np.ndarray:
+        """Fetch every page of aggregates for one ticker as BAR_DTYPE records.
+
+        adjusted=False asks for bars without Polygon's split adjustment.
+        """
+        path = f"/v2/aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from_date}/{to_date}"
+        fields = {"adjusted": "true" if adjusted else "false", "sort": "asc", "limit": 50000}
+        pages = []
+        while path:
+            page = self._get_json(path, fields)
+            pages.append(results_to_bars(page.get("results", [])))
+            next_url = page.get("next_url")
+            if not next_url:
+                break
+            parsed = urlparse(next_url)
+            path = parsed.path + ("?" + parsed.query if parsed.query else "")
+            fields = None
+        bars = np.concatenate(pages) if len(pages) > 1 else pages[0]
+        return sort_bars(bars)
+
+    def _get_json(self, path: str, fields) -> dict:
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                resp = self.pool.request("GET", self.base_url + path, fields=fields)
+            except urllib3.exceptions.HTTPError as e:
+                if attempt == self.max_retries:
+                    raise AggsFetchError(f"Request failed: {e}") from e
+                instrumentation.count("polygon_retries", method=self.label, reason="connection")
+                time.sleep(min(self.backoff * 2 ** attempt, self.max_backoff))
+                continue
+
+            if resp.status == 200:
+                return json.loads(resp.data)
+            if resp.status not in RETRY_STATUSES or attempt == self.max_retries:
+                raise AggsFetchError(
+                    f"HTTP {resp.status}: {resp.data.decode('utf-8', 'replace')[:200]}", resp.status
+                )
+            instrumentation.count("polygon_retries", method=self.label, reason=str(resp.status))
+            time.sleep(self._retry_delay(resp, attempt))
+
+    def _retry_delay(self, resp, attempt: int) -> float:
+        # Retry-After is either seconds or an HTTP date; both are capped at max_backoff.
+        delay = retry_after_seconds(resp.headers.get("Retry-After"))
+        if delay is None:
+            delay = self.backoff * 2 ** attempt
+        return min(max(delay, 0.0), self.max_backoff)
@@ -0,0 +1,36 @@
+import os
+
+
+class OfflineError(RuntimeError):
+    """Raised when a network request is attempted in offline mode."""
+
+
+def polygon_client(api_key: str = None):
+    """Default client factory: a polygon RESTClient for POLYGON_API_KEY.
+
+    The Polygon SDK is imported and the .env file read here, when the first
+    request needs a client, not when external.polygon_trading_data is
+    imported.
+
+    Raises:
+        ValueError: If no API key is given or found in the environment / .env.
+    """
+    # Deferred: the SDK takes longer to import than the rest of external/.
+    from dotenv import load_dotenv
+    from polygon import RESTClient
+
+    load_dotenv()
+    api_key = api_key or os.getenv("POLYGON_API_KEY")
+    if not api_key:
+        raise ValueError("POLYGON_API_KEY not found in .env file")
+    return RESTClient(api_key=api_key)
+
+
+def offline_client():
+    """Client factory for offline mode: any request raises OfflineError.
+
+    Pass it as PolygonTradingDataService(client_factory=offline_client) to
+    serve only from the bar cache. Cache hits never build a client, and a
+    miss fails (and is reported) instead of going to the network.
+    """
+    raise OfflineError("Offline mode: this request is not in the bar cache")
@@ -0,0 +1,297 @@
+import json
+import os
+import re
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# One split or cash dividend. ex_ms is the ex-date's midnight in exchange
+# time, as epoch milliseconds (like BAR_DTYPE timestamps): bars before it are
+# adjusted, bars from it on are not. ref_close is the unadjusted close of the
+# last session before a dividend's ex-date; NaN for splits.
+ACTION_DTYPE = np.dtype([
+    ("ex_ms", "<i8"),
+    ("kind", "<i1"),
+    ("split_from", "<f8"),
+    ("split_to", "<f8"),
+    ("cash_amount", "<f8"),
+    ("ref_close", "<f8"),
+])
+SPLIT, DIVIDEND = 0, 1
+
+_PRICE_COLUMNS = ("open", "high", "low", "close")
+
+
+def action_factors(actions: np.ndarray) -> tuple:
+    """Per-action price and volume multipliers for bars before each ex-date.
+
+    A split of split_from -> split_to shares multiplies earlier prices by
+    split_from / split_to and volumes by the inverse. A cash dividend
+    multiplies earlier prices by 1 - cash_amount / ref_close (the usual
+    total-return adjustment) and leaves volume alone. A dividend without a
+    usable reference close is ignored.
+    """
+    split = actions["kind"] == SPLIT
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = actions["split_from"] / actions["split_to"]
+        dividend = 1.0 - actions["cash_amount"] / actions["ref_close"]
+    ratio = np.where(np.isfinite(ratio) & (ratio > 0), ratio, 1.0)
+    dividend = np.where(np.isfinite(dividend) & (dividend > 0), dividend, 1.0)
+    price = np.where(split, ratio, dividend)
+    volume = np.where(split, 1.0 / ratio, 1.0)
+    return price, volume
+
+
+def cumulative_factors(actions: np.ndarray) -> tuple:
+    """Cumulative adjustment arrays for actions sorted by ex_ms.
+
+    Returns:
+        (ex_ms, price, volume) where price and volume have one more element
+        than ex_ms. A bar at timestamp t takes element
+        np.searchsorted(ex_ms, t, side="right"): the product of the factors of
+        every action whose ex-date is after t.
+    """
+    price, volume = action_factors(actions)
+    ones = np.ones(1)
+    return (
+        np.asarray(actions["ex_ms"], dtype=np.int64),
+        np.concatenate([np.cumprod(price[::-1])[::-1], ones]),
+        np.concatenate([np.cumprod(volume[::-1])[::-1], ones]),
+    )
+
+
+def adjust_bars(bars: np.ndarray, ex_ms: np.ndarray, price: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """Apply cumulative factors (see cumulative_factors) to BAR_DTYPE bars.
+
+    One searchsorted finds each bar's factor, then prices and volume are
+    multiplied in place on a copy. Bars that need no adjustment (none, or
+    all at or after the last ex-date) are returned as they are, without a copy.
+    """
+    if len(bars) == 0 or len(ex_ms) == 0:
+        return bars
+    idx = np.searchsorted(ex_ms, bars["timestamp"], side="right")
+    if idx.min() == len(ex_ms):
+        return bars
+    adjusted = np.array(bars)
+    price_factor = price[idx]
+    for column in _PRICE_COLUMNS:
+        adjusted[column] *= price_factor
+    adjusted["volume"] *= volume[idx]
+    return adjusted
+
+
+def reference_closes(daily_bars: np.ndarray, ex_ms: np.ndarray) -> np.ndarray:
+    """Close of the last daily bar before each ex-date, NaN where there is none."""
+    idx = np.searchsorted(daily_bars["timestamp"], ex_ms, side="left") - 1
+    closes = np.full(len(ex_ms), np.nan)
+    found = idx >= 0
+    closes[found] = daily_bars["close"][idx[found]]
+    return closes
+
+
+class CorporateActionsIndex:
+    """Persistent index of splits and cash dividends, with adjustment factors per ticker.
+
+    Actions are stored per ticker as ACTION_DTYPE .npy files under root,
+    and cumulative price and volume factors are computed once per ticker
+    and kept in memory. adjust() applies them to raw (unadjusted) bars at
+    read time, so cached bars never have to be rewritten when a new action
+    arrives.
+
+    update() merges freshly fetched actions and returns the tickers whose
+    actions changed. Each listener (e.g. FeatureCache.invalidate) is then
+    called once per changed ticker, so only those tickers' derived data is
+    dropped.
+
+    Only actions with an ex-date up to as_of (default: now) are applied, so
+    an announced future split does not move today's prices.
+
+    The index also records when each ticker's actions were last fetched
+    (last_refresh), so an incremental refresh never skips the history of a
+    ticker that joined the universe later.
+
+    Args:
+        root: Directory to keep the index in. Created if missing.
+        session_tz: Timezone whose midnight starts an ex-date.
+    """
+
+    def __init__(self, root: str, session_tz: str = "America/New_York"):
+        self.root = root
+        self.session_tz = session_tz
+        self._lock = threading.Lock()
+        self._actions = {}
+        self._factors = {}
+        self._listeners = []
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        self._index = self._empty_index()
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index.update(json.load(f))
+
+    @property
+    def tickers(self) -> list:
+        return list(self._index["tickers"])
+
+    @property
+    def refreshed(self) -> str:
+        """Date ("YYYY-MM-DD") of the last update(), or None."""
+        return self._index["refreshed"]
+
+    def last_refresh(self, ticker: str) -> str:
+        """Date ("YYYY-MM-DD") ticker's actions were last fetched, or None if never."""
+        dates = [self._index["covered"].get(ticker), self._index["covered_all"]]
+        dates = [d for d in dates if d is not None]
+        return max(dates) if dates else None
+
+    def add_listener(self, callback):
+        """Call callback(ticker) for every ticker whose actions change."""
+        self._listeners.append(callback)
+
+    def actions(self, ticker: str) -> np.ndarray:
+        """Stored actions of one ticker, sorted by ex-date (empty if none)."""
+        with self._lock:
+            return self._load(ticker)
+
+    def factors(self, ticker: str, as_of=None) -> tuple:
+        """(ex_ms, price, volume) cumulative factors of a ticker's actions up to as_of."""
+        as_of_ms = self._as_of_ms(as_of)
+        with self._lock:
+            actions = self._load(ticker)
+            n = int(np.searchsorted(actions["ex_ms"], as_of_ms, side="right"))
+            cached = self._factors.get(ticker)
+            if cached is None or cached[0] != n:
+                cached = self._factors[ticker] = (n, cumulative_factors(actions[:n]))
+            return cached[1]
+
+    def adjust(self, ticker: str, bars: np.ndarray, as_of=None) -> np.ndarray:
+        """Split- and dividend-adjusted copy of raw BAR_DTYPE bars (see adjust_bars)."""
+        return adjust_bars(bars, *self.factors(ticker, as_of))
+
+    def update(self, splits=(), dividends=(), reference_close=None, tickers=None) -> list:
+        """Merge newly fetched actions into the index.
+
+        Args:
+            splits: Objects with ticker, execution_date, split_from and
+                    split_to, e.g. from RESTClient.list_splits.
+            dividends: Objects with ticker, ex_dividend_date and cash_amount,
+                       e.g. from RESTClient.list_dividends. Dividends sharing
+                       an ex-date are summed.
+            reference_close: Callable (ticker, ex_ms array) -> unadjusted
+                             close of the last session before each ex-date.
+                             Called once per ticker with past dividends that
+                             do not have one yet. Without it those dividends
+                             are stored but not applied until a later update.
+            tickers: Universe the actions were fetched for, recorded as
+                     refreshed today (see last_refresh). None means every
+                     ticker was fetched.
+
+        Returns:
+            Sorted tickers whose stored actions changed.
+        """
+        fetched = {}
+        for split in splits:
+            key = (self._ex_ms(split.execution_date), SPLIT)
+            fetched.setdefault(split.ticker, {})[key] = (split.split_from, split.split_to, 0.0)
+        for dividend in dividends:
+            if not dividend.cash_amount:
+                continue
+            key = (self._ex_ms(dividend.ex_dividend_date), DIVIDEND)
+            by_date = fetched.setdefault(dividend.ticker, {})
+            cash = by_date.get(key, (np.nan, np.nan, 0.0))[2] + dividend.cash_amount
+            by_date[key] = (np.nan, np.nan, cash)
+
+        changed = []
+        now_ms = self._as_of_ms(None)
+        with self._lock:
+            for ticker, new in fetched.items():
+                old = self._load(ticker)
+                merged = {(int(a["ex_ms"]), int(a["kind"])): a for a in old}
+                for key, (split_from, split_to, cash) in new.items():
+                    previous = merged.get(key)
+                    ref_close = previous["ref_close"] if previous is not None else np.nan
+                    merged[key] = np.array((*key, split_from, split_to, cash, ref_close), dtype=ACTION_DTYPE)
+                actions = np.array([merged[key] for key in sorted(merged)], dtype=ACTION_DTYPE)
+
+                # A close is only final once the session before the ex-date is over.
+                missing = (actions["kind"] == DIVIDEND) & np.isnan(actions["ref_close"]) & (actions["ex_ms"] <= now_ms)
+                if reference_close is not None and missing.any():
+                    actions["ref_close"][missing] = reference_close(ticker, actions["ex_ms"][missing])
+
+                if actions.tobytes() != old.tobytes():
+                    self._store(ticker, actions)
+                    changed.append(ticker)
+
+            today = pd.Timestamp.now(tz=self.session_tz).date().isoformat()
+            self._index["refreshed"] = today
+            if tickers is None:
+                self._index["covered_all"] = today
+            else:
+                self._index["covered"].update(dict.fromkeys(tickers, today))
+            self._index["tickers"] = sorted(set(self._index["tickers"]) | set(fetched))
+            self._write_index()
+
+        for ticker in sorted(changed):
+            for callback in self._listeners:
+                callback(ticker)
+        return sorted(changed)
+
+    def clear(self):
+        """Delete every stored action."""
+        with self._lock:
+            for ticker in self._index["tickers"]:
+                path = self._path(ticker)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._actions.clear()
+            self._factors.clear()
+            self._index = self._empty_index()
+            self._write_index()
+
+    # ── storage ───────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _empty_index() -> dict:
+        # covered: per-ticker date of the last fetch; covered_all: last market-wide one.
+        return {"refreshed": None, "tickers": [], "covered": {}, "covered_all": None}
+
+    def _path(self, ticker: str) -> str:
+        # Tickers like BRK.B are kept as they are; anything path-unsafe is escaped.
+        safe = re.sub(r"[^A-Za-z0-9._-]", lambda m: f"%{ord(m.group()):02X}", ticker)
+        return os.path.join(self.root, safe + ".npy")
+
+    def _load(self, ticker: str) -> np.ndarray:
+        actions = self._actions.get(ticker)
+        if actions is None:
+            path = self._path(ticker)
+            actions = np.load(path) if os.path.exists(path) else np.empty(0, dtype=ACTION_DTYPE)
+            self._actions[ticker] = actions
+        return actions
+
+    def _store(self, ticker: str, actions: np.ndarray):
+        path = self._path(ticker)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, actions)
+        os.replace(tmp, path)
+        self._actions[ticker] = actions
+        self._factors.pop(ticker, None)
+
+    def _write_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    def _ex_ms(self, day) -> int:
+        day = day.isoformat() if isinstance(day, date) else str(day)[:10]
+        return pd.Timestamp(day, tz=self.session_tz).value // 1_000_000
+
+    def _as_of_ms(self, as_of) -> int:
+        if as_of is None:
+            return pd.Timestamp.now(tz="UTC").value // 1_000_000
+        ts = pd.Timestamp(as_of)
+        ts = ts.tz_localize(self.session_tz) if ts.tz is None else ts
+        return ts.value // 1_000_000
@@ -0,0 +1,74 @@
+import functools
+import threading
+
+from services import instrumentation
+
+_local = threading.local()
+
+
+def current_method() -> str:
+    """Name of the PolygonTradingDataService method running on this thread, if any."""
+    return getattr(_local, "method", None)
+
+
+def instrumented_method(method):
+    """Decorator for PolygonTradingDataService methods.
+
+    Counts calls (polygon_calls), times the call (polygon_call span), and
+    labels every HTTP request made on this thread during the call with the
+    method name (see InstrumentedPool). Does nothing extra while
+    instrumentation is disabled.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not instrumentation.is_enabled():
+            return method(*args, **kwargs)
+        previous = current_method()
+        _local.method = name
+        instrumentation.count("polygon_calls", method=name)
+        try:
+            with instrumentation.span("polygon_call", method=name):
+                return method(*args, **kwargs)
+        finally:
+            _local.method = previous
+
+    return wrapper
+
+
+def report_error(method: str, message: str, error: Exception):
+    """Print an error the way the service always has, and count it as polygon_errors."""
+    print(f"{message}: {error}")
+    instrumentation.count("polygon_errors", method=method, error=type(error).__name__)
+
+
+class InstrumentedPool:
+    """Wraps a urllib3 PoolManager and records every request it sends.
+
+    Records a polygon_request span, polygon_requests by status,
+    polygon_bytes received, and polygon_retries made by urllib3's own retry
+    policy. Requests are labelled with method, or else with the service
+    method running on the calling thread. Everything else is passed
+    through to the wrapped pool.
+    """
+
+    def __init__(self, pool, method: str = None):
+        self.pool = pool
+        self.method = method
+
+    def request(self, verb, url, *args, **kwargs):
+        if not instrumentation.is_enabled():
+            return self.pool.request(verb, url, *args, **kwargs)
+        label = self.method or current_method() or "other"
+        with instrumentation.span("polygon_request", method=label):
+            resp = self.pool.request(verb, url, *args, **kwargs)
+        instrumentation.count("polygon_requests", method=label, status=resp.status)
+        instrumentation.count("polygon_bytes", len(resp.data or b""), method=label)
+        retries = getattr(resp, "retries", None)
+        if retries is not None and retries.history:
+            instrumentation.count("polygon_retries", len(retries.history), method=label, reason="urllib3")
+        return resp
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
@@ -1,44 +1,120 @@
-from polygon import RESTClient
-import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from external.bars import aggs_to_bars, bars_to_frame, sort_bars
+from external.clients import polygon_client
+from external.corporate_actions import reference_closes
+from external.http_metrics import InstrumentedPool, instrumented_method, report_error
+from external.snapshots import snapshot_to_frame
+from services import instrumentation
+from services.resampling import resample_bars
+from services.tick_aggregation import TradeAggregator
+
+_OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+# Bar cache key per Polygon timespan; raw bars (see corporate_actions) get ".raw".
+_CACHE_KEYS = {"hour": "1hour", "minute": "1minute"}
 
 class PolygonTradingDataService:
     """Polygon.io service for comprehensive trading data and market analysis"""
     
-    def __init__(self):
-        api_key = os.getenv('POLYGON_API_KEY')
-        if not api_key:
-            raise ValueError("POLYGON_API_KEY not found in .env file")
-        
-        self.client = RESTClient(api_key=api_key)
+    def __init__(self, client=None, bar_cache=None, corporate_actions=None, client_factory=None):
+        """
+        Args:
+            client: Optional pre-built client exposing the RESTClient methods
+                    used here (e.g. a fake for offline tests). If omitted,
+                    one is built by client_factory on the first request.
+            bar_cache: Optional external.bar_cache.BarCache. When set,
+                       get_hourly_ohlcv serves repeated ranges from disk and
+                       only fetches the dates it has not seen yet.
+            corporate_actions: Optional
+                       external.corporate_actions.CorporateActionsIndex. When
+                       set, bars are fetched and cached unadjusted, and
+                       splits and dividends are applied when they are read.
+                       Keep it current with refresh_corporate_actions.
+            client_factory: Callable () -> client used when client is
+                       omitted. Defaults to external.clients.polygon_client,
+                       which reads POLYGON_API_KEY and imports the Polygon SDK
+                       only then; external.clients.offline_client serves from
+                       the bar cache alone. Requests answered by the cache
+                       never build a client.
+        """
+        self.client_factory = client_factory or polygon_client
+        self.bar_cache = bar_cache
+        self.corporate_actions = corporate_actions
+        self._client = None
+        self._client_lock = threading.Lock()
+        if client is not None:
+            self.client = client
+
+    @property
+    def client(self):
+        """The REST client, built by client_factory on first use.
+
+        Raises:
+            ValueError: From the default factory when no API key is set.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self.client = self.client_factory()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        # RESTClient sends every request through one urllib3 pool; wrapping it
+        # lets services.instrumentation count requests and bytes per method.
+        pool = getattr(client, "client", None)
+        if hasattr(pool, "request") and not isinstance(pool, InstrumentedPool):
+            client.client = InstrumentedPool(pool)
+        self._client = client
     
-    def get_trade_volume_data(self, ticker="AAPL"):
-        # Get trade volume data from Trades API (tick-level)
+    @instrumented_method
+    def get_trade_volume_data(self, ticker="AAPL", date="2024-12-27", intervals=("1min", "5min", "1h"), bar_volume=None):
+        """Summarise one day of tick-level trades from the Trades API.
+
+        Trades are folded into a services.tick_aggregation.TradeAggregator as
+        they stream in, so memory stays constant no matter how many trades
+        the day has.
+
+        Args:
+            ticker: Stock ticker symbol.
+            date: Trading day "YYYY-MM-DD".
+            intervals: Time-bar widths to build (pandas offset strings).
+            bar_volume: If set, also build volume bars of this many shares.
+
+        Returns:
+            Dict with total_volume, avg_trade_price (VWAP), trade_count,
+            latest_trade and 'bars' ({interval: DataFrame}, plus "volume"
+            when bar_volume is set), or None if there were no trades.
+        """
         try:
-            trades = []
-            for trade in self.client.list_trades(ticker=ticker, timestamp="2024-12-27"):
-                trades.append(trade)
-            
-            if trades:
-                total_volume = sum(trade.size for trade in trades)
-                avg_trade_price = sum(trade.price * trade.size for trade in trades) / total_volume
-                
+            aggregator = TradeAggregator(intervals=intervals, bar_volume=bar_volume)
+            aggregator.add_trades(
+                self.client.list_trades(ticker=ticker, timestamp=date, order="asc", sort="timestamp", limit=50000)
+            )
+
+            instrumentation.count("polygon_rows", aggregator.trade_count, method="get_trade_volume_data")
+            if aggregator.trade_count:
+                bars = {interval: aggregator.bars(interval) for interval in intervals}
+                if bar_volume:
+                    bars["volume"] = aggregator.volume_bar_frame()
                 return {
                     'ticker': ticker,
-                    'total_volume': total_volume,
-                    'avg_trade_price': avg_trade_price,
-                    'trade_count': len(trades),
-                    'latest_trade': trades[-1].price if trades else None
+                    'total_volume': aggregator.total_volume,
+                    'avg_trade_price': aggregator.vwap,
+                    'trade_count': aggregator.trade_count,
+                    'latest_trade': aggregator.last_price,
+                    'bars': bars,
                 }
             return None
         except Exception as e:
-            print(f"Error getting trade volume data: {e}")
+            report_error("get_trade_volume_data", "Error getting trade volume data", e)
             return None
     
+    @instrumented_method
     def get_bid_ask_spread(self, ticker="AAPL"):
         # Get bid/ask spread from Quotes API (NBBO)
         try:
@@ -57,9 +133,10 @@ class PolygonTradingDataService:
                 'spread_percentage': spread_percentage
             }
         except Exception as e:
-            print(f"Error getting bid/ask spread: {e}")
+            report_error("get_bid_ask_spread", "Error getting bid/ask spread", e)
             return None
     
+    @instrumented_method
     def get_order_imbalance(self, ticker="AAPL"):
         # Get order imbalance from Quotes API (size of bid vs ask)
         try:
@@ -79,36 +156,36 @@ class PolygonTradingDataService:
                 'excess_demand': imbalance > 0
             }
         except Exception as e:
-            print(f"Error getting order imbalance: {e}")
+            report_error("get_order_imbalance", "Error getting order imbalance", e)
             return None
     
+    @instrumented_method
     def get_ohlc_momentum(self, ticker="AAPL"):
-        # Get OHLC momentum from Aggregates API
+        # Get OHLC momentum from minute bars (shared with get_minute_ohlcv via the bar cache)
         try:
-            aggs = []
-            for agg in self.client.list_aggs(ticker=ticker, multiplier=1, timespan="minute", from_="2024-12-20", to="2024-12-27"):
-                aggs.append(agg)
+            bars = self._bars(ticker, "minute", "2024-12-20", "2024-12-27")
             
-            if len(aggs) >= 2:
-                current = aggs[-1]
-                previous = aggs[-2]
+            if len(bars) >= 2:
+                current = float(bars["close"][-1])
+                previous = float(bars["close"][-2])
                 
-                momentum = current.close - previous.close
-                momentum_percentage = (momentum / previous.close) * 100
+                momentum = current - previous
+                momentum_percentage = (momentum / previous) * 100
                 
                 return {
                     'ticker': ticker,
-                    'current_close': current.close,
-                    'previous_close': previous.close,
+                    'current_close': current,
+                    'previous_close': previous,
                     'momentum': momentum,
                     'momentum_percentage': momentum_percentage,
                     'trend': 'up' if momentum > 0 else 'down' if momentum < 0 else 'flat'
                 }
             return None
         except Exception as e:
-            print(f"Error getting OHLC momentum: {e}")
+            report_error("get_ohlc_momentum", "Error getting OHLC momentum", e)
             return None
     
+    @instrumented_method
     def get_snapshot_mover_data(self, ticker="AAPL"):
         # Get snapshot data to identify market movers
         try:
@@ -123,49 +200,290 @@ class PolygonTradingDataService:
                 'prev_day_change': snapshot.prev_day.change if snapshot.prev_day else None
             }
         except Exception as e:
-            print(f"Error getting snapshot data: {e}")
+            report_error("get_snapshot_mover_data", "Error getting snapshot data", e)
             return None
     
-    def get_hourly_ohlcv(self, ticker: str, from_date: str, to_date: str) -> pd.DataFrame:
+    @instrumented_method
+    def get_market_snapshot(self, tickers: list = None, include_otc: bool = False, chunk_size: int = 250) -> pd.DataFrame:
+        """Snapshot of many tickers (or the whole US stock market) as one DataFrame.
+
+        Replaces per-ticker get_snapshot_mover_data, get_bid_ask_spread and
+        get_order_imbalance calls: the full-market snapshot is a single
+        request, and a ticker list takes one request per chunk_size tickers.
+        The raw JSON is converted column by column (external.snapshots).
+
+        Args:
+            tickers: Ticker symbols, or None for every traded stock.
+            include_otc: Include OTC securities in a full-market snapshot.
+            chunk_size: Tickers per request when a list is given, to keep
+                        the query string a sensible length.
+
+        Returns:
+            DataFrame with one row per ticker: last trade, NBBO prices and
+            sizes, today's and the previous day's bar, today's change, and
+            the spread / imbalance columns of add_quote_metrics. Tickers
+            Polygon has no snapshot for are left out. Returns an empty
+            DataFrame on error.
+        """
+        try:
+            if tickers is None:
+                batches = [None]
+            else:
+                batches = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+            rows = []
+            for batch in batches:
+                resp = self.client.get_snapshot_all("stocks", tickers=batch, include_otc=include_otc, raw=True)
+                rows.extend(json.loads(resp.data).get("tickers") or [])
+            instrumentation.count("polygon_rows", len(rows), method="get_market_snapshot")
+            with instrumentation.span("polygon_stage", method="get_market_snapshot", stage="frame"):
+                return snapshot_to_frame(rows)
+        except Exception as e:
+            report_error("get_market_snapshot", "Error getting market snapshot", e)
+            return pd.DataFrame()
+
+    @instrumented_method
+    def get_hourly_ohlcv(
+        self, ticker: str, from_date: str, to_date: str, use_cache: bool = True, adjust: bool = True
+    ) -> pd.DataFrame:
         """Fetch hourly OHLCV bars from Polygon aggregates API.
 
         Args:
             ticker: Stock ticker symbol (e.g. "AAPL")
             from_date: Start date string "YYYY-MM-DD" (inclusive)
             to_date: End date string "YYYY-MM-DD" (inclusive)
+            use_cache: Set False to bypass the bar cache (if one is configured)
+                       and always go to the network.
+            adjust: With a corporate_actions index, set False for raw bars
+                    without split and dividend adjustment.
 
         Returns:
             DataFrame with columns [timestamp, open, high, low, close, volume],
             sorted ascending by timestamp. Returns empty DataFrame on no data.
         """
-        _EMPTY = pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume"])
+        _EMPTY = pd.DataFrame(columns=_OHLCV_COLUMNS)
         try:
-            rows = []
-            for agg in self.client.list_aggs(
-                ticker=ticker,
-                multiplier=1,
-                timespan="hour",
-                from_=from_date,
-                to=to_date,
-            ):
-                rows.append({
-                    "timestamp": pd.Timestamp(agg.timestamp, unit="ms", tz="UTC"),
-                    "open": agg.open,
-                    "high": agg.high,
-                    "low": agg.low,
-                    "close": agg.close,
-                    "volume": agg.volume,
-                })
-
-            if not rows:
+            with instrumentation.span("polygon_stage", method="get_hourly_ohlcv", stage="fetch"):
+                bars = self._bars(ticker, "hour", from_date, to_date, use_cache, adjust)
+            instrumentation.count("polygon_rows", len(bars), method="get_hourly_ohlcv")
+
+            if len(bars) == 0:
                 return _EMPTY
 
-            df = pd.DataFrame(rows)
-            return df.sort_values("timestamp").reset_index(drop=True)
+            with instrumentation.span("polygon_stage", method="get_hourly_ohlcv", stage="frame"):
+                return bars_to_frame(bars)
         except Exception as e:
-            print(f"Error getting hourly OHLCV data: {e}")
+            report_error("get_hourly_ohlcv", "Error getting hourly OHLCV data", e)
             return _EMPTY
 
+    @instrumented_method
+    def get_minute_ohlcv(
+        self, ticker: str, from_date: str, to_date: str, use_cache: bool = True, adjust: bool = True
+    ) -> pd.DataFrame:
+        """Fetch one-minute OHLCV bars from Polygon aggregates API.
+
+        Minute bars are the single store every other bar size can be built
+        from; see get_resampled_ohlcv.
+
+        Args:
+            ticker: Stock ticker symbol (e.g. "AAPL")
+            from_date: Start date string "YYYY-MM-DD" (inclusive)
+            to_date: End date string "YYYY-MM-DD" (inclusive)
+            use_cache: Set False to bypass the bar cache (if one is configured)
+                       and always go to the network.
+            adjust: Set False for raw bars; see get_hourly_ohlcv.
+
+        Returns:
+            DataFrame with the same layout as get_hourly_ohlcv. Returns empty
+            DataFrame on no data.
+        """
+        _EMPTY = pd.DataFrame(columns=_OHLCV_COLUMNS)
+        try:
+            with instrumentation.span("polygon_stage", method="get_minute_ohlcv", stage="fetch"):
+                bars = self._bars(ticker, "minute", from_date, to_date, use_cache, adjust)
+            instrumentation.count("polygon_rows", len(bars), method="get_minute_ohlcv")
+
+            if len(bars) == 0:
+                return _EMPTY
+
+            with instrumentation.span("polygon_stage", method="get_minute_ohlcv", stage="frame"):
+                return bars_to_frame(bars)
+        except Exception as e:
+            report_error("get_minute_ohlcv", "Error getting minute OHLCV data", e)
+            return _EMPTY
+
+    @instrumented_method
+    def get_resampled_ohlcv(
+        self,
+        ticker: str,
+        from_date: str,
+        to_date: str,
+        timeframe: str = "1h",
+        session: str = "extended",
+        anchor: str = "clock",
+        use_cache: bool = True,
+        adjust: bool = True,
+    ) -> pd.DataFrame:
+        """OHLCV bars of any timeframe, built from minute bars.
+
+        Only minute bars are fetched (or read from the bar cache), so asking
+        for several timeframes of the same range costs one download. With the
+        defaults the result matches Polygon's own hourly bars.
+
+        Args:
+            ticker: Stock ticker symbol (e.g. "AAPL")
+            from_date: Start date string "YYYY-MM-DD" (inclusive)
+            to_date: End date string "YYYY-MM-DD" (inclusive)
+            timeframe: "5min", "15min", "1h", "1d", ... (see
+                       services.resampling.timeframe_minutes).
+            session: "extended" (04:00-20:00 New York) or "regular"
+                     (09:30-16:00); minutes outside it are dropped.
+            anchor: "clock" aligns bars to the wall clock, "session" to the
+                    session open.
+            use_cache: Set False to bypass the bar cache.
+            adjust: Set False for raw bars; see get_hourly_ohlcv.
+
+        Returns:
+            DataFrame with the same layout as get_hourly_ohlcv. Returns empty
+            DataFrame on no data or an invalid timeframe.
+        """
+        _EMPTY = pd.DataFrame(columns=_OHLCV_COLUMNS)
+        try:
+            with instrumentation.span("polygon_stage", method="get_resampled_ohlcv", stage="fetch"):
+                bars = self._bars(ticker, "minute", from_date, to_date, use_cache, adjust)
+            instrumentation.count("polygon_rows", len(bars), method="get_resampled_ohlcv")
+
+            if len(bars) == 0:
+                return _EMPTY
+
+            with instrumentation.span("polygon_stage", method="get_resampled_ohlcv", stage="resample"):
+                return resample_bars(bars_to_frame(bars), timeframe, session, anchor)
+        except Exception as e:
+            report_error("get_resampled_ohlcv", "Error resampling OHLCV data", e)
+            return _EMPTY
+
+    def _bars(
+        self, ticker: str, timespan: str, from_date: str, to_date: str, use_cache: bool = True, adjust: bool = True
+    ) -> np.ndarray:
+        # Bars through the bar cache when one is configured. With a corporate
+        # actions index, raw bars are fetched and cached, and adjusted here.
+        raw = self.corporate_actions is not None
+        fetch = lambda start, end: self._fetch_bars(ticker, timespan, start, end, adjusted=not raw)
+        if self.bar_cache is not None and use_cache:
+            key = _CACHE_KEYS[timespan] + (".raw" if raw else "")
+            bars = self.bar_cache.get_bars(ticker, key, from_date, to_date, fetch)
+        else:
+            bars = fetch(from_date, to_date)
+        if raw and adjust:
+            with instrumentation.span("polygon_stage", method="corporate_actions", stage="adjust"):
+                bars = self.corporate_actions.adjust(ticker, bars)
+        return bars
+
+    def _fetch_bars(self, ticker: str, timespan: str, from_date: str, to_date: str, adjusted: bool = True) -> np.ndarray:
+        # Aggregates as BAR_DTYPE records in timestamp order. adjusted=False
+        # asks Polygon for bars without its own split adjustment.
+        aggs = self.client.list_aggs(
+            ticker=ticker,
+            multiplier=1,
+            timespan=timespan,
+            from_=from_date,
+            to=to_date,
+            adjusted=adjusted,
+        )
+        return sort_bars(aggs_to_bars(aggs))
+
+    def iter_hourly_ohlcv_many(
+        self,
+        tickers: list,
+        from_date: str,
+        to_date: str,
+        max_workers: int = 8,
+        requests_per_second: float = 5.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        use_cache: bool = True,
+        adjust: bool = True,
+    ):
+        """Fetch hourly OHLCV bars for many tickers concurrently.
+
+        Runs a bounded thread pool over one shared connection pool. All
+        requests draw from a single token bucket, and 429/5xx responses are
+        retried with exponential backoff. Uses the bar cache if one is
+        configured. Requires a real RESTClient (its BASE and headers are
+        reused).
+
+        Args:
+            tickers: Ticker symbols to fetch.
+            from_date: Start date string "YYYY-MM-DD" (inclusive)
+            to_date: End date string "YYYY-MM-DD" (inclusive)
+            max_workers: Concurrent requests (and pooled connections).
+            requests_per_second: Rate limit shared by all workers.
+            max_retries: Retries per request on 429/5xx or connection errors.
+            backoff: Base retry delay in seconds, doubled on each attempt.
+                     A Retry-After header takes precedence.
+            use_cache: Set False to bypass the bar cache.
+            adjust: Set False for raw bars; see get_hourly_ohlcv.
+
+        Yields:
+            (ticker, DataFrame) pairs in completion order, as soon as each
+            ticker lands. The DataFrame has the same layout as
+            get_hourly_ohlcv; it is empty if the ticker had no data or failed.
+        """
+        fetchers = []
+        fetcher_lock = threading.Lock()
+
+        def fetcher():
+            # Built on the first cache miss, so cached runs never need a client
+            # (or urllib3, which bulk_fetch imports).
+            from external.bulk_fetch import AggsFetcher
+
+            with fetcher_lock:
+                if not fetchers:
+                    fetchers.append(AggsFetcher(
+                        self.client.BASE,
+                        self.client.headers,
+                        max_connections=max_workers,
+                        requests_per_second=requests_per_second,
+                        max_retries=max_retries,
+                        backoff=backoff,
+                        label="get_hourly_ohlcv_many",
+                    ))
+                return fetchers[0]
+
+        raw = self.corporate_actions is not None
+
+        def fetch_one(ticker):
+            fetch = lambda start, end: fetcher().fetch_bars(ticker, 1, "hour", start, end, adjusted=not raw)
+            if self.bar_cache is not None and use_cache:
+                bars = self.bar_cache.get_bars(ticker, "1hour" + (".raw" if raw else ""), from_date, to_date, fetch)
+            else:
+                bars = fetch(from_date, to_date)
+            if raw and adjust:
+                bars = self.corporate_actions.adjust(ticker, bars)
+            return bars_to_frame(bars) if len(bars) else pd.DataFrame(columns=_OHLCV_COLUMNS)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {executor.submit(fetch_one, ticker): ticker for ticker in tickers}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    report_error("get_hourly_ohlcv_many", f"Error getting hourly OHLCV data for {ticker}", e)
+                    df = pd.DataFrame(columns=_OHLCV_COLUMNS)
+                yield ticker, df
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @instrumented_method
+    def get_hourly_ohlcv_many(self, tickers: list, from_date: str, to_date: str, **kwargs) -> dict:
+        """Fetch hourly OHLCV bars for many tickers; returns {ticker: DataFrame}.
+
+        Accepts the same keyword arguments as iter_hourly_ohlcv_many.
+        """
+        return dict(self.iter_hourly_ohlcv_many(tickers, from_date, to_date, **kwargs))
+
+    @instrumented_method
     def get_corporate_actions(self, ticker="AAPL"):
         # Get corporate actions like dividends and splits
         try:
@@ -179,9 +497,79 @@ class PolygonTradingDataService:
                 'recent_dividends': [{'amount': d.cash_amount, 'date': d.pay_date} for d in dividends[:5]]
             }
         except Exception as e:
-            print(f"Error getting corporate actions: {e}")
+            report_error("get_corporate_actions", "Error getting corporate actions", e)
             return None
 
+    @instrumented_method
+    def refresh_corporate_actions(self, tickers: list = None, since: str = None, per_ticker_limit: int = 50) -> list:
+        """Fetch splits and cash dividends into the corporate_actions index.
+
+        Small universes are fetched ticker by ticker. Larger ones (or
+        tickers=None) use one market-wide listing per action type, filtered
+        to the universe, which is a handful of paginated requests instead of
+        two per ticker. Each ticker with new dividends costs one more request
+        for the daily closes the dividend factors are computed from.
+
+        Listeners of the index (e.g. FeatureCache.invalidate) are called for
+        every ticker whose actions changed.
+
+        Args:
+            tickers: Universe to refresh, or None for every ticker.
+            since: Earliest ex-date "YYYY-MM-DD" to fetch. Defaults to 30 days
+                   before each ticker's previous refresh, or all history for
+                   a ticker that was never refreshed (see
+                   CorporateActionsIndex.last_refresh). A market-wide listing
+                   starts from the earliest of these.
+            per_ticker_limit: Largest universe fetched ticker by ticker.
+
+        Returns:
+            Sorted tickers whose actions changed; empty on error or without
+            a corporate_actions index.
+        """
+        index = self.corporate_actions
+        if index is None:
+            return []
+        try:
+            def start(last):
+                if since is not None or last is None:
+                    return since
+                return (pd.Timestamp(last) - pd.Timedelta(days=30)).date().isoformat()
+
+            if tickers is not None and len(tickers) <= per_ticker_limit:
+                splits, dividends = [], []
+                for ticker in tickers:
+                    first = start(index.last_refresh(ticker))
+                    splits.extend(self.client.list_splits(ticker=ticker, execution_date_gte=first, limit=1000))
+                    dividends.extend(self.client.list_dividends(ticker=ticker, ex_dividend_date_gte=first, limit=1000))
+            else:
+                universe = None if tickers is None else set(tickers)
+                if tickers is None:
+                    last = index.last_refresh(None)
+                else:
+                    dates = [index.last_refresh(t) for t in universe]
+                    last = None if None in dates or not dates else min(dates)
+                since = start(last)
+                splits = [
+                    s for s in self.client.list_splits(execution_date_gte=since, limit=1000)
+                    if universe is None or s.ticker in universe
+                ]
+                dividends = [
+                    d for d in self.client.list_dividends(ex_dividend_date_gte=since, limit=1000)
+                    if universe is None or d.ticker in universe
+                ]
+            instrumentation.count("polygon_rows", len(splits) + len(dividends), method="refresh_corporate_actions")
+            return index.update(splits, dividends, self._reference_closes, tickers=tickers)
+        except Exception as e:
+            report_error("refresh_corporate_actions", "Error refreshing corporate actions", e)
+            return []
+
+    def _reference_closes(self, ticker: str, ex_ms: np.ndarray) -> np.ndarray:
+        # Unadjusted daily close of the last session before each ex-date.
+        first = pd.Timestamp(int(ex_ms.min()), unit="ms", tz="UTC") - pd.Timedelta(days=10)
+        last = pd.Timestamp(int(ex_ms.max()), unit="ms", tz="UTC")
+        daily = self._fetch_bars(ticker, "day", first.date().isoformat(), last.date().isoformat(), adjusted=False)
+        return reference_closes(daily, ex_ms)
+
 def main():
     # Test the comprehensive trading data service
     try:
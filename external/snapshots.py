@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# (column, payload section, key) for the numeric fields of one ticker in a
+# raw /v2/snapshot/locale/us/markets/stocks/tickers response. A section of
+# None means the key sits on the ticker object itself.
+_PRICE_FIELDS = [
+    ("last_trade_price", "lastTrade", "p"),
+    ("last_trade_size", "lastTrade", "s"),
+    ("bid_price", "lastQuote", "p"),
+    ("bid_size", "lastQuote", "s"),
+    ("ask_price", "lastQuote", "P"),
+    ("ask_size", "lastQuote", "S"),
+    ("day_open", "day", "o"),
+    ("day_high", "day", "h"),
+    ("day_low", "day", "l"),
+    ("day_close", "day", "c"),
+    ("day_volume", "day", "v"),
+    ("day_vwap", "day", "vw"),
+    ("minute_close", "min", "c"),
+    ("accumulated_volume", "min", "av"),
+    ("prev_open", "prevDay", "o"),
+    ("prev_high", "prevDay", "h"),
+    ("prev_low", "prevDay", "l"),
+    ("prev_close", "prevDay", "c"),
+    ("prev_volume", "prevDay", "v"),
+    ("prev_vwap", "prevDay", "vw"),
+    ("todays_change", None, "todaysChange"),
+    ("todays_change_percent", None, "todaysChangePerc"),
+]
+
+# Nanosecond timestamps are read as int64; float64 would round them.
+_TIMESTAMP_FIELDS = [
+    ("last_trade_timestamp", "lastTrade", "t"),
+    ("quote_timestamp", "lastQuote", "t"),
+    ("updated", None, "updated"),
+]
+
+_NAT = np.iinfo(np.int64).min
+_EMPTY = {}
+
+
+def _column(tickers: list, section, key, default, dtype) -> np.ndarray:
+    if section is None:
+        values = (t.get(key, default) for t in tickers)
+    else:
+        values = ((t.get(section) or _EMPTY).get(key, default) for t in tickers)
+    return np.fromiter(
+        (default if v is None else v for v in values), dtype=dtype, count=len(tickers)
+    )
+
+
+def snapshot_to_frame(tickers: list) -> pd.DataFrame:
+    """Convert the 'tickers' list of raw snapshot payloads into one columnar DataFrame.
+
+    Each field is read straight into a NumPy column, so no TickerSnapshot
+    object or per-ticker dict is built. Missing sections (e.g. no quote yet
+    today) become NaN / NaT. Quote metrics from add_quote_metrics are included.
+
+    Returns:
+        DataFrame with one row per ticker, in payload order: ticker, the
+        _PRICE_FIELDS columns, UTC timestamps for the last trade, last quote
+        and update time, and the quote metrics.
+    """
+    columns = {"ticker": [t.get("ticker") for t in tickers]}
+    for name, section, key in _PRICE_FIELDS:
+        columns[name] = _column(tickers, section, key, np.nan, np.float64)
+    for name, section, key in _TIMESTAMP_FIELDS:
+        columns[name] = pd.to_datetime(_column(tickers, section, key, _NAT, np.int64), unit="ns", utc=True)
+    return add_quote_metrics(pd.DataFrame(columns))
+
+
+def add_quote_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """Add NBBO spread and size-imbalance columns, computed for every row at once.
+
+    Matches get_bid_ask_spread and get_order_imbalance:
+        spread = ask_price - bid_price
+        spread_percentage = spread / bid_price * 100 (NaN if bid_price <= 0)
+        imbalance = bid_size - ask_size
+        imbalance_ratio = bid_size / ask_size (inf if ask_size == 0)
+        excess_demand = imbalance > 0
+    mid_price is also added: (bid_price + ask_price) / 2.
+    """
+    bid, ask = df["bid_price"].to_numpy(), df["ask_price"].to_numpy()
+    bid_size, ask_size = df["bid_size"].to_numpy(), df["ask_size"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = ask - bid
+        df["mid_price"] = (bid + ask) / 2
+        df["spread"] = spread
+        df["spread_percentage"] = np.where(bid > 0, spread / bid * 100, np.nan)
+        df["imbalance"] = bid_size - ask_size
+        df["imbalance_ratio"] = np.where(ask_size > 0, bid_size / ask_size, np.where(ask_size == 0, np.inf, np.nan))
+        df["excess_demand"] = bid_size - ask_size > 0
+    return df
@@ -0,0 +1,113 @@
+import json
+from operator import itemgetter
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional: a faster JSON parser for streamed frames
+    orjson = None
+
+# (column, key) per event type of Polygon's stocks WebSocket feed: AM is a
+# closed minute bar, T a trade, Q an NBBO quote. 'timestamp' and 'end' are
+# sent as epoch milliseconds and returned as int64 epoch nanoseconds;
+# everything else is read as float64.
+_FIELDS = {
+    "AM": [
+        ("timestamp", "s"), ("end", "e"), ("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"),
+        ("volume", "v"), ("vwap", "vw"), ("accumulated_volume", "av"),
+    ],
+    "T": [("timestamp", "t"), ("price", "p"), ("size", "s")],
+    "Q": [("timestamp", "t"), ("bid_price", "bp"), ("bid_size", "bs"), ("ask_price", "ap"), ("ask_size", "as")],
+}
+_TIMESTAMPS = ("timestamp", "end")
+
+EVENT_TYPES = tuple(_FIELDS)
+
+# One record per event, read in a single pass with itemgetter.
+_RECORD_DTYPES = {
+    event_type: np.dtype([(name, "<i8" if name in _TIMESTAMPS else "<f8") for name, _ in fields])
+    for event_type, fields in _FIELDS.items()
+}
+_GETTERS = {event_type: itemgetter(*(key for _, key in fields)) for event_type, fields in _FIELDS.items()}
+
+_EV = itemgetter("ev")
+_SYM = itemgetter("sym")
+_MS = 1_000_000
+
+
+def _column(events: list, key, default, dtype) -> np.ndarray:
+    values = (e.get(key, default) for e in events)
+    return np.fromiter((default if v is None else v for v in values), dtype=dtype, count=len(events))
+
+
+def _records(event_type: str, events: list) -> dict:
+    # Every field at once when all events carry them; else field by field,
+    # with missing or null values as NaN (0 for timestamps).
+    dtype = _RECORD_DTYPES[event_type]
+    try:
+        records = np.fromiter(map(_GETTERS[event_type], events), dtype=dtype, count=len(events))
+        columns = {name: records[name] for name in dtype.names}
+    except (KeyError, TypeError, ValueError):
+        columns = {
+            name: _column(events, key, 0 if name in _TIMESTAMPS else np.nan, dtype[name])
+            for name, key in _FIELDS[event_type]
+        }
+    for name in _TIMESTAMPS:
+        if name in columns:
+            columns[name] = columns[name] * _MS
+    return columns
+
+
+def parse_frames(frames) -> list:
+    """Every event in a batch of raw WebSocket frames, as dicts in arrival order.
+
+    Each frame is a JSON array of events (a lone object is accepted too).
+    orjson is used when it is installed.
+    """
+    loads = json.loads if orjson is None else orjson.loads
+    events = []
+    for frame in frames:
+        parsed = loads(frame)
+        if isinstance(parsed, list):
+            events.extend(parsed)
+        else:
+            events.append(parsed)
+    return events
+
+
+def events_to_columns(events: list) -> dict:
+    """Split events by type and read each field straight into a NumPy column.
+
+    No per-event object is built beyond the parsed dicts, which can be
+    dropped as soon as this returns.
+
+    Returns:
+        {"AM" | "T" | "Q": {"ticker": object array, "timestamp": int64 epoch
+        ns, ...}, "status": [status event dicts]}. Every event type is
+        present, with empty columns if the batch had none. AM bars also carry
+        'end' (epoch ns); missing numeric fields read as NaN. Other event
+        types are ignored.
+    """
+    try:
+        types = np.array(list(map(_EV, events)))
+    except KeyError:
+        types = np.array([e.get("ev", "") for e in events])
+    by_type = {event_type: [] for event_type in EVENT_TYPES}
+    if len(events):
+        for event_type in EVENT_TYPES:
+            by_type[event_type] = [events[i] for i in np.flatnonzero(types == event_type).tolist()]
+    status = [events[i] for i in np.flatnonzero(types == "status").tolist()] if len(events) else []
+
+    batch = {"status": status}
+    for event_type, typed in by_type.items():
+        batch[event_type] = {
+            "ticker": np.array(list(map(_SYM, typed)), dtype=object),
+            **_records(event_type, typed),
+        }
+    return batch
+
+
+def decode_frames(frames) -> dict:
+    """parse_frames then events_to_columns: one columnar batch from raw frames."""
+    return events_to_columns(parse_frames(frames))
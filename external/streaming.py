@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from websockets.sync.client import connect
+
+from external.http_metrics import report_error
+from external.snapshots import add_quote_metrics
+from external.stream_messages import decode_frames, events_to_columns, parse_frames
+from services import instrumentation
+
+STOCKS_URL = "wss://socket.polygon.io/stocks"
+DELAYED_STOCKS_URL = "wss://delayed.polygon.io/stocks"
+
+# AM: minute bars, T: trades, Q: NBBO quotes.
+CHANNELS = ("AM", "T", "Q")
+
+
+class StreamAuthError(Exception):
+    """Raised when the WebSocket feed rejects the API key; not retried."""
+
+
+class PolygonStream:
+    """Consumes Polygon's stocks WebSocket feed and feeds a LivePipeline.
+
+    One connection carries every subscribed channel and ticker. Two
+    background threads split the work:
+
+    - The reader only receives frames and appends them to a bounded queue,
+      so the socket is always drained and the server never sees a slow
+      client.
+    - The worker takes everything queued (up to max_batch_frames), decodes
+      it as one columnar batch (external.stream_messages) and passes it to
+      pipeline.process. When the worker falls behind, batches grow and the
+      fixed cost per batch is shared by more messages.
+
+    If the queue still fills up, the oldest frames are dropped and counted
+    (stats()["dropped_frames"] and the stream_dropped_frames counter) rather
+    than blocking the socket. A frame that cannot be decoded is dropped on
+    its own (stats()["bad_frames"], stream_bad_frames) and the rest of its
+    batch is still processed. Lost connections are reopened with
+    exponential backoff and the subscription is sent again.
+
+    Args:
+        tickers: Ticker symbols, or ["*"] for every stock.
+        pipeline: Object with process(batch), e.g. services.live_pipeline.LivePipeline.
+        channels: Any of "AM", "T" and "Q".
+        api_key: Polygon API key; defaults to POLYGON_API_KEY.
+        url: Feed URL, e.g. DELAYED_STOCKS_URL or a local test server.
+        max_pending_frames: Frames queued before the oldest are dropped.
+        max_batch_frames: Most frames decoded and processed as one batch.
+        reconnect: Reopen the connection when it drops.
+        backoff: First reconnect delay in seconds, doubled per failed attempt
+                 up to max_backoff.
+        max_backoff: Longest reconnect delay in seconds.
+        subscribe_chunk: Tickers per subscribe message.
+        on_batch: Optional callable(batch, updated) after each processed
+                  batch, where updated is pipeline.process's return value.
+    """
+
+    def __init__(
+        self,
+        tickers: list,
+        pipeline,
+        channels=CHANNELS,
+        api_key: str = None,
+        url: str = STOCKS_URL,
+        max_pending_frames: int = 100_000,
+        max_batch_frames: int = 5_000,
+        reconnect: bool = True,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        subscribe_chunk: int = 1_000,
+        on_batch=None,
+    ):
+        unknown = sorted(set(channels) - set(CHANNELS))
+        if unknown:
+            raise ValueError(f"Unknown channels {unknown}; expected some of {list(CHANNELS)}.")
+        if not api_key:
+            # Deferred like external.clients.polygon_client: .env is read only when needed.
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            api_key = os.getenv("POLYGON_API_KEY")
+        if not api_key:
+            raise ValueError("POLYGON_API_KEY not found in .env file")
+        self.tickers = list(tickers)
+        self.pipeline = pipeline
+        self.channels = list(channels)
+        self.api_key = api_key
+        self.url = url
+        self.max_pending_frames = max_pending_frames
+        self.max_batch_frames = max_batch_frames
+        self.reconnect = reconnect
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.subscribe_chunk = subscribe_chunk
+        self.on_batch = on_batch
+
+        self.connected = threading.Event()
+        self.error = None
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._ws = None
+        self._reader = None
+        self._worker = None
+        self._counts = {
+            "frames": 0, "dropped_frames": 0, "bad_frames": 0, "processed_frames": 0, "batches": 0,
+            "largest_batch": 0, "connections": 0, "reconnects": 0,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self) -> "PolygonStream":
+        """Connect and start consuming in the background; returns self."""
+        self._stop.clear()
+        self._reader = threading.Thread(target=self._read, name="polygon-stream-reader", daemon=True)
+        self._worker = threading.Thread(target=self._work, name="polygon-stream-worker", daemon=True)
+        self._worker.start()
+        self._reader.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Close the connection, process the frames already queued, and stop both threads."""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._reader is not None:
+            self._reader.join(timeout)
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every frame received so far has been processed (or dropped).
+
+        Returns:
+            True if the queue drained within timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            counts = self._counts
+            if counts["processed_frames"] + counts["dropped_frames"] >= counts["frames"]:
+                return True
+            time.sleep(0.002)
+        return False
+
+    def stats(self) -> dict:
+        """Frames received, dropped, undecodable and processed, batches, connections, and the queue length."""
+        return {**self._counts, "pending_frames": len(self._pending)}
+
+    def quotes(self):
+        """Latest quote per ticker with spread and imbalance columns (see add_quote_metrics)."""
+        return add_quote_metrics(self.pipeline.quote_frame())
+
+    def subscribe_messages(self) -> list:
+        """The subscribe actions sent after authenticating, subscribe_chunk tickers each."""
+        messages = []
+        for i in range(0, len(self.tickers), self.subscribe_chunk):
+            chunk = self.tickers[i:i + self.subscribe_chunk]
+            params = ",".join(f"{channel}.{ticker}" for ticker in chunk for channel in self.channels)
+            messages.append(json.dumps({"action": "subscribe", "params": params}))
+        return messages
+
+    def _read(self):
+        delay = self.backoff
+        while not self._stop.is_set():
+            try:
+                with connect(self.url, max_size=None, open_timeout=10) as ws:
+                    self._ws = ws
+                    self._handshake(ws)
+                    self._counts["connections"] += 1
+                    self.connected.set()
+                    delay = self.backoff
+                    for frame in ws:
+                        self._push(frame)
+            except StreamAuthError as e:
+                self.error = e
+                report_error("PolygonStream", "Stream authentication failed", e)
+                return
+            except (ConnectionClosed, InvalidHandshake, OSError, TimeoutError) as e:
+                if self._stop.is_set():
+                    return
+                report_error("PolygonStream", "Stream disconnected", e)
+            finally:
+                self._ws = None
+                self.connected.clear()
+            if not self.reconnect or self._stop.is_set():
+                return
+            self._counts["reconnects"] += 1
+            instrumentation.count("stream_reconnects")
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def _handshake(self, ws):
+        # connected -> auth -> auth_success -> subscribe, per Polygon's protocol.
+        ws.send(json.dumps({"action": "auth", "params": self.api_key}))
+        while True:
+            for event in parse_frames([ws.recv(timeout=10)]):
+                status = event.get("status")
+                if status == "auth_success":
+                    for message in self.subscribe_messages():
+                        ws.send(message)
+                    return
+                if status in ("auth_failed", "auth_timeout"):
+                    raise StreamAuthError(event.get("message", status))
+
+    def _push(self, frame):
+        # Never blocks: a full queue loses its oldest frame.
+        self._counts["frames"] += 1
+        if len(self._pending) >= self.max_pending_frames:
+            try:
+                self._pending.popleft()
+                self._counts["dropped_frames"] += 1
+                instrumentation.count("stream_dropped_frames")
+            except IndexError:
+                pass
+        self._pending.append(frame)
+        self._wake.set()
+
+    def _work(self):
+        while True:
+            self._wake.wait(0.1)
+            self._wake.clear()
+            frames = []
+            pending = self._pending
+            while pending and len(frames) < self.max_batch_frames:
+                frames.append(pending.popleft())
+            if frames:
+                self._handle(frames)
+                if pending:
+                    self._wake.set()
+            elif self._stop.is_set() and not (self._reader and self._reader.is_alive()):
+                return
+
+    def _handle(self, frames: list):
+        try:
+            with instrumentation.span("stream_batch", stage="decode"):
+                batch = self._decode(frames)
+            for event in batch["status"]:
+                if event.get("status") in ("error", "max_connections", "auth_failed"):
+                    report_error("PolygonStream", "Stream status", RuntimeError(event.get("message")))
+            with instrumentation.span("stream_batch", stage="process"):
+                updated = self.pipeline.process(batch)
+            if self.on_batch is not None:
+                self.on_batch(batch, updated)
+        except Exception as e:
+            report_error("PolygonStream", "Error processing stream batch", e)
+        finally:
+            self._counts["processed_frames"] += len(frames)
+            self._counts["batches"] += 1
+            self._counts["largest_batch"] = max(self._counts["largest_batch"], len(frames))
+            instrumentation.count("stream_frames", len(frames))
+
+    def _decode(self, frames: list) -> dict:
+        try:
+            return decode_frames(frames)
+        except Exception:
+            pass
+        # Something in the batch is malformed: decode frame by frame and drop only the bad ones.
+        events, bad = [], 0
+        for frame in frames:
+            try:
+                parsed = parse_frames([frame])
+                events_to_columns(parsed)
+            except Exception as e:
+                bad += 1
+                error = e
+            else:
+                events.extend(parsed)
+        if bad:
+            self._counts["bad_frames"] += bad
+            instrumentation.count("stream_bad_frames", bad)
+            report_error("PolygonStream", f"Dropped {bad} undecodable stream frame(s)", error)
+        return events_to_columns(events)
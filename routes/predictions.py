@@ -0,0 +1,70 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from services.prediction import MicroBatcher, PredictionService
+
+try:
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+except ImportError:  # fastapi is only needed to serve over HTTP
+    FastAPI = None
+
+
+def create_app(service: PredictionService, max_batch_size: int = 256, max_wait_ms: float = 2.0):
+    """FastAPI app serving predictions from a warm PredictionService.
+
+    Routes:
+        GET  /predict/{ticker}?model=name  one ticker, answered through a MicroBatcher
+        POST /predict                      {"tickers": [...], "model": name}, one batch call
+        GET  /metrics                      latency and batch-size histograms
+
+    Build the service (load models, load features) before creating the app,
+    so the first request is already warm:
+
+        service = PredictionService.from_dir("models/")
+        service.load_features(matrices)
+        uvicorn.run(create_app(service), port=8000)
+
+    Raises:
+        ImportError: If fastapi is not installed.
+    """
+    if FastAPI is None:
+        raise ImportError("fastapi is required to serve predictions over HTTP: pip install fastapi uvicorn")
+
+    class BatchRequest(BaseModel):
+        tickers: list
+        model: Optional[str] = None
+
+    batcher = MicroBatcher(service, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Answer whatever is still queued, then stop the batcher's worker on shutdown.
+        yield
+        batcher.close()
+
+    app = FastAPI(title="Intraday Equity Screener predictions", lifespan=lifespan)
+    app.state.service = service
+    app.state.batcher = batcher
+
+    @app.get("/predict/{ticker}")
+    async def predict_one(ticker: str, model: Optional[str] = None):
+        try:
+            return await batcher.predict(ticker, model)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+    @app.post("/predict")
+    def predict_many(request: BatchRequest):
+        try:
+            result = service.predict(request.tickers, request.model)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e.args[0]))
+        # JSON has no NaN: a missing probability is sent as null.
+        return result.astype(object).where(result.notna(), None).to_dict("records")
+
+    @app.get("/metrics")
+    def metrics():
+        return batcher.stats()
+
+    return app
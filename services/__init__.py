@@ -0,0 +1,51 @@
+"""Feature engineering, screening, backtesting and serving.
+
+The main entry points can be imported from the package itself, e.g.
+`from services import build_feature_matrix, Screener`. Nothing is imported
+until a name is first used, so `import services` costs nothing, and a
+process only loads the modules it actually needs.
+"""
+import importlib
+
+# Public name -> module that defines it.
+_EXPORTS = {
+    "build_feature_matrix": "services.feature_engineering",
+    "build_panel_feature_matrix": "services.feature_engineering",
+    "build_compact_feature_matrix": "services.feature_engineering",
+    "build_multi_timeframe_feature_matrix": "services.feature_engineering",
+    "feature_columns": "services.feature_engineering",
+    "build_feature_sweep": "services.feature_sweep",
+    "parameter_grid": "services.feature_sweep",
+    "FeatureCache": "services.feature_cache",
+    "FeatureStore": "services.feature_store",
+    "build_feature_matrices_parallel": "services.parallel_features",
+    "StreamingFeatureEngine": "services.streaming_indicators",
+    "TradeAggregator": "services.tick_aggregation",
+    "Screener": "services.screener",
+    "run_walk_forward": "services.backtest",
+    "walk_forward_splits": "services.backtest",
+    "PredictionService": "services.prediction",
+    "MicroBatcher": "services.prediction",
+    "resample_many": "services.resampling",
+    "resample_bars": "services.resampling",
+    "Resampler": "services.resampling",
+    "session_clock": "services.market_calendar",
+    "trading_days": "services.market_calendar",
+    "LivePipeline": "services.live_pipeline",
+    "TickerRingBuffer": "services.ring_buffers",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,295 @@
+import copy
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+_NON_FEATURE_COLUMNS = {"timestamp", "ticker", "direction"}
+
+
+def stack_feature_matrices(matrices: dict, feature_columns: list = None) -> dict:
+    """Lay out per-ticker feature matrices as (time × ticker) arrays for backtesting.
+
+    If every matrix has a 'timestamp' column (build_feature_matrix with
+    compact=True), rows are aligned on the union of timestamps. Otherwise
+    they are aligned by position, with shorter tickers padded with NaN at
+    the end, as in panel mode.
+
+    Args:
+        matrices: {ticker: DataFrame} of build_feature_matrix outputs.
+        feature_columns: Columns to stack as model inputs. Defaults to every
+                         column except timestamp and direction.
+
+    Returns:
+        Dict with:
+            tickers: list of tickers (the N axis).
+            timestamp: (T,) int64 epoch ms, or None for positional alignment.
+            features: (T, N, F) float32, NaN where a ticker has no row.
+            feature_columns: the F feature names.
+            direction: (T, N) float64 label, NaN where missing.
+            returns: (T, N) float64 next-bar simple return, close[k+1] / close[k] - 1
+                     over each ticker's own consecutive rows. NaN on its last row.
+
+    Raises:
+        ValueError: If matrices is empty.
+    """
+    if not matrices:
+        raise ValueError("No feature matrices provided.")
+    tickers = list(matrices)
+    frames = [matrices[t] for t in tickers]
+    if feature_columns is None:
+        feature_columns = [c for c in frames[0].columns if c not in _NON_FEATURE_COLUMNS]
+
+    if all("timestamp" in df.columns for df in frames):
+        timestamp = np.unique(np.concatenate([df["timestamp"].to_numpy(np.int64) for df in frames]))
+        positions = [np.searchsorted(timestamp, df["timestamp"].to_numpy(np.int64)) for df in frames]
+        n_bars = len(timestamp)
+    else:
+        timestamp = None
+        positions = [np.arange(len(df)) for df in frames]
+        n_bars = max(len(df) for df in frames)
+
+    shape = (n_bars, len(tickers))
+    features = np.full(shape + (len(feature_columns),), np.nan, dtype=np.float32)
+    direction = np.full(shape, np.nan)
+    returns = np.full(shape, np.nan)
+    for j, (df, rows) in enumerate(zip(frames, positions)):
+        features[rows, j] = df[feature_columns].to_numpy(np.float32)
+        direction[rows, j] = df["direction"].to_numpy(np.float64)
+        close = df["close"].to_numpy(np.float64)
+        returns[rows[:-1], j] = close[1:] / close[:-1] - 1
+
+    return {
+        "tickers": tickers,
+        "timestamp": timestamp,
+        "features": features,
+        "feature_columns": list(feature_columns),
+        "direction": direction,
+        "returns": returns,
+    }
+
+
+def walk_forward_splits(n_bars: int, train_bars: int, test_bars: int, step: int = None, expanding: bool = False) -> list:
+    """Consecutive (train, test) index slices along the time axis.
+
+    Each test window starts right after its training window. Windows advance
+    by step bars (default test_bars, so test windows tile without overlap).
+    With expanding=True every training window starts at bar 0.
+    """
+    if train_bars <= 0 or test_bars <= 0:
+        raise ValueError("train_bars and test_bars must be positive.")
+    step = step or test_bars
+    splits = []
+    start = 0
+    while start + train_bars < n_bars:
+        train_end = start + train_bars
+        test_end = min(train_end + test_bars, n_bars)
+        splits.append((slice(0 if expanding else start, train_end), slice(train_end, test_end)))
+        start += step
+    return splits
+
+
+def positions_from_predictions(predictions: np.ndarray, long_only: bool = False) -> np.ndarray:
+    """Turn predicted direction labels (1 = up, 0 = down) into positions.
+
+    Up is +1, down is -1 (0 with long_only). Missing predictions (NaN) are flat.
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)
+    down = 0.0 if long_only else -1.0
+    return np.where(np.isnan(predictions), 0.0, np.where(predictions >= 0.5, 1.0, down))
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+def _max_drawdown(equity: np.ndarray) -> np.ndarray:
+    # Largest fall from a running peak, per column. The curve starts at 0.
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=0)
+    return (peak - equity).max(axis=0, initial=0.0)
+
+
+def _fold_metrics(positions: np.ndarray, returns: np.ndarray, cost: float) -> dict:
+    """Per-ticker and equal-weight portfolio metrics for one test window.
+
+    positions and returns are (L, N). A position held at bar t earns the
+    return from t to t + 1. Position changes, including entering at the
+    start of the window, pay cost per unit traded. The hit rate is the share
+    of bars with a position whose gross return was positive.
+    """
+    traded = np.isfinite(returns)
+    positions = np.where(traded, np.nan_to_num(positions), 0.0)
+    returns = np.where(traded, returns, 0.0)
+
+    change = np.abs(np.diff(positions, axis=0, prepend=0.0))
+    gross = positions * returns
+    pnl = gross - cost * change
+    active = positions != 0
+    hits = gross > 0
+
+    portfolio = pnl.mean(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = hits.sum(axis=0) / active.sum(axis=0)
+        portfolio_hit_rate = hits.sum() / active.sum()
+    return {
+        "bars": traded.sum(axis=0),
+        "pnl": pnl.sum(axis=0),
+        "hit_rate": hit_rate,
+        "turnover": change.sum(axis=0) / len(positions),
+        "max_drawdown": _max_drawdown(np.cumsum(pnl, axis=0)),
+        "portfolio": {
+            "pnl": portfolio.sum(),
+            "hit_rate": portfolio_hit_rate,
+            "turnover": change.sum() / change.size,
+            "max_drawdown": float(_max_drawdown(np.cumsum(portfolio))),
+        },
+    }
+
+
+# ── Walk-forward runner ───────────────────────────────────────────────────────
+
+def _fit_predict(model, features, direction, train: slice, test: slice, long_only: bool) -> np.ndarray:
+    # Training rows stop one bar early: the label on the last bar before the
+    # test window is decided by the first test bar's close.
+    train = slice(train.start, train.stop - 1)
+    n_features = features.shape[2]
+    x_train = np.asarray(features[train]).reshape(-1, n_features)
+    y_train = np.asarray(direction[train]).reshape(-1)
+    fit_rows = np.isfinite(x_train).all(axis=1) & np.isfinite(y_train)
+    model.fit(x_train[fit_rows], y_train[fit_rows].astype(int))
+
+    x_test = np.asarray(features[test])
+    shape = x_test.shape[:2]
+    x_test = x_test.reshape(-1, n_features)
+    predictions = np.full(len(x_test), np.nan)
+    rows = np.isfinite(x_test).all(axis=1)
+    if rows.any():
+        predictions[rows] = model.predict(x_test[rows])
+    return positions_from_predictions(predictions.reshape(shape), long_only)
+
+
+def _run_fold(arrays: dict, train: slice, test: slice, model, cost: float, long_only: bool) -> dict:
+    if model is not None:
+        positions = _fit_predict(model, arrays["features"], arrays["direction"], train, test, long_only)
+    else:
+        positions = np.asarray(arrays["signals"][test], dtype=np.float64)
+    return _fold_metrics(positions, np.asarray(arrays["returns"][test]), cost)
+
+
+def _run_fold_mapped(paths: dict, train: slice, test: slice, model, cost: float, long_only: bool) -> dict:
+    # Worker entry point: inputs arrive as .npy paths and are opened read-only,
+    # so every worker shares the same pages instead of receiving a pickled copy.
+    arrays = {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+    return _run_fold(arrays, train, test, model, cost, long_only)
+
+
+def run_walk_forward(
+    panel: dict,
+    signals: np.ndarray = None,
+    model=None,
+    train_bars: int = 2_000,
+    test_bars: int = 500,
+    step: int = None,
+    expanding: bool = False,
+    cost_bps: float = 0.0,
+    long_only: bool = False,
+    max_workers: int = None,
+) -> dict:
+    """Walk-forward backtest of a signal array or a model across every ticker.
+
+    Args:
+        panel: Output of stack_feature_matrices (or any dict with 'returns'
+               and, for model mode, 'features' and 'direction').
+        signals: (T, N) positions, e.g. +1 long, -1 short, 0 flat, aligned
+                 with panel. Scored on every test window.
+        model: Alternative to signals. An unfitted estimator with
+               fit(X, y) / predict(X), such as a scikit-learn classifier.
+               Each fold fits a fresh copy on its training window, pooled
+               across tickers, and trades its predicted direction on the
+               test window. Must be picklable when max_workers > 1.
+        train_bars: Training window length in bars.
+        test_bars: Test window length in bars.
+        step: Bars between consecutive folds. Defaults to test_bars.
+        expanding: If True, training windows all start at the first bar.
+        cost_bps: Cost per unit of position traded, in basis points.
+        long_only: In model mode, go flat instead of short on a down prediction.
+        max_workers: Processes for running folds in parallel. Inputs are
+                     shared with the workers as memory-mapped .npy files.
+                     None uses every CPU; 1 runs in this process.
+
+    Returns:
+        Dict with:
+            tickers: DataFrame, one row per (fold, ticker): fold, ticker,
+                     test_start, test_end, bars, pnl, hit_rate, turnover,
+                     max_drawdown.
+            folds: DataFrame, one row per fold: train_start, train_end,
+                   test_start, test_end, and the equal-weight portfolio's
+                   pnl, hit_rate, turnover and max_drawdown.
+        P&L is the sum of simple next-bar returns times position, net of costs.
+
+    Raises:
+        ValueError: If neither or both of signals and model are given, the
+                    signals shape does not match, or no fold fits in the data.
+    """
+    if (signals is None) == (model is None):
+        raise ValueError("Pass exactly one of signals or model.")
+    returns = panel["returns"]
+    if signals is not None and np.shape(signals) != returns.shape:
+        raise ValueError(f"signals shape {np.shape(signals)} does not match returns shape {returns.shape}.")
+
+    splits = walk_forward_splits(len(returns), train_bars, test_bars, step, expanding)
+    if not splits:
+        raise ValueError(f"Not enough bars ({len(returns)}) for a {train_bars}-bar training window.")
+
+    arrays = {"returns": returns}
+    if model is None:
+        arrays["signals"] = signals
+    else:
+        arrays["features"] = panel["features"]
+        arrays["direction"] = panel["direction"]
+    cost = cost_bps / 10_000
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers <= 1 or len(splits) == 1:
+        results = [
+            _run_fold(arrays, train, test, copy.deepcopy(model), cost, long_only)
+            for train, test in splits
+        ]
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = {}
+            for name, values in arrays.items():
+                paths[name] = os.path.join(workdir, f"{name}.npy")
+                np.save(paths[name], np.asarray(values))
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(splits))) as pool:
+                futures = [
+                    pool.submit(_run_fold_mapped, paths, train, test, model, cost, long_only)
+                    for train, test in splits
+                ]
+                results = [future.result() for future in futures]
+
+    tickers = panel.get("tickers") or list(range(returns.shape[1]))
+    ticker_frames = []
+    fold_rows = []
+    for fold, ((train, test), metrics) in enumerate(zip(splits, results)):
+        portfolio = metrics.pop("portfolio")
+        ticker_frames.append(pd.DataFrame({
+            "fold": fold,
+            "ticker": tickers,
+            "test_start": test.start,
+            "test_end": test.stop,
+            **metrics,
+        }))
+        fold_rows.append({
+            "fold": fold,
+            "train_start": train.start,
+            "train_end": train.stop,
+            "test_start": test.start,
+            "test_end": test.stop,
+            **portfolio,
+        })
+    return {
+        "tickers": pd.concat(ticker_frames, ignore_index=True),
+        "folds": pd.DataFrame(fold_rows),
+    }
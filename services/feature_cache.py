@@ -0,0 +1,305 @@
+import copy
+import hashlib
+import inspect
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from services.feature_engineering import build_feature_matrix
+from services.streaming_indicators import StreamingFeatureEngine
+
+_BUILD_SIGNATURE = inspect.signature(build_feature_matrix)
+_STREAM_PARAMS = set(inspect.signature(StreamingFeatureEngine).parameters)
+_BAR_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def fingerprint(ohlcv: pd.DataFrame, ticker: str = None) -> str:
+    """Cheap content hash of a bar DataFrame.
+
+    Covers the ticker, the first and last timestamp, the row count, and the
+    raw bytes of the close and volume columns. Edits that touch only open,
+    high or low are not detected.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(ticker).encode())
+    h.update(np.int64(len(ohlcv)).tobytes())
+    if len(ohlcv):
+        timestamp = ohlcv["timestamp"]
+        h.update(np.int64(pd.Timestamp(timestamp.iloc[0]).value).tobytes())
+        h.update(np.int64(pd.Timestamp(timestamp.iloc[-1]).value).tobytes())
+        for column in ("close", "volume"):
+            h.update(np.ascontiguousarray(ohlcv[column].to_numpy(dtype=np.float64)).data)
+    return h.hexdigest()
+
+
+def _resolve_params(ohlcv: pd.DataFrame, params: dict) -> tuple:
+    # Every build_feature_matrix keyword, defaults filled in, as a hashable key.
+    # Binding raises TypeError for unknown keywords, just like the call would.
+    bound = _BUILD_SIGNATURE.bind(ohlcv, **params)
+    bound.apply_defaults()
+    resolved = dict(bound.arguments)
+    del resolved["ohlcv"]
+    if resolved["lag_periods"] is None:
+        resolved["lag_periods"] = [1, 2, 3, 4, 5]
+    resolved["lag_periods"] = tuple(resolved["lag_periods"])
+    if resolved["timeframes"] is not None:
+        # In order: the first timeframe is the base one.
+        resolved["timeframes"] = tuple(
+            (timeframe, None if columns is None else tuple(columns))
+            for timeframe, columns in resolved["timeframes"].items()
+        )
+    return tuple(sorted(resolved.items()))
+
+
+def _build_params(resolved: tuple) -> dict:
+    # build_feature_matrix keywords back from a _resolve_params key.
+    params = dict(resolved)
+    if params["timeframes"] is not None:
+        params["timeframes"] = {
+            timeframe: None if columns is None else list(columns)
+            for timeframe, columns in params["timeframes"]
+        }
+    return params
+
+
+def _with_timestamp(row: dict, timestamp) -> dict:
+    # A streamed feature row plus its bar time in epoch ms, the 'timestamp'
+    # column of the compact layout.
+    if row is not None:
+        row["timestamp"] = pd.Timestamp(timestamp).value // 1_000_000
+    return row
+
+
+class _Entry:
+    __slots__ = ("features", "n_bars", "fingerprint", "series", "nbytes", "engine", "pending")
+
+    def __init__(self, features, n_bars, fingerprint, series, engine=None, pending=None):
+        self.features = features
+        self.n_bars = n_bars
+        self.fingerprint = fingerprint
+        self.series = series
+        self.nbytes = len(features) * sum(dtype.itemsize for dtype in features.dtypes)
+        # Streaming state after the last input bar, and that bar's feature row,
+        # which has no direction label yet. Built on first extension.
+        self.engine = engine
+        self.pending = pending
+
+
+class FeatureCache:
+    """Memoizes build_feature_matrix results by input content and parameters.
+
+    Entries are keyed by fingerprint() of the bars plus every
+    build_feature_matrix keyword, with defaults filled in. A memory tier holds
+    the most recently used matrices within a byte budget. An optional disk
+    tier keeps a copy of each matrix that survives eviction and restarts.
+
+    When bars are appended to an input that is already cached (same ticker and
+    parameters, and the cached bars are an unchanged prefix of the new ones),
+    only the new bars are computed. Each extension feeds them through a
+    StreamingFeatureEngine resumed at the end of the cached input. The extended
+    rows match a full rebuild to floating-point rounding. Multi-timeframe
+    matrices (timeframes=...) are always rebuilt in full.
+
+    Args:
+        max_bytes: Memory budget for cached matrices. Least recently used
+                   entries are evicted once it is exceeded.
+        disk_dir: Directory for the disk tier. None keeps the cache in memory only.
+        max_extend_bars: Appends longer than this are rebuilt in full, which is
+                         faster than streaming that many bars one at a time.
+
+    Counters (hits, disk_hits, extensions, misses, evictions) are plain
+    attributes and are also returned by stats().
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2, disk_dir: str = None, max_extend_bars: int = 500):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_extend_bars = max_extend_bars
+        self._entries = OrderedDict()
+        self._latest = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.extensions = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, ohlcv: pd.DataFrame, ticker: str = None, **params) -> pd.DataFrame:
+        """Return build_feature_matrix(ohlcv, **params), from the cache when possible.
+
+        Args:
+            ohlcv: DataFrame with columns [timestamp, open, high, low, close, volume].
+            ticker: Optional ticker symbol. It is part of the key, and bars for
+                    the same ticker can be extended incrementally.
+            **params: Any build_feature_matrix keyword arguments.
+
+        Returns:
+            A copy of the cached feature matrix, safe to modify.
+
+        Raises:
+            ValueError: As build_feature_matrix, for empty or too-short input.
+            TypeError: If params contains an unknown keyword.
+        """
+        resolved = _resolve_params(ohlcv, params)
+        series = (ticker, resolved)
+        digest = fingerprint(ohlcv, ticker)
+        key = hashlib.blake2b(f"{digest}{resolved!r}".encode(), digest_size=16).hexdigest()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.features.copy()
+            previous = self._entries.get(self._latest.get(series))
+
+        entry = self._load(key, ticker, len(ohlcv), digest, series)
+        if entry is not None:
+            counter = "disk_hits"
+        elif previous is not None and self._extends(previous, ohlcv, ticker):
+            entry = self._extend(previous, ohlcv, digest, _build_params(resolved))
+            counter = "extensions"
+        else:
+            features = build_feature_matrix(ohlcv, **_build_params(resolved))
+            entry = _Entry(features, len(ohlcv), digest, series)
+            counter = "misses"
+
+        if counter != "disk_hits":
+            self._save(key, ticker, entry)
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self._insert(key, entry)
+        return entry.features.copy()
+
+    def invalidate(self, ticker: str = None):
+        """Drop cached matrices for one ticker, or every matrix, from both tiers."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if ticker is None or e.series[0] == ticker]:
+                self._bytes -= self._entries.pop(key).nbytes
+            self._latest = {s: k for s, k in self._latest.items() if k in self._entries}
+        if self.disk_dir is None:
+            return
+        for name in os.listdir(self.disk_dir):
+            if ticker is None or name.startswith(self._disk_prefix(ticker)):
+                os.remove(os.path.join(self.disk_dir, name))
+
+    def clear(self):
+        self.invalidate()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "extensions": self.extensions,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    # ── incremental extension ─────────────────────────────────────────────────
+
+    def _extends(self, previous: _Entry, ohlcv: pd.DataFrame, ticker: str) -> bool:
+        # Multi-timeframe matrices have no streaming counterpart; they are rebuilt.
+        appended = len(ohlcv) - previous.n_bars
+        return (
+            dict(previous.series[1])["timeframes"] is None
+            and 0 < appended <= self.max_extend_bars
+            and fingerprint(ohlcv.iloc[:previous.n_bars], ticker) == previous.fingerprint
+        )
+
+    def _extend(self, previous: _Entry, ohlcv: pd.DataFrame, digest: str, params: dict) -> _Entry:
+        n = previous.n_bars
+        if previous.engine is None:
+            engine = StreamingFeatureEngine(**{k: v for k, v in params.items() if k in _STREAM_PARAMS})
+            engine.prime(ohlcv.iloc[:n - 1])
+            last = ohlcv.iloc[n - 1][_BAR_COLUMNS]
+            pending = _with_timestamp(engine.update(*last), last["timestamp"])
+        else:
+            # Each entry owns its engine, so an older entry can still be
+            # extended along a different set of appended bars.
+            engine = copy.deepcopy(previous.engine)
+            pending = dict(previous.pending) if previous.pending is not None else None
+
+        new = ohlcv.iloc[n:]
+        prev_close = ohlcv["close"].iloc[n - 1]
+        rows = []
+        for bar in new[_BAR_COLUMNS].itertuples(index=False):
+            if pending is not None:
+                pending["direction"] = 1 if bar.close > prev_close else 0
+                rows.append(pending)
+            pending = _with_timestamp(engine.update(*bar), bar.timestamp)
+            prev_close = bar.close
+
+        features = previous.features
+        if rows:
+            # Cast to the cached layout, so compact=True matrices keep their
+            # epoch-ms timestamp, float32 features and int8 direction.
+            appended = pd.DataFrame({
+                column: np.array([row[column] for row in rows], dtype=dtype)
+                for column, dtype in features.dtypes.items()
+            })
+            features = pd.concat([features, appended], ignore_index=True)
+        return _Entry(features, len(ohlcv), digest, previous.series, engine, pending)
+
+    # ── memory tier ───────────────────────────────────────────────────────────
+
+    def _insert(self, key: str, entry: _Entry):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        self._latest[entry.series] = key
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+            if self._latest.get(old.series) == old_key:
+                del self._latest[old.series]
+
+    # ── disk tier ─────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _disk_prefix(ticker: str) -> str:
+        return f"{ticker or '_'}@"
+
+    def _disk_path(self, key: str, ticker: str) -> str:
+        return os.path.join(self.disk_dir, f"{self._disk_prefix(ticker)}{key}.npz")
+
+    def _save(self, key: str, ticker: str, entry: _Entry):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key, ticker)
+        tmp = path + ".tmp"
+        features = entry.features
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                __columns__=np.array(features.columns, dtype=str),
+                **{f"c{i}": features[column].to_numpy() for i, column in enumerate(features.columns)},
+            )
+        os.replace(tmp, path)
+
+    def _load(self, key: str, ticker: str, n_bars: int, digest: str, series) -> _Entry:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key, ticker)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            columns = list(data["__columns__"])
+            features = pd.DataFrame({column: data[f"c{i}"] for i, column in enumerate(columns)})
+        return _Entry(features, n_bars, digest, series)
+
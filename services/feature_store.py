@@ -0,0 +1,534 @@
+import json
+import operator
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services import instrumentation
+from services.feature_engineering import _epoch_ms, _import_pyarrow
+from services.resampling import timeframe_minutes
+
+PARTITIONS = ("day", "month", "year")
+READ_OUTPUTS = ("frame", "arrays", "arrow")
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+# Columns of an input frame that are not stored as features.
+_RESERVED = ("ticker", "timestamp", "direction")
+# Per-partition files besides the features: bar time, and the label of each
+# row with the time it became known. Labels are appended one bar behind rows.
+_TIMESTAMP = ("timestamp", np.dtype("<i8"))
+_LABELS = (("direction", np.dtype("i1")), ("label_ms", np.dtype("<i8")))
+_FEATURE_DTYPE = np.dtype("<f4")
+
+
+class FeatureStore:
+    """Append-only, point-in-time store of feature rows on local disk.
+
+    Rows are partitioned by ticker and calendar period (day, month or year in
+    session_tz), and stored column by column: every partition directory
+    holds one raw little-endian file per column, with int64 epoch-millisecond
+    timestamps, float32 features (as in build_compact_feature_matrix) and the
+    labels. Reads memory-map only the files of the requested columns.
+
+    Each ticker has a small JSON index recording, per partition, the row and
+    label counts, the timestamp range and the min/max of every feature. A
+    read uses it to skip partitions outside the time range, or whose min/max
+    rule out every filter (predicate pushdown), then binary-searches the
+    sorted timestamps within each partition it opens.
+
+    Appends only ever add rows after a ticker's last stored bar. Column files
+    are written first and the index last, so an interrupted append leaves
+    rows that readers never see and the next append overwrites.
+
+    Point-in-time correctness: a row's 'direction' label needs the next bar,
+    so it is never taken from the input. When a row is appended, the store
+    labels the previous row (close now vs. close then, as
+    compute_direction_label does) and records when that label became known:
+    the end of the new bar. A row's features are known at the end of its own
+    bar. read(as_of=...) only returns what was known at as_of, and a training
+    read only returns rows whose label is known.
+
+    Args:
+        root: Directory to keep the store in. Created if missing.
+        timeframe: Bar size of the stored rows, e.g. "1h". A row becomes
+                   known one timeframe after its timestamp (the bar start).
+        partition: "day", "month" or "year". Smaller partitions make
+                   narrow time ranges cheaper to read; larger ones mean
+                   fewer files for long training reads.
+        session_tz: Timezone whose calendar bounds partitions and
+                    interprets naive start / end / as_of times.
+
+    Raises:
+        ValueError: If partition or timeframe is unknown (see
+                    services.resampling.timeframe_minutes), or root holds a
+                    store created with a different timeframe, partition or
+                    session_tz.
+    """
+
+    def __init__(self, root: str, timeframe: str = "1h", partition: str = "month",
+                 session_tz: str = "America/New_York"):
+        if partition not in PARTITIONS:
+            raise ValueError(f"Unknown partition {partition!r}; expected one of {PARTITIONS}.")
+        self.root = root
+        self.timeframe = timeframe
+        self.partition = partition
+        self.session_tz = session_tz
+        self._bar_ms = (timeframe_minutes(timeframe) or 24 * 60) * 60_000
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        self._indexes = {}
+        self._last_partition = (0, 0, None)
+        os.makedirs(root, exist_ok=True)
+
+        self._schema_path = os.path.join(root, "store.json")
+        schema = _read_json(self._schema_path, None)
+        settings = {"timeframe": timeframe, "partition": partition, "session_tz": session_tz}
+        if schema is None:
+            schema = dict(settings, columns=None)
+            _write_json(self._schema_path, schema)
+        for name, value in settings.items():
+            if schema[name] != value:
+                raise ValueError(f"Feature store at {root} was created with {name}={schema[name]!r}, not {value!r}.")
+        self.columns = schema["columns"]
+
+        self.partitions_read = 0
+        self.partitions_skipped = 0
+        self.rows_read = 0
+        self.rows_appended = 0
+
+    # ── writes ────────────────────────────────────────────────────────────────
+
+    def append(self, ticker: str, features: pd.DataFrame) -> int:
+        """Append feature rows for one ticker, oldest first.
+
+        Args:
+            ticker: Stock ticker symbol.
+            features: DataFrame with a 'timestamp' column (datetimes, or int64
+                      epoch milliseconds as in the compact layout) and the
+                      feature columns, e.g. build_feature_matrix(compact=True)
+                      output. A 'direction' column is ignored; labels are
+                      derived as later rows arrive. Each call must continue
+                      from the ticker's last stored bar, as consecutive
+                      feature rows do.
+
+        Returns:
+            Number of rows written. Rows at or before the ticker's last
+            stored timestamp are skipped, so re-appending an overlapping
+            matrix is harmless.
+
+        Raises:
+            ValueError: If timestamps are not increasing, or the feature
+                        columns differ from those already stored.
+        """
+        timestamp = features["timestamp"]
+        if pd.api.types.is_integer_dtype(timestamp):
+            timestamp = timestamp.to_numpy(dtype=np.int64)
+        else:
+            timestamp = _epoch_ms(timestamp)
+        columns = {name: features[name].to_numpy() for name in features.columns if name not in _RESERVED}
+        return self._append(ticker, timestamp, columns)
+
+    def append_row(self, ticker: str, timestamp, row: dict) -> int:
+        """Append one feature row, e.g. as LivePipeline(on_features=store.append_row).
+
+        Args:
+            ticker: Stock ticker symbol.
+            timestamp: Bar start time. Naive times are taken as UTC.
+            row: {column: value} with the stored feature columns, as
+                 StreamingFeatureEngine.update returns.
+
+        Returns:
+            1, or 0 if the row is at or before the ticker's last stored bar.
+        """
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize("UTC") if ts.tz is None else ts
+        columns = {name: np.array([value]) for name, value in row.items() if name not in _RESERVED}
+        return self._append(ticker, np.array([ts.value // 1_000_000], dtype=np.int64), columns)
+
+    def _append(self, ticker: str, timestamp: np.ndarray, columns: dict) -> int:
+        with self._ticker_lock(ticker), instrumentation.span("feature_store", stage="append"):
+            index = self._index(ticker)
+            last_ts, last_close = index["last_ts"], index["last_close"]
+            if last_ts is not None:
+                keep = timestamp > last_ts
+                if not keep.all():
+                    timestamp = timestamp[keep]
+                    columns = {name: values[keep] for name, values in columns.items()}
+            n = len(timestamp)
+            if n == 0:
+                return 0
+            if n > 1 and (np.diff(timestamp) <= 0).any():
+                raise ValueError("Feature rows must be in increasing timestamp order.")
+            self._check_columns(columns)
+
+            # Each new row labels the row before it, now that its close is known.
+            close = np.asarray(columns["close"], dtype=np.float64)
+            if last_ts is None:
+                labelled_ts, prev_close, next_close, next_ts = timestamp[:-1], close[:-1], close[1:], timestamp[1:]
+            else:
+                labelled_ts = np.concatenate([[last_ts], timestamp[:-1]])
+                prev_close = np.concatenate([[last_close], close[:-1]])
+                next_close, next_ts = close, timestamp
+            labels = {
+                "direction": (next_close > prev_close).astype(np.int8),
+                "label_ms": next_ts + self._bar_ms,
+            }
+
+            try:
+                self._write_rows(ticker, index, timestamp, columns, labelled_ts, labels)
+            except BaseException:
+                self._indexes.pop(ticker, None)  # reload what is committed on disk
+                raise
+            index["last_ts"], index["last_close"] = int(timestamp[-1]), float(close[-1])
+            self._save_index(ticker, index)
+            self.rows_appended += n
+        instrumentation.count("feature_store_rows", n, op="append")
+        return n
+
+    def _write_rows(self, ticker, index, timestamp, columns, labelled_ts, labels):
+        # Append rows and labels to their partitions' files, updating the
+        # in-memory index to match. The caller saves the index.
+        partitions = index["partitions"]
+        for key, lo, hi in self._partitions(timestamp):
+            part = partitions.setdefault(key, {"rows": 0, "labels": 0, "start": None, "end": None,
+                                               "min": {}, "max": {}})
+            values = {"timestamp": timestamp[lo:hi]}
+            for name in self.columns:
+                values[name] = np.asarray(columns[name][lo:hi], dtype=_FEATURE_DTYPE)
+            self._write(ticker, key, part["rows"], values)
+            part["rows"] += hi - lo
+            part["start"] = int(timestamp[lo]) if part["start"] is None else part["start"]
+            part["end"] = int(timestamp[hi - 1])
+            for name in self.columns:
+                lo_value = float(np.fmin.reduce(values[name]))
+                hi_value = float(np.fmax.reduce(values[name]))
+                part["min"][name] = float(np.fmin(part["min"].get(name, lo_value), lo_value))
+                part["max"][name] = float(np.fmax(part["max"].get(name, hi_value), hi_value))
+
+        for key, lo, hi in self._partitions(labelled_ts):
+            part = partitions[key]
+            self._write(ticker, key, part["labels"], {name: values[lo:hi] for name, values in labels.items()})
+            part["labels"] += hi - lo
+
+    def _check_columns(self, columns: dict):
+        if self.columns is None:
+            if "close" not in columns:
+                raise ValueError("Feature rows need a 'close' column to derive the direction label.")
+            with self._lock:
+                if self.columns is None:
+                    self.columns = list(columns)
+                    schema = _read_json(self._schema_path, {})
+                    schema["columns"] = self.columns
+                    _write_json(self._schema_path, schema)
+        if set(columns) != set(self.columns):
+            raise ValueError(f"Expected feature columns {self.columns}, got {list(columns)}.")
+
+    def _write(self, ticker: str, key: str, offset: int, values: dict):
+        # Write at the committed row count, cutting off whatever an
+        # interrupted append may have left after it.
+        directory = os.path.join(self.root, ticker, key)
+        os.makedirs(directory, exist_ok=True)
+        for name, array in values.items():
+            path = os.path.join(directory, name + ".bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(offset * array.dtype.itemsize)
+                f.write(np.ascontiguousarray(array).tobytes())
+                f.truncate()
+
+    # ── reads ─────────────────────────────────────────────────────────────────
+
+    def read(
+        self,
+        tickers=None,
+        start=None,
+        end=None,
+        columns: list = None,
+        filters: list = None,
+        as_of=None,
+        labels: bool = True,
+        output: str = "frame",
+    ):
+        """Read stored rows for some tickers and a time range.
+
+        Args:
+            tickers: A ticker, a list of tickers, or None for every ticker.
+            start: Earliest bar start to include. Naive times are in session_tz.
+            end: Bar start to stop before (exclusive).
+            columns: Feature columns to load. Defaults to all of them. Other
+                     columns' files are never opened.
+            filters: List of (column, op, value) conditions that must all
+                     hold, e.g. [("rsi", "<", 30), ("volume", ">", 1e6)].
+                     op is one of <, <=, >, >=, ==, !=. Partitions whose
+                     min/max rule a condition out are skipped unread.
+            as_of: Only return what was known at this time: rows whose bar
+                   had ended, and labels whose next bar had ended.
+            labels: If True (training), return only rows whose label is
+                    known, with an int8 'direction' column. If False
+                    (serving), return every row, without labels.
+            output: "frame" for a DataFrame, "arrays" for a {column: array}
+                    dict, or "arrow" for a pyarrow.Table (requires pyarrow).
+                    Arrays of a range within one partition and without
+                    filters are read-only views of the memory-mapped files,
+                    so nothing is copied.
+
+        Returns:
+            'ticker', 'timestamp' (int64 epoch ms), the requested feature
+            columns and, with labels=True, 'direction'; rows grouped by
+            ticker in the order given, oldest first.
+
+        Raises:
+            ValueError: If a column, filter operator or output is unknown.
+            ImportError: If output="arrow" and pyarrow is not installed.
+        """
+        if output not in READ_OUTPUTS:
+            raise ValueError(f"Unknown output {output!r}; expected one of {READ_OUTPUTS}.")
+        pa = _import_pyarrow() if output == "arrow" else None
+        stored = self.columns or []
+        columns = list(stored) if columns is None else list(columns)
+        filters = list(filters or [])
+        for name in columns + [f[0] for f in filters]:
+            if name not in stored:
+                raise ValueError(f"Unknown feature column {name!r}.")
+        for _, op, _ in filters:
+            if op not in _OPS:
+                raise ValueError(f"Unknown filter operator {op!r}; expected one of {tuple(_OPS)}.")
+        # Compare in float32, as stored, so the min/max checks agree with the rows.
+        filters = [(name, op, np.float32(value)) for name, op, value in filters]
+        if tickers is None:
+            tickers = self.tickers
+        elif isinstance(tickers, str):
+            tickers = [tickers]
+
+        lo_ms = self._to_ms(start, -np.inf)
+        hi_ms = self._to_ms(end, np.inf)
+        as_of_ms = self._to_ms(as_of, np.inf)
+        known_ms = as_of_ms - self._bar_ms
+        names = ["timestamp"] + columns + (["direction"] if labels else [])
+
+        slices, counts = [], []
+        with instrumentation.span("feature_store", stage="read"):
+            for ticker in tickers:
+                count = 0
+                for key, part in list(self._index(ticker)["partitions"].items()):
+                    part = dict(part)
+                    if part["end"] < lo_ms or part["start"] >= hi_ms or part["start"] > known_ms:
+                        continue
+                    if not all(_may_match(part, *f) for f in filters):
+                        self.partitions_skipped += 1
+                        continue
+                    self.partitions_read += 1
+                    found = self._slice(ticker, key, part, filters, lo_ms, hi_ms, known_ms,
+                                        as_of_ms if labels else None)
+                    if found is not None:
+                        slices.append((ticker, key) + found)
+                        count += found[-1]
+                counts.append(count)
+            arrays = {"ticker": np.repeat(np.array(tickers, dtype=object), counts)}
+            for name in names:
+                arrays[name] = self._gather(name, slices, sum(counts))
+        n = sum(counts)
+        self.rows_read += n
+        instrumentation.count("feature_store_rows", n, op="read")
+
+        if output == "arrays":
+            return arrays
+        if output == "arrow":
+            return pa.table({name: pa.array(values) for name, values in arrays.items()})
+        return pd.DataFrame(arrays)
+
+    def _slice(self, ticker, key, part, filters, lo_ms, hi_ms, known_ms, label_as_of):
+        # Rows [a, b) of one partition in the time range and known by as_of,
+        # and the filter mask over them. None if no row qualifies. A partition
+        # wholly inside the range is taken without opening its timestamps.
+        a, b = 0, part["rows"]
+        if part["start"] < lo_ms or part["end"] >= hi_ms or part["end"] > known_ms:
+            timestamp = self._column(ticker, key, "timestamp", part["rows"])
+            if lo_ms > -np.inf:
+                a = np.searchsorted(timestamp, lo_ms, side="left")
+            if hi_ms < np.inf:
+                b = np.searchsorted(timestamp, hi_ms, side="left")
+            if known_ms < np.inf:
+                b = min(b, np.searchsorted(timestamp, known_ms, side="right"))
+        if label_as_of is not None:
+            b = min(b, part["labels"])
+            if label_as_of < np.inf and b > a:
+                label_ms = self._column(ticker, key, "label_ms", part["labels"])
+                b = min(b, np.searchsorted(label_ms, label_as_of, side="right"))
+        if a >= b:
+            return None
+
+        mask = None
+        for name, op, value in filters:
+            hit = _OPS[op](self._column(ticker, key, name, part["rows"])[a:b], value)
+            mask = hit if mask is None else mask & hit
+        n = b - a if mask is None else int(mask.sum())
+        return (part, int(a), int(b), mask, n) if n else None
+
+    def _gather(self, name: str, slices: list, total: int) -> np.ndarray:
+        # One column of every slice. A single unfiltered slice is returned as
+        # a view of the memory-mapped file; otherwise each slice is read
+        # straight into its place in one output array.
+        dtype = self._dtype(name)
+        if len(slices) == 1 and slices[0][5] is None:
+            ticker, key, part, a, b, _, _ = slices[0]
+            return self._column(ticker, key, name, b)[a:b]
+        out = np.empty(total, dtype=dtype)
+        pos = 0
+        for ticker, key, part, a, b, mask, n in slices:
+            if mask is None:
+                with open(os.path.join(self.root, ticker, key, name + ".bin"), "rb") as f:
+                    f.seek(a * dtype.itemsize)
+                    f.readinto(out[pos:pos + n])
+            else:
+                out[pos:pos + n] = self._column(ticker, key, name, b)[a:b][mask]
+            pos += n
+        return out
+
+    def _column(self, ticker: str, key: str, name: str, n: int) -> np.ndarray:
+        dtype = self._dtype(name)
+        if n == 0:
+            return np.empty(0, dtype=dtype)
+        path = os.path.join(self.root, ticker, key, name + ".bin")
+        return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+    @staticmethod
+    def _dtype(name: str) -> np.dtype:
+        return dict((_TIMESTAMP,) + _LABELS).get(name, _FEATURE_DTYPE)
+
+    # ── index ─────────────────────────────────────────────────────────────────
+
+    @property
+    def tickers(self) -> list:
+        """Every ticker with stored rows, sorted."""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "index.json"))
+        )
+
+    def latest(self, ticker: str):
+        """Start time of the ticker's last stored bar (UTC Timestamp), or None.
+
+        An incremental job can build features from the bars after it and append them.
+        """
+        last_ts = self._index(ticker)["last_ts"]
+        return None if last_ts is None else pd.Timestamp(last_ts, unit="ms", tz="UTC")
+
+    def delete(self, ticker: str = None):
+        """Delete every stored row, or only those of one ticker."""
+        for name in ([ticker] if ticker is not None else self.tickers):
+            with self._ticker_lock(name):
+                self._indexes.pop(name, None)
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def refresh(self):
+        """Forget cached indexes, to see rows another process has appended since."""
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> dict:
+        return {
+            "partitions_read": self.partitions_read,
+            "partitions_skipped": self.partitions_skipped,
+            "rows_read": self.rows_read,
+            "rows_appended": self.rows_appended,
+        }
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        # Appends to different tickers run concurrently; the same ticker never does.
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _index(self, ticker: str) -> dict:
+        index = self._indexes.get(ticker)
+        if index is None:
+            path = os.path.join(self.root, ticker, "index.json")
+            index = _read_json(path, {"last_ts": None, "last_close": None, "partitions": {}})
+            self._indexes[ticker] = index
+        return index
+
+    def _save_index(self, ticker: str, index: dict):
+        os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+        _write_json(os.path.join(self.root, ticker, "index.json"), index)
+
+    def _partitions(self, timestamp: np.ndarray) -> list:
+        # (name, start, stop) for each run of rows in one partition, named
+        # "2024-12-23", "2024-12" or "2024". Live rows nearly always fall in
+        # the last partition seen, so its bounds are kept to skip the
+        # timezone conversion.
+        n = len(timestamp)
+        if n == 0:
+            return []
+        lo, hi, name = self._last_partition
+        if lo <= timestamp[0] and timestamp[-1] < hi:
+            return [(name, 0, n)]
+        local = pd.DatetimeIndex(pd.to_datetime(timestamp, unit="ms", utc=True)).tz_convert(self.session_tz)
+        code = np.asarray(local.year, dtype=np.int64)
+        if self.partition != "year":
+            code = code * 100 + np.asarray(local.month)
+        if self.partition == "day":
+            code = code * 100 + np.asarray(local.day)
+        bounds = [0, *(np.flatnonzero(np.diff(code)) + 1).tolist(), n]
+        runs = [(_partition_name(int(code[a]), self.partition), a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+        period = local[-1].tz_localize(None).to_period({"day": "D", "month": "M", "year": "Y"}[self.partition])
+        lo, hi = (pd.Timestamp(p.start_time).tz_localize(self.session_tz).value // 1_000_000
+                  for p in (period, period + 1))
+        self._last_partition = (lo, hi, runs[-1][0])
+        return runs
+
+    def _to_ms(self, value, default: float) -> float:
+        if value is None:
+            return default
+        ts = pd.Timestamp(value)
+        ts = ts.tz_localize(self.session_tz) if ts.tz is None else ts
+        return ts.value // 1_000_000
+
+
+def _partition_name(code: int, partition: str) -> str:
+    # 2024 -> "2024", 202412 -> "2024-12", 20241223 -> "2024-12-23".
+    if partition == "year":
+        return str(code)
+    if partition == "month":
+        return f"{code // 100}-{code % 100:02d}"
+    return f"{code // 10000}-{code // 100 % 100:02d}-{code % 100:02d}"
+
+
+def _may_match(part: dict, column: str, op: str, value) -> bool:
+    # Whether any row of a partition can satisfy column <op> value, from its
+    # min/max. Both are NaN only if every value is, and NaN rows match "!=" alone.
+    lo, hi = part["min"][column], part["max"][column]
+    if op == "<":
+        return lo < value
+    if op == "<=":
+        return lo <= value
+    if op == ">":
+        return hi > value
+    if op == ">=":
+        return hi >= value
+    if op == "==":
+        return lo <= value <= hi
+    return not lo == hi == value
+
+
+def _read_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path: str, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(json.dumps(obj))  # dumps uses the C encoder; dump does not
+    os.replace(tmp, path)
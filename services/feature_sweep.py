@@ -0,0 +1,240 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from services import indicator_kernels
+from services.feature_engineering import (
+    _use_kernels,
+    compute_direction_label,
+    compute_vwap,
+)
+
+# build_feature_matrix keyword arguments and their defaults.
+SWEEP_DEFAULTS = {
+    "rsi_period": 14,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "atr_period": 14,
+    "bb_period": 20,
+    "bb_std": 2.0,
+    "lag_periods": (1, 2, 3, 4, 5),
+}
+
+_PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def parameter_grid(**options) -> list:
+    """Expand lists of parameter values into every combination of configs.
+
+    Example: parameter_grid(rsi_period=[7, 14], bb_period=[10, 20]) returns
+    four configs. Parameters not given keep their build_feature_matrix default.
+    """
+    names = list(options)
+    return [dict(zip(names, values)) for values in product(*(options[n] for n in names))]
+
+
+class _SharedIntermediates:
+    """Per-series work reused across every config in a sweep.
+
+    Parameter-independent arrays (close diff, gains/losses, true range, VWAP,
+    the direction label and one cumulative-sum pass for rolling windows) are
+    built once. Each indicator is memoized by its own parameters, so configs
+    that share an RSI period, an EMA span or a Bollinger window share the work.
+    """
+
+    def __init__(self, ohlcv: pd.DataFrame, engine: str):
+        self.use_kernels = _use_kernels(engine)
+        self.close = np.ascontiguousarray(ohlcv["close"].to_numpy(dtype=np.float64))
+        high = ohlcv["high"].to_numpy(dtype=np.float64)
+        low = ohlcv["low"].to_numpy(dtype=np.float64)
+
+        delta = np.full_like(self.close, np.nan)
+        delta[1:] = self.close[1:] - self.close[:-1]
+        with np.errstate(invalid="ignore"):
+            self.gains = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+            self.losses = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+        prev_close = np.full_like(self.close, np.nan)
+        prev_close[1:] = self.close[:-1]
+        self.true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+        self.vwap = compute_vwap(
+            ohlcv["close"], ohlcv["high"], ohlcv["low"], ohlcv["volume"], ohlcv["timestamp"], engine=engine
+        ).to_numpy()
+        self.direction = compute_direction_label(ohlcv["close"]).to_numpy()
+
+        # One cumulative-sum pass serves every Bollinger window. Sums are taken
+        # around the first close to limit cancellation error.
+        valid = ~np.isnan(self.close)
+        ref = self.close[valid][0] if valid.any() else 0.0
+        centred = np.where(valid, self.close - ref, 0.0)
+        self._ref = ref
+        self._cum_count = np.concatenate([[0], np.cumsum(valid)])
+        self._cum_s1 = np.concatenate([[0.0], np.cumsum(centred)])
+        self._cum_s2 = np.concatenate([[0.0], np.cumsum(centred * centred)])
+
+        self._memo = {}
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def _ewm(self, values: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+        if self.use_kernels:
+            return indicator_kernels.ewm_mean(np.ascontiguousarray(values), alpha, min_periods)
+        return pd.Series(values).ewm(alpha=alpha, min_periods=min_periods, adjust=False).mean().to_numpy()
+
+    def ema(self, span: int) -> np.ndarray:
+        return self._cached(("ema", span), lambda: self._ewm(self.close, 2.0 / (span + 1), 0))
+
+    def rsi(self, period: int) -> np.ndarray:
+        def compute():
+            avg_gain = self._ewm(self.gains, 1.0 / period, period)
+            avg_loss = self._ewm(self.losses, 1.0 / period, period)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+                return 100 - (100 / (1 + rs))
+        return self._cached(("rsi", period), compute)
+
+    def macd(self, fast: int, slow: int, signal: int) -> tuple:
+        def compute():
+            macd_line = self.ema(fast) - self.ema(slow)
+            signal_line = self._ewm(macd_line, 2.0 / (signal + 1), 0)
+            return macd_line, signal_line, macd_line - signal_line
+        return self._cached(("macd", fast, slow, signal), compute)
+
+    def atr(self, period: int) -> np.ndarray:
+        return self._cached(("atr", period), lambda: self._ewm(self.true_range, 1.0 / period, period))
+
+    def rolling_mean_std(self, window: int) -> tuple:
+        def compute():
+            n = len(self.close)
+            mean = np.full(n, np.nan)
+            std = np.full(n, np.nan)
+            if window <= n:
+                count = self._cum_count[window:] - self._cum_count[:-window]
+                s1 = self._cum_s1[window:] - self._cum_s1[:-window]
+                s2 = self._cum_s2[window:] - self._cum_s2[:-window]
+                m = s1 / window
+                full = count >= window
+                mean[window - 1:] = np.where(full, m + self._ref, np.nan)
+                std[window - 1:] = np.where(full, np.sqrt(np.maximum(s2 / window - m * m, 0.0)), np.nan)
+            return mean, std
+        return self._cached(("rolling", window), compute)
+
+    def bollinger(self, period: int, num_std: float) -> tuple:
+        def compute():
+            middle, std = self.rolling_mean_std(period)
+            return middle + num_std * std, middle, middle - num_std * std
+        return self._cached(("bollinger", period, num_std), compute)
+
+    def lagged_return(self, lag: int) -> np.ndarray:
+        return self._cached(
+            ("lag", lag), lambda: pd.Series(self.close).pct_change(lag).to_numpy()
+        )
+
+
+def _resolve(config: dict) -> dict:
+    unknown = set(config) - set(SWEEP_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown feature parameter(s): {', '.join(sorted(unknown))}.")
+    resolved = {**SWEEP_DEFAULTS, **config}
+    resolved["lag_periods"] = tuple(resolved["lag_periods"])
+    return resolved
+
+
+def _indicator_columns(shared: _SharedIntermediates, p: dict) -> dict:
+    macd_line, signal_line, histogram = shared.macd(p["macd_fast"], p["macd_slow"], p["macd_signal"])
+    bb_upper, bb_middle, bb_lower = shared.bollinger(p["bb_period"], p["bb_std"])
+    columns = {
+        "rsi": shared.rsi(p["rsi_period"]),
+        "macd_line": macd_line,
+        "signal_line": signal_line,
+        "histogram": histogram,
+        "vwap": shared.vwap,
+        "atr": shared.atr(p["atr_period"]),
+        "bb_upper": bb_upper,
+        "bb_middle": bb_middle,
+        "bb_lower": bb_lower,
+    }
+    for lag in p["lag_periods"]:
+        columns[f"return_lag_{lag}"] = shared.lagged_return(lag)
+    return columns
+
+
+def _finish(ohlcv: pd.DataFrame, columns: dict, direction: np.ndarray) -> pd.DataFrame:
+    # Same row selection as build_feature_matrix: drop any row with a NaN.
+    df = pd.concat([
+        ohlcv[_PRICE_COLUMNS],
+        pd.DataFrame(columns, index=ohlcv.index),
+        pd.Series(direction, index=ohlcv.index, name="direction"),
+    ], axis=1)
+    df = df.dropna()
+    df["direction"] = df["direction"].astype(int)
+    return df.reset_index(drop=True)
+
+
+def build_feature_sweep(
+    ohlcv: pd.DataFrame,
+    configs: list,
+    wide: bool = False,
+    engine: str = "pandas",
+):
+    """Build feature matrices for many indicator configs, sharing the common work.
+
+    Args:
+        ohlcv: DataFrame with columns [timestamp, open, high, low, close, volume].
+        configs: List of dicts of build_feature_matrix keyword arguments
+                 (rsi_period, macd_fast, ...). Missing keys take the
+                 build_feature_matrix defaults. See parameter_grid.
+        wide: If False, return one DataFrame per config. If True, return a
+              single DataFrame with each distinct indicator computed once. Its
+              columns are named by their parameters (e.g. rsi_14,
+              macd_line_12_26_9, bb_upper_20_2.0), and it keeps only the rows
+              valid for every config.
+        engine: "pandas" or "numba", as in build_feature_matrix.
+
+    Returns:
+        List of DataFrames in config order, each identical to
+        build_feature_matrix(ohlcv, **config), or one wide DataFrame.
+
+    Raises:
+        ValueError: If ohlcv is empty, a config has an unknown key, or any
+                    config needs more warm-up rows than ohlcv has.
+    """
+    if ohlcv is None or len(ohlcv) == 0:
+        raise ValueError("ohlcv DataFrame is empty.")
+
+    resolved = [_resolve(config) for config in configs]
+    for p in resolved:
+        min_rows = p["macd_slow"] + p["macd_signal"] + max(p["lag_periods"])
+        if len(ohlcv) < min_rows:
+            raise ValueError(
+                f"Insufficient data: {len(ohlcv)} rows provided, "
+                f"need at least {min_rows} for indicator warm-up."
+            )
+
+    shared = _SharedIntermediates(ohlcv, engine)
+
+    if not wide:
+        return [_finish(ohlcv, _indicator_columns(shared, p), shared.direction) for p in resolved]
+
+    columns = {"vwap": shared.vwap}
+    for p in resolved:
+        columns[f"rsi_{p['rsi_period']}"] = shared.rsi(p["rsi_period"])
+        macd_key = f"{p['macd_fast']}_{p['macd_slow']}_{p['macd_signal']}"
+        macd_line, signal_line, histogram = shared.macd(p["macd_fast"], p["macd_slow"], p["macd_signal"])
+        columns[f"macd_line_{macd_key}"] = macd_line
+        columns[f"signal_line_{macd_key}"] = signal_line
+        columns[f"histogram_{macd_key}"] = histogram
+        columns[f"atr_{p['atr_period']}"] = shared.atr(p["atr_period"])
+        bb_key = f"{p['bb_period']}_{p['bb_std']}"
+        bb_upper, bb_middle, bb_lower = shared.bollinger(p["bb_period"], p["bb_std"])
+        columns[f"bb_upper_{bb_key}"] = bb_upper
+        columns[f"bb_middle_{p['bb_period']}"] = bb_middle
+        columns[f"bb_lower_{bb_key}"] = bb_lower
+        for lag in p["lag_periods"]:
+            columns[f"return_lag_{lag}"] = shared.lagged_return(lag)
+    return _finish(ohlcv, columns, shared.direction)
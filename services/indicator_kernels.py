@@ -0,0 +1,191 @@
+"""Compiled kernels for the feature_engineering indicators.
+
+Each kernel works on contiguous float64 NumPy arrays and reproduces the
+matching pandas expression in feature_engineering, NaN handling included.
+They are JIT-compiled with numba when it is installed. Without numba,
+NUMBA_AVAILABLE is False and feature_engineering keeps using pandas, so
+nothing here is called on the slow pure-Python path.
+
+numba itself is only imported when a kernel is first called: importing it
+takes longer than the rest of the package, and the default pandas engine
+never needs it.
+"""
+import functools
+import importlib.util
+import threading
+
+import numpy as np
+
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+_KERNELS = []
+_compile_lock = threading.Lock()
+
+
+def _jit(func):
+    if not NUMBA_AVAILABLE:
+        return func
+    _KERNELS.append(func)
+
+    @functools.wraps(func)
+    def first_call(*args):
+        _compile()
+        return globals()[func.__name__](*args)
+
+    return first_call
+
+
+def _compile():
+    # Swap every kernel for its numba dispatcher at once, so kernels that
+    # call each other resolve to compiled code. Falls back to plain Python
+    # functions (and NUMBA_AVAILABLE = False) if numba fails to import.
+    global NUMBA_AVAILABLE
+    with _compile_lock:
+        if not _KERNELS:
+            return
+        try:
+            from numba import njit
+        except ImportError:
+            njit = None
+            NUMBA_AVAILABLE = False
+        for func in _KERNELS:
+            globals()[func.__name__] = func if njit is None else njit(cache=True, nogil=True)(func)
+        _KERNELS.clear()
+
+
+@_jit
+def ewm_mean(values, alpha, min_periods):
+    # Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean()
+    n = values.shape[0]
+    out = np.empty(n)
+    if n == 0:
+        return out
+    min_periods = max(min_periods, 1)
+    weighted = values[0]
+    nobs = 0 if np.isnan(weighted) else 1
+    old_wt = 1.0
+    out[0] = weighted if nobs >= min_periods else np.nan
+    for i in range(1, n):
+        cur = values[i]
+        is_obs = not np.isnan(cur)
+        nobs += is_obs
+        if not np.isnan(weighted):
+            old_wt *= 1.0 - alpha
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= min_periods else np.nan
+    return out
+
+
+@_jit
+def rsi(close, period):
+    n = close.shape[0]
+    gains = np.empty(n)
+    losses = np.empty(n)
+    gains[0] = np.nan
+    losses[0] = np.nan
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        if np.isnan(delta):
+            gains[i] = np.nan
+            losses[i] = np.nan
+        else:
+            gains[i] = delta if delta > 0 else 0.0
+            losses[i] = -delta if delta < 0 else 0.0
+    avg_gain = ewm_mean(gains, 1.0 / period, period)
+    avg_loss = ewm_mean(losses, 1.0 / period, period)
+    out = np.empty(n)
+    for i in range(n):
+        if avg_loss[i] == 0 or np.isnan(avg_loss[i]) or np.isnan(avg_gain[i]):
+            out[i] = np.nan
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain[i] / avg_loss[i])
+    return out
+
+
+@_jit
+def macd(close, fast, slow, signal):
+    macd_line = ewm_mean(close, 2.0 / (fast + 1), 0) - ewm_mean(close, 2.0 / (slow + 1), 0)
+    signal_line = ewm_mean(macd_line, 2.0 / (signal + 1), 0)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+@_jit
+def vwap(close, high, low, volume, day):
+    # day holds an integer session key per bar; sums restart when it changes.
+    n = close.shape[0]
+    out = np.empty(n)
+    cumvol = 0.0
+    cumtpvol = 0.0
+    for i in range(n):
+        if i == 0 or day[i] != day[i - 1]:
+            cumvol = 0.0
+            cumtpvol = 0.0
+        tp_vol = (high[i] + low[i] + close[i]) / 3.0 * volume[i]
+        if not np.isnan(volume[i]):
+            cumvol += volume[i]
+        if not np.isnan(tp_vol):
+            cumtpvol += tp_vol
+        if np.isnan(volume[i]) or np.isnan(tp_vol) or cumvol == 0:
+            out[i] = np.nan
+        else:
+            out[i] = cumtpvol / cumvol
+    return out
+
+
+@_jit
+def true_range(high, low, close):
+    n = close.shape[0]
+    out = np.empty(n)
+    for i in range(n):
+        best = high[i] - low[i]
+        if i > 0:
+            for candidate in (abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])):
+                if np.isnan(best) or candidate > best:
+                    best = candidate
+        out[i] = best
+    return out
+
+
+@_jit
+def atr(high, low, close, period):
+    return ewm_mean(true_range(high, low, close), 1.0 / period, period)
+
+
+@_jit
+def rolling_mean_std(values, window):
+    # Rolling mean and population std (ddof=0), NaN until `window` valid values.
+    # Sums are taken around the first value to limit cancellation error.
+    n = values.shape[0]
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    ref = 0.0
+    for i in range(n):
+        if not np.isnan(values[i]):
+            ref = values[i]
+            break
+    s1 = 0.0
+    s2 = 0.0
+    count = 0
+    for i in range(n):
+        x = values[i]
+        if not np.isnan(x):
+            s1 += x - ref
+            s2 += (x - ref) * (x - ref)
+            count += 1
+        if i >= window:
+            y = values[i - window]
+            if not np.isnan(y):
+                s1 -= y - ref
+                s2 -= (y - ref) * (y - ref)
+                count -= 1
+        if count >= window:
+            m = s1 / window
+            var = s2 / window - m * m
+            mean[i] = m + ref
+            std[i] = np.sqrt(var) if var > 0 else 0.0
+    return mean, std
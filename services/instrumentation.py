@@ -0,0 +1,427 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+# Instrumentation is off until enable() is called. While it is off, span()
+# returns one shared no-op context manager and count() returns at once, so
+# instrumented code pays a function call and a flag check, nothing more.
+_enabled = False
+_sinks = []
+
+
+def enable(*sinks):
+    """Start recording. Every span and counter event is also passed to each sink."""
+    global _enabled
+    _sinks[:] = sinks
+    _enabled = True
+
+
+def disable():
+    """Stop recording. Aggregates recorded so far are kept until reset()."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# ── Histograms ────────────────────────────────────────────────────────────────
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets from 1 µs to 100 s, safe to record from many threads.
+
+    Percentiles are read from the bucket edges, so they are accurate to one
+    bucket width (about 5%). Memory use does not grow with the sample count.
+    """
+
+    BOUNDS = np.geomspace(1e-6, 100.0, 8 * 48 + 1)
+
+    def __init__(self):
+        self.counts = np.zeros(len(self.BOUNDS) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        bucket = int(np.searchsorted(self.BOUNDS, seconds))
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th percentile (q in 0-100), in seconds."""
+        with self._lock:
+            if self.count == 0:
+                return float("nan")
+            bucket = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+            return float(min(self.BOUNDS[min(bucket, len(self.BOUNDS) - 1)], self.max))
+
+    def summary(self) -> dict:
+        """count, mean, p50, p90, p99 and max, in milliseconds. None before any sample."""
+        if self.count == 0:
+            return {"count": 0, "mean_ms": None, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p90_ms": self.percentile(90) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+# ── Registry ──────────────────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def _emit(event: dict):
+    for sink in _sinks:
+        sink.emit(event)
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add value to the counter name{labels}, e.g. count("polygon_bytes", 5120, endpoint="aggs")."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    if _sinks:
+        _emit({"type": "counter", "name": name, "labels": labels, "value": value, "time": time.time()})
+
+
+def record_span(name: str, seconds: float, **labels):
+    """Record a duration measured elsewhere as if it were a span."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    histogram = _timings.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = _timings.setdefault(key, LatencyHistogram())
+    histogram.record(seconds)
+    if _sinks:
+        _emit({"type": "span", "name": name, "labels": labels, "seconds": seconds, "time": time.time()})
+
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: dict):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = self.labels
+        if exc_type is not None:
+            labels = {**labels, "error": exc_type.__name__}
+        record_span(self.name, time.perf_counter() - self.start, **labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **labels):
+    """Context manager timing a block as name{labels}.
+
+    A block that raises is recorded with an extra 'error' label holding the
+    exception type, and the exception propagates as usual.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, labels)
+
+
+def timed(name: str, **labels):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def reset():
+    """Forget every counter and timing."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+
+def snapshot() -> dict:
+    """Current aggregates.
+
+    Returns:
+        Dict with 'counters', a list of {name, labels, value}, and 'spans', a
+        list of {name, labels} plus the LatencyHistogram.summary() fields
+        and total_s, the summed duration in seconds.
+    """
+    with _lock:
+        counters = list(_counters.items())
+        timings = list(_timings.items())
+    return {
+        "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters],
+        "spans": [
+            {"name": name, "labels": dict(labels), "total_s": histogram.total, **histogram.summary()}
+            for (name, labels), histogram in timings
+        ],
+    }
+
+
+def flush():
+    """Hand the current snapshot to every sink (e.g. to rewrite a Prometheus file)."""
+    current = snapshot()
+    for sink in _sinks:
+        sink.flush(current)
+
+
+# ── Prometheus text format ────────────────────────────────────────────────────
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{_metric_name(k)}="{_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(current: dict = None) -> str:
+    """Render a snapshot in the Prometheus text exposition format.
+
+    Counters become '<name>_total' counters. Spans become '<name>_seconds'
+    summaries with 0.5, 0.9 and 0.99 quantiles, _sum and _count.
+    """
+    current = snapshot() if current is None else current
+    lines = []
+    seen = set()
+    for counter in sorted(current["counters"], key=lambda c: c["name"]):
+        metric = _metric_name(counter["name"]) + "_total"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_label_text(counter['labels'])} {counter['value']}")
+    for timing in sorted(current["spans"], key=lambda s: s["name"]):
+        metric = _metric_name(timing["name"]) + "_seconds"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} summary")
+            seen.add(metric)
+        for quantile, field in (("0.5", "p50_ms"), ("0.9", "p90_ms"), ("0.99", "p99_ms")):
+            lines.append(f"{metric}{_label_text(timing['labels'], quantile=quantile)} {timing[field] / 1e3:.9g}")
+        lines.append(f"{metric}_sum{_label_text(timing['labels'])} {timing['total_s']:.9g}")
+        lines.append(f"{metric}_count{_label_text(timing['labels'])} {timing['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# ── Sinks ─────────────────────────────────────────────────────────────────────
+
+class InMemorySink:
+    """Keeps every event, and the last flushed snapshot, in lists. Handy in tests."""
+
+    def __init__(self):
+        self.events = []
+        self.snapshots = []
+
+    def emit(self, event: dict):
+        self.events.append(event)
+
+    def flush(self, current: dict):
+        self.snapshots.append(current)
+
+
+class JsonLinesSink:
+    """Appends each event, and each flushed snapshot, to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, event: dict):
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self, current: dict):
+        line = json.dumps({"type": "snapshot", "time": time.time(), **current}, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusTextSink:
+    """Rewrites a Prometheus text file on every flush, e.g. for node_exporter's textfile collector.
+
+    Individual events are ignored; only the aggregates are written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, event: dict):
+        pass
+
+    def flush(self, current: dict):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(prometheus_text(current))
+        os.replace(tmp, self.path)
+
+
+# ── Profiling ─────────────────────────────────────────────────────────────────
+
+PROFILERS = ("cprofile", "sampling")
+
+
+class Profile:
+    """Result of profile(): call report() for a text summary of where time went."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.stats = None      # pstats.Stats, for kind="cprofile"
+        self.samples = 0       # for kind="sampling"
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+
+    def report(self, limit: int = 20) -> str:
+        if self.kind == "cprofile":
+            out = io.StringIO()
+            self.stats.stream = out
+            self.stats.sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        lines = [f"{self.samples} samples", f"{'self %':>7} {'total %':>8}  function"]
+        for frame, hits in self.total_counts.most_common(limit):
+            lines.append(
+                f"{100 * self.self_counts[frame] / max(self.samples, 1):>6.1f}% "
+                f"{100 * hits / max(self.samples, 1):>7.1f}%  {frame}"
+            )
+        return "\n".join(lines)
+
+
+def _sample(profile: Profile, thread_id: int, interval: float, stop: threading.Event):
+    # Walk the target thread's stack every interval seconds. Each function on
+    # the stack gets a 'total' hit; the innermost one also gets a 'self' hit.
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        profile.samples += 1
+        seen = set()
+        leaf = True
+        while frame is not None:
+            code = frame.f_code
+            name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            if leaf:
+                profile.self_counts[name] += 1
+                leaf = False
+            if name not in seen:
+                profile.total_counts[name] += 1
+                seen.add(name)
+            frame = frame.f_back
+
+
+@contextmanager
+def profile(kind: str = "cprofile", interval: float = 0.005):
+    """Profile the enclosed block.
+
+    Args:
+        kind: "cprofile" for deterministic per-call timing (higher overhead),
+              or "sampling" to snapshot the calling thread's stack every
+              interval seconds from a background thread (low overhead,
+              statistical).
+        interval: Seconds between samples for kind="sampling".
+
+    Yields:
+        A Profile, filled in when the block exits.
+
+    Raises:
+        ValueError: If kind is unknown.
+    """
+    if kind not in PROFILERS:
+        raise ValueError(f"Unknown profiler {kind!r}; expected one of {PROFILERS}.")
+    result = Profile(kind)
+    if kind == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result.stats = pstats.Stats(profiler)
+        return
+
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sample, args=(result, threading.get_ident(), interval, stop), daemon=True
+    )
+    sampler.start()
+    try:
+        yield result
+    finally:
+        stop.set()
+        sampler.join()
+
+
+def profile_call(fn, *args, profiler: str = None, **kwargs):
+    """Call fn(*args, **kwargs), profiling this one call if profiler is set.
+
+    Returns:
+        (result, Profile) when profiler is "cprofile" or "sampling", or
+        (result, None) when profiler is None.
+    """
+    if profiler is None:
+        return fn(*args, **kwargs), None
+    with profile(profiler) as result:
+        value = fn(*args, **kwargs)
+    return value, result
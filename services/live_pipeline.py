@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+
+from services import instrumentation
+from services.resampling import bucket_bounds
+from services.ring_buffers import TickerRingBuffer
+from services.streaming_indicators import StreamingFeatureEngine
+
+# Ring-buffer records. Timestamps are UTC epoch nanoseconds.
+BAR_RECORD = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+TRADE_RECORD = np.dtype([("timestamp", "<i8"), ("price", "<f8"), ("size", "<f8")])
+QUOTE_RECORD = np.dtype([
+    ("timestamp", "<i8"),
+    ("bid_price", "<f8"),
+    ("bid_size", "<f8"),
+    ("ask_price", "<f8"),
+    ("ask_size", "<f8"),
+])
+
+_MINUTE_NS = 60 * 1_000_000_000
+# Open bar state: [start, end, open, high, low, close, volume]
+_START, _END, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(7)
+
+
+def _records(dtype: np.dtype, columns: dict) -> np.ndarray:
+    records = np.empty(len(columns["timestamp"]), dtype=dtype)
+    for name in dtype.names:
+        records[name] = columns[name]
+    return records
+
+
+class LivePipeline:
+    """Turns batches of streamed minute bars, trades and quotes into live features.
+
+    Each process() call takes one decoded batch (see
+    external.stream_messages.events_to_columns) for any number of tickers:
+
+    - Minute bars, trades and quotes are appended to per-ticker ring buffers
+      (TickerRingBuffer), a few vectorised writes per batch.
+    - Minute bars are folded into timeframe bars, bucketed by the session
+      calendar as resample_many does. Every bar that closes feeds the
+      ticker's StreamingFeatureEngine, and each new feature row goes to the
+      screener and on_features. With timeframe="1min" every streamed bar
+      closes at once.
+    - A bar closes when its last minute arrives, when a later minute of the
+      same ticker arrives, or when any ticker's minute bar starts at or after
+      its end. So a quiet ticker's bar closes about a minute late at most,
+      without waiting for its next trade.
+
+    Minute bars at or before a ticker's latest one are ignored as duplicates,
+    and so are any that arrive after their bar has closed.
+
+    Args:
+        timeframe: Bar size the features are computed on, e.g. "1min",
+                   "5min" or "1h".
+        session: "extended" or "regular", as for resample_many.
+        anchor: "clock" or "session", as for resample_many.
+        screener: Optional Screener; each new feature row updates it.
+        on_features: Optional callable(ticker, timestamp, row) for each new
+                     feature row, e.g. one that forwards the row to
+                     PredictionService.update_row.
+        feature_params: StreamingFeatureEngine keyword arguments.
+        bar_capacity: Minute and timeframe bars kept per ticker.
+        trade_capacity: Trades kept per ticker.
+        quote_capacity: Quotes kept per ticker.
+    """
+
+    def __init__(
+        self,
+        timeframe: str = "1min",
+        session: str = "extended",
+        anchor: str = "clock",
+        screener=None,
+        on_features=None,
+        feature_params: dict = None,
+        bar_capacity: int = 390,
+        trade_capacity: int = 256,
+        quote_capacity: int = 64,
+    ):
+        bucket_bounds(np.empty(0, dtype=np.int64), timeframe, session, anchor)
+        self.timeframe = timeframe
+        self.session = session
+        self.anchor = anchor
+        self.screener = screener
+        self.on_features = on_features
+        self.feature_params = feature_params or {}
+        self.minute_bars = TickerRingBuffer(BAR_RECORD, bar_capacity)
+        self.bars = TickerRingBuffer(BAR_RECORD, bar_capacity)
+        self.trades = TickerRingBuffer(TRADE_RECORD, trade_capacity)
+        self.quotes = TickerRingBuffer(QUOTE_RECORD, quote_capacity)
+        self.features = {}
+        self._engines = {}
+        self._open = {}
+        self._last = {}
+        self._closed = {}
+        self._horizon = None
+        self.counts = {"minute_bars": 0, "trades": 0, "quotes": 0, "bars": 0, "feature_rows": 0}
+
+    def prime(self, ohlcv_by_ticker: dict):
+        """Warm up each ticker's feature engine from stored bars of this timeframe.
+
+        Without history a ticker needs ~35 bars before its first feature row.
+        See StreamingFeatureEngine.prime.
+        """
+        for ticker, ohlcv in ohlcv_by_ticker.items():
+            engine = StreamingFeatureEngine(**self.feature_params)
+            engine.prime(ohlcv)
+            self._engines[ticker] = engine
+
+    def process(self, batch: dict) -> dict:
+        """Fold in one decoded batch.
+
+        Returns:
+            {ticker: latest feature row} for every ticker that produced a new
+            row in this batch.
+        """
+        with instrumentation.span("stream_pipeline", stage="buffers"):
+            bars, trades, quotes = batch["AM"], batch["T"], batch["Q"]
+            self.minute_bars.extend(bars["ticker"], _records(BAR_RECORD, bars))
+            self.trades.extend(trades["ticker"], _records(TRADE_RECORD, trades))
+            self.quotes.extend(quotes["ticker"], _records(QUOTE_RECORD, quotes))
+        for name, columns in (("minute_bars", bars), ("trades", trades), ("quotes", quotes)):
+            self.counts[name] += len(columns["ticker"])
+            instrumentation.count("stream_events", len(columns["ticker"]), kind=name)
+
+        with instrumentation.span("stream_pipeline", stage="bars"):
+            closed = self._fold(bars)
+        with instrumentation.span("stream_pipeline", stage="features"):
+            return self._close(closed)
+
+    def advance(self, timestamp) -> dict:
+        """Close every open bar that ends at or before timestamp, e.g. at the session close.
+
+        Returns:
+            {ticker: latest feature row} for the tickers that produced one.
+        """
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize("UTC") if ts.tz is None else ts
+        return self._close(self._expire(ts.value))
+
+    def quote_frame(self) -> pd.DataFrame:
+        """Latest quote of every ticker: ticker, UTC timestamp, bid/ask prices and sizes."""
+        df = pd.DataFrame(self.quotes.latest())
+        df.insert(0, "ticker", self.quotes.tickers)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ns", utc=True)
+        return df
+
+    def feature_frame(self) -> pd.DataFrame:
+        """Latest feature row of every ticker that has one, indexed by ticker."""
+        return pd.DataFrame.from_dict(self.features, orient="index")
+
+    def _fold(self, bars: dict) -> list:
+        # Merge minute bars into open timeframe bars. Returns the closed bars
+        # as (ticker, state) pairs, in time order per ticker.
+        closed = []
+        n = len(bars["ticker"])
+        if n:
+            timestamp = bars["timestamp"]
+            start, end, in_session = bucket_bounds(timestamp, self.timeframe, self.session, self.anchor)
+            order = np.argsort(timestamp, kind="stable")
+            order = order[in_session[order]]
+            columns = [bars[name][order].tolist() for name in ("open", "high", "low", "close", "volume")]
+            rows = zip(bars["ticker"][order].tolist(), timestamp[order].tolist(), start[order].tolist(),
+                       end[order].tolist(), *columns)
+            for ticker, ts, bucket_start, bucket_end, open_, high, low, close, volume in rows:
+                last = self._last.get(ticker)
+                if last is not None and ts <= last or ts < self._closed.get(ticker, ts):
+                    continue
+                self._last[ticker] = ts
+                bar = self._open.get(ticker)
+                if bar is not None and bar[_START] == bucket_start:
+                    bar[_HIGH] = max(bar[_HIGH], high)
+                    bar[_LOW] = min(bar[_LOW], low)
+                    bar[_CLOSE] = close
+                    bar[_VOLUME] += volume
+                else:
+                    if bar is not None:
+                        closed.append((ticker, bar))
+                    bar = [bucket_start, bucket_end, open_, high, low, close, volume]
+                    self._open[ticker] = bar
+                if ts + _MINUTE_NS >= bar[_END]:
+                    closed.append((ticker, self._open.pop(ticker)))
+            if len(order):
+                # A minute bar is sent once its minute has ended, so every
+                # bucket ending by the newest bar's start is complete.
+                closed.extend(self._expire(int(timestamp[order[-1]])))
+        return closed
+
+    def _expire(self, horizon: int) -> list:
+        # Close the open bars that end by horizon; only scans when the clock moves.
+        if self._horizon is not None and horizon <= self._horizon:
+            return []
+        self._horizon = horizon
+        done = [ticker for ticker, bar in self._open.items() if bar[_END] <= horizon]
+        return [(ticker, self._open.pop(ticker)) for ticker in done]
+
+    def _close(self, closed: list) -> dict:
+        # Store closed bars, then run them through the feature engines.
+        if not closed:
+            return {}
+        tickers = np.array([ticker for ticker, _ in closed], dtype=object)
+        records = np.array([tuple(bar[:_END] + bar[_OPEN:]) for _, bar in closed], dtype=BAR_RECORD)
+        self.bars.extend(tickers, records)
+        self.counts["bars"] += len(closed)
+        instrumentation.count("stream_bars_closed", len(closed), timeframe=self.timeframe)
+
+        updated = {}
+        for ticker, bar in closed:
+            self._closed[ticker] = bar[_END]
+            engine = self._engines.get(ticker)
+            if engine is None:
+                engine = self._engines[ticker] = StreamingFeatureEngine(**self.feature_params)
+            timestamp = pd.Timestamp(bar[_START], tz="UTC")
+            row = engine.update(timestamp, *bar[_OPEN:])
+            if row is None:
+                continue
+            self.features[ticker] = updated[ticker] = row
+            self.counts["feature_rows"] += 1
+            if self.screener is not None:
+                self.screener.update(ticker, row)
+            if self.on_features is not None:
+                self.on_features(ticker, timestamp, row)
+        return updated
@@ -0,0 +1,119 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+MARKET_TZ = "America/New_York"
+
+# (open, close) of each session in minutes after midnight, exchange time.
+SESSIONS = {
+    "regular": (9 * 60 + 30, 16 * 60),
+    "extended": (4 * 60, 20 * 60),
+}
+
+# Close on early-close days (July 3, day after Thanksgiving, Christmas Eve).
+EARLY_CLOSE = {
+    "regular": 13 * 60,
+    "extended": 17 * 60,
+}
+
+_DAY_NS = 86_400 * 1_000_000_000
+_MINUTE_NS = 60 * 1_000_000_000
+
+
+class MarketHolidays(AbstractHolidayCalendar):
+    """NYSE full-day closures.
+
+    A holiday on a Saturday is observed the Friday before and one on a
+    Sunday the Monday after, except New Year's Day, which is never moved
+    back into the previous year.
+    """
+
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+def trading_days(start, end) -> tuple:
+    """Weekdays from start to end that the exchange is open, and which close early.
+
+    Early closes are the day after Thanksgiving, Christmas Eve and July 3
+    when they are trading days; July 3 only when July 4 falls on a weekday
+    too (a Friday July 3 is the observed holiday instead).
+
+    Returns:
+        (DatetimeIndex of naive dates, boolean array of early closes).
+    """
+    days = pd.bdate_range(start, end)
+    days = days[~days.isin(MarketHolidays().holidays(start, end))]
+    thanksgiving = USThanksgivingDay.dates(start, pd.Timestamp(end) + pd.Timedelta(days=1))
+    early = (
+        days.isin(thanksgiving + pd.Timedelta(days=1))
+        | ((days.month == 12) & (days.day == 24))
+        | ((days.month == 7) & (days.day == 3) & (days.weekday < 4))
+    )
+    return days, np.asarray(early)
+
+
+@lru_cache(maxsize=None)
+def _early_closes(year: int) -> np.ndarray:
+    # Early-close dates of one year as naive-midnight epoch ns.
+    days, early = trading_days(f"{year}-01-01", f"{year}-12-31")
+    return days[early].values.astype("datetime64[ns]").astype(np.int64)
+
+
+def session_clock(timestamp_ns: np.ndarray, session: str = "extended") -> dict:
+    """Exchange-time position of UTC epoch-nanosecond timestamps, computed in one pass.
+
+    Returns:
+        Dict of int64 arrays: 'offset' (exchange wall clock minus UTC, in ns),
+        'day' (exchange-time midnight, as naive wall-clock ns), 'minute'
+        (minutes after that midnight), 'open' and 'close' (the session's
+        bounds that day, in minutes), and a boolean 'in_session'.
+
+    Raises:
+        ValueError: If session is not "regular" or "extended".
+    """
+    if session not in SESSIONS:
+        raise ValueError(f"Unknown session {session!r}; expected one of {sorted(SESSIONS)}.")
+    timestamp_ns = np.asarray(timestamp_ns, dtype=np.int64)
+    utc = pd.DatetimeIndex(timestamp_ns.astype("datetime64[ns]")).tz_localize("UTC")
+    local = utc.tz_convert(MARKET_TZ).tz_localize(None).values.astype("datetime64[ns]").astype(np.int64)
+    day = local // _DAY_NS * _DAY_NS
+    minute = (local - day) // _MINUTE_NS
+
+    open_, close = SESSIONS[session]
+    close = np.full(len(day), close, dtype=np.int64)
+    if len(day):
+        years = range(pd.Timestamp(day.min()).year, pd.Timestamp(day.max()).year + 1)
+        early_days = np.concatenate([_early_closes(year) for year in years])
+        close[np.isin(day, early_days)] = EARLY_CLOSE[session]
+    return {
+        "offset": local - timestamp_ns,
+        "day": day,
+        "minute": minute,
+        "open": np.full(len(day), open_, dtype=np.int64),
+        "close": close,
+        "in_session": (minute >= open_) & (minute < close),
+    }
@@ -0,0 +1,281 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from services.feature_engineering import _compact_columns, _epoch_ms, feature_columns
+
+_PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Shared-memory layout, per row: input int64 ns timestamp + five float64 prices;
+# output float32 features + int64 ms timestamp + int8 direction.
+_INPUT_ROW_BYTES = 8 + 5 * 8
+
+
+def _output_row_bytes(n_features: int) -> int:
+    return 4 * n_features + 8 + 1
+
+
+def _input_views(buf, n_rows: int) -> dict:
+    return {
+        "timestamp": np.ndarray((n_rows,), dtype=np.int64, buffer=buf),
+        "prices": np.ndarray((5, n_rows), dtype=np.float64, buffer=buf, offset=8 * n_rows),
+    }
+
+
+def _output_views(buf, n_rows: int, n_features: int) -> dict:
+    # Features are stored (feature, row), the block layout of a compact
+    # DataFrame, so each ticker's slice becomes a frame with one copy.
+    offset = 4 * n_features * n_rows
+    return {
+        "features": np.ndarray((n_features, n_rows), dtype=np.float32, buffer=buf),
+        "timestamp": np.ndarray((n_rows,), dtype=np.int64, buffer=buf, offset=offset),
+        "direction": np.ndarray((n_rows,), dtype=np.int8, buffer=buf, offset=offset + 8 * n_rows),
+    }
+
+
+def _build_span(inputs: dict, outputs: dict, start: int, stop: int, tz, params: dict) -> int:
+    # Build one ticker's bars [start, stop) and write its feature rows to the
+    # output from row start on. There are never more output rows than input
+    # rows, so every ticker's slot is its own input span.
+    timestamp = pd.to_datetime(inputs["timestamp"][start:stop], unit="ns", utc=True)
+    timestamp = timestamp.tz_convert(tz) if tz is not None else timestamp.tz_localize(None)
+    prices = inputs["prices"][:, start:stop]
+    ohlcv = pd.DataFrame({"timestamp": timestamp, **dict(zip(_PRICE_COLUMNS, prices))})
+
+    columns, direction, rows, n = _compact_columns(ohlcv, **params)
+    features = outputs["features"]
+    for i, values in enumerate(columns.values()):
+        features[i, start:start + n] = values[rows]
+    outputs["timestamp"][start:start + n] = _epoch_ms(ohlcv["timestamp"])[rows]
+    outputs["direction"][start:start + n] = direction[rows]
+    return n
+
+
+def _build_spans(input_buf, output_buf, n_rows: int, n_features: int, spans: list, tz, params: dict) -> list:
+    inputs = _input_views(input_buf, n_rows)
+    outputs = _output_views(output_buf, n_rows, n_features)
+    return [_build_span(inputs, outputs, start, stop, tz, params) for start, stop in spans]
+
+
+def _build_task(input_name: str, output_name: str, n_rows: int, n_features: int, spans: list, tz, params: dict) -> list:
+    # Worker entry point: attach to the wave's shared segments by name, build
+    # every span in the task, and return only the output row counts.
+    source = shared_memory.SharedMemory(name=input_name)
+    target = shared_memory.SharedMemory(name=output_name)
+    try:
+        return _build_spans(source.buf, target.buf, n_rows, n_features, spans, tz, params)
+    finally:
+        _close(source, target)
+
+
+def _close(*segments):
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            # An exception traceback still holds views into the segment. The
+            # mapping is released when they are garbage collected.
+            pass
+
+
+def _split_input(ohlcv_by_ticker) -> tuple:
+    # (tickers, [(timestamp ns, prices (5, n)), ...], tz) from a dict of
+    # per-ticker frames or one long frame with a 'ticker' column. Every
+    # ticker must share one timezone (or all be naive): the features of all
+    # of them are computed and returned in it.
+    if isinstance(ohlcv_by_ticker, pd.DataFrame):
+        codes, tickers = pd.factorize(ohlcv_by_ticker["ticker"])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(tickers)))])
+        frames = [ohlcv_by_ticker.iloc[order[bounds[i]:bounds[i + 1]]] for i in range(len(tickers))]
+        tickers = list(tickers)
+    else:
+        tickers = list(ohlcv_by_ticker)
+        frames = [ohlcv_by_ticker[t] for t in tickers]
+
+    tz = None
+    series = []
+    for i, df in enumerate(frames):
+        ts = pd.DatetimeIndex(df["timestamp"])
+        if i == 0:
+            tz = ts.tz
+        elif str(ts.tz) != str(tz):
+            raise ValueError(
+                f"Ticker {tickers[i]} has timestamps in {ts.tz}, but {tickers[0]} has them in {tz}; "
+                "convert every ticker to one timezone first."
+            )
+        if ts.tz is not None:
+            ts = ts.tz_convert(None)
+        prices = np.stack([df[column].to_numpy(dtype=np.float64) for column in _PRICE_COLUMNS])
+        series.append((ts.values.astype("datetime64[ns]").astype(np.int64), prices))
+    return tickers, series, tz
+
+
+def _plan_waves(lengths: list, max_rows: int) -> list:
+    # Consecutive groups of tickers holding at most max_rows bars in total.
+    # A single ticker longer than max_rows forms a wave of its own.
+    waves, current, rows = [], [], 0
+    for i, n in enumerate(lengths):
+        if current and rows + n > max_rows:
+            waves.append(current)
+            current, rows = [], 0
+        current.append(i)
+        rows += n
+    if current:
+        waves.append(current)
+    return waves
+
+
+def _plan_tasks(spans: list, n_tasks: int) -> list:
+    # Split a wave's spans into about n_tasks consecutive groups of similar row counts.
+    total = spans[-1][1] - spans[0][0]
+    target = max(1, total // n_tasks)
+    tasks, current, rows = [], [], 0
+    for start, stop in spans:
+        current.append((start, stop))
+        rows += stop - start
+        if rows >= target:
+            tasks.append(current)
+            current, rows = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+def build_feature_matrices_parallel(
+    ohlcv_by_ticker,
+    max_workers: int = None,
+    max_rows: int = 5_000_000,
+    tasks_per_worker: int = 4,
+    **params,
+) -> dict:
+    """Build compact feature matrices for a universe of tickers on several processes.
+
+    Tickers are sharded across a process pool. Bars are copied once into a
+    shared-memory segment (multiprocessing.shared_memory) that every worker
+    reads in place, and workers write their feature rows straight into a
+    preallocated shared output segment. Only ticker offsets and row counts
+    are pickled. Each ticker is built exactly as build_feature_matrix(ohlcv,
+    compact=True, **params) would build it.
+
+    Memory stays bounded by processing the universe in waves of at most
+    max_rows bars. Each wave has its own input and output segments, which are
+    copied into the result frames and released before the next wave.
+
+    Args:
+        ohlcv_by_ticker: {ticker: DataFrame with columns [timestamp, open,
+                         high, low, close, volume]}, or one long DataFrame
+                         with a 'ticker' column as for
+                         build_panel_feature_matrix. All tickers must share
+                         one timezone (or all be naive).
+        max_workers: Worker processes. None uses every CPU; 1 builds in this
+                     process, with no pool or shared memory.
+        max_rows: Most bars held in shared memory at once. A wave uses about
+                  (48 + 4 * n_features + 9) bytes per bar, roughly 130 bytes
+                  with the default features.
+        tasks_per_worker: Tasks each wave is split into per worker, so a
+                          slow shard does not leave other workers idle.
+        **params: build_feature_matrix indicator keyword arguments
+                  (rsi_period, macd_fast, ..., engine).
+
+    Returns:
+        {ticker: compact feature DataFrame}, in input order: int64 epoch-ms
+        'timestamp', float32 features and int8 'direction'.
+
+    Raises:
+        ValueError: If there are no tickers, tickers' timestamps are in
+                    different timezones, or any ticker has too few rows for
+                    warm-up.
+    """
+    tickers, series, tz = _split_input(ohlcv_by_ticker)
+    if not tickers:
+        raise ValueError("No tickers provided.")
+
+    lag_periods = params.get("lag_periods")
+    columns = feature_columns(lag_periods)
+    min_rows = (
+        params.get("macd_slow", 26) + params.get("macd_signal", 9)
+        + max(lag_periods or [1, 2, 3, 4, 5])
+    )
+    short = [str(t) for t, (timestamp, _) in zip(tickers, series) if len(timestamp) < min_rows]
+    if short:
+        raise ValueError(
+            f"Insufficient data for {len(short)} ticker(s) "
+            f"({', '.join(short[:5])}{', ...' if len(short) > 5 else ''}): "
+            f"need at least {min_rows} rows each for indicator warm-up."
+        )
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    lengths = [len(timestamp) for timestamp, _ in series]
+    results = {}
+    pool = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    try:
+        for wave in _plan_waves(lengths, max_rows):
+            results.update(_run_wave([tickers[i] for i in wave], [series[i] for i in wave],
+                                     columns, tz, params, pool, max_workers * tasks_per_worker))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def _run_wave(tickers: list, series: list, columns: list, tz, params: dict, pool, n_tasks: int) -> dict:
+    n_rows = sum(len(timestamp) for timestamp, _ in series)
+    n_features = len(columns)
+    offsets = np.concatenate([[0], np.cumsum([len(timestamp) for timestamp, _ in series])])
+    spans = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+
+    if pool is None:
+        inputs = {"timestamp": np.empty(n_rows, dtype=np.int64), "prices": np.empty((5, n_rows))}
+        outputs = {
+            "features": np.empty((n_features, n_rows), dtype=np.float32),
+            "timestamp": np.empty(n_rows, dtype=np.int64),
+            "direction": np.empty(n_rows, dtype=np.int8),
+        }
+        _pack(inputs, series, spans)
+        counts = [_build_span(inputs, outputs, start, stop, tz, params) for start, stop in spans]
+        return _unpack(tickers, outputs, spans, counts, columns)
+
+    source = shared_memory.SharedMemory(create=True, size=max(1, _INPUT_ROW_BYTES * n_rows))
+    try:
+        target = shared_memory.SharedMemory(create=True, size=max(1, _output_row_bytes(n_features) * n_rows))
+    except BaseException:
+        _close(source)
+        source.unlink()
+        raise
+    try:
+        # Views are never bound to a local here, so the segments can be
+        # closed as soon as the helpers return.
+        _pack(_input_views(source.buf, n_rows), series, spans)
+        futures = [
+            pool.submit(_build_task, source.name, target.name, n_rows, n_features, task, tz, params)
+            for task in _plan_tasks(spans, n_tasks)
+        ]
+        counts = [n for future in futures for n in future.result()]
+        return _unpack(tickers, _output_views(target.buf, n_rows, n_features), spans, counts, columns)
+    finally:
+        _close(source, target)
+        source.unlink()
+        target.unlink()
+
+
+def _pack(inputs: dict, series: list, spans: list):
+    for (start, stop), (timestamp, prices) in zip(spans, series):
+        inputs["timestamp"][start:stop] = timestamp
+        inputs["prices"][:, start:stop] = prices
+
+
+def _unpack(tickers: list, outputs: dict, spans: list, counts: list, columns: list) -> dict:
+    # Copy each ticker's rows out of the (possibly shared) output buffers.
+    result = {}
+    for ticker, (start, _), n in zip(tickers, spans, counts):
+        block = np.array(outputs["features"][:, start:start + n])
+        df = pd.DataFrame(block.T, columns=columns, copy=False)
+        df.insert(0, "timestamp", outputs["timestamp"][start:start + n].copy())
+        df["direction"] = outputs["direction"][start:start + n].copy()
+        result[ticker] = df
+    return result
@@ -0,0 +1,366 @@
+import asyncio
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from services.feature_engineering import feature_columns
+from services.instrumentation import LatencyHistogram
+from services.screener import latest_rows
+from services.streaming_indicators import StreamingFeatureEngine
+
+# Model inputs, in order: every build_feature_matrix column except the label,
+# with the default lag_periods. This is also the column order of
+# stack_feature_matrices, so models fitted by run_walk_forward fit here.
+FEATURE_COLUMNS = feature_columns()
+
+_BAR_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def load_models(model_dir: str) -> dict:
+    """Unpickle every *.pkl file in model_dir, keyed by file name without the extension.
+
+    A model is any object with predict(X), e.g. a fitted scikit-learn
+    estimator saved with pickle.dump. Only load files you trust.
+    """
+    models = {}
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith(".pkl"):
+            with open(os.path.join(model_dir, name), "rb") as f:
+                models[name[:-len(".pkl")]] = pickle.load(f)
+    return models
+
+
+# ── Histograms ────────────────────────────────────────────────────────────────
+
+class BatchSizeHistogram:
+    """Counts of batch sizes from 1 to max_size."""
+
+    def __init__(self, max_size: int):
+        self.counts = np.zeros(max_size + 1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def record(self, size: int):
+        with self._lock:
+            self.counts[min(size, len(self.counts) - 1)] += 1
+
+    def summary(self) -> dict:
+        """Number of batches, mean size, p50 / p99 size and the largest batch."""
+        with self._lock:
+            counts = self.counts.copy()
+        batches = int(counts.sum())
+        if batches == 0:
+            return {"batches": 0, "mean": None, "p50": 0, "p99": 0, "max": 0}
+        cumulative = np.cumsum(counts)
+        sizes = np.arange(len(counts))
+        return {
+            "batches": batches,
+            "mean": float((counts * sizes).sum() / batches),
+            "p50": int(np.searchsorted(cumulative, 0.5 * batches)),
+            "p99": int(np.searchsorted(cumulative, 0.99 * batches)),
+            "max": int(np.flatnonzero(counts)[-1]),
+        }
+
+
+# ── Prediction service ────────────────────────────────────────────────────────
+
+class PredictionService:
+    """Serves predictions from warm models over the latest feature row of each ticker.
+
+    Models are loaded once and warmed up with a throwaway predict call, so no
+    request pays for lazy initialisation. The latest feature row of every
+    ticker sits in one (ticker × feature) float64 array, like the Screener's.
+    A prediction for any set of tickers is one row gather and one vectorised
+    predict call per model.
+
+    Latest rows come from build_feature_matrix outputs (load_features), or
+    from bars streamed through a StreamingFeatureEngine per ticker
+    (load_history, then update_bar as each bar closes).
+
+    Args:
+        models: {name: model}, each with predict(X). See load_models.
+        feature_columns: Model input columns, in the order the models were
+                         fitted on. Defaults to FEATURE_COLUMNS.
+        default_model: Model used when a request does not name one. Defaults
+                       to the first model.
+        warm_up: Run each model once on a dummy row at construction.
+        **engine_params: StreamingFeatureEngine parameters for update_bar
+                         (rsi_period, macd_fast, ...).
+
+    Raises:
+        ValueError: If models is empty or default_model is not in it.
+    """
+
+    def __init__(self, models: dict, feature_columns: list = None, default_model: str = None,
+                 warm_up: bool = True, **engine_params):
+        if not models:
+            raise ValueError("No models provided.")
+        self.models = dict(models)
+        self.default_model = default_model or next(iter(self.models))
+        if self.default_model not in self.models:
+            raise ValueError(f"Unknown default model {self.default_model!r}.")
+        self.feature_columns = list(feature_columns or FEATURE_COLUMNS)
+        self.engine_params = engine_params
+
+        self.tickers = []
+        self._rows = {}
+        self._engines = {}
+        self.values = np.empty((0, len(self.feature_columns)))
+        self._size = 0
+        self._lock = threading.Lock()
+        if warm_up:
+            self.warm_up()
+
+    @classmethod
+    def from_dir(cls, model_dir: str, **kwargs) -> "PredictionService":
+        """Load every pickled model in model_dir (see load_models) and warm it up."""
+        return cls(load_models(model_dir), **kwargs)
+
+    def warm_up(self):
+        """Call every model once on a row of zeros."""
+        dummy = np.zeros((1, len(self.feature_columns)))
+        for model in self.models.values():
+            model.predict(dummy)
+
+    # ── latest feature rows ───────────────────────────────────────────────────
+
+    def load_features(self, features):
+        """Store the last row of each ticker's feature matrix.
+
+        Args:
+            features: {ticker: build_feature_matrix DataFrame}, or one long
+                      DataFrame with a 'ticker' column.
+        """
+        rows = latest_rows(features)
+        values = rows[self.feature_columns].to_numpy(dtype=np.float64)
+        with self._lock:
+            for ticker, row in zip(rows.index, values):
+                i = self._position(ticker)
+                self.values[i] = row
+
+    def load_history(self, ohlcv_by_ticker: dict):
+        """Start a streaming feature engine per ticker from its stored bars.
+
+        Each engine is fast-forwarded through the bars (see
+        StreamingFeatureEngine.prime), and the last bar's feature row becomes
+        the ticker's latest row. Follow up with update_bar as new bars close.
+        """
+        for ticker, ohlcv in ohlcv_by_ticker.items():
+            engine = StreamingFeatureEngine(**self.engine_params)
+            engine.prime(ohlcv.iloc[:-1])
+            self._engines[ticker] = engine
+            if len(ohlcv):
+                self._store(ticker, engine.update(*ohlcv.iloc[-1][_BAR_COLUMNS]))
+
+    def update_bar(self, ticker: str, timestamp, open_: float, high: float, low: float, close: float, volume: float):
+        """Feed one closed bar to the ticker's streaming engine and store its feature row.
+
+        A ticker seen for the first time starts a fresh engine, and has no
+        row until the indicators have warmed up.
+        """
+        engine = self._engines.get(ticker)
+        if engine is None:
+            engine = self._engines[ticker] = StreamingFeatureEngine(**self.engine_params)
+        self._store(ticker, engine.update(timestamp, open_, high, low, close, volume))
+
+    def update_row(self, ticker: str, row: dict):
+        """Overwrite one ticker's latest row with a dict of feature values."""
+        self._store(ticker, row)
+
+    def _store(self, ticker: str, row: dict):
+        if row is None:
+            return
+        values = [row[column] for column in self.feature_columns]
+        with self._lock:
+            i = self._position(ticker)
+            self.values[i] = values
+
+    def _position(self, ticker: str) -> int:
+        # Callers hold the lock. Rows grow geometrically, as in Screener.
+        i = self._rows.get(ticker)
+        if i is not None:
+            return i
+        if self._size == len(self.values):
+            grown = np.full((max(16, 2 * len(self.values)), len(self.feature_columns)), np.nan)
+            grown[:self._size] = self.values[:self._size]
+            self.values = grown
+        self.tickers.append(ticker)
+        self._rows[ticker] = self._size
+        self._size += 1
+        return self._size - 1
+
+    # ── prediction ────────────────────────────────────────────────────────────
+
+    def predict_arrays(self, tickers: list, model: str = None) -> tuple:
+        """Predict for a list of tickers with one model call.
+
+        Returns:
+            (known, predictions, probabilities): a boolean mask of the tickers
+            that have a feature row, and float64 arrays aligned with tickers.
+            predictions is NaN for unknown tickers. probabilities is the
+            predict_proba score of the last class (e.g. P(up)), or None if the
+            model has no predict_proba.
+
+        Raises:
+            KeyError: If model is not loaded.
+        """
+        name = model or self.default_model
+        if name not in self.models:
+            raise KeyError(f"Unknown model {name!r}.")
+        estimator = self.models[name]
+        with self._lock:
+            positions = np.fromiter((self._rows.get(t, -1) for t in tickers), dtype=np.int64, count=len(tickers))
+            known = positions >= 0
+            x = self.values[positions[known]]
+
+        predictions = np.full(len(tickers), np.nan)
+        probabilities = None
+        if hasattr(estimator, "predict_proba"):
+            probabilities = np.full(len(tickers), np.nan)
+        if len(x):
+            predictions[known] = estimator.predict(x)
+            if probabilities is not None:
+                probabilities[known] = np.asarray(estimator.predict_proba(x))[:, -1]
+        return known, predictions, probabilities
+
+    def predict(self, tickers: list = None, model: str = None) -> pd.DataFrame:
+        """Batch prediction for a list of tickers, or every ticker with a row.
+
+        Returns:
+            DataFrame with columns [ticker, model, prediction, probability],
+            one row per known ticker, in request order. probability is NaN if
+            the model has no predict_proba.
+        """
+        if tickers is None:
+            with self._lock:
+                tickers = list(self.tickers)
+        known, predictions, probabilities = self.predict_arrays(tickers, model)
+        if probabilities is None:
+            probabilities = np.full(len(tickers), np.nan)
+        return pd.DataFrame({
+            "ticker": np.asarray(tickers, dtype=object)[known],
+            "model": model or self.default_model,
+            "prediction": predictions[known],
+            "probability": probabilities[known],
+        })
+
+
+# ── Micro-batching ────────────────────────────────────────────────────────────
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-ticker requests into vectorised predict calls.
+
+    Requests go onto a queue. A worker thread takes the first waiting
+    request, then keeps collecting until it has max_batch_size requests or
+    max_wait_ms has passed, and answers the batch with one
+    PredictionService.predict_arrays call per model. Under light load a
+    request waits at most max_wait_ms. Under heavy load batches fill up and
+    the per-request model overhead is shared.
+
+    Latency (submit to result), batch size and model call time are kept in
+    histograms; see stats().
+
+    Args:
+        service: The PredictionService to call.
+        max_batch_size: Most requests answered by one predict call.
+        max_wait_ms: Longest the first request of a batch waits for company.
+    """
+
+    def __init__(self, service: PredictionService, max_batch_size: int = 256, max_wait_ms: float = 2.0):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.latency = LatencyHistogram()
+        self.predict_time = LatencyHistogram()
+        self.batch_size = BatchSizeHistogram(max_batch_size)
+        self._queue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, ticker: str, model: str = None) -> Future:
+        """Queue one ticker. The Future resolves to a dict with ticker, model,
+        prediction and probability, or raises KeyError for an unknown ticker
+        or model."""
+        future = Future()
+        self._queue.put((ticker, model, future, time.perf_counter()))
+        return future
+
+    async def predict(self, ticker: str, model: str = None) -> dict:
+        """Awaitable version of submit, for async web handlers."""
+        return await asyncio.wrap_future(self.submit(ticker, model))
+
+    def close(self):
+        """Stop the worker after it answers every request already queued."""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def stats(self) -> dict:
+        return {
+            "latency": self.latency.summary(),
+            "predict_time": self.predict_time.summary(),
+            "batch_size": self.batch_size.summary(),
+        }
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        if batch[0] is _STOP:
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self.batch_size.record(len(batch))
+                self._answer(batch)
+            if stop:
+                return
+
+    def _answer(self, batch: list):
+        by_model = {}
+        for request in batch:
+            by_model.setdefault(request[1], []).append(request)
+        for model, requests in by_model.items():
+            tickers = [request[0] for request in requests]
+            start = time.perf_counter()
+            try:
+                known, predictions, probabilities = self.service.predict_arrays(tickers, model)
+            except Exception as e:
+                for _, _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+            self.predict_time.record(time.perf_counter() - start)
+
+            name = model or self.service.default_model
+            for i, (ticker, _, future, submitted) in enumerate(requests):
+                if known[i]:
+                    future.set_result({
+                        "ticker": ticker,
+                        "model": name,
+                        "prediction": float(predictions[i]),
+                        "probability": None if probabilities is None else float(probabilities[i]),
+                    })
+                else:
+                    future.set_exception(KeyError(f"No features for ticker {ticker!r}."))
+                self.latency.record(time.perf_counter() - submitted)
@@ -0,0 +1,323 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from services.market_calendar import session_clock
+
+ANCHORS = ("clock", "session")
+
+_MINUTE_NS = 60 * 1_000_000_000
+_DAILY = ("1d", "1D", "day")
+_TIMEFRAME = re.compile(r"^(\d+)(min|h)$")
+_UNIT_MINUTES = {"min": 1, "h": 60}
+_BAR_FIELDS = ["timestamp", "end", "open", "high", "low", "close", "volume"]
+
+
+def timeframe_minutes(timeframe: str):
+    """Minutes per bar for an intraday timeframe such as "5min" or "1h", or None for "1d".
+
+    Intraday timeframes are a whole number followed by "min" or "h"; they are
+    parsed here rather than by pd.Timedelta, whose accepted aliases change
+    between pandas versions.
+
+    Raises:
+        ValueError: If timeframe is not in that form or is not under a day.
+    """
+    if timeframe in _DAILY:
+        return None
+    match = _TIMEFRAME.match(timeframe) if isinstance(timeframe, str) else None
+    minutes = int(match.group(1)) * _UNIT_MINUTES[match.group(2)] if match else 0
+    if not 1 <= minutes < 24 * 60:
+        raise ValueError(f"Unsupported timeframe {timeframe!r}; use e.g. '5min', '15min', '1h' or '1d'.")
+    return minutes
+
+
+def _minute_arrays(minute_ohlcv: pd.DataFrame) -> tuple:
+    # (UTC epoch-ns timestamps, {column: float64 array}) in timestamp order.
+    # Naive timestamps are taken to be UTC, as get_hourly_ohlcv returns them.
+    ts = pd.DatetimeIndex(minute_ohlcv["timestamp"])
+    if ts.tz is not None:
+        ts = ts.tz_convert(None)
+    timestamp = ts.values.astype("datetime64[ns]").astype(np.int64)
+    values = {name: minute_ohlcv[name].to_numpy(dtype=np.float64) for name in ["open", "high", "low", "close", "volume"]}
+    if len(timestamp) > 1 and not (timestamp[1:] >= timestamp[:-1]).all():
+        order = np.argsort(timestamp, kind="stable")
+        timestamp = timestamp[order]
+        values = {name: column[order] for name, column in values.items()}
+    return timestamp, values
+
+
+def _buckets(clock: dict, minutes, anchor: str) -> tuple:
+    # (start, end) in UTC epoch ns of the bucket each bar falls in. Clock
+    # buckets line up with the wall clock (an hourly bucket starts on the
+    # hour, as Polygon's hourly aggregates do); session buckets count from
+    # the session open. Buckets never run past the session close, and a
+    # daily bucket starts at exchange-time midnight.
+    minute, open_, close = clock["minute"], clock["open"], clock["close"]
+    if minutes is None:
+        start, end = np.zeros_like(minute), close
+    else:
+        base = 0 if anchor == "clock" else open_
+        start = base + (minute - base) // minutes * minutes
+        end = np.minimum(start + minutes, close)
+    midnight = clock["day"] - clock["offset"]
+    return midnight + start * _MINUTE_NS, midnight + end * _MINUTE_NS
+
+
+def _empty() -> dict:
+    return {field: np.empty(0, dtype=np.int64 if field in ("timestamp", "end") else np.float64)
+            for field in _BAR_FIELDS}
+
+
+def _aggregate(start: np.ndarray, end: np.ndarray, values: dict) -> dict:
+    # One bar per run of equal bucket starts; the input is in time order.
+    if len(start) == 0:
+        return _empty()
+    first = np.flatnonzero(np.r_[True, start[1:] != start[:-1]])
+    last = np.r_[first[1:], len(start)] - 1
+    return {
+        "timestamp": start[first],
+        "end": end[first],
+        "open": values["open"][first],
+        "high": np.maximum.reduceat(values["high"], first),
+        "low": np.minimum.reduceat(values["low"], first),
+        "close": values["close"][last],
+        "volume": np.add.reduceat(values["volume"], first),
+    }
+
+
+def _to_frame(bars: dict, include_end: bool) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(bars["timestamp"], unit="ns", utc=True),
+        "open": bars["open"],
+        "high": bars["high"],
+        "low": bars["low"],
+        "close": bars["close"],
+        "volume": bars["volume"],
+    })
+    if include_end:
+        df["end"] = pd.to_datetime(bars["end"], unit="ns", utc=True)
+    return df
+
+
+def _check(session: str, anchor: str, timeframes) -> dict:
+    if anchor not in ANCHORS:
+        raise ValueError(f"Unknown anchor {anchor!r}; expected one of {ANCHORS}.")
+    session_clock(np.empty(0, dtype=np.int64), session)
+    return {timeframe: timeframe_minutes(timeframe) for timeframe in timeframes}
+
+
+def resample_many(
+    minute_ohlcv: pd.DataFrame,
+    timeframes=("5min", "15min", "1h", "1d"),
+    session: str = "extended",
+    anchor: str = "clock",
+    include_end: bool = False,
+) -> dict:
+    """Build several higher timeframes from one set of minute bars.
+
+    Bars are bucketed by exchange-time session, not UTC: minute bars outside
+    the session are dropped, buckets stop at the session close (13:00 or
+    17:00 on early-close days), and "1d" is one bar per trading session.
+    The exchange-time conversion is done once and shared by every timeframe.
+
+    Args:
+        minute_ohlcv: DataFrame with columns [timestamp, open, high, low,
+                      close, volume], e.g. from get_minute_ohlcv. Each
+                      timestamp is the start of its minute.
+        timeframes: Bar sizes such as "5min", "15min", "1h" or "1d".
+        session: "extended" (04:00-20:00 New York time, as Polygon's
+                 aggregates) or "regular" (09:30-16:00).
+        anchor: "clock" to start buckets on the wall clock (10:00, 11:00,
+                ...), which reproduces Polygon's hourly bars, or "session"
+                to start them at the session open (09:30, 10:30, ...).
+        include_end: Add an 'end' column with each bucket's end time, when
+                     the bar is complete.
+
+    Returns:
+        {timeframe: DataFrame [timestamp, open, high, low, close, volume]}
+        in the get_hourly_ohlcv layout: UTC bucket-start timestamps, oldest
+        first. Buckets with no minute bars are omitted. The last bar may
+        still be filling.
+
+    Raises:
+        ValueError: For an unknown timeframe, session or anchor.
+    """
+    minutes = _check(session, anchor, timeframes)
+    timestamp, values = _minute_arrays(minute_ohlcv)
+    clock = session_clock(timestamp, session)
+    keep = clock["in_session"]
+    if not keep.all():
+        timestamp = timestamp[keep]
+        values = {name: column[keep] for name, column in values.items()}
+        clock = {name: column[keep] for name, column in clock.items()}
+    return {
+        timeframe: _to_frame(_aggregate(*_buckets(clock, minutes[timeframe], anchor), values), include_end)
+        for timeframe in timeframes
+    }
+
+
+def resample_bars(
+    minute_ohlcv: pd.DataFrame,
+    timeframe: str = "1h",
+    session: str = "extended",
+    anchor: str = "clock",
+    include_end: bool = False,
+) -> pd.DataFrame:
+    """Build one higher timeframe from minute bars. See resample_many."""
+    return resample_many(minute_ohlcv, (timeframe,), session, anchor, include_end)[timeframe]
+
+
+def bucket_bounds(timestamp_ns: np.ndarray, timeframe: str, session: str = "extended", anchor: str = "clock") -> tuple:
+    """Bucket each minute bar falls in, for callers that fold bars themselves.
+
+    Uses the same buckets as resample_many, for many tickers' bars at once
+    (e.g. one batch of streamed minute bars).
+
+    Args:
+        timestamp_ns: UTC epoch-nanosecond minute-bar start times, any order.
+
+    Returns:
+        (start, end, in_session): int64 UTC epoch-ns bucket bounds and a
+        boolean mask of the bars inside the session. Bounds of bars outside
+        the session are meaningless.
+
+    Raises:
+        ValueError: For an unknown timeframe, session or anchor.
+    """
+    minutes = _check(session, anchor, (timeframe,))[timeframe]
+    clock = session_clock(timestamp_ns, session)
+    start, end = _buckets(clock, minutes, anchor)
+    return start, end, clock["in_session"]
+
+
+class Resampler:
+    """Incremental counterpart of resample_many, fed minute bars as they arrive.
+
+    Each update() only buckets the new minute bars and merges them into the
+    bar still filling, so its cost does not grow with history. Bars that
+    complete are returned, ready to feed StreamingFeatureEngine.update().
+    A bar completes when a minute bar at or after its end arrives, when the
+    bar's last minute arrives, or when advance() moves the clock past it.
+    Minute bars must arrive in time order; any at or before the latest one
+    already seen are ignored as duplicates.
+
+    Args:
+        timeframes: Bar sizes such as "5min", "15min", "1h" or "1d".
+        session: "extended" or "regular", as for resample_many.
+        anchor: "clock" or "session", as for resample_many.
+    """
+
+    def __init__(self, timeframes=("5min", "15min", "1h", "1d"), session: str = "extended", anchor: str = "clock"):
+        self.minutes = _check(session, anchor, timeframes)
+        self.timeframes = list(timeframes)
+        self.session = session
+        self.anchor = anchor
+        self.last_timestamp = None
+        self._done = {timeframe: [] for timeframe in self.timeframes}
+        self._open = {timeframe: None for timeframe in self.timeframes}
+
+    def update(self, minute_ohlcv: pd.DataFrame) -> dict:
+        """Fold in a DataFrame of new minute bars.
+
+        Returns:
+            {timeframe: DataFrame of the bars completed by this update}.
+        """
+        timestamp, values = _minute_arrays(minute_ohlcv)
+        return self.update_arrays(timestamp, **values)
+
+    def update_bar(self, timestamp, open_: float, high: float, low: float, close: float, volume: float) -> dict:
+        """Fold in one minute bar. Naive timestamps are taken to be UTC."""
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize("UTC") if ts.tz is None else ts
+        return self.update_arrays(
+            np.array([ts.value]), np.array([open_], dtype=np.float64), np.array([high], dtype=np.float64),
+            np.array([low], dtype=np.float64), np.array([close], dtype=np.float64),
+            np.array([volume], dtype=np.float64),
+        )
+
+    def update_arrays(self, timestamp, open, high, low, close, volume) -> dict:
+        """Fold in minute bars given as parallel arrays (timestamps in UTC epoch ns, in order)."""
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+        values = {"open": open, "high": high, "low": low, "close": close, "volume": volume}
+        values = {name: np.asarray(column, dtype=np.float64) for name, column in values.items()}
+        if self.last_timestamp is not None:
+            new = timestamp > self.last_timestamp
+            if not new.all():
+                timestamp = timestamp[new]
+                values = {name: column[new] for name, column in values.items()}
+        if len(timestamp) == 0:
+            return {timeframe: _to_frame(_empty(), False) for timeframe in self.timeframes}
+        self.last_timestamp = int(timestamp[-1])
+
+        clock = session_clock(timestamp, self.session)
+        keep = clock["in_session"]
+        timestamp = timestamp[keep]
+        values = {name: column[keep] for name, column in values.items()}
+        clock = {name: column[keep] for name, column in clock.items()}
+        # Every bucket ending by the end of the newest minute bar is complete.
+        horizon = self.last_timestamp + _MINUTE_NS
+
+        completed = {}
+        for timeframe in self.timeframes:
+            bars = _aggregate(*_buckets(clock, self.minutes[timeframe], self.anchor), values)
+            completed[timeframe] = self._settle(timeframe, self._merge_open(timeframe, bars), horizon)
+        return completed
+
+    def advance(self, timestamp) -> dict:
+        """Complete every bar that ends at or before timestamp, e.g. at the session close.
+
+        Returns:
+            {timeframe: DataFrame of the bars completed}.
+        """
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize("UTC") if ts.tz is None else ts
+        return {
+            timeframe: self._settle(timeframe, self._merge_open(timeframe, None), ts.value)
+            for timeframe in self.timeframes
+        }
+
+    def bars(self, timeframe: str, include_partial: bool = True, include_end: bool = False) -> pd.DataFrame:
+        """Every bar of one timeframe so far, oldest first, in the resample_many layout."""
+        done = self._done[timeframe]
+        if len(done) > 1:
+            done[:] = [{field: np.concatenate([chunk[field] for chunk in done]) for field in _BAR_FIELDS}]
+        chunks = list(done)
+        if include_partial and self._open[timeframe] is not None:
+            chunks.append(self._open[timeframe])
+        if not chunks:
+            return _to_frame(_empty(), include_end)
+        return _to_frame({field: np.concatenate([chunk[field] for chunk in chunks]) for field in _BAR_FIELDS},
+                         include_end)
+
+    def _merge_open(self, timeframe: str, bars) -> dict:
+        # Put the bar still filling in front of the new bars, combining the
+        # two when the first new bar falls in the same bucket.
+        current = self._open[timeframe]
+        self._open[timeframe] = None
+        if bars is None or len(bars["timestamp"]) == 0:
+            return current
+        if current is None:
+            return bars
+        if bars["timestamp"][0] == current["timestamp"][0]:
+            bars["open"][0] = current["open"][0]
+            bars["high"][0] = max(bars["high"][0], current["high"][0])
+            bars["low"][0] = min(bars["low"][0], current["low"][0])
+            bars["volume"][0] += current["volume"][0]
+            return bars
+        return {field: np.concatenate([current[field], bars[field]]) for field in _BAR_FIELDS}
+
+    def _settle(self, timeframe: str, bars, horizon: int) -> pd.DataFrame:
+        # Move the bars ending by horizon to the completed list; at most the
+        # last one stays open.
+        if bars is None:
+            return _to_frame(_empty(), False)
+        n = len(bars["timestamp"])
+        complete = n - 1 + int(bars["end"][-1] <= horizon)
+        if complete < n:
+            self._open[timeframe] = {field: bars[field][complete:] for field in _BAR_FIELDS}
+        done = {field: bars[field][:complete] for field in _BAR_FIELDS}
+        if complete:
+            self._done[timeframe].append(done)
+        return _to_frame(done, False)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+
+class TickerRingBuffer:
+    """The last `capacity` records of every ticker, in one NumPy structured array.
+
+    Each ticker owns one row of a (ticker × capacity) array and writes round
+    it, overwriting its oldest records, so memory stays fixed however long a
+    stream runs. extend() places a whole batch of records for many tickers
+    with one fancy-indexed assignment, so its cost depends on the batch size
+    rather than the number of tickers. Rows are added as new tickers appear,
+    and the array grows geometrically like Screener's.
+
+    Args:
+        dtype: Structured dtype of one record, e.g. a bar or a quote.
+        capacity: Records kept per ticker.
+    """
+
+    def __init__(self, dtype, capacity: int = 256):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.tickers = []
+        self._rows = {}
+        self._index = None
+        self.values = np.zeros((0, capacity), dtype=self.dtype)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._rows
+
+    def rows(self, tickers) -> np.ndarray:
+        """Row index of each ticker, adding a row for each one not seen before."""
+        if self._index is None:
+            self._index = pd.Index(self.tickers)
+        positions = self._index.get_indexer(tickers)
+        for i in np.flatnonzero(positions < 0):
+            row = self._rows.get(tickers[i])
+            positions[i] = self._append(tickers[i]) if row is None else row
+        return positions
+
+    def extend(self, tickers, records: np.ndarray, rows: np.ndarray = None):
+        """Append records, in arrival order within each ticker.
+
+        Args:
+            tickers: Ticker of each record.
+            records: Array of self.dtype.
+            rows: Row indices from rows(tickers), if already known.
+        """
+        if len(records) == 0:
+            return
+        rows = self.rows(tickers) if rows is None else np.asarray(rows)
+        order = np.argsort(rows, kind="stable")
+        rows, records = rows[order], records[order]
+        first = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        run = np.diff(np.r_[first, len(rows)])
+        rank = np.arange(len(rows)) - np.repeat(first, run)
+        # Of more than capacity records for one ticker, only the newest land.
+        keep = rank >= np.repeat(run, run) - self.capacity
+        slots = (self.counts[rows] + rank) % self.capacity
+        self.values[rows[keep], slots[keep]] = records[keep]
+        self.counts[rows[first]] += run
+
+    def get(self, ticker, n: int = None) -> np.ndarray:
+        """A ticker's last n records (all kept ones by default), oldest first."""
+        row = self._rows.get(ticker)
+        if row is None:
+            return np.zeros(0, dtype=self.dtype)
+        count = int(self.counts[row])
+        n = min(count, self.capacity) if n is None else min(n, count, self.capacity)
+        slots = np.arange(count - n, count) % self.capacity
+        return self.values[row, slots]
+
+    def frame(self, ticker, n: int = None) -> pd.DataFrame:
+        """get() as a DataFrame, with an epoch-ns 'timestamp' field as UTC datetimes."""
+        df = pd.DataFrame(self.get(ticker, n))
+        if "timestamp" in df:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ns", utc=True)
+        return df
+
+    def latest(self) -> np.ndarray:
+        """The newest record of every ticker, in self.tickers order."""
+        rows = np.arange(len(self.tickers))
+        return self.values[rows, (self.counts[rows] - 1) % self.capacity]
+
+    def _append(self, ticker) -> int:
+        size = len(self.tickers)
+        if size == len(self.values):
+            grown = np.zeros((max(16, 2 * size), self.capacity), dtype=self.dtype)
+            grown[:size] = self.values
+            self.values = grown
+            counts = np.zeros(len(grown), dtype=np.int64)
+            counts[:size] = self.counts[:size]
+            self.counts = counts
+        self.tickers.append(ticker)
+        self._rows[ticker] = size
+        self._index = None
+        return size
@@ -0,0 +1,227 @@
+import ast
+
+import numpy as np
+import pandas as pd
+
+# Feature-matrix columns the screener keeps per ticker.
+BASE_COLUMNS = [
+    "open", "high", "low", "close", "volume",
+    "rsi", "macd_line", "signal_line", "histogram", "vwap", "atr",
+    "bb_upper", "bb_middle", "bb_lower", "return_lag_1",
+]
+
+# Cross-sectionally comparable columns derived from BASE_COLUMNS.
+DERIVED_COLUMNS = ["vwap_distance", "atr_return", "bb_percent_b"]
+
+# Functions an expression may call.
+EXPRESSION_FUNCTIONS = {
+    "abs": np.abs,
+    "log": np.log,
+    "sqrt": np.sqrt,
+    "sign": np.sign,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "where": np.where,
+    "isnan": np.isnan,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd, ast.Invert,
+    ast.BitAnd, ast.BitOr, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+# Limits that keep any accepted expression cheap to evaluate: numbers are
+# capped in size, and ** only takes a small constant exponent, so nothing
+# like 9**9**9 can tie up a worker.
+MAX_CONSTANT = 1e15
+MAX_EXPONENT = 4
+
+
+def derived_columns(columns: dict) -> dict:
+    """Distance from VWAP, ATR-normalized last return and Bollinger %B.
+
+    vwap_distance: close / vwap - 1.
+    atr_return: last bar's price change in ATRs, (close - previous close) / atr.
+    bb_percent_b: (close - bb_lower) / (bb_upper - bb_lower); 0 at the lower
+                  band, 1 at the upper band.
+    """
+    close = columns["close"]
+    r1 = columns["return_lag_1"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "vwap_distance": close / columns["vwap"] - 1,
+            "atr_return": close * r1 / (1 + r1) / columns["atr"],
+            "bb_percent_b": (close - columns["bb_lower"]) / (columns["bb_upper"] - columns["bb_lower"]),
+        }
+
+
+def _is_number(value) -> bool:
+    # NaN and inf fail the size check too.
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and abs(value) <= MAX_CONSTANT
+
+
+def _is_small_exponent(node: ast.expr) -> bool:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    return isinstance(node, ast.Constant) and _is_number(node.value) and abs(node.value) <= MAX_EXPONENT
+
+
+def compile_expression(expression: str):
+    """Compile a filter or score expression into a function of column arrays.
+
+    Expressions are ordinary arithmetic over column names, e.g.
+    "histogram / atr" or "(rsi < 30) & (volume > 100_000)". Use & and | to
+    combine conditions (not `and`/`or`), since they apply element-wise. Only
+    column names, numbers, operators and EXPRESSION_FUNCTIONS are allowed.
+    Numbers must be finite and at most MAX_CONSTANT in size, and the
+    exponent of ** must be a number of at most MAX_EXPONENT, e.g. "atr ** 2".
+
+    Raises:
+        ValueError: If the expression uses anything else.
+    """
+    tree = ast.parse(expression, mode="eval")
+    allowed_names = set(BASE_COLUMNS) | set(DERIVED_COLUMNS) | set(EXPRESSION_FUNCTIONS)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.BoolOp):
+            raise ValueError(f"Use & and | instead of and/or in {expression!r}.")
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax {type(node).__name__} in {expression!r}.")
+        if isinstance(node, ast.Constant) and not _is_number(node.value):
+            raise ValueError(f"Only finite numbers up to {MAX_CONSTANT:g} are allowed in {expression!r}.")
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) and not _is_small_exponent(node.right):
+            raise ValueError(f"The exponent of ** must be a number up to {MAX_EXPONENT} in {expression!r}.")
+        if isinstance(node, ast.Name) and node.id not in allowed_names:
+            raise ValueError(f"Unknown name {node.id!r} in {expression!r}.")
+        if isinstance(node, ast.Call) and not (
+            isinstance(node.func, ast.Name) and node.func.id in EXPRESSION_FUNCTIONS
+        ):
+            raise ValueError(f"Only {sorted(EXPRESSION_FUNCTIONS)} can be called in {expression!r}.")
+    code = compile(tree, "<screen>", "eval")
+
+    def evaluate(columns: dict):
+        return eval(code, {"__builtins__": {}, **EXPRESSION_FUNCTIONS}, columns)
+
+    evaluate.expression = expression
+    return evaluate
+
+
+def latest_rows(features) -> pd.DataFrame:
+    """Last feature row per ticker, indexed by ticker.
+
+    Args:
+        features: {ticker: build_feature_matrix DataFrame}, or one long
+                  DataFrame with a 'ticker' column (build_panel_feature_matrix).
+    """
+    if isinstance(features, dict):
+        rows = {t: df.iloc[-1] for t, df in features.items() if len(df)}
+        return pd.DataFrame.from_dict(rows, orient="index")
+    return features.groupby("ticker", sort=False).tail(1).set_index("ticker")
+
+
+class Screener:
+    """Ranks a whole universe on its latest feature rows.
+
+    The universe lives in one (ticker × column) float64 array. Updating a
+    ticker overwrites its row in place. rank() evaluates the filters and the
+    score as NumPy expressions over whole columns, then selects the top k
+    with np.argpartition, so only the k winners are sorted.
+
+    Args:
+        score: Expression or callable(columns) -> array to rank by, e.g.
+               "histogram / atr". Callables receive a dict of column arrays
+               (BASE_COLUMNS and DERIVED_COLUMNS).
+        filters: Expressions or callables returning a boolean array. A ticker
+                 must pass all of them.
+        k: Default number of tickers to return.
+        ascending: Rank lowest scores first (e.g. most oversold RSI).
+    """
+
+    def __init__(self, score, filters=(), k: int = 20, ascending: bool = False):
+        self.score = compile_expression(score) if isinstance(score, str) else score
+        self.filters = [compile_expression(f) if isinstance(f, str) else f for f in filters]
+        self.k = k
+        self.ascending = ascending
+        self.tickers = []
+        self._rows = {}
+        self._index = None
+        self.values = np.empty((0, len(BASE_COLUMNS)))
+        self._size = 0
+
+    def load(self, rows: pd.DataFrame):
+        """Replace the universe with a DataFrame of latest rows indexed by ticker (see latest_rows)."""
+        self.tickers = list(rows.index)
+        self._rows = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._index = None
+        self.values = np.ascontiguousarray(rows[BASE_COLUMNS].to_numpy(dtype=np.float64))
+        self._size = len(self.tickers)
+
+    def update(self, ticker: str, row: dict):
+        """Overwrite one ticker's latest row, e.g. a StreamingFeatureEngine.update() result."""
+        i = self._rows.get(ticker)
+        if i is None:
+            i = self._append(ticker)
+        self.values[i] = [row[column] for column in BASE_COLUMNS]
+
+    def update_many(self, rows: pd.DataFrame):
+        """Overwrite the rows of every ticker in a DataFrame indexed by ticker.
+
+        If a ticker appears more than once, its last row wins.
+        """
+        if rows.index.has_duplicates:
+            rows = rows[~rows.index.duplicated(keep="last")]
+        if self._index is None:
+            self._index = pd.Index(self.tickers)
+        positions = self._index.get_indexer(rows.index)
+        for i in np.flatnonzero(positions < 0):
+            positions[i] = self._append(rows.index[i])
+        self.values[positions] = rows[BASE_COLUMNS].to_numpy(dtype=np.float64)
+
+    def columns(self) -> dict:
+        """Column arrays for the current universe, derived columns included."""
+        values = self.values[:self._size]
+        columns = {name: values[:, j] for j, name in enumerate(BASE_COLUMNS)}
+        columns.update(derived_columns(columns))
+        return columns
+
+    def rank(self, k: int = None) -> pd.DataFrame:
+        """Top-k tickers that pass every filter, best first.
+
+        Tickers with a NaN score are never selected.
+
+        Returns:
+            DataFrame with columns [ticker, score, <BASE_COLUMNS>, <DERIVED_COLUMNS>],
+            at most k rows.
+        """
+        k = self.k if k is None else k
+        columns = self.columns()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.asarray(self.score(columns), dtype=np.float64)
+            keep = ~np.isnan(score)
+            for condition in self.filters:
+                keep &= np.asarray(condition(columns), dtype=bool)
+
+        candidates = np.flatnonzero(keep)
+        key = score[candidates] if self.ascending else -score[candidates]
+        if k < len(candidates):
+            part = np.argpartition(key, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        chosen = candidates[part[np.argsort(key[part], kind="stable")]]
+
+        return pd.DataFrame({
+            "ticker": [self.tickers[i] for i in chosen],
+            "score": score[chosen],
+            **{name: values[chosen] for name, values in columns.items()},
+        })
+
+    def _append(self, ticker: str) -> int:
+        # Grow the array geometrically so streaming in new tickers stays cheap.
+        if self._size == len(self.values):
+            grown = np.full((max(16, 2 * len(self.values)), len(BASE_COLUMNS)), np.nan)
+            grown[:self._size] = self.values[:self._size]
+            self.values = grown
+        self.tickers.append(ticker)
+        self._rows[ticker] = self._size
+        self._index = None
+        self._size += 1
+        return self._size - 1
@@ -0,0 +1,294 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+_NAN = float("nan")
+
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+
+class _EwmMean:
+    """One-value-at-a-time Series.ewm(alpha=..., adjust=False).mean().
+
+    Mirrors pandas' recursion exactly, including how it counts observations
+    towards min_periods and decays the old weight across NaN inputs.
+    """
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        self.alpha = alpha
+        self.min_periods = max(min_periods, 1)
+        self.weighted = _NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        is_obs = not _is_nan(value)
+        self.nobs += is_obs
+        if not _is_nan(self.weighted):
+            self.old_wt *= 1 - self.alpha
+            if is_obs:
+                if self.weighted != value:
+                    self.weighted = (
+                        (self.old_wt * self.weighted + self.alpha * value)
+                        / (self.old_wt + self.alpha)
+                    )
+                self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else _NAN
+
+    def prime(self, values: np.ndarray) -> np.ndarray:
+        # Vectorised update() over a whole array, on a fresh instance. Returns
+        # every output and leaves the state as if each value had been fed in.
+        values = np.asarray(values, dtype=np.float64)
+        out = pd.Series(values).ewm(alpha=self.alpha, adjust=False).mean().to_numpy(copy=True)
+        observed = ~np.isnan(values)
+        self.nobs = int(observed.sum())
+        if self.nobs:
+            last_obs = len(values) - 1 - int(np.argmax(observed[::-1]))
+            self.weighted = float(out[-1])
+            self.old_wt = (1 - self.alpha) ** (len(values) - 1 - last_obs)
+        out[np.cumsum(observed) < self.min_periods] = np.nan
+        return out
+
+
+class StreamingRSI:
+    """Bar-by-bar counterpart of compute_rsi."""
+
+    def __init__(self, period: int = 14):
+        self.prev_close = _NAN
+        self._gain = _EwmMean(1.0 / period, period)
+        self._loss = _EwmMean(1.0 / period, period)
+
+    def update(self, close: float) -> float:
+        delta = close - self.prev_close
+        self.prev_close = close
+        avg_gain = self._gain.update(max(delta, 0.0) if not _is_nan(delta) else _NAN)
+        avg_loss = self._loss.update(max(-delta, 0.0) if not _is_nan(delta) else _NAN)
+        if _is_nan(avg_gain) or _is_nan(avg_loss) or avg_loss == 0:
+            return _NAN
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def prime(self, close: np.ndarray):
+        delta = np.diff(close, prepend=self.prev_close)
+        with np.errstate(invalid="ignore"):
+            self._gain.prime(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)))
+            self._loss.prime(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0)))
+        self.prev_close = float(close[-1])
+
+
+class StreamingMACD:
+    """Bar-by-bar counterpart of compute_macd. Returns (macd_line, signal_line, histogram)."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast = _EwmMean(2.0 / (fast + 1))
+        self._slow = _EwmMean(2.0 / (slow + 1))
+        self._signal = _EwmMean(2.0 / (signal + 1))
+
+    def update(self, close: float) -> tuple:
+        macd_line = self._fast.update(close) - self._slow.update(close)
+        signal_line = self._signal.update(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def prime(self, close: np.ndarray):
+        self._signal.prime(self._fast.prime(close) - self._slow.prime(close))
+
+
+class StreamingVWAP:
+    """Bar-by-bar counterpart of compute_vwap. Resets at each new calendar day."""
+
+    def __init__(self):
+        self.session = None
+        self.cumvol = 0.0
+        self.cumtpvol = 0.0
+
+    def update(self, close: float, high: float, low: float, volume: float, timestamp) -> float:
+        session = timestamp.date()
+        if session != self.session:
+            self.session = session
+            self.cumvol = 0.0
+            self.cumtpvol = 0.0
+        self.cumvol += volume
+        self.cumtpvol += (high + low + close) / 3 * volume
+        if self.cumvol == 0:
+            return _NAN
+        return self.cumtpvol / self.cumvol
+
+    def prime(self, close, high, low, volume, timestamp: pd.Series):
+        # Only the last session matters. Its sums are folded left to right,
+        # in the same order update() would add them.
+        timestamp = timestamp.iloc
+        self.session = timestamp[-1].date()
+        start = len(close) - 1
+        while start > 0 and timestamp[start - 1].date() == self.session:
+            start -= 1
+        self.cumvol = 0.0
+        self.cumtpvol = 0.0
+        for i in range(start, len(close)):
+            self.cumvol += volume[i]
+            self.cumtpvol += (high[i] + low[i] + close[i]) / 3 * volume[i]
+
+
+class StreamingATR:
+    """Bar-by-bar counterpart of compute_atr."""
+
+    def __init__(self, period: int = 14):
+        self.prev_close = _NAN
+        self._tr = _EwmMean(1.0 / period, period)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if not _is_nan(self.prev_close):
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        return self._tr.update(tr)
+
+    def prime(self, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        prev_close = np.concatenate([[self.prev_close], close[:-1]])
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        self._tr.prime(tr)
+        self.prev_close = float(close[-1])
+
+
+class StreamingBollingerBands:
+    """Bar-by-bar counterpart of compute_bollinger_bands. Returns (upper, middle, lower).
+
+    Keeps the window in a ring buffer with a sliding-window Welford mean and
+    sum of squared deviations, so each update is O(1).
+    """
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        self.period = period
+        self.num_std = num_std
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, close: float) -> tuple:
+        if len(self.window) < self.period:
+            self.window.append(close)
+            delta = close - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (close - self.mean)
+        else:
+            dropped = self.window[0]
+            self.window.append(close)
+            old_mean = self.mean
+            self.mean += (close - dropped) / self.period
+            self.m2 += (close - dropped) * (close - self.mean + dropped - old_mean)
+        if len(self.window) < self.period:
+            return _NAN, _NAN, _NAN
+        std = math.sqrt(max(self.m2 / self.period, 0.0))
+        return (
+            self.mean + self.num_std * std,
+            self.mean,
+            self.mean - self.num_std * std,
+        )
+
+    def prime(self, close: np.ndarray):
+        self.window.extend(float(c) for c in close[-self.period:])
+        window = np.array(self.window)
+        self.mean = float(window.mean())
+        self.m2 = float(((window - self.mean) ** 2).sum())
+
+
+class StreamingLaggedReturns:
+    """Bar-by-bar counterpart of compute_lagged_returns. Returns {column: value}."""
+
+    def __init__(self, lags: list = None):
+        self.lags = lags if lags is not None else [1, 2, 3, 4, 5]
+        self.closes = deque(maxlen=max(self.lags) + 1)
+
+    def update(self, close: float) -> dict:
+        self.closes.append(close)
+        out = {}
+        for lag in self.lags:
+            if len(self.closes) <= lag:
+                out[f"return_lag_{lag}"] = _NAN
+                continue
+            base = self.closes[-1 - lag]
+            if base == 0:
+                out[f"return_lag_{lag}"] = _NAN if close == 0 else math.copysign(math.inf, close)
+            else:
+                out[f"return_lag_{lag}"] = close / base - 1
+        return out
+
+    def prime(self, close: np.ndarray):
+        self.closes.extend(float(c) for c in close[-self.closes.maxlen:])
+
+
+class StreamingFeatureEngine:
+    """Incremental counterpart of build_feature_matrix for one ticker.
+
+    Feed bars oldest-first with update(). Each call costs the same no matter
+    how much history has been seen, and returns the new bar's feature row as
+    a dict (same columns as build_feature_matrix, minus 'direction', which
+    needs the next bar) or None while the indicators are still warming up.
+    """
+
+    def __init__(
+        self,
+        rsi_period: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal: int = 9,
+        atr_period: int = 14,
+        bb_period: int = 20,
+        bb_std: float = 2.0,
+        lag_periods: list = None,
+    ):
+        self.rsi = StreamingRSI(rsi_period)
+        self.macd = StreamingMACD(macd_fast, macd_slow, macd_signal)
+        self.vwap = StreamingVWAP()
+        self.atr = StreamingATR(atr_period)
+        self.bollinger = StreamingBollingerBands(bb_period, bb_std)
+        self.lagged_returns = StreamingLaggedReturns(lag_periods)
+
+    def update(self, timestamp, open_: float, high: float, low: float, close: float, volume: float):
+        macd_line, signal_line, histogram = self.macd.update(close)
+        bb_upper, bb_middle, bb_lower = self.bollinger.update(close)
+        row = {
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "rsi": self.rsi.update(close),
+            "macd_line": macd_line,
+            "signal_line": signal_line,
+            "histogram": histogram,
+            "vwap": self.vwap.update(close, high, low, volume, timestamp),
+            "atr": self.atr.update(high, low, close),
+            "bb_upper": bb_upper,
+            "bb_middle": bb_middle,
+            "bb_lower": bb_lower,
+        }
+        row.update(self.lagged_returns.update(close))
+        if any(_is_nan(value) for value in row.values()):
+            return None
+        return row
+
+    def prime(self, ohlcv: pd.DataFrame):
+        """Fast-forward a fresh engine through a block of history.
+
+        Leaves the engine in the state it would reach by feeding every row of
+        ohlcv to update(), but in a handful of vectorised passes rather than a
+        Python loop per bar. Useful for resuming a stream from stored bars.
+        """
+        if len(ohlcv) == 0:
+            return
+        close = ohlcv["close"].to_numpy(dtype=np.float64)
+        high = ohlcv["high"].to_numpy(dtype=np.float64)
+        low = ohlcv["low"].to_numpy(dtype=np.float64)
+        volume = ohlcv["volume"].to_numpy(dtype=np.float64)
+        self.rsi.prime(close)
+        self.macd.prime(close)
+        self.vwap.prime(close, high, low, volume, ohlcv["timestamp"])
+        self.atr.prime(high, low, close)
+        self.bollinger.prime(close)
+        self.lagged_returns.prime(close)
@@ -0,0 +1,186 @@
+from itertools import islice
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+# Bucket state: [first_ts, last_ts, open, high, low, close, volume, notional, trade_count]
+_FIRST_TS, _LAST_TS, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _NOTIONAL, _COUNT = range(9)
+
+_BAR_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "vwap", "trade_count"]
+
+_TRADE_DTYPE = np.dtype([("price", "<f8"), ("size", "<f8"), ("timestamp", "<i8")])
+_TRADE_FIELDS = attrgetter("price", "size", "sip_timestamp")
+
+
+class TradeAggregator:
+    """Streaming aggregation of trades into running totals and OHLCV bars.
+
+    Trades are folded in as they arrive and then discarded, so memory is
+    O(1) per bar rather than O(trades). Time bars are keyed by interval start
+    (UTC epoch-aligned), and each bar's open/close come from its earliest and
+    latest trade, so arrival order does not matter for them. Volume bars need
+    trades in time order.
+
+    Args:
+        intervals: Time-bar widths as pandas offset strings, e.g. ("1min", "5min", "1h").
+        bar_volume: If set, also build volume bars of this many shares. A trade
+                    belongs to the bar in which it starts, so the last trade
+                    of a bar can carry it slightly past bar_volume.
+    """
+
+    def __init__(self, intervals=("1min", "5min", "1h"), bar_volume: float = None):
+        self.widths = {interval: pd.Timedelta(interval).value for interval in intervals}
+        self.buckets = {interval: {} for interval in intervals}
+        self.bar_volume = bar_volume
+        self.volume_bars = []
+        self._open_volume_bar = None
+        self._open_volume_bar_id = None
+        self._volume_carry = 0.0
+
+        self.total_volume = 0.0
+        self.notional = 0.0
+        self.trade_count = 0
+        self.last_price = None
+        self.last_timestamp = None
+
+    @property
+    def vwap(self) -> float:
+        return self.notional / self.total_volume if self.total_volume else float("nan")
+
+    def add_trades(self, trades, chunk_size: int = 50_000):
+        """Fold in an iterable of polygon Trade objects, one chunk at a time."""
+        trades = iter(trades)
+        while True:
+            chunk = np.fromiter(map(_TRADE_FIELDS, islice(trades, chunk_size)), dtype=_TRADE_DTYPE)
+            if len(chunk) == 0:
+                return
+            self.add_arrays(chunk["price"], chunk["size"], chunk["timestamp"])
+
+    def add(self, price: float, size: float, timestamp: int):
+        """Fold in a single trade (timestamp in epoch nanoseconds)."""
+        self.add_arrays(np.array([price]), np.array([size]), np.array([timestamp]))
+
+    def add_arrays(self, price: np.ndarray, size: np.ndarray, timestamp: np.ndarray):
+        """Fold in a batch of trades given as parallel arrays (timestamps in epoch ns)."""
+        price = np.asarray(price, dtype=np.float64)
+        size = np.asarray(size, dtype=np.float64)
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+        if len(price) == 0:
+            return
+
+        notional = price * size
+        self.total_volume += size.sum()
+        self.notional += notional.sum()
+        self.trade_count += len(price)
+        latest = len(timestamp) - 1 - np.argmax(timestamp[::-1])
+        if self.last_timestamp is None or timestamp[latest] >= self.last_timestamp:
+            self.last_timestamp = int(timestamp[latest])
+            self.last_price = float(price[latest])
+
+        order = np.argsort(timestamp, kind="stable")
+        p, s, n, t = price[order], size[order], notional[order], timestamp[order]
+        for interval, width in self.widths.items():
+            self._fold_time_bars(self.buckets[interval], p, s, n, t, t // width * width)
+
+        if self.bar_volume:
+            self._fold_volume_bars(price, size, notional, timestamp)
+
+    def bars(self, interval: str) -> pd.DataFrame:
+        """Time bars for one interval, oldest first."""
+        return self._to_frame(self.buckets[interval].items())
+
+    def volume_bar_frame(self, include_partial: bool = True) -> pd.DataFrame:
+        """Volume bars built so far, optionally including the one still filling."""
+        bars = list(self.volume_bars)
+        if include_partial and self._open_volume_bar is not None:
+            bars.append(self._open_volume_bar)
+        return self._to_frame((bar[_FIRST_TS], bar) for bar in bars)
+
+    def summary(self) -> dict:
+        return {
+            "total_volume": self.total_volume,
+            "vwap": self.vwap,
+            "trade_count": self.trade_count,
+            "last_price": self.last_price,
+        }
+
+    # ── internals ─────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _segments(keys: np.ndarray):
+        # Start/end positions of runs of equal keys in a sorted array.
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)] - 1
+        return starts, ends
+
+    def _fold_time_bars(self, buckets: dict, p, s, n, t, keys):
+        starts, ends = self._segments(keys)
+        highs = np.maximum.reduceat(p, starts)
+        lows = np.minimum.reduceat(p, starts)
+        volumes = np.add.reduceat(s, starts)
+        notionals = np.add.reduceat(n, starts)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            chunk = [
+                int(t[start]), int(t[end]), p[start], highs[i], lows[i], p[end],
+                volumes[i], notionals[i], end - start + 1,
+            ]
+            self._merge(buckets, int(keys[start]), chunk)
+
+    def _fold_volume_bars(self, price, size, notional, timestamp):
+        bar_ids = (self._volume_carry + np.cumsum(size) - size) // self.bar_volume
+        self._volume_carry += size.sum()
+        starts, ends = self._segments(bar_ids)
+        for start, end in zip(starts, ends):
+            seg = slice(start, end + 1)
+            chunk = [
+                int(timestamp[start]), int(timestamp[end]), price[start], price[seg].max(),
+                price[seg].min(), price[end], size[seg].sum(), notional[seg].sum(), end - start + 1,
+            ]
+            bar_id = int(bar_ids[start])
+            if self._open_volume_bar is not None and self._open_volume_bar_id == bar_id:
+                self._combine(self._open_volume_bar, chunk)
+                continue
+            if self._open_volume_bar is not None:
+                self.volume_bars.append(self._open_volume_bar)
+            self._open_volume_bar, self._open_volume_bar_id = chunk, bar_id
+
+    @classmethod
+    def _merge(cls, buckets: dict, key: int, chunk: list):
+        existing = buckets.get(key)
+        if existing is None:
+            buckets[key] = chunk
+        else:
+            cls._combine(existing, chunk)
+
+    @staticmethod
+    def _combine(bar: list, chunk: list):
+        if chunk[_FIRST_TS] < bar[_FIRST_TS]:
+            bar[_FIRST_TS], bar[_OPEN] = chunk[_FIRST_TS], chunk[_OPEN]
+        if chunk[_LAST_TS] >= bar[_LAST_TS]:
+            bar[_LAST_TS], bar[_CLOSE] = chunk[_LAST_TS], chunk[_CLOSE]
+        bar[_HIGH] = max(bar[_HIGH], chunk[_HIGH])
+        bar[_LOW] = min(bar[_LOW], chunk[_LOW])
+        bar[_VOLUME] += chunk[_VOLUME]
+        bar[_NOTIONAL] += chunk[_NOTIONAL]
+        bar[_COUNT] += chunk[_COUNT]
+
+    @staticmethod
+    def _to_frame(items) -> pd.DataFrame:
+        rows = sorted(items)
+        if not rows:
+            return pd.DataFrame(columns=_BAR_COLUMNS)
+        keys = np.array([key for key, _ in rows], dtype=np.int64)
+        state = np.array([bar for _, bar in rows], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = state[:, _NOTIONAL] / state[:, _VOLUME]
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(keys, unit="ns", utc=True),
+            "open": state[:, _OPEN],
+            "high": state[:, _HIGH],
+            "low": state[:, _LOW],
+            "close": state[:, _CLOSE],
+            "volume": state[:, _VOLUME],
+            "vwap": vwap,
+            "trade_count": state[:, _COUNT].astype(np.int64),
+        })
@@ -0,0 +1,102 @@
+"""Local stand-in for the Polygon REST API, for offline tests and benchmarks.
+
+Serves /v2/aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{from}/{to}
+with deterministic hourly bars (04:00-19:00 New York time on weekdays).
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+
+def hourly_results(ticker: str, from_date: str, to_date: str) -> list:
+    seed = sum(map(ord, ticker))
+    results = []
+    for day in pd.date_range(from_date, to_date, freq="D"):
+        if day.weekday() >= 5:
+            continue
+        open_ = pd.Timestamp(day.date().isoformat(), tz="America/New_York")
+        for hour in range(4, 20):
+            price = 50.0 + seed % 100 + day.day + hour * 0.25
+            results.append({
+                "t": (open_ + pd.Timedelta(hours=hour)).value // 1_000_000,
+                "o": price, "h": price + 1, "l": price - 1, "c": price + 0.5, "v": 1_000.0 + hour,
+            })
+    return results
+
+
+class PolygonStub:
+    """Threaded HTTP server that mimics the aggregates endpoint.
+
+    Args:
+        latency: Seconds to sleep before answering each request.
+        page_size: Results per page; longer responses carry a next_url.
+        fail_first: {ticker: [status, ...]} statuses to return, in order,
+                    before that ticker's first successful response.
+    """
+
+    def __init__(self, latency: float = 0.0, page_size: int = 50_000, fail_first: dict = None):
+        self.latency = latency
+        self.page_size = page_size
+        self.fail_first = {t: list(s) for t, s in (fail_first or {}).items()}
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                ticker, from_date, to_date = parts[3], parts[7], parts[8]
+                with stub._lock:
+                    stub.requests.append((ticker, time.monotonic()))
+                    pending = stub.fail_first.get(ticker)
+                    status = pending.pop(0) if pending else 200
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if status != 200:
+                    return self._send(status, {"status": "ERROR", "error": "stub failure"})
+
+                offset = int(parse_qs(url.query).get("cursor", ["0"])[0])
+                results = hourly_results(ticker, from_date, to_date)
+                page = {"status": "OK", "results": results[offset:offset + stub.page_size]}
+                if offset + stub.page_size < len(results):
+                    page["next_url"] = f"{stub.base_url}{url.path}?cursor={offset + stub.page_size}"
+                self._send(200, page)
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,181 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.backtest import (
+    positions_from_predictions,
+    run_walk_forward,
+    stack_feature_matrices,
+    walk_forward_splits,
+)
+from services.feature_engineering import build_feature_matrix
+
+
+def _synthetic_ohlcv(seed: int, n: int = 300, start: str = "2024-01-02 09:00") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(start, periods=n, freq="h", tz="UTC")
+    close = 150.0 + np.cumsum(rng.standard_normal(n) * 0.5)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": close + rng.standard_normal(n) * 0.2,
+        "high": close + np.abs(rng.standard_normal(n) * 0.3),
+        "low": close - np.abs(rng.standard_normal(n) * 0.3),
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, size=n).astype(float),
+    })
+
+
+@pytest.fixture
+def matrices():
+    """Feature matrices for three tickers; MSFT starts 20 bars later."""
+    return {
+        "AAPL": build_feature_matrix(_synthetic_ohlcv(1), compact=True),
+        "MSFT": build_feature_matrix(_synthetic_ohlcv(2, start="2024-01-02 13:00"), compact=True),
+        "NVDA": build_feature_matrix(_synthetic_ohlcv(3), compact=True),
+    }
+
+
+class UpModel:
+    """Always predicts 'up'. Module-level so worker processes can unpickle it."""
+
+    def fit(self, x, y):
+        self.rows = len(x)
+        return self
+
+    def predict(self, x):
+        return np.ones(len(x))
+
+
+class LastReturnModel:
+    """Predicts 'up' after an up bar: sign of the lag-1 return feature."""
+
+    def __init__(self, column: int):
+        self.column = column
+
+    def fit(self, x, y):
+        return self
+
+    def predict(self, x):
+        return (x[:, self.column] > 0).astype(float)
+
+
+# ── Panel layout ──────────────────────────────────────────────────────────────
+
+def test_stack_aligns_on_timestamps(matrices):
+    panel = stack_feature_matrices(matrices)
+    assert panel["tickers"] == ["AAPL", "MSFT", "NVDA"]
+    assert panel["features"].shape == (len(panel["timestamp"]), 3, len(panel["feature_columns"]))
+    assert "timestamp" not in panel["feature_columns"]
+
+    msft = matrices["MSFT"]
+    rows = np.searchsorted(panel["timestamp"], msft["timestamp"].to_numpy())
+    close = panel["features"][:, 1, panel["feature_columns"].index("close")]
+    np.testing.assert_array_equal(close[rows], msft["close"].to_numpy())
+    assert np.isnan(close[:rows[0]]).all()
+
+
+def test_stack_returns_are_next_row_returns(matrices):
+    panel = stack_feature_matrices(matrices)
+    aapl = matrices["AAPL"]["close"].to_numpy(np.float64)
+    rows = np.searchsorted(panel["timestamp"], matrices["AAPL"]["timestamp"].to_numpy())
+    np.testing.assert_allclose(panel["returns"][rows[:-1], 0], aapl[1:] / aapl[:-1] - 1)
+    assert np.isnan(panel["returns"][rows[-1], 0])
+
+
+def test_stack_without_timestamps_aligns_by_position():
+    matrices = {"A": build_feature_matrix(_synthetic_ohlcv(1)), "B": build_feature_matrix(_synthetic_ohlcv(2, n=250))}
+    panel = stack_feature_matrices(matrices)
+    assert panel["timestamp"] is None
+    assert panel["direction"].shape == (len(matrices["A"]), 2)
+    assert np.isnan(panel["direction"][len(matrices["B"]):, 1]).all()
+
+
+# ── Splits and positions ──────────────────────────────────────────────────────
+
+def test_walk_forward_splits_rolling_and_expanding():
+    rolling = walk_forward_splits(100, train_bars=40, test_bars=25)
+    assert [(t.start, t.stop, s.start, s.stop) for t, s in rolling] == [(0, 40, 40, 65), (25, 65, 65, 90), (50, 90, 90, 100)]
+    expanding = walk_forward_splits(100, train_bars=40, test_bars=25, expanding=True)
+    assert all(train.start == 0 for train, _ in expanding)
+
+
+def test_positions_from_predictions():
+    predictions = np.array([1.0, 0.0, np.nan])
+    np.testing.assert_array_equal(positions_from_predictions(predictions), [1.0, -1.0, 0.0])
+    np.testing.assert_array_equal(positions_from_predictions(predictions, long_only=True), [1.0, 0.0, 0.0])
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+def test_signal_backtest_matches_hand_computed_metrics():
+    returns = np.array([[0.01, -0.02], [-0.01, 0.03], [0.02, 0.01], [np.nan, -0.01]])
+    signals = np.array([[1.0, -1.0], [1.0, 1.0], [-1.0, 1.0], [1.0, 0.0]])
+    panel = {"returns": returns, "tickers": ["A", "B"]}
+    result = run_walk_forward(panel, signals=signals, train_bars=1, test_bars=3, cost_bps=10, max_workers=1)
+
+    row = result["tickers"].set_index("ticker").loc["A"]
+    # Bars 1..3 of A: positions 1, -1, 0 (no return on the last bar, so flat).
+    # Traded units: enter 1, flip 2, exit 1.
+    assert row["bars"] == 2
+    assert row["pnl"] == pytest.approx(-0.01 - 0.02 - 0.001 * (1 + 2 + 1))
+    assert row["turnover"] == pytest.approx(4 / 3)
+    assert row["hit_rate"] == 0.0
+    assert row["max_drawdown"] == pytest.approx(-row["pnl"])
+
+    row = result["tickers"].set_index("ticker").loc["B"]
+    # Positions 1, 1, 0: +0.03 +0.01, entry then exit cost.
+    assert row["pnl"] == pytest.approx(0.04 - 0.001 * 2)
+    assert row["hit_rate"] == 1.0
+
+    folds = result["folds"]
+    assert len(folds) == 1
+    assert folds.loc[0, "pnl"] == pytest.approx(result["tickers"]["pnl"].mean())
+
+
+def test_every_bar_is_tested_once_with_tiling_folds(matrices):
+    panel = stack_feature_matrices(matrices)
+    signals = np.ones_like(panel["returns"])
+    result = run_walk_forward(panel, signals=signals, train_bars=60, test_bars=50, max_workers=1)
+    tested = result["tickers"].groupby("ticker")["bars"].sum()
+    expected = np.isfinite(panel["returns"][60:]).sum(axis=0)
+    np.testing.assert_array_equal(tested.loc[panel["tickers"]].to_numpy(), expected)
+
+
+def test_signals_shape_is_checked(matrices):
+    panel = stack_feature_matrices(matrices)
+    with pytest.raises(ValueError):
+        run_walk_forward(panel, signals=np.ones((3, 3)), max_workers=1)
+    with pytest.raises(ValueError):
+        run_walk_forward(panel, max_workers=1)
+
+
+# ── Model mode ────────────────────────────────────────────────────────────────
+
+def test_model_mode_trades_predictions(matrices):
+    panel = stack_feature_matrices(matrices)
+    lag_1 = panel["feature_columns"].index("return_lag_1")
+    result = run_walk_forward(panel, model=LastReturnModel(lag_1), train_bars=80, test_bars=60, max_workers=1)
+
+    # Same positions passed in as signals give the same numbers.
+    features = panel["features"]
+    valid = np.isfinite(features).all(axis=2)
+    signals = np.where(valid, np.where(features[:, :, lag_1] > 0, 1.0, -1.0), 0.0)
+    expected = run_walk_forward(panel, signals=signals, train_bars=80, test_bars=60, max_workers=1)
+    pd.testing.assert_frame_equal(result["tickers"], expected["tickers"])
+
+
+def test_process_pool_matches_in_process(matrices):
+    panel = stack_feature_matrices(matrices)
+    serial = run_walk_forward(panel, model=UpModel(), train_bars=60, test_bars=40, long_only=True, max_workers=1)
+    pooled = run_walk_forward(panel, model=UpModel(), train_bars=60, test_bars=40, long_only=True, max_workers=2)
+    pd.testing.assert_frame_equal(serial["tickers"], pooled["tickers"])
+    pd.testing.assert_frame_equal(serial["folds"], pooled["folds"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
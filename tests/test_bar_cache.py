@@ -0,0 +1,158 @@
+import sys
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.bar_cache import BarCache
+from external.polygon_trading_data import PolygonTradingDataService
+
+
+class FakeRESTClient:
+    """Serves hourly bars 04:00-19:00 New York time on weekdays and records every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def list_aggs(self, ticker, multiplier, timespan, from_, to, **kwargs):
+        self.calls.append((ticker, from_, to))
+        for day in pd.date_range(from_, to, freq="D"):
+            if day.weekday() >= 5:
+                continue
+            for hour in range(4, 20):
+                ts = pd.Timestamp(day.date().isoformat(), tz="America/New_York") + pd.Timedelta(hours=hour)
+                price = 100.0 + hour + day.day
+                yield SimpleNamespace(
+                    timestamp=ts.value // 1_000_000,
+                    open=price, high=price + 1, low=price - 1, close=price + 0.5, volume=1_000.0,
+                )
+
+
+@pytest.fixture
+def client():
+    return FakeRESTClient()
+
+
+@pytest.fixture
+def service(client, tmp_path):
+    return PolygonTradingDataService(client=client, bar_cache=BarCache(str(tmp_path)))
+
+
+def test_repeat_request_served_from_cache(service, client):
+    first = service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    second = service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    assert len(client.calls) == 1
+    assert len(first) == 5 * 16
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_cached_result_matches_uncached(service):
+    cached = service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    direct = service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20", use_cache=False)
+    pd.testing.assert_frame_equal(cached, direct)
+
+
+def test_only_missing_ranges_are_fetched(service, client):
+    service.get_hourly_ohlcv("AAPL", "2024-12-10", "2024-12-12")
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-18")
+    result = service.get_hourly_ohlcv("AAPL", "2024-12-09", "2024-12-20")
+    assert client.calls[2:] == [
+        ("AAPL", "2024-12-09", "2024-12-09"),
+        ("AAPL", "2024-12-13", "2024-12-15"),
+        ("AAPL", "2024-12-19", "2024-12-20"),
+    ]
+    assert len(result) == 10 * 16
+    assert result["timestamp"].is_monotonic_increasing
+    assert not result["timestamp"].duplicated().any()
+
+
+def test_weekend_range_is_remembered(service, client):
+    first = service.get_hourly_ohlcv("AAPL", "2024-12-21", "2024-12-22")
+    second = service.get_hourly_ohlcv("AAPL", "2024-12-21", "2024-12-22")
+    assert first.empty and second.empty
+    assert len(client.calls) == 1
+
+
+def test_ranges_from_today_onwards_are_refetched(service, client):
+    service.get_hourly_ohlcv("AAPL", "2099-01-05", "2099-01-06")
+    service.get_hourly_ohlcv("AAPL", "2099-01-05", "2099-01-06")
+    assert len(client.calls) == 2
+
+
+def test_bypass_always_fetches(service, client):
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20", use_cache=False)
+    assert len(client.calls) == 2
+
+
+def test_get_bars_returns_view_of_cached_file(client, tmp_path):
+    service = PolygonTradingDataService(client=client)
+    cache = BarCache(str(tmp_path))
+    fetch = lambda start, end: service._fetch_bars("AAPL", "hour", start, end)
+    bars = cache.get_bars("AAPL", "1hour", "2024-12-16", "2024-12-17", fetch)
+    assert isinstance(bars.base, np.memmap) or isinstance(bars, np.memmap)
+    assert not bars.flags.writeable
+
+
+def test_size_based_eviction_drops_least_recently_used(client, tmp_path):
+    # One week of hourly bars is 80 records of 48 bytes, plus the .npy header.
+    cache = BarCache(str(tmp_path), max_bytes=9_000)
+    service = PolygonTradingDataService(client=client, bar_cache=cache)
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    service.get_hourly_ohlcv("MSFT", "2024-12-16", "2024-12-20")
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    service.get_hourly_ohlcv("GOOGL", "2024-12-16", "2024-12-20")
+    assert cache.size_bytes <= 9_000
+    calls = len(client.calls)
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    assert len(client.calls) == calls
+    service.get_hourly_ohlcv("MSFT", "2024-12-16", "2024-12-20")
+    assert len(client.calls) == calls + 1
+
+
+def test_eviction_skips_a_series_being_fetched(client, tmp_path):
+    cache = BarCache(str(tmp_path), max_bytes=9_000)
+    service = PolygonTradingDataService(client=client, bar_cache=cache)
+    service.get_hourly_ohlcv("AAPL", "2024-12-09", "2024-12-13")
+    service.get_hourly_ohlcv("MSFT", "2024-12-09", "2024-12-13")
+
+    # AAPL is the least recently used series, and is mid-fetch while MSFT grows past the budget.
+    fetching, release = threading.Event(), threading.Event()
+
+    def slow_fetch(start, end):
+        fetching.set()
+        release.wait(5)
+        return service._fetch_bars("AAPL", "hour", start, end)
+
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(
+        bars=cache.get_bars("AAPL", "1hour", "2024-12-09", "2024-12-20", slow_fetch)))
+    reader.start()
+    assert fetching.wait(5)
+    service.get_hourly_ohlcv("MSFT", "2024-12-09", "2024-12-20")
+    assert os.path.exists(cache._bars_path("AAPL/1hour"))
+    release.set()
+    reader.join(5)
+
+    # AAPL kept its first week and gained the second; MSFT made room instead.
+    assert len(result["bars"]) == 2 * 80
+    assert "AAPL/1hour" in cache._index and "MSFT/1hour" not in cache._index
+    assert cache.size_bytes <= 9_000
+
+
+def test_clear_removes_one_ticker(service, client):
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    service.get_hourly_ohlcv("MSFT", "2024-12-16", "2024-12-20")
+    service.bar_cache.clear("AAPL")
+    service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+    service.get_hourly_ohlcv("MSFT", "2024-12-16", "2024-12-20")
+    assert [c[0] for c in client.calls] == ["AAPL", "MSFT", "AAPL"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,76 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+from polygon.rest.models import Agg
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.bars import BAR_DTYPE, aggs_to_bars, bars_to_frame, results_to_bars, sort_bars
+
+
+@pytest.fixture
+def results():
+    """Raw aggregates JSON results for 50 hourly bars."""
+    rng = np.random.default_rng(3)
+    start = 1_734_350_400_000
+    close = 150.0 + np.cumsum(rng.standard_normal(50))
+    return [
+        {"t": start + i * 3_600_000, "o": c - 0.1, "h": c + 0.5, "l": c - 0.5, "c": c, "v": 1_000.0 + i, "vw": c, "n": 10}
+        for i, c in enumerate(close)
+    ]
+
+
+@pytest.fixture
+def aggs(results):
+    return [Agg.from_dict(r) for r in results]
+
+
+def _reference_frame(aggs):
+    # The original per-row conversion in get_hourly_ohlcv.
+    rows = [{
+        "timestamp": pd.Timestamp(agg.timestamp, unit="ms", tz="UTC"),
+        "open": agg.open,
+        "high": agg.high,
+        "low": agg.low,
+        "close": agg.close,
+        "volume": agg.volume,
+    } for agg in aggs]
+    return pd.DataFrame(rows).sort_values("timestamp").reset_index(drop=True)
+
+
+def test_aggs_to_frame_matches_row_by_row_conversion(aggs):
+    frame = bars_to_frame(sort_bars(aggs_to_bars(iter(aggs))))
+    pd.testing.assert_frame_equal(frame, _reference_frame(aggs))
+
+
+def test_results_and_aggs_give_same_bars(aggs, results):
+    np.testing.assert_array_equal(results_to_bars(results), aggs_to_bars(aggs))
+
+
+def test_bars_have_bar_dtype(results):
+    bars = results_to_bars(results)
+    assert bars.dtype == BAR_DTYPE
+    assert len(bars) == len(results)
+
+
+def test_empty_input(aggs):
+    assert len(aggs_to_bars(iter([]))) == 0
+    assert len(results_to_bars([])) == 0
+
+
+def test_sort_skipped_when_already_ordered(results):
+    bars = results_to_bars(results)
+    assert sort_bars(bars) is bars
+
+
+def test_sort_orders_shuffled_bars(aggs):
+    shuffled = [aggs[i] for i in np.random.default_rng(0).permutation(len(aggs))]
+    frame = bars_to_frame(sort_bars(aggs_to_bars(shuffled)))
+    pd.testing.assert_frame_equal(frame, _reference_frame(aggs))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
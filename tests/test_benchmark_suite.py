@@ -0,0 +1,184 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_suite import CASES, compare, fold_retry, merge_runs, run_suite
+from benchmarks.synthetic import FakeRESTClient, make_ohlcv
+from external.polygon_trading_data import PolygonTradingDataService
+from services.market_calendar import trading_days
+
+
+def _local(df):
+    return df["timestamp"].dt.tz_convert("America/New_York")
+
+
+# ── Synthetic OHLCV ────────────────────────────────────────────────────────────
+
+def test_same_seed_same_bars():
+    pd.testing.assert_frame_equal(make_ohlcv(2_000, seed=3), make_ohlcv(2_000, seed=3))
+    assert not make_ohlcv(2_000, seed=3)["close"].equals(make_ohlcv(2_000, seed=4)["close"])
+
+
+@pytest.mark.parametrize("timespan,extended,first,last", [
+    ("hour", True, (4, 0), (19, 0)),
+    ("hour", False, (9, 0), (15, 0)),
+    ("minute", True, (4, 0), (19, 59)),
+    ("minute", False, (9, 30), (15, 59)),
+])
+def test_bars_stay_in_session_hours(timespan, extended, first, last):
+    local = _local(make_ohlcv(20_000, timespan, extended_hours=extended))
+    minutes = local.dt.hour * 60 + local.dt.minute
+    assert minutes.min() == first[0] * 60 + first[1]
+    assert minutes.max() == last[0] * 60 + last[1]
+
+
+def test_no_bars_on_weekends_or_holidays():
+    df = make_ohlcv(5_000, start="2024-01-02")
+    dates = pd.DatetimeIndex(_local(df).dt.date.unique())
+    assert (dates.weekday < 5).all()
+    for holiday in ["2024-01-15", "2024-03-29", "2024-06-19", "2024-07-04", "2024-11-28", "2024-12-25"]:
+        assert pd.Timestamp(holiday) not in dates
+
+
+def test_new_years_day_on_saturday_is_not_observed_on_friday():
+    days, _ = trading_days("2021-12-27", "2022-01-07")
+    assert pd.Timestamp("2021-12-31") in days and pd.Timestamp("2022-01-03") in days
+    days, _ = trading_days("2022-12-26", "2023-01-06")
+    assert pd.Timestamp("2023-01-02") not in days  # Sunday Jan 1 moves to Monday
+
+
+def test_early_close_days():
+    days, early = trading_days("2024-01-01", "2024-12-31")
+    assert len(days) == 252
+    assert list(days[early].strftime("%Y-%m-%d")) == ["2024-07-03", "2024-11-29", "2024-12-24"]
+    # July 3 closes early only when July 4 is a weekday holiday of its own.
+    for year, july_3_early in [(2023, True), (2025, True), (2020, False), (2022, False), (2026, False)]:
+        days, early = trading_days(f"{year}-07-01", f"{year}-07-06")
+        assert (pd.Timestamp(f"{year}-07-03") in days[early]) == july_3_early
+    local = _local(make_ohlcv(5_000, start="2024-11-25", missing_fraction=0, halts_per_year=0))
+    assert local[local.dt.date == pd.Timestamp("2024-11-29").date()].dt.hour.max() == 16
+
+
+def test_utc_open_follows_dst():
+    df = make_ohlcv(3_000, start="2024-01-02", extended_hours=False, missing_fraction=0, halts_per_year=0)
+    first_bar = df.groupby(_local(df).dt.date)["timestamp"].min().dt.hour
+    assert set(first_bar) == {13, 14}
+
+
+def test_gaps_and_zero_volume_bars():
+    df = make_ohlcv(20_000, missing_fraction=0.05, zero_volume_fraction=0.02)
+    per_day = _local(df).dt.date.value_counts()
+    assert (per_day < 16).mean() > 0.3
+    zero = df[df["volume"] == 0]
+    assert 0.01 < len(zero) / len(df) < 0.03
+    # A zero-volume bar is flat at the previous close.
+    previous_close = df["close"].shift().loc[zero.index]
+    for column in ["open", "high", "low", "close"]:
+        np.testing.assert_allclose(zero[column], previous_close)
+
+
+def test_prices_are_consistent():
+    df = make_ohlcv(10_000, "minute")
+    assert df["timestamp"].is_monotonic_increasing and df["timestamp"].is_unique
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert (df["volume"] >= 0).all()
+
+
+# ── Fake REST client ───────────────────────────────────────────────────────────
+
+def test_fake_client_replays_pages_through_service():
+    ohlcv = make_ohlcv(3_000)
+    client = FakeRESTClient({"SYN": ohlcv}, page_size=1_000)
+    local = _local(ohlcv)
+    result = PolygonTradingDataService(client=client).get_hourly_ohlcv(
+        "SYN", str(local.iloc[0].date()), str(local.iloc[-1].date())
+    )
+    assert client.requests == 3
+    pd.testing.assert_frame_equal(result, ohlcv, check_dtype=False)
+
+
+def test_fake_client_filters_dates_and_waits():
+    ohlcv = make_ohlcv(3_000, start="2024-01-02")
+    client = FakeRESTClient({"SYN": ohlcv}, latency=0.05)
+    aggs = list(client.list_aggs("SYN", 1, "hour", "2024-01-08", "2024-01-12"))
+    dates = {pd.Timestamp(a.timestamp, unit="ms", tz="UTC").tz_convert("America/New_York").date() for a in aggs}
+    assert min(dates) == pd.Timestamp("2024-01-08").date()
+    assert max(dates) == pd.Timestamp("2024-01-12").date()
+    assert list(client.list_aggs("OTHER", 1, "hour", "2024-01-08", "2024-01-12")) == []
+
+
+# ── Regression gate ────────────────────────────────────────────────────────────
+
+def _result(seconds, peak_mb, calibration=0.01):
+    return {"meta": {"calibration_s": calibration},
+            "results": {"compute_rsi[hour:1000]": {"rows": 1000, "seconds": seconds, "peak_mb": peak_mb}}}
+
+
+def test_compare_flags_slower_and_bigger_cases():
+    rows = compare(_result(0.020, 10.0), _result(0.010, 5.0))
+    assert {row["metric"]: row["regressed"] for row in rows} == {"seconds": True, "peak_mb": True}
+
+
+def test_compare_allows_changes_within_thresholds():
+    rows = compare(_result(0.011, 5.2), _result(0.010, 5.0))
+    assert not any(row["regressed"] for row in rows)
+
+
+def test_compare_ignores_noise_on_tiny_cases():
+    rows = compare(_result(0.0004, 0.3), _result(0.0002, 0.1))
+    assert not any(row["regressed"] for row in rows)
+
+
+def test_compare_normalizes_by_calibration():
+    # Twice as slow on a machine that is twice as slow is no regression.
+    current, baseline = _result(0.020, 5.0, calibration=0.02), _result(0.010, 5.0, calibration=0.01)
+    assert not any(row["regressed"] for row in compare(current, baseline))
+    assert any(row["regressed"] for row in compare(current, baseline, normalize=False))
+
+
+def test_merge_runs_takes_median_time_and_largest_memory():
+    runs = [_result(0.010, 5.0, 0.01), _result(0.030, 6.0, 0.03), _result(0.012, 5.5, 0.02)]
+    merged = merge_runs(runs)
+    metrics = merged["results"]["compute_rsi[hour:1000]"]
+    assert metrics["seconds"] == 0.012 and metrics["peak_mb"] == 6.0
+    assert merged["meta"]["calibration_s"] == 0.02 and merged["meta"]["runs"] == 3
+
+
+def test_fold_retry_rescales_reruns_and_keeps_the_median():
+    current = _result(0.030, 5.0, calibration=0.01)
+    attempts = {}
+    # Twice as fast, but measured while the calibration also ran twice as fast.
+    fold_retry(current, _result(0.010, 5.0, calibration=0.005), attempts)
+    assert attempts["compute_rsi[hour:1000]"] == [0.030, 0.020]
+    fold_retry(current, _result(0.004, 5.0, calibration=0.01), attempts)
+    metrics = current["results"]["compute_rsi[hour:1000]"]
+    assert metrics["seconds"] == 0.020 and metrics["rows_per_s"] == pytest.approx(1000 / 0.020)
+
+    raw = _result(0.030, 5.0, calibration=0.01)
+    fold_retry(raw, _result(0.010, 5.0, calibration=0.005), {}, normalize=False)
+    assert raw["results"]["compute_rsi[hour:1000]"]["seconds"] == pytest.approx(0.020)
+
+
+def test_run_suite_records_every_case():
+    result = run_suite([500], repeat=1, min_time=0)
+    assert set(result["results"]) == {f"{case}[hour:500]" for case in CASES}
+    for metrics in result["results"].values():
+        assert metrics["seconds"] > 0 and metrics["peak_mb"] > 0
+        assert metrics["rows_per_s"] == pytest.approx(500 / metrics["seconds"])
+    assert result["meta"]["calibration_s"] > 0
+    assert not any(row["regressed"] for row in compare(result, result))
+
+
+def test_run_suite_rejects_unknown_case():
+    with pytest.raises(ValueError):
+        run_suite([500], cases=["compute_foo"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+
+import pytest
+import pandas as pd
+from polygon import RESTClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.bar_cache import BarCache
+from external.bulk_fetch import AggsFetcher, AggsFetchError, TokenBucket, retry_after_seconds
+from external.polygon_trading_data import PolygonTradingDataService
+from tests.polygon_stub import PolygonStub
+
+_TICKERS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META"]
+
+
+def _service(stub, **kwargs):
+    return PolygonTradingDataService(client=RESTClient(api_key="test", base=stub.base_url), **kwargs)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # The first token is free; the other five wait 1/20 s each.
+    assert time.monotonic() - start >= 0.2
+
+
+def test_many_matches_serial_results():
+    with PolygonStub() as stub:
+        service = _service(stub)
+        bulk = service.get_hourly_ohlcv_many(_TICKERS, "2024-12-16", "2024-12-20", requests_per_second=100)
+        for ticker in _TICKERS:
+            serial = service.get_hourly_ohlcv(ticker, "2024-12-16", "2024-12-20")
+            pd.testing.assert_frame_equal(bulk[ticker], serial)
+
+
+def test_follows_pagination():
+    with PolygonStub(page_size=25) as stub:
+        result = _service(stub).get_hourly_ohlcv_many(["AAPL"], "2024-12-16", "2024-12-20")
+        assert len(result["AAPL"]) == 5 * 16
+        assert len(stub.requests) == 4
+        assert result["AAPL"]["timestamp"].is_monotonic_increasing
+
+
+def test_retries_rate_limited_and_server_errors():
+    with PolygonStub(fail_first={"AAPL": [429, 503]}) as stub:
+        fetcher = AggsFetcher(stub.base_url, {}, requests_per_second=100, backoff=0.01)
+        bars = fetcher.fetch_bars("AAPL", 1, "hour", "2024-12-16", "2024-12-16")
+        assert len(bars) == 16
+        assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries():
+    with PolygonStub(fail_first={"AAPL": [429] * 10}) as stub:
+        fetcher = AggsFetcher(stub.base_url, {}, requests_per_second=100, max_retries=2, backoff=0.01)
+        with pytest.raises(AggsFetchError) as exc:
+            fetcher.fetch_bars("AAPL", 1, "hour", "2024-12-16", "2024-12-16")
+        assert exc.value.status == 429
+
+
+def test_retry_after_is_parsed_and_capped():
+    now = pd.Timestamp("2015-10-21 07:27:50", tz="UTC").timestamp()
+    assert retry_after_seconds("5") == 5.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT", now=now) == 10.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:27:00 GMT", now=now) == 0.0
+    assert retry_after_seconds(None) is None and retry_after_seconds("soon") is None
+    assert retry_after_seconds("nan") is None
+
+    fetcher = AggsFetcher("http://localhost", {}, backoff=0.5, max_backoff=2.0)
+    resp = lambda value: type("Response", (), {"headers": {} if value is None else {"Retry-After": value}})()
+    assert fetcher._retry_delay(resp("3600"), 0) == 2.0
+    assert fetcher._retry_delay(resp("Fri, 01 Jan 2100 00:00:00 GMT"), 0) == 2.0
+    assert fetcher._retry_delay(resp("-4"), 0) == 0.0
+    assert fetcher._retry_delay(resp(None), 1) == 1.0 and fetcher._retry_delay(resp(None), 6) == 2.0
+
+
+def test_does_not_retry_client_errors():
+    with PolygonStub(fail_first={"AAPL": [403]}) as stub:
+        fetcher = AggsFetcher(stub.base_url, {}, requests_per_second=100, backoff=0.01)
+        with pytest.raises(AggsFetchError):
+            fetcher.fetch_bars("AAPL", 1, "hour", "2024-12-16", "2024-12-16")
+        assert len(stub.requests) == 1
+
+
+def test_failed_ticker_yields_empty_frame():
+    with PolygonStub(fail_first={"MSFT": [404]}) as stub:
+        result = _service(stub).get_hourly_ohlcv_many(["AAPL", "MSFT"], "2024-12-16", "2024-12-16")
+        assert len(result["AAPL"]) == 16
+        assert result["MSFT"].empty
+
+
+def test_results_stream_in_completion_order():
+    with PolygonStub(latency=0.05, fail_first={"AAPL": [503, 503]}) as stub:
+        service = _service(stub)
+        order = [
+            ticker for ticker, _ in service.iter_hourly_ohlcv_many(
+                ["AAPL", "MSFT", "GOOGL"], "2024-12-16", "2024-12-16",
+                requests_per_second=100, backoff=0.1,
+            )
+        ]
+        # AAPL needs two retries, so the others land first.
+        assert order[-1] == "AAPL"
+        assert set(order) == {"AAPL", "MSFT", "GOOGL"}
+
+
+def test_runs_concurrently():
+    with PolygonStub(latency=0.2) as stub:
+        service = _service(stub)
+        start = time.monotonic()
+        service.get_hourly_ohlcv_many(_TICKERS, "2024-12-16", "2024-12-16", max_workers=6, requests_per_second=100)
+        assert time.monotonic() - start < 0.2 * len(_TICKERS) / 2
+
+
+def test_uses_bar_cache(tmp_path):
+    with PolygonStub() as stub:
+        service = _service(stub, bar_cache=BarCache(str(tmp_path)))
+        service.get_hourly_ohlcv_many(_TICKERS, "2024-12-16", "2024-12-20", requests_per_second=100)
+        requests = len(stub.requests)
+        service.get_hourly_ohlcv_many(_TICKERS, "2024-12-16", "2024-12-20", requests_per_second=100)
+        assert len(stub.requests) == requests == len(_TICKERS)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,242 @@
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.bar_cache import BarCache
+from external.bars import BAR_DTYPE
+from external.corporate_actions import (
+    ACTION_DTYPE,
+    DIVIDEND,
+    SPLIT,
+    CorporateActionsIndex,
+    adjust_bars,
+    cumulative_factors,
+)
+from external.polygon_trading_data import PolygonTradingDataService
+from services.feature_cache import FeatureCache
+from services.feature_engineering import build_feature_matrix
+
+TZ = "America/New_York"
+
+
+def _ms(day, hour=0):
+    return (pd.Timestamp(day, tz=TZ) + pd.Timedelta(hours=hour)).value // 1_000_000
+
+
+class FakeRESTClient:
+    """Raw (unadjusted) bars with a 4-for-1 split of AAA on 2024-06-12, plus split/dividend listings.
+
+    AAA trades around 400 before the split and 100 after. BBB pays a 1.00
+    dividend going ex on 2024-06-11. Every call is recorded.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.splits = [SimpleNamespace(ticker="AAA", execution_date="2024-06-12", split_from=1, split_to=4)]
+        self.dividends = [
+            SimpleNamespace(ticker="BBB", ex_dividend_date="2024-06-11", cash_amount=1.0, pay_date="2024-06-20"),
+        ]
+
+    def _price(self, ticker, ts_ms):
+        if ticker == "AAA":
+            return 400.0 if ts_ms < _ms("2024-06-12") else 100.0
+        return 50.0
+
+    def list_aggs(self, ticker, multiplier, timespan, from_, to, adjusted=True, **kwargs):
+        self.calls.append(("aggs", ticker, timespan, from_, to, adjusted))
+        hours = [0] if timespan == "day" else range(4, 20)
+        for day in pd.date_range(from_, to, freq="D"):
+            if day.weekday() >= 5:
+                continue
+            for hour in hours:
+                ts = _ms(day.date().isoformat(), hour)
+                price = self._price(ticker, ts)
+                volume = 1_000.0 if price != 100.0 else 4_000.0
+                yield SimpleNamespace(timestamp=ts, open=price, high=price + 1, low=price - 1, close=price,
+                                      volume=volume)
+
+    def list_splits(self, ticker=None, execution_date_gte=None, **kwargs):
+        self.calls.append(("splits", ticker, execution_date_gte))
+        return [s for s in self.splits if ticker in (None, s.ticker)
+                and (execution_date_gte is None or s.execution_date >= execution_date_gte)]
+
+    def list_dividends(self, ticker=None, ex_dividend_date_gte=None, **kwargs):
+        self.calls.append(("dividends", ticker, ex_dividend_date_gte))
+        return [d for d in self.dividends if ticker in (None, d.ticker)
+                and (ex_dividend_date_gte is None or d.ex_dividend_date >= ex_dividend_date_gte)]
+
+
+@pytest.fixture
+def client():
+    return FakeRESTClient()
+
+
+@pytest.fixture
+def index(tmp_path):
+    return CorporateActionsIndex(str(tmp_path / "actions"))
+
+
+@pytest.fixture
+def service(client, index, tmp_path):
+    return PolygonTradingDataService(client=client, bar_cache=BarCache(str(tmp_path / "bars")),
+                                     corporate_actions=index)
+
+
+# ── Factors ────────────────────────────────────────────────────────────────────
+
+def _actions(rows):
+    return np.array(rows, dtype=ACTION_DTYPE)
+
+
+def test_cumulative_factors_and_adjust_bars():
+    actions = _actions([
+        (100, SPLIT, 1, 2, 0.0, np.nan),        # 2-for-1
+        (200, DIVIDEND, np.nan, np.nan, 1.0, 50.0),
+    ])
+    ex_ms, price, volume = cumulative_factors(actions)
+    np.testing.assert_allclose(price, [0.5 * 0.98, 0.98, 1.0])
+    np.testing.assert_allclose(volume, [2.0, 1.0, 1.0])
+
+    bars = np.zeros(4, dtype=BAR_DTYPE)
+    bars["timestamp"] = [50, 100, 150, 200]
+    bars["close"] = 10.0
+    bars["volume"] = 1.0
+    adjusted = adjust_bars(bars, ex_ms, price, volume)
+    np.testing.assert_allclose(adjusted["close"], [4.9, 9.8, 9.8, 10.0])
+    np.testing.assert_allclose(adjusted["volume"], [2.0, 1.0, 1.0, 1.0])
+    assert bars["close"][0] == 10.0
+    # Nothing before the first ex-date left to adjust: no copy.
+    assert np.shares_memory(adjust_bars(bars[3:], ex_ms, price, volume), bars)
+
+
+def test_invalid_actions_are_ignored():
+    actions = _actions([(100, SPLIT, 1, 0, 0.0, np.nan), (200, DIVIDEND, np.nan, np.nan, 1.0, np.nan)])
+    _, price, volume = cumulative_factors(actions)
+    np.testing.assert_array_equal(price, [1.0, 1.0, 1.0])
+    np.testing.assert_array_equal(volume, [1.0, 1.0, 1.0])
+
+
+# ── Adjusted bars ──────────────────────────────────────────────────────────────
+
+def test_split_adjusted_bars_are_continuous(service, client):
+    assert service.refresh_corporate_actions(["AAA", "BBB"]) == ["AAA", "BBB"]
+    bars = service.get_hourly_ohlcv("AAA", "2024-06-10", "2024-06-14")
+    assert bars["close"].nunique() == 1 and bars["close"].iloc[0] == pytest.approx(100.0)
+    assert bars["volume"].nunique() == 1 and bars["volume"].iloc[0] == pytest.approx(4_000.0)
+    assert (bars["close"].pct_change().dropna().abs() < 1e-12).all()
+
+    raw = service.get_hourly_ohlcv("AAA", "2024-06-10", "2024-06-14", adjust=False)
+    assert set(raw["close"]) == {400.0, 100.0}
+    # Raw bars are fetched without Polygon's adjustment and cached under their own key.
+    assert all(call[5] is False for call in client.calls if call[0] == "aggs")
+    assert len([call for call in client.calls if call[0] == "aggs" and call[2] == "hour"]) == 1
+
+
+def test_dividend_adjustment_uses_previous_close(service):
+    service.refresh_corporate_actions(["BBB"])
+    action = service.corporate_actions.actions("BBB")[0]
+    assert action["kind"] == DIVIDEND and action["ref_close"] == 50.0
+    bars = service.get_hourly_ohlcv("BBB", "2024-06-10", "2024-06-11")
+    before = bars["timestamp"] < pd.Timestamp("2024-06-11", tz=TZ)
+    assert bars.loc[before, "close"].eq(50.0 * (1 - 1.0 / 50.0)).all()
+    assert bars.loc[~before, "close"].eq(50.0).all()
+
+
+def test_resampled_bars_are_adjusted(service):
+    service.refresh_corporate_actions(["AAA"])
+    daily = service.get_resampled_ohlcv("AAA", "2024-06-10", "2024-06-14", timeframe="1d")
+    assert daily["close"].tolist() == pytest.approx([100.0] * 5)
+
+
+def test_future_actions_apply_once_effective(index):
+    index.update([SimpleNamespace(ticker="AAA", execution_date="2024-06-12", split_from=1, split_to=4)])
+    bars = np.zeros(2, dtype=BAR_DTYPE)
+    bars["timestamp"] = [_ms("2024-06-11", 10), _ms("2024-06-12", 10)]
+    bars["close"] = [400.0, 100.0]
+    assert index.adjust("AAA", bars, as_of="2024-06-11")["close"].tolist() == [400.0, 100.0]
+    assert index.adjust("AAA", bars, as_of="2024-06-12")["close"].tolist() == [100.0, 100.0]
+    assert index.adjust("AAA", bars)["close"].tolist() == [100.0, 100.0]
+
+
+# ── Refresh and invalidation ───────────────────────────────────────────────────
+
+def test_large_universe_uses_market_wide_listing(service, client):
+    universe = ["AAA"] + [f"T{i}" for i in range(60)]
+    assert service.refresh_corporate_actions(universe) == ["AAA"]
+    listings = [call for call in client.calls if call[0] in ("splits", "dividends")]
+    assert listings == [("splits", None, None), ("dividends", None, None)]
+    assert service.corporate_actions.actions("BBB").size == 0
+
+
+def test_refresh_is_incremental_and_persistent(service, client, index):
+    service.refresh_corporate_actions(["AAA", "BBB"])
+    assert service.refresh_corporate_actions(["AAA", "BBB"]) == []
+    since = (pd.Timestamp(index.refreshed) - pd.Timedelta(days=30)).date().isoformat()
+    assert client.calls[-1] == ("dividends", "BBB", since)
+
+    reopened = CorporateActionsIndex(index.root)
+    assert reopened.refreshed == index.refreshed and reopened.tickers == ["AAA", "BBB"]
+    assert reopened.actions("BBB").tobytes() == index.actions("BBB").tobytes()
+
+
+def test_ticker_added_to_universe_gets_full_history(service, client, index):
+    service.refresh_corporate_actions(["BBB"])
+    assert index.last_refresh("AAA") is None
+    assert service.refresh_corporate_actions(["AAA", "BBB"]) == ["AAA"]
+    assert ("splits", "AAA", None) in client.calls
+    assert index.actions("AAA")["ex_ms"].tolist() == [_ms("2024-06-12")]
+    assert index.last_refresh("AAA") == index.refreshed
+
+    # A market-wide listing starts from the oldest refresh in the universe.
+    fresh = CorporateActionsIndex(index.root + "_2")
+    service.corporate_actions = fresh
+    service.refresh_corporate_actions(["BBB"])
+    universe = ["AAA", "BBB"] + [f"T{i}" for i in range(60)]
+    assert service.refresh_corporate_actions(universe) == ["AAA"]
+    assert client.calls[-2:] == [("splits", None, None), ("dividends", None, None)]
+
+
+def test_new_action_invalidates_only_affected_features(service, client, index):
+    cache = FeatureCache()
+    index.add_listener(cache.invalidate)
+    service.refresh_corporate_actions(["AAA", "BBB"])
+    for ticker in ["AAA", "BBB"]:
+        cache.get(service.get_hourly_ohlcv(ticker, "2024-06-03", "2024-06-14"), ticker=ticker)
+    assert cache.stats()["entries"] == 2
+
+    client.splits.append(SimpleNamespace(ticker="BBB", execution_date="2024-06-13", split_from=1, split_to=2))
+    aggs_calls = len([call for call in client.calls if call[0] == "aggs"])
+    assert service.refresh_corporate_actions(["AAA", "BBB"], since="2024-06-01") == ["BBB"]
+    assert cache.stats()["entries"] == 1
+
+    # Cached raw bars are adjusted again on read, with no refetch.
+    bars = service.get_hourly_ohlcv("BBB", "2024-06-12", "2024-06-13")
+    assert len([call for call in client.calls if call[0] == "aggs"]) == aggs_calls
+    before = bars["timestamp"] < pd.Timestamp("2024-06-13", tz=TZ)
+    assert bars.loc[before, "close"].eq(25.0).all() and bars.loc[~before, "close"].eq(50.0).all()
+    features = cache.get(service.get_hourly_ohlcv("BBB", "2024-06-03", "2024-06-14"), ticker="BBB")
+    expected = build_feature_matrix(service.get_hourly_ohlcv("BBB", "2024-06-03", "2024-06-14"))
+    pd.testing.assert_frame_equal(features, expected)
+
+
+def test_refresh_without_index_or_on_error(client, tmp_path, capsys):
+    plain = PolygonTradingDataService(client=client)
+    assert plain.refresh_corporate_actions(["AAA"]) == []
+
+    class BrokenClient(FakeRESTClient):
+        def list_splits(self, **kwargs):
+            raise RuntimeError("boom")
+
+    broken = PolygonTradingDataService(client=BrokenClient(), corporate_actions=CorporateActionsIndex(str(tmp_path)))
+    assert broken.refresh_corporate_actions(["AAA"]) == []
+    assert "Error refreshing corporate actions" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
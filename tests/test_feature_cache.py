@@ -0,0 +1,178 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_ohlcv
+from services.feature_cache import FeatureCache, fingerprint
+from services.feature_engineering import build_feature_matrix
+
+
+@pytest.fixture
+def synthetic_ohlcv():
+    """400 hourly bars of synthetic OHLCV data spanning several calendar days."""
+    np.random.seed(42)
+    n = 400
+    timestamps = pd.date_range("2024-01-02 09:00", periods=n, freq="h", tz="UTC")
+    close = 150.0 + np.cumsum(np.random.randn(n) * 0.5)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": close + np.random.randn(n) * 0.2,
+        "high": close + np.abs(np.random.randn(n) * 0.3),
+        "low": close - np.abs(np.random.randn(n) * 0.3),
+        "close": close,
+        "volume": np.random.randint(1_000, 100_000, size=n).astype(float),
+    })
+
+
+# ── Fingerprint ───────────────────────────────────────────────────────────────
+
+def test_fingerprint_tracks_content_and_ticker(synthetic_ohlcv):
+    base = fingerprint(synthetic_ohlcv, "AAPL")
+    assert fingerprint(synthetic_ohlcv.copy(), "AAPL") == base
+    assert fingerprint(synthetic_ohlcv, "MSFT") != base
+    assert fingerprint(synthetic_ohlcv.iloc[:-1], "AAPL") != base
+
+    edited = synthetic_ohlcv.copy()
+    edited.loc[100, "close"] += 0.01
+    assert fingerprint(edited, "AAPL") != base
+
+
+# ── Memory tier ───────────────────────────────────────────────────────────────
+
+def test_hit_returns_same_matrix_and_counts(synthetic_ohlcv):
+    cache = FeatureCache()
+    first = cache.get(synthetic_ohlcv, "AAPL")
+    second = cache.get(synthetic_ohlcv.copy(), "AAPL")
+    pd.testing.assert_frame_equal(first, build_feature_matrix(synthetic_ohlcv))
+    pd.testing.assert_frame_equal(second, first)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_parameters_are_part_of_the_key(synthetic_ohlcv):
+    cache = FeatureCache()
+    cache.get(synthetic_ohlcv, rsi_period=14)
+    cache.get(synthetic_ohlcv)  # same as the explicit default
+    cache.get(synthetic_ohlcv, lag_periods=[1, 2, 3, 4, 5])
+    custom = cache.get(synthetic_ohlcv, rsi_period=7)
+    assert (cache.hits, cache.misses) == (2, 2)
+    pd.testing.assert_frame_equal(custom, build_feature_matrix(synthetic_ohlcv, rsi_period=7))
+
+
+def test_unknown_parameter_raises(synthetic_ohlcv):
+    with pytest.raises(TypeError):
+        FeatureCache().get(synthetic_ohlcv, rsi_periods=14)
+
+
+def test_returned_matrix_is_a_copy(synthetic_ohlcv):
+    cache = FeatureCache()
+    features = cache.get(synthetic_ohlcv)
+    features["rsi"] = 0.0
+    assert (cache.get(synthetic_ohlcv)["rsi"] != 0.0).all()
+
+
+def test_lru_eviction_respects_byte_budget(synthetic_ohlcv):
+    one_entry = build_feature_matrix(synthetic_ohlcv).memory_usage(index=False).sum()
+    cache = FeatureCache(max_bytes=int(one_entry * 2.5))
+    for ticker in ["A", "B", "C"]:
+        cache.get(synthetic_ohlcv, ticker)
+    assert cache.evictions == 1
+    assert cache.size_bytes <= cache.max_bytes
+
+    cache.get(synthetic_ohlcv, "C")  # still cached
+    cache.get(synthetic_ohlcv, "A")  # evicted first, so recomputed
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_invalidate_drops_one_ticker(synthetic_ohlcv):
+    cache = FeatureCache()
+    cache.get(synthetic_ohlcv, "AAPL")
+    cache.get(synthetic_ohlcv, "MSFT")
+    cache.invalidate("AAPL")
+    cache.get(synthetic_ohlcv, "AAPL")
+    cache.get(synthetic_ohlcv, "MSFT")
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+# ── Incremental extension ─────────────────────────────────────────────────────
+
+def test_appended_bars_extend_cached_matrix(synthetic_ohlcv):
+    cache = FeatureCache()
+    cache.get(synthetic_ohlcv.iloc[:300], "AAPL")
+    extended = cache.get(synthetic_ohlcv.iloc[:340], "AAPL")
+    again = cache.get(synthetic_ohlcv, "AAPL")  # extends the extension
+
+    assert cache.extensions == 2
+    assert cache.misses == 1
+    pd.testing.assert_frame_equal(extended, build_feature_matrix(synthetic_ohlcv.iloc[:340]), rtol=1e-9)
+    pd.testing.assert_frame_equal(again, build_feature_matrix(synthetic_ohlcv), rtol=1e-9)
+
+
+def test_compact_matrix_extends_in_compact_layout(synthetic_ohlcv):
+    cache = FeatureCache()
+    cache.get(synthetic_ohlcv.iloc[:300], "AAPL", compact=True)
+    extended = cache.get(synthetic_ohlcv.iloc[:340], "AAPL", compact=True)
+    expected = build_feature_matrix(synthetic_ohlcv.iloc[:340], compact=True)
+
+    assert cache.extensions == 1
+    assert extended.dtypes.equals(expected.dtypes)
+    np.testing.assert_array_equal(extended["timestamp"], expected["timestamp"])
+    np.testing.assert_array_equal(extended["direction"], expected["direction"])
+    pd.testing.assert_frame_equal(extended, expected, rtol=1e-5)
+
+
+def test_changed_history_is_rebuilt_not_extended(synthetic_ohlcv):
+    cache = FeatureCache()
+    cache.get(synthetic_ohlcv.iloc[:300], "AAPL")
+    revised = synthetic_ohlcv.copy()
+    revised.loc[50, "close"] += 1.0
+    result = cache.get(revised, "AAPL")
+    assert (cache.extensions, cache.misses) == (0, 2)
+    pd.testing.assert_frame_equal(result, build_feature_matrix(revised))
+
+
+def test_long_append_is_rebuilt(synthetic_ohlcv):
+    cache = FeatureCache(max_extend_bars=50)
+    cache.get(synthetic_ohlcv.iloc[:300], "AAPL")
+    cache.get(synthetic_ohlcv, "AAPL")
+    assert (cache.extensions, cache.misses) == (0, 2)
+
+
+def test_multi_timeframe_matrices_are_cached_and_rebuilt_on_append():
+    minutes = make_ohlcv(3_000, "minute")
+    timeframes = {"15min": None, "1h": ["rsi"]}
+    cache = FeatureCache()
+    first = cache.get(minutes.iloc[:2_500], "AAPL", timeframes=timeframes)
+    again = cache.get(minutes.iloc[:2_500], "AAPL", timeframes={"15min": None, "1h": ["rsi"]})
+    grown = cache.get(minutes, "AAPL", timeframes=timeframes)
+
+    assert (cache.hits, cache.misses, cache.extensions) == (1, 2, 0)
+    pd.testing.assert_frame_equal(again, first)
+    pd.testing.assert_frame_equal(grown, build_feature_matrix(minutes, timeframes=timeframes))
+    # The base timeframe comes first, so order is part of the key.
+    swapped = cache.get(minutes, "AAPL", timeframes={"1h": ["rsi"], "15min": None})
+    assert cache.misses == 3 and len(swapped) < len(grown)
+
+
+# ── Disk tier ─────────────────────────────────────────────────────────────────
+
+def test_disk_tier_survives_a_new_cache(synthetic_ohlcv, tmp_path):
+    FeatureCache(disk_dir=str(tmp_path)).get(synthetic_ohlcv, "AAPL", bb_period=10)
+
+    cache = FeatureCache(disk_dir=str(tmp_path))
+    restored = cache.get(synthetic_ohlcv, "AAPL", bb_period=10)
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 0
+    pd.testing.assert_frame_equal(restored, build_feature_matrix(synthetic_ohlcv, bb_period=10))
+
+    cache.invalidate("AAPL")
+    assert os.listdir(tmp_path) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
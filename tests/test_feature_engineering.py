@@ -15,7 +15,13 @@ from services.feature_engineering import (
     compute_bollinger_bands,
     compute_lagged_returns,
     compute_direction_label,
+    build_panel_feature_matrix,
+    compute_panel_features,
+    build_compact_feature_matrix,
+    compact_feature_dtype,
+    feature_columns,
 )
+from services import indicator_kernels
 
 
 @pytest.fixture
@@ -166,6 +172,12 @@ def test_build_feature_matrix_expected_columns(synthetic_ohlcv):
     assert expected.issubset(set(result.columns))
 
 
+def test_feature_columns_match_build_feature_matrix(synthetic_ohlcv):
+    assert feature_columns() + ["direction"] == list(build_feature_matrix(synthetic_ohlcv).columns)
+    result = build_feature_matrix(synthetic_ohlcv, lag_periods=[1, 3])
+    assert feature_columns([1, 3]) + ["direction"] == list(result.columns)
+
+
 def test_build_feature_matrix_direction_is_int(synthetic_ohlcv):
     result = build_feature_matrix(synthetic_ohlcv)
     assert result["direction"].dtype in (int, np.int64, np.int32)
@@ -203,5 +215,230 @@ def test_build_feature_matrix_raises_on_insufficient_data():
         build_feature_matrix(df)
 
 
+# ── Panel mode ─────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def synthetic_panel():
+    """Three tickers of different lengths, interleaved in time order."""
+    rng = np.random.default_rng(7)
+    frames = []
+    for i, n in enumerate([100, 60, 150]):
+        timestamps = pd.date_range("2024-01-02 09:00", periods=n, freq="h", tz="UTC")
+        close = 150.0 + np.cumsum(rng.standard_normal(n) * 0.5)
+        frames.append(pd.DataFrame({
+            "ticker": f"T{i}",
+            "timestamp": timestamps,
+            "open": close + rng.standard_normal(n) * 0.2,
+            "high": close + np.abs(rng.standard_normal(n) * 0.3),
+            "low": close - np.abs(rng.standard_normal(n) * 0.3),
+            "close": close,
+            "volume": rng.integers(0, 3, size=n) * 1_000.0,
+        }))
+    return pd.concat(frames).sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+def test_panel_matches_single_ticker_path(synthetic_panel):
+    result = build_panel_feature_matrix(synthetic_panel)
+    for ticker, group in synthetic_panel.groupby("ticker"):
+        expected = build_feature_matrix(group.drop(columns="ticker").reset_index(drop=True))
+        actual = result[result["ticker"] == ticker].drop(columns="ticker").reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_panel_arrays_match_single_ticker_indicators(synthetic_ohlcv):
+    df = synthetic_ohlcv
+    block = {col: df[[col]].to_numpy() for col in ["open", "high", "low", "close", "volume"]}
+    features = compute_panel_features(
+        block["open"], block["high"], block["low"], block["close"], block["volume"],
+        df["timestamp"],
+    )
+    np.testing.assert_allclose(features["rsi"][:, 0], compute_rsi(df["close"]), rtol=1e-10)
+    np.testing.assert_allclose(
+        features["atr"][:, 0], compute_atr(df["high"], df["low"], df["close"]), rtol=1e-10
+    )
+    np.testing.assert_allclose(
+        features["vwap"][:, 0],
+        compute_vwap(df["close"], df["high"], df["low"], df["volume"], df["timestamp"]),
+        rtol=1e-10,
+    )
+
+
+def test_panel_raises_on_empty():
+    empty = pd.DataFrame(columns=["ticker", "timestamp", "open", "high", "low", "close", "volume"])
+    with pytest.raises(ValueError, match="empty"):
+        build_panel_feature_matrix(empty)
+
+
+def test_panel_raises_on_insufficient_ticker(synthetic_panel):
+    short = synthetic_panel[synthetic_panel["ticker"] == "T0"].head(10).assign(ticker="SHORT")
+    panel = pd.concat([synthetic_panel, short], ignore_index=True)
+    with pytest.raises(ValueError, match="SHORT"):
+        build_panel_feature_matrix(panel)
+
+
+# ── Kernel engine ──────────────────────────────────────────────────────────────
+
+needs_numba = pytest.mark.skipif(not indicator_kernels.NUMBA_AVAILABLE, reason="numba not installed")
+
+
+@needs_numba
+def test_engine_rsi_parity(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    rsi = compute_rsi(close, engine="numba")
+    pd.testing.assert_series_equal(rsi, compute_rsi(close), rtol=1e-10)
+    assert rsi.iloc[:13].isna().all()
+    valid = rsi.dropna()
+    assert (valid >= 0).all() and (valid <= 100).all()
+
+
+@needs_numba
+def test_engine_macd_parity(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    macd = compute_macd(close, engine="numba")
+    pd.testing.assert_frame_equal(macd, compute_macd(close), rtol=1e-10, atol=1e-12)
+    diff = (macd["histogram"] - (macd["macd_line"] - macd["signal_line"])).abs()
+    assert (diff < 1e-10).all()
+
+
+@needs_numba
+def test_engine_vwap_parity(synthetic_ohlcv):
+    df = synthetic_ohlcv
+    args = (df["close"], df["high"], df["low"], df["volume"], df["timestamp"])
+    vwap = compute_vwap(*args, engine="numba")
+    pd.testing.assert_series_equal(vwap, compute_vwap(*args), rtol=1e-10)
+    assert vwap.notna().all()
+
+
+@needs_numba
+def test_engine_atr_parity(synthetic_ohlcv):
+    df = synthetic_ohlcv
+    atr = compute_atr(df["high"], df["low"], df["close"], engine="numba")
+    pd.testing.assert_series_equal(atr, compute_atr(df["high"], df["low"], df["close"]), rtol=1e-10)
+    assert (atr.dropna() >= 0).all()
+
+
+@needs_numba
+def test_engine_bollinger_parity(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    bb = compute_bollinger_bands(close, engine="numba")
+    pd.testing.assert_frame_equal(bb, compute_bollinger_bands(close), rtol=1e-9)
+    pd.testing.assert_series_equal(bb["bb_middle"], close.rolling(20).mean(), check_names=False)
+    valid = bb.dropna()
+    assert (valid["bb_upper"] >= valid["bb_middle"]).all()
+    assert (valid["bb_middle"] >= valid["bb_lower"]).all()
+
+
+@needs_numba
+def test_engine_handles_nan_input(synthetic_ohlcv):
+    df = synthetic_ohlcv.copy()
+    df.loc[[30, 31, 60], ["high", "low", "close", "volume"]] = np.nan
+    pd.testing.assert_series_equal(
+        compute_rsi(df["close"], engine="numba"), compute_rsi(df["close"]), rtol=1e-10
+    )
+    pd.testing.assert_series_equal(
+        compute_atr(df["high"], df["low"], df["close"], engine="numba"),
+        compute_atr(df["high"], df["low"], df["close"]),
+        rtol=1e-10,
+    )
+    pd.testing.assert_frame_equal(
+        compute_bollinger_bands(df["close"], engine="numba"),
+        compute_bollinger_bands(df["close"]),
+        rtol=1e-9,
+    )
+
+
+@needs_numba
+def test_engine_build_feature_matrix_parity(synthetic_ohlcv):
+    result = build_feature_matrix(synthetic_ohlcv, engine="numba")
+    pd.testing.assert_frame_equal(result, build_feature_matrix(synthetic_ohlcv), rtol=1e-9)
+    assert result.isnull().sum().sum() == 0
+
+
+def test_engine_falls_back_without_numba(synthetic_ohlcv, monkeypatch):
+    monkeypatch.setattr(indicator_kernels, "NUMBA_AVAILABLE", False)
+    result = build_feature_matrix(synthetic_ohlcv, engine="numba")
+    pd.testing.assert_frame_equal(result, build_feature_matrix(synthetic_ohlcv))
+
+
+def test_engine_rejects_unknown_name(synthetic_ohlcv):
+    with pytest.raises(ValueError, match="engine"):
+        compute_rsi(synthetic_ohlcv["close"], engine="cuda")
+
+
+
+# ── Compact output ─────────────────────────────────────────────────────────────
+
+# float32 has a 24-bit significand: round-to-nearest is within 2**-24 relative.
+FLOAT32_RTOL = 2.0 ** -24
+
+
+def test_compact_layout_and_dtypes(synthetic_ohlcv):
+    compact = build_feature_matrix(synthetic_ohlcv, compact=True)
+    full = build_feature_matrix(synthetic_ohlcv)
+    assert list(compact.columns) == ["timestamp"] + list(full.columns)
+    assert compact["timestamp"].dtype == np.int64
+    assert compact["direction"].dtype == np.int8
+    assert (compact.drop(columns=["timestamp", "direction"]).dtypes == np.float32).all()
+    assert compact.memory_usage(index=False).sum() < 0.6 * full.memory_usage(index=False).sum()
+
+
+def test_compact_precision_parity_with_float64(synthetic_ohlcv):
+    full = build_feature_matrix(synthetic_ohlcv)
+    compact = build_feature_matrix(synthetic_ohlcv, compact=True)
+    assert len(compact) == len(full)
+    np.testing.assert_array_equal(compact["direction"], full["direction"])
+
+    features = full.drop(columns="direction")
+    # Each value is the float64 result rounded once to float32...
+    np.testing.assert_array_equal(compact[features.columns].to_numpy(), features.to_numpy(np.float32))
+    # ...so it is within float32 round-off of the float64 value.
+    np.testing.assert_allclose(compact[features.columns].to_numpy(), features.to_numpy(), rtol=FLOAT32_RTOL)
+
+
+def test_compact_timestamps_are_epoch_ms_of_kept_rows(synthetic_ohlcv):
+    compact = build_feature_matrix(synthetic_ohlcv, compact=True)
+    epoch = pd.Timestamp("1970-01-01", tz="UTC")
+    epoch_ms = ((synthetic_ohlcv["timestamp"] - epoch) // pd.Timedelta(milliseconds=1)).to_numpy()
+    # Clean input: the kept rows are one run ending just before the last bar.
+    last = len(synthetic_ohlcv) - 1
+    np.testing.assert_array_equal(compact["timestamp"], epoch_ms[last - len(compact):last])
+
+
+def test_compact_drops_interior_nan_rows_like_dropna(synthetic_ohlcv):
+    df = synthetic_ohlcv.copy()
+    df.loc[120, "volume"] = np.nan
+    full = build_feature_matrix(df)
+    compact = build_feature_matrix(df, compact=True)
+    assert len(compact) == len(full)
+    np.testing.assert_allclose(compact["close"], full["close"], rtol=FLOAT32_RTOL)
+
+
+def test_compact_memmap_output(synthetic_ohlcv, tmp_path):
+    path = str(tmp_path / "features.npy")
+    frame = build_compact_feature_matrix(synthetic_ohlcv, bb_period=10)
+    mapped = build_compact_feature_matrix(synthetic_ohlcv, output="memmap", path=path, bb_period=10)
+
+    reopened = np.load(path, mmap_mode="r")
+    assert reopened.dtype == compact_feature_dtype(list(frame.columns[1:-1]))
+    for name in frame.columns:
+        np.testing.assert_array_equal(reopened[name], frame[name].to_numpy())
+        np.testing.assert_array_equal(mapped[name], frame[name].to_numpy())
+
+
+def test_compact_arrow_output(synthetic_ohlcv):
+    pa = pytest.importorskip("pyarrow")
+    table = build_compact_feature_matrix(synthetic_ohlcv, output="arrow")
+    frame = build_compact_feature_matrix(synthetic_ohlcv)
+    assert table.schema.field("rsi").type == pa.float32()
+    assert table.schema.field("direction").type == pa.int8()
+    np.testing.assert_array_equal(table.column("rsi").to_numpy(), frame["rsi"].to_numpy())
+
+
+def test_compact_rejects_bad_output(synthetic_ohlcv):
+    with pytest.raises(ValueError):
+        build_compact_feature_matrix(synthetic_ohlcv, output="parquet")
+    with pytest.raises(ValueError):
+        build_compact_feature_matrix(synthetic_ohlcv, output="memmap")
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,208 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_ohlcv
+from services.feature_engineering import build_feature_matrix
+from services.feature_store import FeatureStore
+from services.streaming_indicators import StreamingFeatureEngine
+
+
+@pytest.fixture(scope="module")
+def bars():
+    """600 hourly bars (extended hours) over about five weeks."""
+    return make_ohlcv(600)
+
+
+@pytest.fixture(scope="module")
+def features(bars):
+    return build_feature_matrix(bars, compact=True)
+
+
+def _at(ms: int, bars: int = 0) -> pd.Timestamp:
+    # UTC time ms epoch milliseconds plus a number of hourly bars.
+    return pd.Timestamp(int(ms), unit="ms", tz="UTC") + pd.Timedelta(hours=bars)
+
+
+# ── Round trip ─────────────────────────────────────────────────────────────────
+
+def test_chunked_appends_read_back_as_one_compact_matrix(tmp_path, features):
+    store = FeatureStore(str(tmp_path), partition="day")
+    assert store.append("AAPL", features.iloc[:200]) == 200
+    assert store.append("AAPL", features.iloc[150:300]) == 100  # overlap is skipped
+    as_datetimes = features.iloc[300:].assign(timestamp=lambda df: pd.to_datetime(df["timestamp"], unit="ms", utc=True))
+    store.append("AAPL", as_datetimes)
+
+    # The last row's label needs a bar that is not stored yet.
+    expected = features.iloc[:-1].reset_index(drop=True)
+    out = store.read("AAPL")
+    assert list(out.columns) == ["ticker"] + list(features.columns)
+    assert (out["ticker"] == "AAPL").all()
+    pd.testing.assert_frame_equal(out.drop(columns="ticker"), expected, check_dtype=True)
+
+    serving = store.read("AAPL", labels=False)
+    assert len(serving) == len(features) and "direction" not in serving
+    assert store.latest("AAPL") == _at(features["timestamp"].iloc[-1])
+
+    reopened = FeatureStore(str(tmp_path), partition="day")
+    pd.testing.assert_frame_equal(reopened.read("AAPL"), out)
+    assert reopened.tickers == ["AAPL"]
+
+
+def test_streamed_rows_match_batch_matrix(tmp_path, bars, features):
+    store = FeatureStore(str(tmp_path))
+    engine = StreamingFeatureEngine()
+    for bar in bars.itertuples(index=False):
+        row = engine.update(bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        if row is not None:
+            store.append_row("AAPL", bar.timestamp, row)
+
+    out = store.read("AAPL").drop(columns="ticker")
+    # The stream also stores the final bar, so every batch row gets its label.
+    expected = features
+    out = out[out["timestamp"] >= expected["timestamp"].iloc[0]].reset_index(drop=True)
+    np.testing.assert_array_equal(out["timestamp"], expected["timestamp"])
+    np.testing.assert_array_equal(out["direction"], expected["direction"])
+    np.testing.assert_allclose(out["rsi"], expected["rsi"], rtol=1e-5)
+
+
+# ── Point in time ──────────────────────────────────────────────────────────────
+
+def test_as_of_never_returns_labels_from_the_future(tmp_path, features):
+    store = FeatureStore(str(tmp_path), partition="day")
+    store.append("AAPL", features)
+    timestamp = features["timestamp"].to_numpy()
+
+    for i in (0, 57, 300, len(features) - 1):
+        as_of = _at(timestamp[i], bars=1)  # the end of bar i
+        known = store.read("AAPL", as_of=as_of, labels=False)
+        labelled = store.read("AAPL", as_of=as_of)
+        assert known["timestamp"].iloc[-1] == timestamp[i]
+        assert len(labelled) == i
+        if i:
+            assert labelled["timestamp"].iloc[-1] == timestamp[i - 1]
+            # Every label returned only compares closes known at as_of.
+            np.testing.assert_array_equal(labelled["direction"], features["direction"].iloc[:i])
+
+    before_first_close = _at(timestamp[0], bars=1) - pd.Timedelta(milliseconds=1)
+    assert store.read("AAPL", as_of=before_first_close, labels=False).empty
+
+
+def test_labels_come_from_stored_closes_not_the_input(tmp_path, features):
+    store = FeatureStore(str(tmp_path))
+    leaked = features.copy()
+    leaked["direction"] = 1 - leaked["direction"]  # a wrong label must not be stored
+    store.append("AAPL", leaked.iloc[:10])
+    assert len(store.read("AAPL")) == 9
+    np.testing.assert_array_equal(store.read("AAPL")["direction"], features["direction"].iloc[:9])
+    store.append("AAPL", leaked.iloc[10:11])
+    assert store.read("AAPL")["direction"].iloc[-1] == features["direction"].iloc[9]
+
+
+# ── Lookups, projection and pushdown ───────────────────────────────────────────
+
+def test_ticker_and_time_range_lookups(tmp_path, features):
+    store = FeatureStore(str(tmp_path), partition="day")
+    shifted = features.copy()
+    shifted["close"] = shifted["close"] * 2
+    store.append("AAPL", features)
+    store.append("MSFT", shifted)
+
+    start, end = "2020-01-09", "2020-01-14 12:00"
+    out = store.read(["MSFT", "AAPL"], start=start, end=end, columns=["close"])
+    assert list(out.columns) == ["ticker", "timestamp", "close", "direction"]
+    assert list(out["ticker"].unique()) == ["MSFT", "AAPL"]
+
+    lo = pd.Timestamp(start, tz="America/New_York").value // 1_000_000
+    hi = pd.Timestamp(end, tz="America/New_York").value // 1_000_000
+    ts = features["timestamp"].iloc[:-1]
+    expected = features.iloc[:-1][(ts >= lo) & (ts < hi)]
+    aapl = out[out["ticker"] == "AAPL"]
+    np.testing.assert_array_equal(aapl["timestamp"], expected["timestamp"])
+    np.testing.assert_array_equal(out[out["ticker"] == "MSFT"]["close"], expected["close"] * 2)
+
+    assert store.tickers == ["AAPL", "MSFT"]
+    assert len(store.read(start=start, end=end)) == 2 * len(expected)
+    assert store.read("TSLA").empty
+    assert store.latest("TSLA") is None
+
+
+def test_filters_match_pandas_and_skip_partitions(tmp_path, features):
+    store = FeatureStore(str(tmp_path), partition="day")
+    store.append("AAPL", features)
+    labelled = features.iloc[:-1]
+
+    threshold = float(labelled["close"].quantile(0.9))
+    filters = [("close", ">=", threshold), ("rsi", "<", 70)]
+    out = store.read("AAPL", columns=["rsi", "atr"], filters=filters)
+    mask = (labelled["close"] >= np.float32(threshold)) & (labelled["rsi"] < np.float32(70))
+    np.testing.assert_array_equal(out["timestamp"], labelled["timestamp"][mask])
+    np.testing.assert_array_equal(out["atr"], labelled["atr"][mask])
+    assert store.partitions_skipped > 0
+
+    # A value equal to a stored float32 must still find its row.
+    value = float(labelled["rsi"].iloc[40])
+    assert store.read("AAPL", filters=[("rsi", "==", value)])["timestamp"].iloc[0] == labelled["timestamp"].iloc[40]
+
+    with pytest.raises(ValueError, match="Unknown feature column"):
+        store.read("AAPL", columns=["not_a_column"])
+    with pytest.raises(ValueError, match="operator"):
+        store.read("AAPL", filters=[("rsi", "~", 1)])
+
+
+def test_arrays_are_memory_mapped_without_copies(tmp_path, features):
+    store = FeatureStore(str(tmp_path), partition="year")
+    store.append("AAPL", features)
+
+    arrays = store.read("AAPL", columns=["rsi", "close"], output="arrays")
+    assert isinstance(arrays["rsi"], np.memmap) and not arrays["rsi"].flags.writeable
+    assert arrays["rsi"].dtype == np.float32 and arrays["direction"].dtype == np.int8
+    np.testing.assert_array_equal(arrays["close"], features["close"].iloc[:-1])
+
+    pytest.importorskip("pyarrow")
+    assert store.read("AAPL", output="arrow").num_rows == len(features) - 1
+
+
+# ── Append-only guarantees ─────────────────────────────────────────────────────
+
+def test_out_of_order_and_mismatched_appends_are_rejected(tmp_path, features):
+    store = FeatureStore(str(tmp_path))
+    store.append("AAPL", features.iloc[:50])
+    with pytest.raises(ValueError, match="increasing"):
+        store.append("AAPL", features.iloc[[60, 55]])
+    with pytest.raises(ValueError, match="columns"):
+        store.append("AAPL", features.iloc[50:60].drop(columns="rsi"))
+    with pytest.raises(ValueError, match="close"):
+        FeatureStore(str(tmp_path / "other")).append("AAPL", features[["timestamp", "rsi"]])
+    with pytest.raises(ValueError, match="partition"):
+        FeatureStore(str(tmp_path), partition="day")
+    assert len(store.read("AAPL", labels=False)) == 50
+
+
+def test_interrupted_append_is_invisible_and_overwritten(tmp_path, features):
+    store = FeatureStore(str(tmp_path), partition="year")
+    store.append("AAPL", features.iloc[:100])
+    # Simulate a crash after the column files were written but before the index was.
+    part = os.path.join(str(tmp_path), "AAPL", "2020")
+    for name in os.listdir(part):
+        with open(os.path.join(part, name), "ab") as f:
+            f.write(b"\xff" * 64)
+
+    store = FeatureStore(str(tmp_path), partition="year")
+    pd.testing.assert_frame_equal(
+        store.read("AAPL").drop(columns="ticker"), features.iloc[:99].reset_index(drop=True))
+    store.append("AAPL", features.iloc[100:])
+    pd.testing.assert_frame_equal(
+        store.read("AAPL").drop(columns="ticker"), features.iloc[:-1].reset_index(drop=True))
+
+    store.delete("AAPL")
+    assert store.tickers == [] and store.read("AAPL").empty
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,103 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import indicator_kernels
+from services.feature_engineering import build_feature_matrix
+from services.feature_sweep import _SharedIntermediates, build_feature_sweep, parameter_grid
+
+
+@pytest.fixture
+def synthetic_ohlcv():
+    """200 hourly bars of synthetic OHLCV data spanning several calendar days."""
+    np.random.seed(42)
+    n = 200
+    timestamps = pd.date_range("2024-01-02 09:00", periods=n, freq="h", tz="UTC")
+    close = 150.0 + np.cumsum(np.random.randn(n) * 0.5)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": close + np.random.randn(n) * 0.2,
+        "high": close + np.abs(np.random.randn(n) * 0.3),
+        "low": close - np.abs(np.random.randn(n) * 0.3),
+        "close": close,
+        "volume": np.random.randint(1_000, 100_000, size=n).astype(float),
+    })
+
+
+_CONFIGS = parameter_grid(
+    rsi_period=[7, 14],
+    macd_fast=[8, 12],
+    bb_period=[10, 20],
+    lag_periods=[[1, 2, 3], [1, 5, 10]],
+)
+
+
+def test_parameter_grid_is_cartesian_product():
+    grid = parameter_grid(rsi_period=[7, 14, 21], bb_period=[10, 20])
+    assert len(grid) == 6
+    assert {"rsi_period": 21, "bb_period": 10} in grid
+
+
+@pytest.mark.parametrize("engine", ["pandas", "numba"])
+def test_each_config_matches_build_feature_matrix(synthetic_ohlcv, engine):
+    if engine == "numba" and not indicator_kernels.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+    results = build_feature_sweep(synthetic_ohlcv, _CONFIGS, engine=engine)
+    assert len(results) == len(_CONFIGS)
+    for config, result in zip(_CONFIGS, results):
+        expected = build_feature_matrix(synthetic_ohlcv, **config)
+        pd.testing.assert_frame_equal(result, expected, rtol=1e-9)
+
+
+def test_default_config_matches_defaults(synthetic_ohlcv):
+    [result] = build_feature_sweep(synthetic_ohlcv, [{}])
+    pd.testing.assert_frame_equal(result, build_feature_matrix(synthetic_ohlcv), rtol=1e-9)
+
+
+def test_wide_has_one_column_per_distinct_indicator(synthetic_ohlcv):
+    wide = build_feature_sweep(synthetic_ohlcv, _CONFIGS, wide=True)
+    assert {"rsi_7", "rsi_14", "macd_line_8_26_9", "macd_line_12_26_9", "bb_middle_10", "bb_upper_20_2.0"} <= set(wide.columns)
+    assert {f"return_lag_{lag}" for lag in [1, 2, 3, 5, 10]} <= set(wide.columns)
+    assert len([c for c in wide.columns if c.startswith("rsi_")]) == 2
+    assert wide.isnull().sum().sum() == 0
+
+
+def test_wide_values_align_with_per_config_output(synthetic_ohlcv):
+    wide = build_feature_sweep(synthetic_ohlcv, _CONFIGS, wide=True)
+    config = {"rsi_period": 7, "bb_period": 10, "lag_periods": [1, 5, 10]}
+    narrow = build_feature_matrix(synthetic_ohlcv, **config)
+    # The wide matrix keeps the rows valid for every config; the narrowest
+    # warm-up among these configs is the longest lag (10), so align on close.
+    merged = wide.merge(narrow, on="close", suffixes=("", "_narrow"))
+    np.testing.assert_allclose(merged["rsi_7"], merged["rsi"], rtol=1e-9)
+    np.testing.assert_allclose(merged["bb_upper_10_2.0"], merged["bb_upper"], rtol=1e-9)
+
+
+def test_shared_work_is_memoized(synthetic_ohlcv):
+    shared = _SharedIntermediates(synthetic_ohlcv, "pandas")
+    for config in parameter_grid(rsi_period=[14] * 5, macd_fast=[12, 12]):
+        shared.rsi(config["rsi_period"])
+        shared.macd(config["macd_fast"], 26, 9)
+    kinds = [key[0] for key in shared._memo]
+    assert kinds.count("rsi") == 1
+    assert kinds.count("ema") == 2
+    assert kinds.count("macd") == 1
+
+
+def test_unknown_parameter_raises(synthetic_ohlcv):
+    with pytest.raises(ValueError, match="rsi_len"):
+        build_feature_sweep(synthetic_ohlcv, [{"rsi_len": 14}])
+
+
+def test_insufficient_rows_raises(synthetic_ohlcv):
+    with pytest.raises(ValueError, match="Insufficient"):
+        build_feature_sweep(synthetic_ohlcv.head(60), [{"macd_slow": 50}])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,232 @@
+import sys
+import os
+import json
+
+import pytest
+import numpy as np
+import pandas as pd
+from polygon import RESTClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.bulk_fetch import AggsFetcher
+from external.polygon_trading_data import PolygonTradingDataService
+from services import instrumentation
+from services.feature_engineering import build_feature_matrix
+from tests.polygon_stub import PolygonStub
+
+
+@pytest.fixture(autouse=True)
+def clean_instrumentation():
+    instrumentation.reset()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@pytest.fixture
+def synthetic_ohlcv():
+    np.random.seed(7)
+    n = 100
+    close = 150.0 + np.cumsum(np.random.randn(n) * 0.5)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-02 09:00", periods=n, freq="h", tz="UTC"),
+        "open": close + np.random.randn(n) * 0.2,
+        "high": close + np.abs(np.random.randn(n) * 0.3),
+        "low": close - np.abs(np.random.randn(n) * 0.3),
+        "close": close,
+        "volume": np.random.randint(1_000, 100_000, size=n).astype(float),
+    })
+
+
+def _counters(name):
+    return {
+        tuple(sorted(c["labels"].items())): c["value"]
+        for c in instrumentation.snapshot()["counters"] if c["name"] == name
+    }
+
+
+def _spans(name):
+    return [s for s in instrumentation.snapshot()["spans"] if s["name"] == name]
+
+
+# ── Spans and counters ─────────────────────────────────────────────────────────
+
+def test_disabled_records_nothing():
+    assert not instrumentation.is_enabled()
+    first = instrumentation.span("a", x=1)
+    assert first is instrumentation.span("b")
+    with first:
+        instrumentation.count("c")
+    assert instrumentation.snapshot() == {"counters": [], "spans": []}
+
+
+def test_counters_and_spans_aggregate_by_label():
+    instrumentation.enable()
+    for _ in range(3):
+        with instrumentation.span("work", stage="a"):
+            instrumentation.count("rows", 10, stage="a")
+    with instrumentation.span("work", stage="b"):
+        pass
+    assert _counters("rows") == {(("stage", "a"),): 30}
+    spans = {s["labels"]["stage"]: s for s in _spans("work")}
+    assert spans["a"]["count"] == 3 and spans["b"]["count"] == 1
+    assert spans["a"]["total_s"] >= 0
+
+
+def test_span_labels_errors_and_reraises():
+    instrumentation.enable()
+    with pytest.raises(KeyError):
+        with instrumentation.span("lookup"):
+            raise KeyError("x")
+    assert _spans("lookup")[0]["labels"] == {"error": "KeyError"}
+
+
+def test_timed_decorator():
+    @instrumentation.timed("double", kind="test")
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4
+    assert _spans("double") == []
+    instrumentation.enable()
+    assert double(3) == 6
+    assert _spans("double")[0]["count"] == 1
+
+
+# ── Sinks ──────────────────────────────────────────────────────────────────────
+
+def test_sinks_receive_events_and_snapshots(tmp_path):
+    memory = instrumentation.InMemorySink()
+    jsonl = instrumentation.JsonLinesSink(str(tmp_path / "events.jsonl"))
+    prom = instrumentation.PrometheusTextSink(str(tmp_path / "metrics.prom"))
+    instrumentation.enable(memory, jsonl, prom)
+    instrumentation.count("polygon_bytes", 512, method="get_hourly_ohlcv")
+    with instrumentation.span("feature_matrix", stage="indicators"):
+        pass
+    instrumentation.flush()
+    jsonl.close()
+
+    assert [e["type"] for e in memory.events] == ["counter", "span"]
+    assert len(memory.snapshots) == 1
+    lines = [json.loads(line) for line in open(tmp_path / "events.jsonl")]
+    assert lines[0]["name"] == "polygon_bytes" and lines[0]["value"] == 512
+    text = open(tmp_path / "metrics.prom").read()
+    assert 'polygon_bytes_total{method="get_hourly_ohlcv"} 512' in text
+    assert 'feature_matrix_seconds_count{stage="indicators"} 1' in text
+
+
+def test_prometheus_text_format():
+    instrumentation.enable()
+    instrumentation.count("calls", method='say "hi"')
+    instrumentation.record_span("request", 0.25, method="x")
+    instrumentation.record_span("request", 0.75, method="x")
+    text = instrumentation.prometheus_text()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{method="say \\"hi\\""} 1' in text
+    assert "# TYPE request_seconds summary" in text
+    assert 'request_seconds{method="x",quantile="0.5"}' in text
+    assert 'request_seconds_sum{method="x"} 1' in text
+    assert 'request_seconds_count{method="x"} 2' in text
+
+
+# ── Profiling ──────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("kind", instrumentation.PROFILERS)
+def test_profile_call(kind, synthetic_ohlcv):
+    result, profile = instrumentation.profile_call(build_feature_matrix, synthetic_ohlcv, profiler=kind)
+    assert len(result) > 0
+    assert profile.kind == kind
+    assert isinstance(profile.report(), str)
+
+
+def test_profile_call_without_profiler(synthetic_ohlcv):
+    result, profile = instrumentation.profile_call(build_feature_matrix, synthetic_ohlcv)
+    assert profile is None and len(result) > 0
+
+
+def test_unknown_profiler_rejected():
+    with pytest.raises(ValueError):
+        with instrumentation.profile("perf"):
+            pass
+
+
+# ── Feature engineering ────────────────────────────────────────────────────────
+
+def test_feature_matrix_emits_spans_and_row_counts(synthetic_ohlcv):
+    instrumentation.enable()
+    features = build_feature_matrix(synthetic_ohlcv)
+    indicators = {s["labels"]["indicator"] for s in _spans("indicator")}
+    assert {"rsi", "macd", "vwap", "atr", "bollinger"} <= indicators
+    stages = {s["labels"]["stage"] for s in _spans("feature_matrix")}
+    assert stages == {"indicators", "assemble"}
+    assert sum(_counters("feature_rows_in").values()) == len(synthetic_ohlcv)
+    assert sum(_counters("feature_rows_out").values()) == len(features)
+
+
+def test_feature_matrix_unchanged_by_instrumentation(synthetic_ohlcv):
+    plain = build_feature_matrix(synthetic_ohlcv)
+    instrumentation.enable()
+    pd.testing.assert_frame_equal(build_feature_matrix(synthetic_ohlcv), plain)
+
+
+# ── Polygon ingestion ──────────────────────────────────────────────────────────
+
+def _service(stub):
+    return PolygonTradingDataService(client=RESTClient(api_key="test", base=stub.base_url))
+
+
+def test_rest_requests_counted_per_method():
+    with PolygonStub(page_size=25) as stub:
+        service = _service(stub)
+        instrumentation.enable()
+        bars = service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+
+    method = (("method", "get_hourly_ohlcv"),)
+    assert _counters("polygon_calls") == {method: 1}
+    assert _counters("polygon_requests") == {(("method", "get_hourly_ohlcv"), ("status", 200)): 4}
+    assert _counters("polygon_bytes")[method] > 0
+    assert _counters("polygon_rows") == {method: len(bars)}
+    assert {s["labels"]["stage"] for s in _spans("polygon_stage")} == {"fetch", "frame"}
+
+
+def test_rest_errors_counted(capsys):
+    with PolygonStub(fail_first={"AAPL": [404]}) as stub:
+        service = _service(stub)
+        instrumentation.enable()
+        result = service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-16")
+
+    assert result.empty
+    assert "Error getting hourly OHLCV data" in capsys.readouterr().out
+    errors = _counters("polygon_errors")
+    assert len(errors) == 1
+    assert dict(next(iter(errors)))["method"] == "get_hourly_ohlcv"
+
+
+def test_bulk_fetch_retries_counted():
+    with PolygonStub(fail_first={"AAPL": [429, 503]}) as stub:
+        fetcher = AggsFetcher(stub.base_url, {}, requests_per_second=100, backoff=0.01, label="bulk")
+        instrumentation.enable()
+        fetcher.fetch_bars("AAPL", 1, "hour", "2024-12-16", "2024-12-16")
+
+    assert _counters("polygon_retries") == {
+        (("method", "bulk"), ("reason", "429")): 1,
+        (("method", "bulk"), ("reason", "503")): 1,
+    }
+    requests = _counters("polygon_requests")
+    assert requests[(("method", "bulk"), ("status", 200))] == 1
+    assert sum(requests.values()) == 3
+
+
+def test_bulk_fetch_labelled_with_service_method():
+    with PolygonStub() as stub:
+        service = _service(stub)
+        instrumentation.enable()
+        service.get_hourly_ohlcv_many(["AAPL", "MSFT"], "2024-12-16", "2024-12-16", requests_per_second=100)
+
+    assert _counters("polygon_calls") == {(("method", "get_hourly_ohlcv_many"),): 1}
+    assert _counters("polygon_requests") == {(("method", "get_hourly_ohlcv_many"), ("status", 200)): 2}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
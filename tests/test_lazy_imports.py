@@ -0,0 +1,126 @@
+import sys
+import os
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import external
+import services
+from external.bar_cache import BarCache
+from external.clients import OfflineError, offline_client, polygon_client
+from external.polygon_trading_data import PolygonTradingDataService
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["polygon", "numba", "urllib3", "dotenv", "websockets"]
+
+
+def _loaded_after(code: str, modules: list) -> list:
+    # Which of modules a fresh interpreter has loaded after running code.
+    check = f"{code}; import sys; print(','.join(m for m in {modules!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+# ── Import cost ────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("module", ["external.polygon_trading_data", "services.feature_engineering", "routes.predictions"])
+def test_entry_points_skip_heavy_optional_modules(module):
+    assert _loaded_after(f"import {module}", HEAVY) == []
+
+
+def test_pyarrow_is_imported_only_for_arrow_output():
+    # pandas 2 imports pyarrow itself when it is installed; nothing here should add to that.
+    baseline = _loaded_after("import pandas", ["pyarrow"])
+    assert _loaded_after("import services.feature_engineering, services.feature_store", ["pyarrow"]) == baseline
+
+
+def test_packages_import_submodules_on_first_use():
+    code = "import services, external"
+    assert _loaded_after(code, ["pandas", "services.backtest", "external.bar_cache"]) == []
+    code += "; services.run_walk_forward; external.BarCache"
+    assert _loaded_after(code, ["services.backtest", "external.bar_cache", "services.screener"]) == [
+        "services.backtest", "external.bar_cache",
+    ]
+
+
+def test_every_package_export_resolves():
+    for package in (services, external):
+        for name in package.__all__:
+            value = getattr(package, name)
+            assert name == "BAR_DTYPE" or value.__name__ == name
+        assert set(package.__all__) <= set(dir(package))
+        with pytest.raises(AttributeError):
+            package.not_a_name
+    from services import instrumentation  # submodules still import as before
+    assert instrumentation.is_enabled() in (True, False)
+
+
+def test_numba_kernels_compile_on_first_call():
+    code = "import services.feature_engineering"
+    assert "numba" not in _loaded_after(code, ["numba"])
+    from services import indicator_kernels
+    if not indicator_kernels.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+    code += ("; from benchmarks.synthetic import make_ohlcv"
+             "; services.feature_engineering.build_feature_matrix(make_ohlcv(200), engine='numba')")
+    assert _loaded_after(code, ["numba"]) == ["numba"]
+
+
+# ── Deferred client ────────────────────────────────────────────────────────────
+
+class FakeRESTClient:
+    def __init__(self):
+        self.calls = 0
+
+    def list_aggs(self, ticker, multiplier, timespan, from_, to, **kwargs):
+        self.calls += 1
+        for day in pd.date_range(from_, to, freq="B"):
+            ts = pd.Timestamp(day.date().isoformat(), tz="America/New_York") + pd.Timedelta(hours=10)
+            yield SimpleNamespace(timestamp=ts.value // 1_000_000, open=1.0, high=2.0, low=0.5, close=1.5, volume=10.0)
+
+
+def test_client_is_built_on_first_request_only(tmp_path):
+    client = FakeRESTClient()
+    built = []
+    factory = lambda: built.append(client) or client
+    cache = BarCache(str(tmp_path))
+    PolygonTradingDataService(client=client, bar_cache=cache).get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")
+
+    service = PolygonTradingDataService(bar_cache=cache, client_factory=factory)
+    assert len(service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")) == 5
+    assert built == []
+    assert len(service.get_hourly_ohlcv("AAPL", "2024-12-23", "2024-12-24")) == 2
+    service.get_hourly_ohlcv("AAPL", "2024-12-26", "2024-12-27")
+    assert len(built) == 1 and service.client is client
+
+
+def test_offline_mode_serves_cache_and_reports_misses(tmp_path, capsys):
+    cache = BarCache(str(tmp_path))
+    PolygonTradingDataService(client=FakeRESTClient(), bar_cache=cache).get_hourly_ohlcv(
+        "AAPL", "2024-12-16", "2024-12-20")
+
+    service = PolygonTradingDataService(bar_cache=cache, client_factory=offline_client)
+    assert len(service.get_hourly_ohlcv("AAPL", "2024-12-16", "2024-12-20")) == 5
+    assert len(service.get_hourly_ohlcv_many(["AAPL"], "2024-12-16", "2024-12-20")["AAPL"]) == 5
+    assert service.get_hourly_ohlcv("MSFT", "2024-12-16", "2024-12-20").empty
+    assert "Offline mode" in capsys.readouterr().out
+    with pytest.raises(OfflineError):
+        service.client
+
+
+def test_missing_key_fails_on_first_request_not_construction(monkeypatch, capsys):
+    monkeypatch.delenv("POLYGON_API_KEY", raising=False)
+    monkeypatch.setattr("dotenv.load_dotenv", lambda *args, **kwargs: False)
+    with pytest.raises(ValueError, match="POLYGON_API_KEY"):
+        polygon_client()
+    service = PolygonTradingDataService()
+    assert service.get_bid_ask_spread("AAPL") is None
+    assert "POLYGON_API_KEY" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
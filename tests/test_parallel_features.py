@@ -0,0 +1,130 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.feature_engineering import build_feature_matrix
+from services.parallel_features import _plan_tasks, _plan_waves, build_feature_matrices_parallel
+
+SHM_DIR = "/dev/shm"
+
+
+def _synthetic_ohlcv(seed: int, n: int = 300, start: str = "2024-01-02 09:00", tz: str = "UTC") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(start, periods=n, freq="h", tz=tz)
+    close = 150.0 + np.cumsum(rng.standard_normal(n) * 0.5)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": close + rng.standard_normal(n) * 0.2,
+        "high": close + np.abs(rng.standard_normal(n) * 0.3),
+        "low": close - np.abs(rng.standard_normal(n) * 0.3),
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, size=n).astype(float),
+    })
+
+
+@pytest.fixture
+def universe():
+    """Eight tickers of different lengths."""
+    return {f"T{i}": _synthetic_ohlcv(i, n=120 + 40 * i) for i in range(8)}
+
+
+def _shm_segments() -> set:
+    return set(os.listdir(SHM_DIR)) if os.path.isdir(SHM_DIR) else set()
+
+
+def _assert_matches_serial(result: dict, universe: dict, **params):
+    assert list(result) == list(universe)
+    for ticker, ohlcv in universe.items():
+        expected = build_feature_matrix(ohlcv, compact=True, **params)
+        pd.testing.assert_frame_equal(result[ticker], expected)
+
+
+# ── Results ───────────────────────────────────────────────────────────────────
+
+def test_process_pool_matches_build_feature_matrix(universe):
+    before = _shm_segments()
+    result = build_feature_matrices_parallel(universe, max_workers=2)
+    _assert_matches_serial(result, universe)
+    assert _shm_segments() == before
+
+
+def test_in_process_matches_build_feature_matrix(universe):
+    result = build_feature_matrices_parallel(universe, max_workers=1)
+    _assert_matches_serial(result, universe)
+
+
+def test_small_row_budget_runs_several_waves(universe):
+    # 500 rows per wave: most tickers get a wave of their own.
+    result = build_feature_matrices_parallel(universe, max_workers=2, max_rows=500, tasks_per_worker=2)
+    _assert_matches_serial(result, universe)
+
+
+def test_parameters_are_passed_through(universe):
+    params = {"rsi_period": 7, "macd_fast": 5, "macd_slow": 20, "lag_periods": [1, 3]}
+    result = build_feature_matrices_parallel(universe, max_workers=2, **params)
+    _assert_matches_serial(result, universe, **params)
+
+
+def test_long_frame_input_keeps_timezone():
+    # VWAP resets on New York days, so the timezone must survive the trip.
+    frames = {
+        "AAPL": _synthetic_ohlcv(1, tz="America/New_York"),
+        "MSFT": _synthetic_ohlcv(2, start="2024-01-03 04:00", tz="America/New_York"),
+    }
+    panel = pd.concat([df.assign(ticker=t) for t, df in frames.items()]).sort_values("timestamp", kind="stable")
+    result = build_feature_matrices_parallel(panel, max_workers=2)
+    _assert_matches_serial(result, frames)
+
+
+# ── Errors ────────────────────────────────────────────────────────────────────
+
+def test_rejects_empty_and_short_input(universe):
+    with pytest.raises(ValueError):
+        build_feature_matrices_parallel({})
+    with pytest.raises(ValueError, match="T_short"):
+        build_feature_matrices_parallel({**universe, "T_short": _synthetic_ohlcv(9, n=20)}, max_workers=2)
+
+
+def test_rejects_mixed_timezones():
+    frames = {
+        "AAPL": _synthetic_ohlcv(1, tz="America/New_York"),
+        "MSFT": _synthetic_ohlcv(2, tz="UTC"),
+    }
+    with pytest.raises(ValueError, match="MSFT.*timezone"):
+        build_feature_matrices_parallel(frames, max_workers=2)
+    naive = {**frames, "MSFT": _synthetic_ohlcv(2, tz=None)}
+    with pytest.raises(ValueError, match="MSFT"):
+        build_feature_matrices_parallel(naive, max_workers=2)
+
+
+def test_worker_errors_propagate_and_release_shared_memory(universe):
+    before = _shm_segments()
+    with pytest.raises(ValueError, match="engine"):
+        build_feature_matrices_parallel(universe, max_workers=2, engine="gpu")
+    assert _shm_segments() == before
+
+
+# ── Planning ──────────────────────────────────────────────────────────────────
+
+def test_waves_respect_row_budget():
+    lengths = [100, 200, 300, 50, 1_000, 10]
+    waves = _plan_waves(lengths, max_rows=400)
+    assert [i for wave in waves for i in wave] == list(range(len(lengths)))
+    for wave in waves:
+        assert len(wave) == 1 or sum(lengths[i] for i in wave) <= 400
+
+
+def test_tasks_cover_every_span():
+    spans = [(0, 100), (100, 150), (150, 400), (400, 410), (410, 600)]
+    tasks = _plan_tasks(spans, n_tasks=3)
+    assert [span for task in tasks for span in task] == spans
+    assert 2 <= len(tasks) <= 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,243 @@
+import sys
+import os
+import asyncio
+import pickle
+import threading
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.feature_engineering import build_feature_matrix
+from services.prediction import (
+    FEATURE_COLUMNS,
+    BatchSizeHistogram,
+    LatencyHistogram,
+    MicroBatcher,
+    PredictionService,
+    load_models,
+)
+
+TICKERS = ["AAPL", "MSFT", "NVDA", "AMD"]
+
+
+def _synthetic_ohlcv(seed: int, n: int = 300, start: str = "2024-01-02 09:00") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(start, periods=n, freq="h", tz="UTC")
+    close = 150.0 + np.cumsum(rng.standard_normal(n) * 0.5)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": close + rng.standard_normal(n) * 0.2,
+        "high": close + np.abs(rng.standard_normal(n) * 0.3),
+        "low": close - np.abs(rng.standard_normal(n) * 0.3),
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, size=n).astype(float),
+    })
+
+
+class RsiModel:
+    """Predicts 'up' when RSI is below 50 and counts its predict calls.
+    Module-level so it can be pickled."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, x):
+        self.calls.append(len(x))
+        return (x[:, FEATURE_COLUMNS.index("rsi")] < 50).astype(float)
+
+    def predict_proba(self, x):
+        up = 1 - x[:, FEATURE_COLUMNS.index("rsi")] / 100
+        return np.column_stack([1 - up, up])
+
+
+class CloseModel:
+    """Returns the close price, so results show which row was used."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, x):
+        self.calls.append(len(x))
+        return x[:, FEATURE_COLUMNS.index("close")]
+
+
+@pytest.fixture
+def matrices():
+    return {t: build_feature_matrix(_synthetic_ohlcv(seed)) for seed, t in enumerate(TICKERS)}
+
+
+@pytest.fixture
+def service(matrices):
+    service = PredictionService({"rsi": RsiModel(), "close": CloseModel()})
+    service.load_features(matrices)
+    return service
+
+
+# ── PredictionService ─────────────────────────────────────────────────────────
+
+def test_models_are_warmed_up_at_startup():
+    model = RsiModel()
+    PredictionService({"rsi": model})
+    assert model.calls == [1]
+    with pytest.raises(ValueError):
+        PredictionService({})
+
+
+def test_batch_predictions_use_latest_rows(service, matrices):
+    result = service.predict(["NVDA", "AAPL"])
+    assert result["ticker"].tolist() == ["NVDA", "AAPL"]
+    assert (result["model"] == "rsi").all()
+    for _, row in result.iterrows():
+        latest = matrices[row["ticker"]].iloc[-1]
+        assert row["prediction"] == float(latest["rsi"] < 50)
+        assert row["probability"] == pytest.approx(1 - latest["rsi"] / 100)
+
+    closes = service.predict(model="close")
+    assert closes["ticker"].tolist() == TICKERS
+    assert closes["prediction"].tolist() == [matrices[t]["close"].iloc[-1] for t in TICKERS]
+    assert closes["probability"].isna().all()
+
+
+def test_unknown_tickers_and_models(service):
+    known, predictions, _ = service.predict_arrays(["AAPL", "NOPE"])
+    assert known.tolist() == [True, False]
+    assert np.isnan(predictions[1])
+    assert service.predict(["NOPE"]).empty
+    with pytest.raises(KeyError):
+        service.predict(["AAPL"], model="transformer")
+
+
+def test_streamed_rows_match_build_feature_matrix():
+    bars = _synthetic_ohlcv(7, n=302)
+    service = PredictionService({"close": CloseModel()})
+    service.load_history({"AAPL": bars.iloc[:299]})
+    service.update_bar("AAPL", *bars.iloc[299][["timestamp", "open", "high", "low", "close", "volume"]])
+
+    # Row for bar 299 is the last labelled row once bar 300 exists.
+    expected = build_feature_matrix(bars.iloc[:301]).iloc[-1][FEATURE_COLUMNS].to_numpy(dtype=float)
+    np.testing.assert_allclose(service.values[0], expected, rtol=1e-9)
+
+
+def test_from_dir_loads_pickled_models(tmp_path):
+    with open(tmp_path / "rsi.pkl", "wb") as f:
+        pickle.dump(RsiModel(), f)
+    (tmp_path / "notes.txt").write_text("not a model")
+    assert list(load_models(tmp_path)) == ["rsi"]
+    service = PredictionService.from_dir(tmp_path)
+    assert service.default_model == "rsi"
+    assert service.models["rsi"].calls == [1]
+
+
+# ── Micro-batching ────────────────────────────────────────────────────────────
+
+def test_concurrent_requests_share_predict_calls(service, matrices):
+    model = service.models["close"]
+    model.calls.clear()
+    batcher = MicroBatcher(service, max_batch_size=64, max_wait_ms=50)
+    n_requests = 200
+    futures = [None] * n_requests
+    start = threading.Barrier(8)
+
+    def client(k):
+        start.wait()
+        for i in range(k, n_requests, 8):
+            futures[i] = batcher.submit(TICKERS[i % len(TICKERS)], "close")
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    for i, result in enumerate(results):
+        ticker = TICKERS[i % len(TICKERS)]
+        assert result["ticker"] == ticker
+        assert result["prediction"] == matrices[ticker]["close"].iloc[-1]
+    assert sum(model.calls) == n_requests
+    assert len(model.calls) <= n_requests // 8
+    assert max(model.calls) <= 64
+
+    stats = batcher.stats()
+    assert stats["latency"]["count"] == n_requests
+    assert stats["batch_size"]["batches"] == len(model.calls)
+    assert stats["latency"]["p50_ms"] <= stats["latency"]["p99_ms"] <= stats["latency"]["max_ms"]
+
+
+def test_async_requests_and_errors(service):
+    batcher = MicroBatcher(service, max_wait_ms=5)
+
+    async def run():
+        ok = await asyncio.gather(*(batcher.predict(t) for t in TICKERS * 50))
+        with pytest.raises(KeyError):
+            await batcher.predict("NOPE")
+        with pytest.raises(KeyError):
+            await batcher.predict("AAPL", model="transformer")
+        return ok
+
+    results = asyncio.run(run())
+    batcher.close()
+    assert [r["ticker"] for r in results] == TICKERS * 50
+    assert all(r["model"] == "rsi" and 0 <= r["probability"] <= 1 for r in results)
+
+
+def test_requests_for_different_models_in_one_batch(service, matrices):
+    batcher = MicroBatcher(service, max_wait_ms=50)
+    rsi = batcher.submit("AAPL")
+    close = batcher.submit("AAPL", "close")
+    assert close.result(timeout=5)["prediction"] == matrices["AAPL"]["close"].iloc[-1]
+    assert rsi.result(timeout=5)["model"] == "rsi"
+    batcher.close()
+
+
+# ── Histograms ────────────────────────────────────────────────────────────────
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.summary()["p50_ms"] is None
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == pytest.approx(50, rel=0.1)
+    assert summary["p99_ms"] == pytest.approx(99, rel=0.1)
+    assert summary["max_ms"] == pytest.approx(100)
+    assert summary["mean_ms"] == pytest.approx(50.5)
+
+
+def test_batch_size_histogram():
+    histogram = BatchSizeHistogram(max_size=8)
+    for size in [1, 1, 2, 8, 8, 8]:
+        histogram.record(size)
+    assert histogram.summary() == {"batches": 6, "mean": 28 / 6, "p50": 2, "p99": 8, "max": 8}
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+
+def test_http_routes(service, matrices):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from routes.predictions import create_app
+
+    app = create_app(service)
+    with TestClient(app) as client:
+        one = client.get("/predict/AAPL", params={"model": "close"})
+        assert one.status_code == 200
+        assert one.json()["prediction"] == matrices["AAPL"]["close"].iloc[-1]
+        assert client.get("/predict/NOPE").status_code == 404
+
+        many = client.post("/predict", json={"tickers": ["MSFT", "NVDA"], "model": "close"})
+        assert [r["ticker"] for r in many.json()] == ["MSFT", "NVDA"]
+        assert many.json()[0]["probability"] is None
+        assert client.get("/metrics").json()["latency"]["count"] == 2
+    # Leaving the client runs the app's shutdown, which stops the batcher.
+    assert not app.state.batcher._worker.is_alive()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,203 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import FakeRESTClient, make_ohlcv
+from external.polygon_trading_data import PolygonTradingDataService
+from services.feature_engineering import build_feature_matrix, build_multi_timeframe_feature_matrix
+from services.market_calendar import session_clock
+from services.resampling import Resampler, resample_bars, resample_many, timeframe_minutes
+
+_TZ = "America/New_York"
+
+
+def _minutes(n=20_000, **kwargs):
+    return make_ohlcv(n, "minute", start="2024-11-25", **kwargs)
+
+
+def _pandas_resample(minute_ohlcv, rule):
+    # Reference: pandas resampling in exchange time, empty buckets dropped.
+    local = minute_ohlcv.set_index(minute_ohlcv["timestamp"].dt.tz_convert(_TZ))
+    bars = local.resample(rule).agg({"open": "first", "high": "max", "low": "min", "close": "last",
+                                     "volume": "sum"}).dropna()
+    bars.index = bars.index.tz_convert("UTC")
+    return bars.rename_axis("timestamp").reset_index()
+
+
+# ── Batch resampling ───────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("timeframe,rule", [("5min", "5min"), ("15min", "15min"), ("1h", "1h")])
+def test_clock_anchored_bars_match_pandas(timeframe, rule):
+    minutes = _minutes()
+    result = resample_bars(minutes, timeframe)
+    pd.testing.assert_frame_equal(result, _pandas_resample(minutes, rule), check_dtype=False)
+
+
+def test_resample_many_shares_one_pass():
+    minutes = _minutes()
+    many = resample_many(minutes, ["5min", "1h", "1d"])
+    for timeframe, bars in many.items():
+        pd.testing.assert_frame_equal(bars, resample_bars(minutes, timeframe))
+    assert many["5min"]["volume"].sum() == pytest.approx(minutes["volume"].sum())
+
+
+def test_regular_session_drops_extended_minutes():
+    minutes = _minutes()
+    bars = resample_bars(minutes, "1h", session="regular")
+    local = bars["timestamp"].dt.tz_convert(_TZ)
+    assert local.dt.hour.min() == 9 and local.dt.hour.max() == 15
+    # The 09:00 bar only holds 09:30-09:59.
+    minute_local = minutes["timestamp"].dt.tz_convert(_TZ)
+    minute = minute_local.dt.hour * 60 + minute_local.dt.minute
+    early = minute_local.dt.strftime("%m-%d").isin(["11-29", "12-24"])
+    in_regular = (minute >= 570) & (minute < np.where(early, 780, 960))
+    assert bars["volume"].sum() == pytest.approx(minutes.loc[in_regular, "volume"].sum())
+
+
+def test_session_anchor_starts_at_the_open():
+    bars = resample_bars(_minutes(), "1h", session="regular", anchor="session", include_end=True)
+    local = bars["timestamp"].dt.tz_convert(_TZ)
+    assert set(local.dt.minute) == {30}
+    # 15:30 bars stop at the 16:00 close.
+    last = bars[local.dt.hour == 15]
+    assert ((last["end"] - last["timestamp"]) == pd.Timedelta(minutes=30)).all()
+
+
+def test_early_close_and_daily_bars():
+    minutes = _minutes(missing_fraction=0, halts_per_year=0)
+    daily = resample_bars(minutes, "1d", include_end=True)
+    local_end = daily["end"].dt.tz_convert(_TZ)
+    ends = dict(zip(local_end.dt.date.astype(str), local_end.dt.hour))
+    assert ends["2024-11-29"] == 17 and ends["2024-11-26"] == 20
+    assert daily["timestamp"].dt.tz_convert(_TZ).dt.hour.eq(0).all()
+    by_day = minutes.groupby(minutes["timestamp"].dt.tz_convert(_TZ).dt.date)
+    np.testing.assert_allclose(daily["volume"], by_day["volume"].sum())
+    np.testing.assert_allclose(daily["high"], by_day["high"].max())
+
+
+def test_naive_utc_timestamps_and_unsorted_input():
+    minutes = _minutes(5_000)
+    shuffled = minutes.sample(frac=1, random_state=0)
+    shuffled["timestamp"] = shuffled["timestamp"].dt.tz_convert(None)
+    pd.testing.assert_frame_equal(resample_bars(shuffled, "15min"), resample_bars(minutes, "15min"))
+
+
+def test_invalid_arguments_raise():
+    assert timeframe_minutes("1h") == 60 and timeframe_minutes("1d") is None
+    assert timeframe_minutes("90min") == 90 and timeframe_minutes("4h") == 240
+    for timeframe in ["30s", "2d", "bogus", "0min", "24h", "1.5h", "1H", " 5min", None]:
+        with pytest.raises(ValueError):
+            timeframe_minutes(timeframe)
+    with pytest.raises(ValueError):
+        resample_many(_minutes(100), ["1h"], session="overnight")
+    with pytest.raises(ValueError):
+        resample_many(_minutes(100), ["1h"], anchor="midnight")
+
+
+def test_session_clock_flags_out_of_session_minutes():
+    ts = pd.to_datetime(["2024-07-01 13:29", "2024-07-01 13:30", "2024-07-01 19:59", "2024-07-01 20:00"], utc=True)
+    clock = session_clock(ts.values.astype("datetime64[ns]").astype(np.int64), "regular")
+    assert list(clock["in_session"]) == [False, True, True, False]
+
+    # July 3, 2024 closes at 13:00 New York time (17:00 UTC).
+    ts = pd.to_datetime(["2024-07-03 16:59", "2024-07-03 17:00"], utc=True)
+    clock = session_clock(ts.values.astype("datetime64[ns]").astype(np.int64), "regular")
+    assert list(clock["close"]) == [13 * 60] * 2 and list(clock["in_session"]) == [True, False]
+
+
+# ── Incremental resampling ─────────────────────────────────────────────────────
+
+def test_incremental_matches_batch():
+    minutes = _minutes()
+    timeframes = ["5min", "15min", "1h", "1d"]
+    resampler = Resampler(timeframes)
+    completed = {timeframe: [] for timeframe in timeframes}
+    for start in range(0, len(minutes), 777):
+        for timeframe, bars in resampler.update(minutes.iloc[start:start + 777]).items():
+            completed[timeframe].append(bars)
+    batch = resample_many(minutes, timeframes)
+    for timeframe in timeframes:
+        pd.testing.assert_frame_equal(resampler.bars(timeframe), batch[timeframe])
+        # Everything but the bar still filling was reported as completed.
+        done = pd.concat(completed[timeframe], ignore_index=True)
+        pd.testing.assert_frame_equal(done, batch[timeframe].iloc[:len(done)], check_dtype=False)
+        assert len(batch[timeframe]) - len(done) <= 1
+
+
+def test_update_bar_completes_on_last_minute_and_ignores_duplicates():
+    resampler = Resampler(["5min"])
+    start = pd.Timestamp("2024-07-01 14:00", tz="UTC")
+    for i in range(4):
+        assert resampler.update_bar(start + pd.Timedelta(minutes=i), 10, 11, 9, 10 + i, 100)["5min"].empty
+    resampler.update_bar(start + pd.Timedelta(minutes=2), 50, 50, 50, 50, 999)
+    done = resampler.update_bar(start + pd.Timedelta(minutes=4), 10, 12, 8, 20, 100)["5min"]
+    assert len(done) == 1
+    assert done.iloc[0][["open", "high", "low", "close", "volume"]].tolist() == [10, 12, 8, 20, 500]
+
+
+def test_advance_closes_a_quiet_bar():
+    resampler = Resampler(["1h"])
+    resampler.update_bar(pd.Timestamp("2024-07-01 14:05", tz="UTC"), 10, 11, 9, 10, 100)
+    assert resampler.advance("2024-07-01 14:59:59+00:00")["1h"].empty
+    assert len(resampler.advance("2024-07-01 15:00+00:00")["1h"]) == 1
+    assert len(resampler.bars("1h", include_partial=False)) == 1
+
+
+# ── Multi-timeframe features ───────────────────────────────────────────────────
+
+def test_multi_timeframe_features_have_no_lookahead():
+    minutes = _minutes(60_000)
+    features = build_multi_timeframe_feature_matrix(minutes, {"15min": ["close", "rsi"], "1h": ["close"]})
+    assert list(features.columns) == ["timestamp", "close", "rsi", "close_1h", "direction"]
+    hourly = resample_bars(minutes, "1h", include_end=True).set_index("end")["close"]
+    for _, row in features.sample(50, random_state=0).iterrows():
+        base_end = row["timestamp"] + pd.Timedelta(minutes=15)
+        available = hourly[hourly.index <= base_end]
+        assert row["close_1h"] == available.iloc[-1]
+
+
+def test_multi_timeframe_base_columns_match_single_timeframe():
+    minutes = _minutes(60_000)
+    features = build_feature_matrix(minutes, timeframes={"1h": None, "1d": ["atr"]})
+    single = build_feature_matrix(resample_bars(minutes, "1h"))
+    merged = features.drop(columns="atr_1d").merge(single, on=["open", "high", "low", "close", "volume"],
+                                                   suffixes=("", "_single"))
+    assert len(merged) == len(features)
+    np.testing.assert_allclose(merged["rsi"], merged["rsi_single"])
+
+
+def test_multi_timeframe_rejects_bad_requests():
+    minutes = _minutes(5_000)
+    with pytest.raises(ValueError, match="Unknown feature"):
+        build_multi_timeframe_feature_matrix(minutes, {"15min": ["not_a_feature"]})
+    with pytest.raises(ValueError):
+        build_feature_matrix(minutes, timeframes={"15min": None}, compact=True)
+    with pytest.raises(ValueError, match="1d"):
+        build_multi_timeframe_feature_matrix(minutes, {"15min": None, "1d": ["rsi"]})
+
+
+# ── Service ────────────────────────────────────────────────────────────────────
+
+def test_service_resamples_one_minute_fetch():
+    minutes = _minutes()
+    client = FakeRESTClient({"SYN": minutes})
+    service = PolygonTradingDataService(client=client)
+    fetched = service.get_minute_ohlcv("SYN", "2024-11-25", "2024-12-31")
+    pd.testing.assert_frame_equal(fetched, minutes, check_dtype=False)
+    hourly = service.get_resampled_ohlcv("SYN", "2024-11-25", "2024-12-31", "1h")
+    pd.testing.assert_frame_equal(hourly, resample_bars(minutes, "1h"), check_dtype=False)
+    assert client.requests == 2
+
+
+def test_service_returns_empty_frame_on_bad_timeframe(capsys):
+    service = PolygonTradingDataService(client=FakeRESTClient({"SYN": _minutes(1_000)}))
+    assert service.get_resampled_ohlcv("SYN", "2024-11-25", "2024-12-31", "7s").empty
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
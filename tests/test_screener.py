@@ -0,0 +1,151 @@
+import sys
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.feature_engineering import build_panel_feature_matrix
+from services.screener import BASE_COLUMNS, Screener, compile_expression, latest_rows
+from services.streaming_indicators import StreamingFeatureEngine
+
+
+@pytest.fixture
+def synthetic_panel():
+    """120 hourly bars for 30 tickers in long format."""
+    rng = np.random.default_rng(7)
+    n_bars, n_tickers = 120, 30
+    timestamps = pd.date_range("2024-01-02 09:00", periods=n_bars, freq="h", tz="UTC")
+    close = 100.0 + np.cumsum(rng.standard_normal((n_bars, n_tickers)) * 0.5, axis=0)
+    spread = np.abs(rng.standard_normal((n_bars, n_tickers))) * 0.3
+    return pd.DataFrame({
+        "ticker": np.tile([f"T{i:02d}" for i in range(n_tickers)], n_bars),
+        "timestamp": np.repeat(timestamps, n_tickers),
+        "open": (close + rng.standard_normal((n_bars, n_tickers)) * 0.2).ravel(),
+        "high": (close + spread).ravel(),
+        "low": (close - spread).ravel(),
+        "close": close.ravel(),
+        "volume": rng.integers(1_000, 100_000, size=(n_bars, n_tickers)).astype(float).ravel(),
+    })
+
+
+@pytest.fixture
+def latest(synthetic_panel):
+    return latest_rows(build_panel_feature_matrix(synthetic_panel))
+
+
+# ── Expressions ───────────────────────────────────────────────────────────────
+
+def test_expression_evaluates_over_columns():
+    columns = {"rsi": np.array([20.0, 50.0, 80.0]), "volume": np.array([5e5, 5e5, 1e3])}
+    mask = compile_expression("(rsi < 60) & (volume > 1e4)")(columns)
+    np.testing.assert_array_equal(mask, [True, True, False])
+    np.testing.assert_allclose(compile_expression("abs(rsi - 50) / 10")(columns), [3.0, 0.0, 3.0])
+    np.testing.assert_allclose(compile_expression("(rsi / 10) ** 2 + rsi ** -1")(columns)[0], 4.05)
+
+
+@pytest.mark.parametrize("expression", [
+    "rsi < 30 and volume > 1",      # and/or are not element-wise
+    "__import__('os')",             # unknown name
+    "rsi.__class__",                # attribute access
+    "open(1)",                      # column name, not a function
+    "foo + 1",                      # unknown column
+    "9**9**9",                      # unbounded exponent
+    "rsi ** atr",                   # exponent must be a constant
+    "'ab' * 2",                     # strings are not numbers
+    "rsi > 1e300",                  # constant too large
+    "rsi + True",                   # booleans are not numbers
+])
+def test_expression_rejects_unsafe_or_unknown(expression):
+    with pytest.raises(ValueError):
+        compile_expression(expression)
+
+
+# ── Ranking ───────────────────────────────────────────────────────────────────
+
+def test_rank_matches_full_sort_reference(latest):
+    screener = Screener(score="histogram / atr", filters=["volume > 10_000"], k=5)
+    screener.load(latest)
+    top = screener.rank()
+
+    reference = latest[latest["volume"] > 10_000]
+    reference = (reference["histogram"] / reference["atr"]).sort_values(ascending=False)
+    assert list(top["ticker"]) == list(reference.index[:5])
+    np.testing.assert_allclose(top["score"], reference.iloc[:5])
+
+
+def test_rank_ascending_and_derived_columns(latest):
+    screener = Screener(score="bb_percent_b", k=3, ascending=True)
+    screener.load(latest)
+    top = screener.rank()
+
+    percent_b = (latest["close"] - latest["bb_lower"]) / (latest["bb_upper"] - latest["bb_lower"])
+    assert list(top["ticker"]) == list(percent_b.sort_values().index[:3])
+    np.testing.assert_allclose(
+        top["vwap_distance"], (latest["close"] / latest["vwap"] - 1).loc[top["ticker"]]
+    )
+
+
+def test_rank_returns_fewer_when_few_pass(latest):
+    screener = Screener(score="rsi", filters=[lambda c: c["rsi"] > 1e9], k=5)
+    screener.load(latest)
+    assert len(screener.rank()) == 0
+    screener.filters = []
+    assert len(screener.rank(k=100)) == len(latest)
+
+
+def test_nan_scores_are_never_selected(latest):
+    latest = latest.copy()
+    latest.loc[latest.index[:5], "atr"] = 0.0   # histogram / 0 → inf or nan
+    latest.loc[latest.index[5], "histogram"] = np.nan
+    screener = Screener(score="histogram / atr", filters=["atr > 0"], k=len(latest))
+    screener.load(latest)
+    top = screener.rank()
+    assert len(top) == len(latest) - 6
+    assert np.isfinite(top["score"]).all()
+
+
+# ── Updates ───────────────────────────────────────────────────────────────────
+
+def test_update_from_streaming_rows_reranks(synthetic_panel, latest):
+    screener = Screener(score="return_lag_1", k=1)
+    screener.load(latest)
+    row = latest.iloc[0][BASE_COLUMNS].to_dict()
+    row["return_lag_1"] = 1.0
+    screener.update("T07", row)
+    assert screener.rank()["ticker"].tolist() == ["T07"]
+
+    # A ticker the screener has not seen yet is appended.
+    ohlcv = synthetic_panel[synthetic_panel["ticker"] == "T00"].drop(columns="ticker")
+    engine = StreamingFeatureEngine()
+    for bar in ohlcv.itertuples(index=False):
+        streamed = engine.update(*bar)
+    streamed["return_lag_1"] = 2.0
+    screener.update("NEW", streamed)
+    assert screener.rank()["ticker"].tolist() == ["NEW"]
+
+
+def test_update_many_matches_load(latest):
+    loaded = Screener(score="rsi", k=10)
+    loaded.load(latest)
+    updated = Screener(score="rsi", k=10)
+    updated.update_many(latest.iloc[:10])
+    updated.update_many(latest)
+    pd.testing.assert_frame_equal(updated.rank(), loaded.rank())
+
+
+def test_update_many_keeps_last_row_of_repeated_new_ticker(latest):
+    screener = Screener(score="rsi", k=10)
+    rows = latest.iloc[[0, 1]].copy()
+    rows.index = ["NEW", "NEW"]
+    screener.update_many(rows)
+    assert screener.tickers == ["NEW"]
+    ranked = screener.rank()
+    assert ranked["ticker"].tolist() == ["NEW"]
+    assert ranked["rsi"].iloc[0] == latest["rsi"].iloc[1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,133 @@
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.polygon_trading_data import PolygonTradingDataService
+from external.snapshots import snapshot_to_frame
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "snapshot_stocks.json")
+
+
+def load_fixture() -> dict:
+    with open(FIXTURE) as f:
+        return json.load(f)
+
+
+class FakeSnapshotClient:
+    """Answers get_snapshot_all(raw=True) from the recorded fixture and records every call."""
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.calls = []
+
+    def get_snapshot_all(self, market_type, tickers=None, include_otc=False, raw=False):
+        self.calls.append(tickers)
+        rows = self.payload["tickers"]
+        if tickers is not None:
+            rows = [row for row in rows if row["ticker"] in tickers]
+        body = {"status": "OK", "count": len(rows), "tickers": rows}
+        return SimpleNamespace(data=json.dumps(body).encode())
+
+    def get_last_quote(self, ticker):
+        quote = next(row["lastQuote"] for row in self.payload["tickers"] if row["ticker"] == ticker)
+        return SimpleNamespace(
+            bid_price=quote["p"], ask_price=quote["P"], bid_size=quote["s"], ask_size=quote["S"]
+        )
+
+
+@pytest.fixture
+def client():
+    return FakeSnapshotClient(load_fixture())
+
+
+@pytest.fixture
+def service(client):
+    return PolygonTradingDataService(client=client)
+
+
+# ── Conversion ────────────────────────────────────────────────────────────────
+
+def test_frame_has_one_row_per_ticker_in_payload_order():
+    df = snapshot_to_frame(load_fixture()["tickers"])
+    assert df["ticker"].tolist() == ["AAPL", "MSFT", "ZBID", "HALT", "NEWIPO"]
+    aapl = df.iloc[0]
+    assert aapl["last_trade_price"] == 254.0
+    assert aapl["bid_price"] == 253.98 and aapl["ask_price"] == 254.02
+    assert aapl["bid_size"] == 5 and aapl["ask_size"] == 3
+    assert aapl["day_volume"] == 40123456
+    assert aapl["prev_close"] == 252.48
+    assert aapl["accumulated_volume"] == 40123456
+
+
+def test_nanosecond_timestamps_are_exact():
+    df = snapshot_to_frame(load_fixture()["tickers"])
+    assert df["quote_timestamp"].iloc[0] == pd.Timestamp(1735318799987654321, unit="ns", tz="UTC")
+    assert df["updated"].iloc[1] == pd.Timestamp(1735318800223456789, unit="ns", tz="UTC")
+
+
+def test_missing_sections_become_nan():
+    df = snapshot_to_frame(load_fixture()["tickers"]).set_index("ticker")
+    halt = df.loc["HALT"]
+    assert np.isnan(halt["bid_price"]) and np.isnan(halt["last_trade_price"])
+    assert pd.isna(halt["quote_timestamp"])
+    assert np.isnan(halt["todays_change"])  # explicit null
+    assert np.isnan(halt["spread"]) and not halt["excess_demand"]
+    assert np.isnan(df.loc["NEWIPO", "prev_close"])
+    assert np.isnan(df.loc["ZBID", "accumulated_volume"])
+
+
+def test_quote_metrics_match_per_ticker_methods(service, client):
+    df = snapshot_to_frame(load_fixture()["tickers"]).set_index("ticker")
+    for ticker in ["AAPL", "MSFT", "NEWIPO"]:
+        spread = service.get_bid_ask_spread(ticker)
+        imbalance = service.get_order_imbalance(ticker)
+        row = df.loc[ticker]
+        assert row["spread"] == pytest.approx(spread["spread"])
+        assert row["spread_percentage"] == pytest.approx(spread["spread_percentage"])
+        assert row["imbalance"] == imbalance["imbalance"]
+        assert row["imbalance_ratio"] == pytest.approx(imbalance["imbalance_ratio"])
+        assert row["excess_demand"] == imbalance["excess_demand"]
+
+
+def test_quote_metrics_edge_cases():
+    df = snapshot_to_frame(load_fixture()["tickers"]).set_index("ticker")
+    zbid = df.loc["ZBID"]
+    assert np.isnan(zbid["spread_percentage"])   # zero bid
+    assert zbid["imbalance_ratio"] == np.inf     # zero ask size
+    assert zbid["mid_price"] == pytest.approx(0.265)
+
+
+def test_empty_payload():
+    df = snapshot_to_frame([])
+    assert len(df) == 0
+    assert "spread" in df.columns
+
+
+# ── Service ───────────────────────────────────────────────────────────────────
+
+def test_full_market_snapshot_is_one_request(service, client):
+    df = service.get_market_snapshot()
+    assert client.calls == [None]
+    assert len(df) == 5
+
+
+def test_ticker_list_is_chunked(service, client):
+    df = service.get_market_snapshot(["AAPL", "MSFT", "ZBID", "NOPE"], chunk_size=2)
+    assert client.calls == [["AAPL", "MSFT"], ["ZBID", "NOPE"]]
+    assert df["ticker"].tolist() == ["AAPL", "MSFT", "ZBID"]
+
+
+def test_errors_return_empty_frame(service, client):
+    client.get_snapshot_all = lambda *args, **kwargs: (_ for _ in ()).throw(RuntimeError("boom"))
+    assert service.get_market_snapshot().empty
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,253 @@
+import sys
+import os
+import json
+import time
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_ohlcv, make_stream_frames
+from external.stream_messages import decode_frames
+from external.streaming import PolygonStream
+from services.feature_engineering import build_feature_matrix
+from services.live_pipeline import BAR_RECORD, LivePipeline
+from services.resampling import resample_bars
+from services.ring_buffers import TickerRingBuffer
+from services.screener import Screener
+from tests.websocket_stub import PolygonStreamStub
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "stream_frames.jsonl")
+
+
+def _fixture_frames():
+    with open(FIXTURE) as f:
+        return f.read().splitlines()
+
+
+def _am_frames(ohlcv_by_ticker, per_frame=50):
+    # Minute bars as AM events, interleaved across tickers in time order.
+    events = []
+    for ticker, ohlcv in ohlcv_by_ticker.items():
+        ms = ohlcv["timestamp"].values.astype("datetime64[ms]").astype(np.int64).tolist()
+        for t, o, h, l, c, v in zip(ms, *(ohlcv[name].tolist() for name in ["open", "high", "low", "close", "volume"])):
+            events.append({"ev": "AM", "sym": ticker, "o": o, "h": h, "l": l, "c": c, "v": v, "s": t, "e": t + 60_000})
+    events.sort(key=lambda e: e["s"])
+    return [json.dumps(events[i:i + per_frame]) for i in range(0, len(events), per_frame)]
+
+
+def _bar(ticker, minute, close, volume=100.0):
+    ms = pd.Timestamp(minute, tz="UTC").value // 1_000_000
+    return {"ev": "AM", "sym": ticker, "o": close, "h": close + 1, "l": close - 1, "c": close, "v": volume,
+            "s": ms, "e": ms + 60_000}
+
+
+# ── Decoding ───────────────────────────────────────────────────────────────────
+
+def test_decode_recorded_frames():
+    batch = decode_frames(_fixture_frames())
+    assert [e["status"] for e in batch["status"]][:2] == ["connected", "auth_success"]
+    assert list(batch["T"]["ticker"]) == ["AAPL", "MSFT", "AAPL"]
+    np.testing.assert_array_equal(batch["T"]["price"], [213.5, 456.1, 213.52])
+    assert batch["T"]["timestamp"][0] == 1719843780015 * 1_000_000
+    assert list(batch["AM"]["ticker"]) == ["AAPL", "MSFT"]
+    assert batch["AM"]["end"][0] - batch["AM"]["timestamp"][0] == 60 * 1_000_000_000
+    # A null or missing field reads as NaN; second aggregates ("A") are ignored.
+    assert np.isnan(batch["Q"]["ask_price"][2]) and np.isnan(batch["Q"]["ask_size"][2])
+    assert batch["Q"]["bid_price"][2] == 213.5
+
+
+def test_decode_empty_batch():
+    batch = decode_frames([])
+    for event_type in ["AM", "T", "Q"]:
+        assert len(batch[event_type]["ticker"]) == 0 and batch[event_type]["timestamp"].dtype == np.int64
+
+
+# ── Ring buffers ───────────────────────────────────────────────────────────────
+
+def _records(values):
+    records = np.zeros(len(values), dtype=BAR_RECORD)
+    records["timestamp"] = values
+    return records
+
+
+def test_ring_buffer_keeps_last_records_per_ticker():
+    rings = TickerRingBuffer(BAR_RECORD, capacity=4)
+    rings.extend(np.array(["A", "B", "A"], dtype=object), _records([1, 10, 2]))
+    rings.extend(np.array(["A"] * 3 + ["B"], dtype=object), _records([3, 4, 5, 11]))
+    assert list(rings.get("A")["timestamp"]) == [2, 3, 4, 5]
+    assert list(rings.get("A", 2)["timestamp"]) == [4, 5]
+    assert list(rings.get("B")["timestamp"]) == [10, 11]
+    assert list(rings.latest()["timestamp"]) == [5, 11]
+    assert len(rings.get("C")) == 0 and "C" not in rings
+
+
+def test_ring_buffer_batch_larger_than_capacity():
+    rings = TickerRingBuffer(BAR_RECORD, capacity=3)
+    rings.extend(np.array(["A"] * 7, dtype=object), _records(range(7)))
+    assert list(rings.get("A")["timestamp"]) == [4, 5, 6]
+    rings.extend(np.array([f"T{i}" for i in range(40)], dtype=object), _records(range(40)))
+    assert len(rings) == 41 and rings.get("T39")["timestamp"][0] == 39
+
+
+# ── Live pipeline ──────────────────────────────────────────────────────────────
+
+def _minute_ohlcv(n=600, seed=0):
+    return make_ohlcv(n, "minute", seed=seed, start="2024-07-01", missing_fraction=0, halts_per_year=0)
+
+
+def test_minute_pipeline_matches_batch_features():
+    ohlcv = {"AAA": _minute_ohlcv(seed=1), "BBB": _minute_ohlcv(seed=2)}
+    screener = Screener("rsi")
+    pipeline = LivePipeline(screener=screener)
+    # build_feature_matrix drops the last bar, which has no label yet.
+    for frame in _am_frames({ticker: bars.iloc[:-1] for ticker, bars in ohlcv.items()}):
+        pipeline.process(decode_frames([frame]))
+    for ticker, bars in ohlcv.items():
+        expected = build_feature_matrix(bars).iloc[-1]
+        row = pipeline.features[ticker]
+        for column, value in row.items():
+            assert value == pytest.approx(expected[column], rel=1e-9), column
+    assert set(screener.rank()["ticker"]) == {"AAA", "BBB"}
+    assert pipeline.counts["minute_bars"] == 1198 and pipeline.counts["bars"] == 1198
+
+
+def test_timeframe_bars_match_resampling():
+    ohlcv = {"AAA": _minute_ohlcv(seed=1), "BBB": _minute_ohlcv(seed=2)}
+    pipeline = LivePipeline(timeframe="15min")
+    for frame in _am_frames(ohlcv, per_frame=7):
+        pipeline.process(decode_frames([frame]))
+    for ticker, bars in ohlcv.items():
+        expected = resample_bars(bars, "15min")
+        got = pipeline.bars.frame(ticker)
+        # The last bar is complete too: its final minute has arrived.
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_quiet_ticker_bar_closes_on_the_clock():
+    pipeline = LivePipeline(timeframe="5min")
+    first = [_bar("AAA", "2024-07-01 14:00", 10), _bar("BBB", "2024-07-01 14:01", 20)]
+    pipeline.process(decode_frames([json.dumps(first)]))
+    assert len(pipeline.bars.get("BBB")) == 0
+    # AAA's 14:05 bar shows the clock has passed 14:05, so BBB's bar closes too.
+    pipeline.process(decode_frames([json.dumps([_bar("AAA", "2024-07-01 14:05", 11)])]))
+    assert list(pipeline.bars.frame("BBB")["close"]) == [20]
+    assert len(pipeline.bars.get("AAA")) == 1
+    pipeline.advance("2024-07-01 14:10+00:00")
+    assert len(pipeline.bars.get("AAA")) == 2
+
+
+def test_duplicate_and_out_of_session_bars_are_ignored():
+    pipeline = LivePipeline()
+    frame = json.dumps([_bar("AAA", "2024-07-01 14:00", 10), _bar("AAA", "2024-07-01 14:00", 99),
+                        _bar("AAA", "2024-07-02 01:00", 50)])
+    pipeline.process(decode_frames([frame]))
+    pipeline.process(decode_frames([json.dumps([_bar("AAA", "2024-07-01 13:59", 5)])]))
+    assert list(pipeline.bars.frame("AAA")["close"]) == [10]
+
+
+def test_pipeline_buffers_trades_and_quotes():
+    pipeline = LivePipeline()
+    pipeline.process(decode_frames(_fixture_frames()))
+    assert list(pipeline.trades.frame("AAPL")["price"]) == [213.5, 213.52]
+    quotes = pipeline.quote_frame().set_index("ticker")
+    assert quotes.loc["MSFT", "ask_price"] == 456.12
+    assert quotes.loc["AAPL", "bid_price"] == 213.5
+
+
+def test_warm_start_from_history():
+    history = _minute_ohlcv(seed=3)
+    pipeline = LivePipeline()
+    pipeline.prime({"AAA": history.iloc[:-2]})
+    pipeline.process(decode_frames(_am_frames({"AAA": history.iloc[-2:-1]})))
+    expected = build_feature_matrix(history).iloc[-1]
+    assert pipeline.features["AAA"]["rsi"] == pytest.approx(expected["rsi"])
+
+
+# ── WebSocket consumer ─────────────────────────────────────────────────────────
+
+def _stream(stub, pipeline, **kwargs):
+    return PolygonStream(["AAPL", "MSFT"], pipeline, api_key="test-key", url=stub.url, **kwargs)
+
+
+def test_stream_subscribes_and_processes_every_frame():
+    frames = _fixture_frames()[3:]
+    with PolygonStreamStub(frames) as stub:
+        pipeline = LivePipeline()
+        with _stream(stub, pipeline, subscribe_chunk=1) as stream:
+            assert stub.replayed.wait(5) and stream.flush(5)
+        assert stub.subscriptions == ["AM.AAPL,T.AAPL,Q.AAPL", "AM.MSFT,T.MSFT,Q.MSFT"]
+        assert pipeline.counts["trades"] == 3 and pipeline.counts["quotes"] == 3
+        assert stream.stats()["connections"] == 1 and stream.stats()["dropped_frames"] == 0
+        assert stream.quotes().set_index("ticker").loc["MSFT", "spread"] == pytest.approx(0.07)
+
+
+def test_stream_rejects_bad_key_without_retrying(capsys):
+    with PolygonStreamStub([], api_key="right-key") as stub:
+        stream = _stream(stub, LivePipeline(), backoff=0.01).start()
+        stream._reader.join(5)
+        stream.stop()
+        assert stream.error is not None and stub.connections == 1
+
+
+def test_stream_reconnects_and_resumes(capsys):
+    frames = make_stream_frames(n_tickers=5, n_minutes=3, events_per_frame=10)
+    with PolygonStreamStub(frames, disconnect_after=len(frames) // 2) as stub:
+        pipeline = LivePipeline()
+        with _stream(stub, pipeline, backoff=0.01) as stream:
+            assert stub.replayed.wait(10) and stream.flush(5)
+        assert stub.connections == 2 and stream.stats()["reconnects"] == 1
+        assert pipeline.counts["trades"] == 5 * 3 * 20 and pipeline.counts["minute_bars"] == 15
+
+
+def test_corrupt_frame_is_dropped_without_losing_its_batch(capsys):
+    frames = _fixture_frames()[3:]
+    corrupt = frames[:1] + ['[{"ev": "T", "sym": "AAPL", "p": 1'] + frames[1:]
+    with PolygonStreamStub(corrupt) as stub:
+        pipeline = LivePipeline()
+        with _stream(stub, pipeline, max_batch_frames=len(corrupt)) as stream:
+            assert stub.replayed.wait(5) and stream.flush(5)
+        stats = stream.stats()
+        assert stats["bad_frames"] == 1 and stats["processed_frames"] == stats["frames"]
+        assert pipeline.counts["trades"] == 3 and pipeline.counts["quotes"] == 3
+    assert "undecodable" in capsys.readouterr().out
+
+
+class _SlowPipeline(LivePipeline):
+    def process(self, batch):
+        time.sleep(0.05)
+        return super().process(batch)
+
+
+def test_slow_consumer_drops_oldest_frames_without_blocking_the_socket():
+    frames = make_stream_frames(n_tickers=5, n_minutes=2, events_per_frame=5)
+    with PolygonStreamStub(frames) as stub:
+        with _stream(stub, _SlowPipeline(), max_pending_frames=20, max_batch_frames=5) as stream:
+            # The whole replay is received while the worker is still busy.
+            assert stub.replayed.wait(5)
+            assert stream.flush(10)
+        stats = stream.stats()
+        assert stats["dropped_frames"] > 0
+        assert stats["processed_frames"] + stats["dropped_frames"] == stats["frames"]
+
+
+def test_stream_keeps_up_with_100k_messages_per_second():
+    frames = make_stream_frames(n_tickers=500, n_minutes=5, trades_per_bar=20, quotes_per_bar=20)
+    events = sum(frame.count('"ev"') for frame in frames)
+    with PolygonStreamStub(frames, rate=100_000) as stub:
+        pipeline = LivePipeline()
+        with _stream(stub, pipeline) as stream:
+            assert stub.replayed.wait(30)
+            replayed = time.perf_counter()
+            assert stream.flush(10)
+            lag = time.perf_counter() - replayed
+        assert stream.stats()["dropped_frames"] == 0
+        assert pipeline.counts["trades"] + pipeline.counts["quotes"] + pipeline.counts["minute_bars"] == events
+        # Caught up within a fraction of a second of the last frame.
+        assert lag < 0.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,142 @@
+import sys
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.feature_engineering import (
+    build_feature_matrix,
+    compute_rsi,
+    compute_macd,
+    compute_vwap,
+    compute_atr,
+    compute_bollinger_bands,
+    compute_lagged_returns,
+)
+from services.streaming_indicators import (
+    StreamingATR,
+    StreamingBollingerBands,
+    StreamingFeatureEngine,
+    StreamingLaggedReturns,
+    StreamingMACD,
+    StreamingRSI,
+    StreamingVWAP,
+)
+
+
+@pytest.fixture
+def synthetic_ohlcv():
+    """300 hourly bars of synthetic OHLCV data spanning several calendar days."""
+    np.random.seed(42)
+    n = 300
+    timestamps = pd.date_range("2024-01-02 09:00", periods=n, freq="h", tz="UTC")
+    close = 150.0 + np.cumsum(np.random.randn(n) * 0.5)
+    high = close + np.abs(np.random.randn(n) * 0.3)
+    low = close - np.abs(np.random.randn(n) * 0.3)
+    open_ = close + np.random.randn(n) * 0.2
+    volume = np.random.randint(1_000, 100_000, size=n).astype(float)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    })
+
+
+def _stream(values, update):
+    return np.array([update(*args) for args in values], dtype=float)
+
+
+def test_streaming_rsi_matches_batch(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    rsi = StreamingRSI(14)
+    streamed = _stream(zip(close), rsi.update)
+    np.testing.assert_allclose(streamed, compute_rsi(close, 14), rtol=1e-10)
+
+
+def test_streaming_macd_matches_batch(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    macd = StreamingMACD(12, 26, 9)
+    streamed = np.array([macd.update(c) for c in close])
+    expected = compute_macd(close, 12, 26, 9)[["macd_line", "signal_line", "histogram"]]
+    np.testing.assert_allclose(streamed, expected.to_numpy(), rtol=1e-10, atol=1e-12)
+
+
+def test_streaming_vwap_matches_batch_and_resets(synthetic_ohlcv):
+    df = synthetic_ohlcv
+    vwap = StreamingVWAP()
+    streamed = _stream(
+        zip(df["close"], df["high"], df["low"], df["volume"], df["timestamp"]), vwap.update
+    )
+    expected = compute_vwap(df["close"], df["high"], df["low"], df["volume"], df["timestamp"])
+    np.testing.assert_allclose(streamed, expected, rtol=1e-10)
+
+
+def test_streaming_atr_matches_batch(synthetic_ohlcv):
+    df = synthetic_ohlcv
+    atr = StreamingATR(14)
+    streamed = _stream(zip(df["high"], df["low"], df["close"]), atr.update)
+    np.testing.assert_allclose(streamed, compute_atr(df["high"], df["low"], df["close"], 14), rtol=1e-10)
+
+
+def test_streaming_bollinger_matches_batch(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    bb = StreamingBollingerBands(20, 2.0)
+    streamed = np.array([bb.update(c) for c in close])
+    expected = compute_bollinger_bands(close, 20, 2.0)[["bb_upper", "bb_middle", "bb_lower"]]
+    np.testing.assert_allclose(streamed, expected.to_numpy(), rtol=1e-9)
+
+
+def test_streaming_lagged_returns_match_batch(synthetic_ohlcv):
+    close = synthetic_ohlcv["close"]
+    lags = StreamingLaggedReturns([1, 3, 5])
+    streamed = pd.DataFrame([lags.update(c) for c in close])
+    expected = compute_lagged_returns(close, [1, 3, 5])
+    np.testing.assert_allclose(streamed.to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+
+def test_feature_engine_matches_build_feature_matrix(synthetic_ohlcv):
+    df = synthetic_ohlcv
+    engine = StreamingFeatureEngine()
+    rows = []
+    for bar in df.itertuples(index=False):
+        row = engine.update(bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        if row is not None:
+            rows.append(row)
+
+    batch = build_feature_matrix(df)
+    # The batch path drops the final row because it has no 'direction' label yet.
+    streamed = pd.DataFrame(rows[:-1])
+    pd.testing.assert_frame_equal(
+        streamed, batch.drop(columns="direction"), rtol=1e-9, atol=1e-12
+    )
+
+
+def test_feature_engine_returns_none_during_warm_up(synthetic_ohlcv):
+    engine = StreamingFeatureEngine()
+    first = synthetic_ohlcv.iloc[0]
+    row = engine.update(
+        first["timestamp"], first["open"], first["high"], first["low"], first["close"], first["volume"]
+    )
+    assert row is None
+
+
+
+def test_feature_engine_prime_matches_bar_by_bar(synthetic_ohlcv):
+    bars = list(synthetic_ohlcv.itertuples(index=False))
+    replayed = StreamingFeatureEngine()
+    for bar in bars[:200]:
+        replayed.update(*bar)
+    primed = StreamingFeatureEngine()
+    primed.prime(synthetic_ohlcv.iloc[:200])
+
+    expected = pd.DataFrame([replayed.update(*bar) for bar in bars[200:]])
+    actual = pd.DataFrame([primed.update(*bar) for bar in bars[200:]])
+    pd.testing.assert_frame_equal(actual, expected, rtol=1e-10)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,124 @@
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tick_aggregation import TradeAggregator
+from external.polygon_trading_data import PolygonTradingDataService
+
+
+@pytest.fixture
+def trades():
+    """5,000 trades spread over one regular session, in time order."""
+    rng = np.random.default_rng(11)
+    n = 5_000
+    start = pd.Timestamp("2024-12-27 14:30", tz="UTC").value
+    timestamp = np.sort(start + rng.integers(0, 6 * 3_600 * 10**9, size=n))
+    price = 250.0 + np.cumsum(rng.standard_normal(n) * 0.01)
+    size = rng.integers(1, 500, size=n).astype(float)
+    return pd.DataFrame({"price": price, "size": size, "timestamp": timestamp})
+
+
+def _trade_objects(df):
+    return [SimpleNamespace(price=p, size=s, sip_timestamp=t) for p, s, t in df.itertuples(index=False)]
+
+
+def _expected_bars(df, interval):
+    idx = pd.to_datetime(df["timestamp"], unit="ns", utc=True)
+    grouped = df.assign(notional=df["price"] * df["size"]).set_index(idx).resample(interval)
+    expected = pd.DataFrame({
+        "open": grouped["price"].first(),
+        "high": grouped["price"].max(),
+        "low": grouped["price"].min(),
+        "close": grouped["price"].last(),
+        "volume": grouped["size"].sum(),
+        "vwap": grouped["notional"].sum() / grouped["size"].sum(),
+        "trade_count": grouped["price"].count(),
+    })
+    return expected[expected["trade_count"] > 0]
+
+
+def test_totals_match_full_list(trades):
+    agg = TradeAggregator()
+    agg.add_trades(_trade_objects(trades), chunk_size=777)
+    assert agg.trade_count == len(trades)
+    assert agg.total_volume == pytest.approx(trades["size"].sum())
+    assert agg.vwap == pytest.approx((trades["price"] * trades["size"]).sum() / trades["size"].sum())
+    assert agg.last_price == trades["price"].iloc[-1]
+
+
+@pytest.mark.parametrize("interval", ["1min", "5min", "1h"])
+def test_time_bars_match_resample(trades, interval):
+    agg = TradeAggregator(intervals=[interval])
+    agg.add_trades(_trade_objects(trades), chunk_size=1_000)
+    bars = agg.bars(interval)
+    expected = _expected_bars(trades, interval)
+    np.testing.assert_array_equal(bars["timestamp"].values, expected.index.values)
+    for col in ["open", "high", "low", "close", "volume", "vwap"]:
+        np.testing.assert_allclose(bars[col], expected[col], rtol=1e-12)
+    np.testing.assert_array_equal(bars["trade_count"], expected["trade_count"])
+
+
+def test_time_bars_independent_of_arrival_order(trades):
+    ordered = TradeAggregator(intervals=["5min"])
+    ordered.add_trades(_trade_objects(trades))
+    shuffled = TradeAggregator(intervals=["5min"])
+    shuffled.add_trades(_trade_objects(trades.sample(frac=1, random_state=0)), chunk_size=300)
+    pd.testing.assert_frame_equal(shuffled.bars("5min"), ordered.bars("5min"), rtol=1e-12)
+    assert shuffled.last_price == ordered.last_price
+
+
+def test_single_trade_updates(trades):
+    agg = TradeAggregator(intervals=["1min"])
+    for p, s, t in trades.head(200).itertuples(index=False):
+        agg.add(p, s, t)
+    batch = TradeAggregator(intervals=["1min"])
+    batch.add_trades(_trade_objects(trades.head(200)))
+    pd.testing.assert_frame_equal(agg.bars("1min"), batch.bars("1min"), rtol=1e-12)
+
+
+def test_volume_bars(trades):
+    agg = TradeAggregator(intervals=[], bar_volume=50_000)
+    agg.add_trades(_trade_objects(trades), chunk_size=999)
+    bars = agg.volume_bar_frame()
+    assert bars["volume"].sum() == pytest.approx(trades["size"].sum())
+    assert bars["trade_count"].sum() == len(trades)
+    # Every completed bar reaches the target; no bar overshoots by more than one trade.
+    completed = bars.iloc[:-1]
+    assert (completed["volume"] >= 50_000 - trades["size"].max()).all()
+    assert (completed["volume"] <= 50_000 + trades["size"].max()).all()
+    assert len(agg.volume_bar_frame(include_partial=False)) == len(bars) - 1
+
+
+class _FakeTradesClient:
+    def __init__(self, trades):
+        self.trades = trades
+        self.kwargs = None
+
+    def list_trades(self, **kwargs):
+        self.kwargs = kwargs
+        return iter(self.trades)
+
+
+def test_get_trade_volume_data_uses_date(trades):
+    client = _FakeTradesClient(_trade_objects(trades))
+    service = PolygonTradingDataService(client=client)
+    result = service.get_trade_volume_data("AAPL", date="2024-12-27", bar_volume=100_000)
+    assert client.kwargs["timestamp"] == "2024-12-27"
+    assert result["trade_count"] == len(trades)
+    assert result["latest_trade"] == trades["price"].iloc[-1]
+    assert set(result["bars"]) == {"1min", "5min", "1h", "volume"}
+
+
+def test_get_trade_volume_data_no_trades():
+    service = PolygonTradingDataService(client=_FakeTradesClient([]))
+    assert service.get_trade_volume_data("AAPL", date="2024-12-28") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,101 @@
+"""Local stand-in for Polygon's stocks WebSocket feed, for offline tests and benchmarks.
+
+Speaks the connect / auth / subscribe handshake, then replays recorded
+frames (e.g. from make_stream_frames or tests/fixtures/stream_frames.jsonl).
+"""
+import json
+import threading
+import time
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+_CONNECTED = json.dumps([{"ev": "status", "status": "connected", "message": "Connected Successfully"}])
+_AUTH_SUCCESS = json.dumps([{"ev": "status", "status": "auth_success", "message": "authenticated"}])
+_AUTH_FAILED = json.dumps([{"ev": "status", "status": "auth_failed", "message": "authentication failed"}])
+
+
+class PolygonStreamStub:
+    """Threaded WebSocket server that replays frames after a Polygon-style handshake.
+
+    The replay position is shared across connections, so a client that
+    reconnects picks up where the last connection stopped, as it would on
+    the live feed.
+
+    Args:
+        frames: Frame strings to send once the client has subscribed.
+        api_key: The only key accepted; others get auth_failed.
+        rate: Events per second to replay at (frames are paced by their
+              event count), or None for as fast as possible.
+        disconnect_after: Close the first connection after this many frames.
+    """
+
+    def __init__(self, frames: list, api_key: str = "test-key", rate: float = None, disconnect_after: int = None):
+        self.frames = list(frames)
+        self.api_key = api_key
+        self.rate = rate
+        self.disconnect_after = disconnect_after
+        self.subscriptions = []
+        self.connections = 0
+        self.sent = 0
+        self.replayed = threading.Event()
+        self._lock = threading.Lock()
+        self.server = serve(self._handle, "127.0.0.1", 0, max_size=None, compression=None)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.server.socket.getsockname()[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join(5)
+
+    def _handle(self, ws):
+        with self._lock:
+            self.connections += 1
+            first = self.connections == 1
+        try:
+            ws.send(_CONNECTED)
+            auth = json.loads(ws.recv())
+            if auth.get("action") != "auth" or auth.get("params") != self.api_key:
+                ws.send(_AUTH_FAILED)
+                return
+            ws.send(_AUTH_SUCCESS)
+            self._subscribe(ws, ws.recv())
+            # The client sends every subscribe message straight after auth.
+            while True:
+                try:
+                    self._subscribe(ws, ws.recv(timeout=0.05))
+                except TimeoutError:
+                    break
+            self._replay(ws, self.disconnect_after if first else None)
+            for _ in ws:
+                pass
+        except ConnectionClosed:
+            pass
+
+    def _subscribe(self, ws, message: str):
+        params = json.loads(message)["params"]
+        self.subscriptions.append(params)
+        ws.send(json.dumps([{"ev": "status", "status": "success", "message": f"subscribed to: {params}"}]))
+
+    def _replay(self, ws, limit):
+        start, events = time.perf_counter(), 0
+        while self.sent < len(self.frames):
+            if limit is not None and self.sent >= limit:
+                ws.close()
+                return
+            frame = self.frames[self.sent]
+            if self.rate:
+                events += frame.count('"ev"')
+                delay = start + events / self.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            ws.send(frame)
+            self.sent += 1
+        self.replayed.set()